@@ -0,0 +1,36 @@
+"""
+Microbenchmark: coste por llamada de obtener un cliente de dominio.
+
+Compara construir un ``MessageClient()`` en cada invocación de herramienta
+(comportamiento anterior) con obtenerlo del ``ClientRegistry`` compartido.
+
+Uso:
+    python benchmarks/bench_client_registry.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+os.environ.setdefault("EVOLUTION_API_URL", "http://localhost:8080")
+os.environ.setdefault("EVOLUTION_API_KEY", "benchmark-key")
+
+from evolution.base_routes import ClientRegistry
+from evolution.message.client import MessageClient
+
+ITERATIONS = 200_000
+
+def main() -> None:
+    registry = ClientRegistry()
+
+    per_call = timeit.timeit(MessageClient, number=ITERATIONS)
+    shared = timeit.timeit(lambda: registry.get(MessageClient), number=ITERATIONS)
+
+    print(f"Iteraciones: {ITERATIONS}")
+    print(f"MessageClient() por llamada: {per_call / ITERATIONS * 1e9:8.1f} ns/llamada")
+    print(f"ClientRegistry.get():        {shared / ITERATIONS * 1e9:8.1f} ns/llamada")
+    print(f"Aceleración:                 {per_call / shared:8.1f}x")
+
+if __name__ == "__main__":
+    main()
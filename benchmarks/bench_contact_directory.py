@@ -0,0 +1,81 @@
+"""
+Benchmark: directorio de contactos en memoria.
+
+Mide la construcción de los índices, la memoria por contacto y la latencia
+de las búsquedas por JID, número y prefijo del nombre, comparadas con
+recorrer la lista de findContacts en cada consulta.
+
+Uso:
+    python benchmarks/bench_contact_directory.py [número_de_contactos]
+"""
+
+import os
+import sys
+import time
+import random
+import statistics
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from evolution.contacts.directory import ContactDirectory, ContactEntry, normalize_name
+from payloads import find_contacts
+
+FIRST = ["Ana", "María", "José", "Luis", "Carla", "João", "Lucía", "Pedro", "Sofía", "Andrés", "Camila", "Diego"]
+LAST = ["Pérez", "Gómez", "Ruiz", "Souza", "Silva", "López", "Fernández", "Oliveira", "Martín", "Núñez"]
+
+def contacts(count: int):
+    """findContacts sintético con nombres variados"""
+    rng = random.Random(9)
+    records = find_contacts(count)
+    for i, record in enumerate(records):
+        record["pushName"] = f"{rng.choice(FIRST)} {rng.choice(LAST)} {i}"
+    return records
+
+def timed(fn, repeat: int = 200):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    records = contacts(count)
+
+    def build():
+        return ContactDirectory([e for e in map(ContactEntry.from_contact, records) if e is not None])
+
+    start = time.perf_counter()
+    directory = build()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    kept = build()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"construcción: {count} contactos en {elapsed * 1000:.0f} ms, {memory / count:.0f} bytes por contacto")
+
+    sample = records[count // 2]
+    number = sample["remoteJid"].split("@")[0]
+    queries = {
+        "JID": sample["remoteJid"],
+        "número completo": f"+{number[:2]} {number[2:4]} {number[4:9]}-{number[9:]}",
+        "número sin país": number[2:],
+        "prefijo de nombre": "lucí",
+        "nombre + apellido": "sofia nun",
+        "nombre completo": sample["pushName"],
+    }
+
+    def scan(query):
+        key = normalize_name(query)
+        return [r for r in records if key in normalize_name(r["pushName"] or "") or query in r["remoteJid"]][:10]
+
+    print(f"{'consulta':<20} {'directorio':>12} {'recorrido':>12} {'filas':>6}")
+    for label, query in queries.items():
+        indexed = timed(lambda: directory.lookup(query))
+        linear = timed(lambda: scan(query), repeat=3)
+        print(f"{label:<20} {indexed:>10.1f}µs {linear / 1000:>10.1f}ms {len(directory.lookup(query)):>6}")
+
+if __name__ == "__main__":
+    main()
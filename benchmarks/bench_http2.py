@@ -0,0 +1,126 @@
+"""
+Benchmark: pool HTTP/1.1 frente a HTTP/2 multiplexado.
+
+Levanta un servidor local (hypercorn, h2c) que simula la latencia de la
+Evolution API y lanza peticiones concurrentes con ambos transportes,
+midiendo throughput, latencia p50/p99 y conexiones abiertas.
+
+El benchmark usa HTTP/2 con "prior knowledge" (h2c) para evitar TLS en
+local; en producción ``EVOLUTION_API_HTTP2`` negocia HTTP/2 por ALPN.
+
+Requiere: pip install "httpx[http2]" hypercorn
+
+Uso:
+    python benchmarks/bench_http2.py [peticiones] [concurrencia]
+"""
+
+import asyncio
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+
+import httpx
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from evolution import http_client
+
+HOST = "127.0.0.1"
+PORT = 18082
+UPSTREAM_LATENCY = 0.02
+MAX_CONNECTIONS = 10
+
+async def stand_in_api(scope, receive, send):
+    """Servidor ASGI mínimo que responde como sendText tras una latencia fija"""
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    more_body = True
+    while more_body:
+        more_body = (await receive()).get("more_body", False)
+    await asyncio.sleep(UPSTREAM_LATENCY)
+    body = b'{"key":{"id":"BAE5F5A632EAE722"},"status":"PENDING"}'
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"application/json")]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+def run_server() -> None:
+    """Ejecutar el servidor en un proceso aparte para no competir por el event loop"""
+    config = Config()
+    config.bind = [f"{HOST}:{PORT}"]
+    config.loglevel = "WARNING"
+    config.h2_max_concurrent_streams = 1000
+    config.keep_alive_max_requests = 1_000_000
+    asyncio.run(serve(stand_in_api, config))
+
+async def run_load(client: httpx.AsyncClient, requests: int, concurrency: int) -> dict:
+    latencies = []
+    peak = {"connections": 0, "active_streams": 0}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(
+                f"http://{HOST}:{PORT}/message/sendText/bench",
+                json={"number": f"5511999{i:06d}", "text": "hola"}
+            )
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+            stats = http_client.get_connection_stats()
+            peak["connections"] = max(peak["connections"], stats["connections"])
+            peak["active_streams"] = max(peak["active_streams"], stats["active_streams"])
+
+    http_client._shared_client = client
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    http_client._shared_client = None
+
+    latencies.sort()
+    return {
+        "throughput": requests / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        **peak
+    }
+
+async def main(requests: int, concurrency: int) -> None:
+    server = multiprocessing.Process(target=run_server, daemon=True)
+    server.start()
+    await asyncio.sleep(1)
+
+    limits = httpx.Limits(max_connections=MAX_CONNECTIONS)
+    transports = {
+        "HTTP/1.1": httpx.AsyncClient(limits=limits),
+        "HTTP/2": httpx.AsyncClient(limits=limits, http1=False, http2=True)
+    }
+
+    print(f"{requests} peticiones, concurrencia {concurrency}, "
+          f"latencia upstream {UPSTREAM_LATENCY * 1000:.0f} ms, max_connections {MAX_CONNECTIONS}")
+    print(f"{'transporte':<10} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'conex.':>7} {'streams':>8}")
+    for name, client in transports.items():
+        async with client:
+            await run_load(client, concurrency, concurrency)  # calentamiento
+            result = await run_load(client, requests, concurrency)
+        print(f"{name:<10} {result['throughput']:>9.0f} {result['p50']:>8.1f} {result['p99']:>8.1f} "
+              f"{result['connections']:>7} {result['active_streams']:>8}")
+
+    server.terminate()
+    server.join()
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    asyncio.run(main(*(args or [2000, 100])))
@@ -0,0 +1,62 @@
+"""
+Benchmark: codecs JSON para cuerpos de petición y respuesta.
+
+Compara el codec de la biblioteca estándar con ``orjson`` (si está
+instalado) sobre payloads con la forma de las respuestas grandes de la
+Evolution API (ver ``payloads.py``).
+
+Uso:
+    python benchmarks/bench_json_codec.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import payloads
+from evolution.codec import CODECS, JSONCodec
+
+def best_of(fn, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main() -> None:
+    codecs = []
+    for name, factory in CODECS.items():
+        try:
+            codecs.append(factory())
+        except ImportError:
+            print(f"(codec '{name}' no disponible)")
+
+    stdlib = JSONCodec()
+    cases = {
+        "findMessages (5k)": payloads.find_messages(),
+        "findChats (3k)": payloads.find_chats(),
+        "findContacts (10k)": payloads.find_contacts(),
+        "fetchAllGroups+participants": payloads.fetch_all_groups(),
+        "getBase64FromMedia (2MB)": payloads.base64_media()
+    }
+    bodies = payloads.send_text_bodies()
+
+    header = f"{'payload':<30} {'MB':>6} " + " ".join(f"{c.name + ' loads':>14}" for c in codecs)
+    print(header)
+    for label, payload in cases.items():
+        raw = stdlib.dumps(payload)
+        row = f"{label:<30} {len(raw) / 1e6:>6.2f} "
+        row += " ".join(f"{best_of(lambda: c.loads(raw)) * 1000:>11.1f} ms" for c in codecs)
+        print(row)
+
+    print()
+    print(f"{'sendText dumps (1000 cuerpos)':<37} " + " ".join(
+        f"{c.name}: {best_of(lambda: [c.dumps(b) for b in bodies]) * 1000:.2f} ms" for c in codecs
+    ))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark: descarga de multimedia completa frente a streaming a disco.
+
+Compara el tiempo y el pico de memoria (tracemalloc) de decodificar una
+respuesta sintética de ``chat/getBase64FromMediaMessage`` entera en memoria
+con decodificarla por trozos escribiendo a disco (como hace la caché de
+medios), y la latencia de un acierto en la caché.
+
+Uso:
+    python benchmarks/bench_media_cache.py [tamaño_en_MB]
+"""
+
+import os
+import sys
+import time
+import base64
+import hashlib
+import tempfile
+import statistics
+import tracemalloc
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import payloads
+from evolution.codec import get_codec
+from evolution.media.cache import MediaCache
+from evolution.streaming import Base64FieldStream
+
+CHUNK_SIZE = 64 * 1024
+
+def network_chunks(size: int) -> List[bytes]:
+    """Respuesta con ``size`` bytes de multimedia, partida como lecturas de socket"""
+    media = payloads.base64_media(1000)
+    media["size"]["fileLength"] = str(size)
+    media["base64"] = base64.b64encode(os.urandom(size)).decode("ascii")
+    body = get_codec().dumps(media)
+    return [body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE)]
+
+def buffered(chunks: List[bytes], directory: str) -> int:
+    media = get_codec().loads(b"".join(chunks))
+    return len(base64.b64decode(media["base64"]))
+
+def streamed(chunks: List[bytes], directory: str) -> int:
+    parser = Base64FieldStream()
+    hasher = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(dir=directory) as f:
+        for chunk in chunks:
+            for item in parser.feed(chunk):
+                if isinstance(item, bytes):
+                    f.write(item)
+                    hasher.update(item)
+                    size += len(item)
+        parser.close()
+    return size
+
+def measure(fn, *args) -> Tuple[float, float]:
+    """Mejor tiempo de 3 ejecuciones y pico de memoria (medido aparte con tracemalloc)"""
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak / 1e6
+
+def main() -> None:
+    sizes = [int(float(sys.argv[1]) * 1e6)] if len(sys.argv) > 1 else [2_000_000, 16_000_000, 64_000_000]
+    print(f"{'MB':>5} {'modo':<20} {'tiempo':>9} {'pico MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            chunks = network_chunks(size)
+            for label, fn in (("completo", buffered), ("streaming a disco", streamed)):
+                elapsed, peak = measure(fn, chunks, tmp)
+                print(f"{size / 1e6:>5.0f} {label:<20} {elapsed * 1000:>7.0f}ms {peak:>9.1f}")
+
+        cache = MediaCache(os.path.join(tmp, "cache"))
+        with open(os.path.join(tmp, "blob"), "wb") as f:
+            f.write(os.urandom(1000))
+        cache._store("bench", "MSG", "original", "0" * 64, 1000, os.path.join(tmp, "blob"), {"mimetype": "image/jpeg"})
+        samples = []
+        for _ in range(1000):
+            start = time.perf_counter()
+            cache.lookup("bench", "MSG")
+            samples.append((time.perf_counter() - start) * 1e6)
+        print(f"acierto en caché: mediana {statistics.median(samples):.0f}µs")
+        cache.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark: índice local de mensajes (SQLite FTS5).
+
+Mide el ritmo de ingesta por lotes de 500 mensajes (como tras una página
+de findMessages) y la latencia de búsquedas típicas sobre el índice lleno.
+
+Uso:
+    python benchmarks/bench_message_index.py [número_de_mensajes]
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from evolution.search.index import MessageIndex
+
+BATCH = 500
+VOCAB = [
+    "hola", "pedido", "gracias", "envío", "mañana", "precio", "confirmo", "factura", "cliente",
+    "entrega", "ok", "buen", "día", "consulta", "stock", "pago", "transferencia", "dirección",
+    "reunión", "presupuesto", "devolución", "garantía", "oferta", "descuento", "horario"
+] + [f"palabra{i}" for i in range(5000)]
+
+def records(count: int, chats: int = 2000, seed: int = 7):
+    """Registros mínimos con la forma de findMessages, generados deprisa"""
+    rng = random.Random(seed)
+    jids = [f"55{rng.randint(11, 99)}9{rng.randint(10000000, 99999999)}@s.whatsapp.net" for _ in range(chats)]
+    names = [f"{rng.choice(['Ana', 'María', 'José', 'Luis', 'Carla'])} {rng.choice(['Pérez', 'Gómez', 'Ruiz'])}" for _ in range(chats)]
+    base_ts = 1_700_000_000
+    for i in range(count):
+        chat = rng.randrange(chats)
+        from_me = rng.random() < 0.4
+        words = rng.choices(VOCAB[:25], k=rng.randint(2, 8)) + rng.choices(VOCAB, k=rng.randint(1, 6))
+        yield {
+            "key": {"id": f"3EB0{i:016X}", "fromMe": from_me, "remoteJid": jids[chat]},
+            "pushName": None if from_me else names[chat],
+            "messageType": "conversation",
+            "message": {"conversation": " ".join(words)},
+            "messageTimestamp": base_ts + i * 30
+        }, jids[chat]
+
+def timed(fn, repeat: int = 20):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples), len(result)
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        index = MessageIndex(os.path.join(tmp, "messages.db"))
+        batch = []
+        some_jid = None
+        start = time.perf_counter()
+        for record, jid in records(count):
+            some_jid = some_jid or jid
+            batch.append(record)
+            if len(batch) == BATCH:
+                index.ingest("bench", batch)
+                batch = []
+        if batch:
+            index.ingest("bench", batch)
+        elapsed = time.perf_counter() - start
+        size = index.stats("bench")["size_bytes"] / 1e6
+        print(f"ingesta: {count} mensajes en {elapsed:.1f}s ({count / elapsed:,.0f} msg/s), base de datos {size:.0f} MB")
+
+        mid = 1_700_000_000 + count * 15
+        queries = {
+            "palabra poco común": dict(query="palabra1234"),
+            "palabra frecuente": dict(query="pedido"),
+            "dos palabras": dict(query="pedido factura"),
+            "prefijo": dict(query="presu*"),
+            "palabra + chat": dict(query="pedido", remote_jid=some_jid),
+            "nombre del remitente": dict(sender="maría"),
+            "número del remitente": dict(sender=some_jid.split("@")[0]),
+            "rango de fechas": dict(since=mid, until=mid + 3600),
+            "palabra + rango de fechas": dict(query="pago", since=mid, until=mid + 86400),
+            "últimos de un chat": dict(remote_jid=some_jid),
+        }
+        print(f"{'consulta':<28} {'mediana':>9} {'máx':>9} {'filas':>6}")
+        for label, filters in queries.items():
+            median, worst, rows = timed(lambda: index.search("bench", limit=20, **filters))
+            print(f"{label:<28} {median:>7.2f}ms {worst:>7.2f}ms {rows:>6}")
+        index.close()
+
+if __name__ == "__main__":
+    main()
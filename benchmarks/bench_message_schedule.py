@@ -0,0 +1,83 @@
+"""
+Benchmark: envíos programados.
+
+Programa ``número_de_envíos`` envíos repartidos a lo largo de un día en una
+base SQLite en disco y mide el tiempo de alta por lotes, el de arranque
+(recuperar los pendientes y montar el montículo del temporizador) y la
+memoria que ocupa el montículo. Después programa 2000 envíos repartidos en
+el próximo segundo, con un cliente simulado que responde al instante, y
+mide con cuánto retraso sobre su hora sale cada uno.
+
+Uso:
+    python benchmarks/bench_message_schedule.py [número_de_envíos]
+"""
+
+import os
+import sys
+import time
+import heapq
+import asyncio
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from evolution.outbox.schedule import MessageSchedule, ScheduleStore
+
+class InstantClient:
+    def __init__(self):
+        self.lateness = []
+
+    async def send_text(self, instance_name: str, number: str, text: str) -> dict:
+        # La hora prevista viaja en el texto: los parámetros tienen que ser los de MessageClient.send_text
+        self.lateness.append(time.time() - float(text.rpartition("@")[2]))
+        return {"key": {"id": number}}
+
+def params(n: int, due: float = 0.0) -> dict:
+    return {"number": f"55119{n:08d}", "text": f"Recordatorio de tu cita {n} @{due!r}"}
+
+async def fire(path: str, count: int) -> list:
+    client = InstantClient()
+    schedule = MessageSchedule(ScheduleStore(path), client=client, workers=8)
+    start = time.time() + 0.2
+    items = [("bench", "send_text", params(n, start + n / count), start + n / count) for n in range(count)]
+    await schedule.schedule_many(items)
+    while len(client.lateness) < count:
+        await asyncio.sleep(0.05)
+    await schedule.stop()
+    schedule.store.close()
+    return sorted(client.lateness)
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "schedule.db")
+        store = ScheduleStore(path)
+        now = time.time()
+        start = time.perf_counter()
+        for first in range(0, count, 1000):
+            store.add_many([
+                ("bench", "send_text", params(n), now + 3600 + n * 86400 / count)
+                for n in range(first, min(count, first + 1000))
+            ])
+        elapsed = time.perf_counter() - start
+        print(f"{count} envíos programados")
+        print(f"{'alta por lotes de 1000':<32} {elapsed * 1000:>7.0f}ms {count / elapsed:>9.0f}/s")
+
+        start = time.perf_counter()
+        tracemalloc.start()
+        heap = store.recover()
+        heapq.heapify(heap)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        elapsed = time.perf_counter() - start
+        print(f"{'arranque (recuperar y montículo)':<32} {elapsed * 1000:>7.0f}ms {memory / 2 ** 20:>8.1f}MB")
+        store.close()
+
+        lateness = asyncio.run(fire(os.path.join(tmp, "fire.db"), 2000))
+        p50, p99 = lateness[len(lateness) // 2], lateness[int(len(lateness) * 0.99)]
+        print(f"{'retraso sobre la hora (2000/s)':<32} p50 {p50 * 1000:.1f}ms  p99 {p99 * 1000:.1f}ms  máx {lateness[-1] * 1000:.1f}ms")
+
+if __name__ == "__main__":
+    main()
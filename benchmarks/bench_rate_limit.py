@@ -0,0 +1,35 @@
+"""
+Microbenchmark: sobrecoste de SendRateLimiter.acquire() con tokens disponibles.
+
+Uso:
+    python benchmarks/bench_rate_limit.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from evolution.rate_limit import SendRateLimiter
+
+ITERATIONS = 200_000
+
+async def measure(limiter: SendRateLimiter, recipients: bool) -> float:
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        await limiter.acquire("bench", f"55119{i % 1000:08d}" if recipients else None)
+    return (time.perf_counter() - start) / ITERATIONS
+
+async def main() -> None:
+    # Ritmo muy alto para que siempre haya tokens: se mide solo el camino rápido
+    per_instance = SendRateLimiter(rate=1e9, burst=1e9)
+    with_recipients = SendRateLimiter(rate=1e9, burst=1e9, recipient_rate=1e9, recipient_burst=1e9)
+
+    print(f"Iteraciones: {ITERATIONS}")
+    print(f"Por instancia:                 {await measure(per_instance, False) * 1e6:6.2f} µs/acquire")
+    print(f"Por instancia + destinatario:  {await measure(with_recipients, True) * 1e6:6.2f} µs/acquire")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+"""
+Benchmark: rendimiento de la cola persistente de envíos.
+
+Mide envíos por segundo al encolar uno a uno (una transacción por envío,
+como las herramientas ``send_*`` en modo cola) y por lotes (como los
+envíos masivos), y al desencolar reclamando y confirmando de uno en uno
+(como los trabajadores) o por lotes, sobre una cola SQLite en disco en
+modo WAL.
+
+Uso:
+    python benchmarks/bench_send_queue.py [número_de_envíos]
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from evolution.outbox.queue import OutboundQueue
+
+def params(n: int) -> dict:
+    return {"number": f"55119{n:08d}", "text": f"Hola, tu pedido {n} ya está en camino. ¡Gracias por tu compra!", "delay": None}
+
+def enqueue_one_by_one(queue: OutboundQueue, count: int) -> None:
+    for n in range(count):
+        queue.enqueue("bench", "send_text", params(n))
+
+def enqueue_batched(queue: OutboundQueue, count: int, batch: int = 500) -> None:
+    for start in range(0, count, batch):
+        queue.enqueue_many([("bench", "send_text", params(n)) for n in range(start, min(count, start + batch))])
+
+def drain(queue: OutboundQueue, batch: int) -> int:
+    done = 0
+    while True:
+        items = queue.claim(batch, visibility_timeout=120, max_attempts=5)
+        if not items:
+            return done
+        for item in items:
+            queue.complete(item["id"], f"MSG{item['id']}")
+        done += len(items)
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"{count} envíos")
+    print(f"{'operación':<30} {'tiempo':>9} {'envíos/s':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, enqueue, batch in (
+            ("encolar de uno en uno", enqueue_one_by_one, 1),
+            ("encolar por lotes de 500", enqueue_batched, 16)
+        ):
+            queue = OutboundQueue(os.path.join(tmp, f"outbox-{batch}.db"))
+            start = time.perf_counter()
+            enqueue(queue, count)
+            elapsed = time.perf_counter() - start
+            print(f"{label:<30} {elapsed * 1000:>7.0f}ms {count / elapsed:>10.0f}")
+
+            start = time.perf_counter()
+            drained = drain(queue, batch)
+            elapsed = time.perf_counter() - start
+            label = "desencolar de uno en uno" if batch == 1 else f"desencolar por lotes de {batch}"
+            print(f"{label:<30} {elapsed * 1000:>7.0f}ms {drained / elapsed:>10.0f}")
+            queue.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark: latencia de un envío prioritario durante un envío masivo.
+
+Simula una instancia limitada a ``rate`` mensajes por segundo con una tanda
+masiva encolada y, mientras se vacía, envíos individuales cada 100 ms. Mide
+la espera en cola de esos envíos cuando van con la misma clase que la tanda
+(como un único FIFO) y cuando van con prioridad ``high``.
+
+Uso:
+    python benchmarks/bench_send_scheduler.py [envíos_masivos] [mensajes_por_segundo]
+"""
+
+import os
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from evolution.rate_limit import SendRateLimiter
+from evolution.scheduler import SendScheduler
+
+async def run(bulk: int, rate: float, priority: str) -> list:
+    sched = SendScheduler()
+    limiter = SendRateLimiter(rate=rate, burst=1, max_wait=3600)
+    waits = []
+
+    async def send(klass: str, record: bool) -> None:
+        start = time.monotonic()
+        await sched.acquire("bench", klass, limiter)
+        if record:
+            waits.append(time.monotonic() - start)
+        sched.release()
+
+    tasks = [asyncio.create_task(send("bulk", False)) for _ in range(bulk)]
+    await asyncio.sleep(0)
+    for _ in range(10):
+        await asyncio.sleep(0.1)
+        tasks.append(asyncio.create_task(send(priority, True)))
+    await asyncio.gather(*tasks)
+    return sorted(waits)
+
+def main() -> None:
+    bulk = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 100
+    print(f"{bulk} envíos masivos a {rate:.0f} mensajes/s, 10 envíos individuales")
+    print(f"{'clase del envío individual':<28} {'p50':>9} {'máximo':>9}")
+    for label, priority in (("bulk (FIFO)", "bulk"), ("high", "high")):
+        waits = asyncio.run(run(bulk, rate, priority))
+        print(f"{label:<28} {waits[len(waits) // 2] * 1000:>7.0f}ms {waits[-1] * 1000:>7.0f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: lectura completa frente a lectura en streaming de findMessages.
+
+Mide el pico de memoria (tracemalloc) y el tiempo de procesar una
+respuesta sintética de ``chat/findMessages`` de distintos tamaños, y el
+coste de quedarse solo con los primeros elementos.
+
+Uso:
+    python benchmarks/bench_streaming.py [número_de_mensajes]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from typing import List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import payloads
+from evolution.codec import get_codec
+from evolution.streaming import JSONItemStream
+
+CHUNK_SIZE = 64 * 1024
+
+def network_chunks(count: int) -> List[bytes]:
+    """Respuesta partida en trozos del tamaño típico de una lectura de socket"""
+    body = b"".join(payloads.find_messages_chunks(count))
+    return [body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE)]
+
+def buffered(chunks: List[bytes], limit: Optional[int] = None) -> int:
+    records = get_codec().loads(b"".join(chunks))["messages"]["records"]
+    return len(records[:limit] if limit else records)
+
+def streamed(chunks: List[bytes], limit: Optional[int] = None) -> int:
+    parser = JSONItemStream(("messages", "records"))
+    seen = 0
+    for chunk in chunks:
+        for _ in parser.feed(chunk):
+            seen += 1
+            if limit and seen >= limit:
+                return seen
+    parser.close()
+    return seen
+
+def measure(fn, *args) -> Tuple[float, float]:
+    """Mejor tiempo de 3 ejecuciones y pico de memoria (medido aparte con tracemalloc)"""
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak / 1e6
+
+def main() -> None:
+    sizes = [int(sys.argv[1])] if len(sys.argv) > 1 else [10_000, 50_000]
+    print(f"codec: {get_codec().name}")
+    print(f"{'mensajes':>9} {'MB':>6} {'modo':<22} {'tiempo':>9} {'pico MB':>9}")
+    for count in sizes:
+        chunks = network_chunks(count)
+        size = sum(map(len, chunks)) / 1e6
+        for label, fn, limit in (
+            ("completo", buffered, None),
+            ("streaming", streamed, None),
+            ("completo, primeros 20", buffered, 20),
+            ("streaming, primeros 20", streamed, 20)
+        ):
+            elapsed, peak = measure(fn, chunks, limit)
+            print(f"{count:>9} {size:>6.1f} {label:<22} {elapsed * 1000:>7.0f}ms {peak:>9.1f}")
+
+if __name__ == "__main__":
+    main()
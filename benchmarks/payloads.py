@@ -0,0 +1,127 @@
+"""
+Payloads sintéticos con la forma de las respuestas de la Evolution API v2.
+
+No hay respuestas reales capturadas en el repositorio, así que se generan
+de forma determinista (misma semilla) imitando la estructura de
+``chat/findChats``, ``chat/findContacts``, ``chat/findMessages``,
+``group/fetchAllGroups?getParticipants=true`` y
+``chat/getBase64FromMediaMessage``.
+"""
+
+import base64
+import json
+import random
+from typing import Any, Dict, List
+
+INSTANCE_ID = "4f1c2d3e-5a6b-4c7d-8e9f-0a1b2c3d4e5f"
+
+def _jid(rng: random.Random) -> str:
+    return f"55{rng.randint(11, 99)}9{rng.randint(10000000, 99999999)}@s.whatsapp.net"
+
+def _timestamp(rng: random.Random) -> int:
+    return rng.randint(1_690_000_000, 1_730_000_000)
+
+def _words(rng: random.Random, n: int) -> str:
+    vocab = ["hola", "pedido", "gracias", "envío", "mañana", "precio", "confirmo", "factura",
+             "cliente", "entrega", "😀", "ok", "buen", "día", "consulta", "stock"]
+    return " ".join(rng.choice(vocab) for _ in range(n))
+
+def message(rng: random.Random, remote_jid: str) -> Dict[str, Any]:
+    ts = _timestamp(rng)
+    return {
+        "id": f"cm{rng.getrandbits(64):016x}",
+        "key": {"id": f"3EB0{rng.getrandbits(64):016X}", "fromMe": rng.random() < 0.5, "remoteJid": remote_jid},
+        "pushName": _words(rng, 2).title(),
+        "messageType": "conversation",
+        "message": {"conversation": _words(rng, rng.randint(3, 40))},
+        "messageTimestamp": ts,
+        "instanceId": INSTANCE_ID,
+        "source": rng.choice(["android", "ios", "web"]),
+        "contextInfo": None,
+        "MessageUpdate": [{"status": rng.choice(["DELIVERY_ACK", "READ", "SERVER_ACK"])}]
+    }
+
+def find_messages(count: int = 5000, seed: int = 1) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    jids = [_jid(rng) for _ in range(50)]
+    records = [message(rng, rng.choice(jids)) for _ in range(count)]
+    return {"messages": {"total": count, "pages": 1, "currentPage": 1, "records": records}}
+
+def find_messages_chunks(count: int, seed: int = 1, batch: int = 200):
+    """Respuesta de ``findMessages`` serializada por trozos, sin construirla entera"""
+    rng = random.Random(seed)
+    jids = [_jid(rng) for _ in range(50)]
+    yield b'{"messages":{"total":%d,"pages":1,"currentPage":1,"records":[' % count
+    for start in range(0, count, batch):
+        records = [message(rng, rng.choice(jids)) for _ in range(min(batch, count - start))]
+        chunk = ",".join(json.dumps(r, ensure_ascii=False) for r in records).encode("utf-8")
+        yield (b"," if start else b"") + chunk
+    yield b"]}}"
+
+def find_chats(count: int = 3000, seed: int = 2) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    chats = []
+    for _ in range(count):
+        jid = _jid(rng)
+        chats.append({
+            "id": f"cm{rng.getrandbits(64):016x}",
+            "remoteJid": jid,
+            "name": _words(rng, 2).title(),
+            "labels": [],
+            "createdAt": "2024-08-01T12:00:00.000Z",
+            "updatedAt": "2024-10-01T12:00:00.000Z",
+            "pushName": _words(rng, 2).title(),
+            "profilePicUrl": f"https://pps.whatsapp.net/v/t61.24694-24/{rng.getrandbits(48)}_n.jpg?oh=abc&oe=def",
+            "unreadCount": rng.randint(0, 20),
+            "lastMessage": message(rng, jid)
+        })
+    return chats
+
+def find_contacts(count: int = 10000, seed: int = 3) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [{
+        "id": f"cm{rng.getrandbits(64):016x}",
+        "remoteJid": _jid(rng),
+        "pushName": _words(rng, 2).title(),
+        "profilePicUrl": None if rng.random() < 0.4 else f"https://pps.whatsapp.net/v/{rng.getrandbits(48)}.jpg",
+        "createdAt": "2024-08-01T12:00:00.000Z",
+        "updatedAt": "2024-10-01T12:00:00.000Z",
+        "instanceId": INSTANCE_ID
+    } for _ in range(count)]
+
+def fetch_all_groups(count: int = 300, participants: int = 200, seed: int = 4) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [{
+        "id": f"1203630{rng.getrandbits(40):012d}@g.us",
+        "subject": _words(rng, 3).title(),
+        "subjectOwner": _jid(rng),
+        "subjectTime": _timestamp(rng),
+        "pictureUrl": None,
+        "size": participants,
+        "creation": _timestamp(rng),
+        "owner": _jid(rng),
+        "desc": _words(rng, 25),
+        "descId": f"{rng.getrandbits(64):016X}",
+        "restrict": rng.random() < 0.5,
+        "announce": rng.random() < 0.2,
+        "participants": [
+            {"id": _jid(rng), "admin": rng.choice([None, None, None, "admin"])}
+            for _ in range(rng.randint(participants // 2, participants))
+        ]
+    } for _ in range(count)]
+
+def base64_media(size: int = 2_000_000, seed: int = 5) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    raw = bytes(rng.getrandbits(8) for _ in range(size))
+    return {
+        "mediaType": "imageMessage",
+        "fileName": "IMG-20241001-WA0001.jpg",
+        "caption": "",
+        "size": {"fileLength": str(size), "height": 1600, "width": 1200},
+        "mimetype": "image/jpeg",
+        "base64": base64.b64encode(raw).decode("ascii")
+    }
+
+def send_text_bodies(count: int = 1000, seed: int = 6) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [{"number": _jid(rng).split("@")[0], "text": _words(rng, rng.randint(5, 60))} for _ in range(count)]
@@ -1,10 +1,39 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Type
 from .http_client import EvolutionAPIClient
 
-class BaseRoutes:
+class ClientRegistry:
+    """Registro perezoso de clientes de dominio compartidos entre herramientas.
+
+    Cada clase de cliente se instancia una sola vez por proceso; las llamadas
+    concurrentes a herramientas reutilizan la misma instancia en lugar de
+    construir (y asignar) un cliente nuevo en cada invocación.
+    """
+
     def __init__(self):
-        self.client = None
-        
+        self._clients: Dict[Type[EvolutionAPIClient], EvolutionAPIClient] = {}
+
+    def get(self, client_class: Type[EvolutionAPIClient]) -> EvolutionAPIClient:
+        """Obtener la instancia compartida de un cliente, creándola si no existe"""
+        client = self._clients.get(client_class)
+        if client is None:
+            client = self._clients.setdefault(client_class, client_class())
+        return client
+
+    def clear(self) -> None:
+        """Descartar los clientes creados (p. ej. tras cambiar la configuración)"""
+        self._clients.clear()
+
+client_registry = ClientRegistry()
+
+class BaseRoutes:
+    # Clase de cliente de dominio usada por las herramientas del router
+    client_class: Optional[Type[EvolutionAPIClient]] = None
+
+    @property
+    def client(self) -> EvolutionAPIClient:
+        """Cliente de dominio compartido, obtenido del registro"""
+        return client_registry.get(self.client_class)
+
     def register_tools(self, mcp):
         """Método que debe ser implementado por las clases hijas para registrar herramientas FastMCP"""
         raise NotImplementedError("Las clases hijas deben implementar register_tools")
@@ -14,4 +43,4 @@ class BaseRoutes:
         return {
             "apikey": self.client.api_key,
             "Content-Type": "application/json"
-        } 
\ No newline at end of file
+        }
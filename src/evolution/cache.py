@@ -0,0 +1,126 @@
+import os
+import time
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+# TTL (segundos) por patrón de endpoint para lecturas de configuración que
+# cambian poco. Los endpoints que no coinciden no se cachean.
+DEFAULT_CACHE_TTLS: List[Tuple[str, float]] = [
+    ("settings/find/*", 300.0),
+    ("proxy/find/*", 300.0),
+    ("webhook/find/*", 300.0),
+    ("label/findLabels/*", 120.0),
+    ("chat/fetchPrivacySettings/*", 300.0),
+    ("chat/fetchBusinessProfile/*", 600.0),
+]
+
+MISSING = object()
+
+class ResponseCache:
+    """Caché en memoria con TTL por endpoint y expulsión LRU
+
+    Las entradas se invalidan por prefijo de endpoint desde los métodos
+    ``set_*``/``update_*`` de los clientes. Cada invalidación incrementa una
+    generación para que una lectura en curso iniciada antes no vuelva a
+    guardar datos obsoletos. Los valores devueltos se comparten entre
+    llamantes y no deben modificarse.
+    """
+
+    def __init__(
+        self,
+        rules: Optional[List[Tuple[str, float]]] = None,
+        max_entries: int = 1000,
+        enabled: bool = True
+    ):
+        self.rules = list(rules if rules is not None else DEFAULT_CACHE_TTLS)
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, str, Any]]" = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        """Construir la caché aplicando EVOLUTION_API_CACHE_TTLS sobre la tabla por defecto
+
+        Formato: ``patrón=segundos`` separados por comas; ``0`` desactiva la
+        caché para ese patrón.
+        """
+        rules = list(DEFAULT_CACHE_TTLS)
+        for item in filter(None, (part.strip() for part in os.getenv("EVOLUTION_API_CACHE_TTLS", "").split(","))):
+            pattern, _, seconds = item.partition("=")
+            rules = [(p, t) for p, t in rules if p != pattern.strip()]
+            rules.insert(0, (pattern.strip(), float(seconds)))
+        return cls(
+            rules,
+            max_entries=int(os.getenv("EVOLUTION_API_CACHE_MAX_ENTRIES", "1000")),
+            enabled=os.getenv("EVOLUTION_API_CACHE", "true").lower() in ("1", "true", "yes")
+        )
+
+    def ttl_for(self, endpoint: str) -> Optional[float]:
+        """TTL configurado para un endpoint, o None si no se cachea"""
+        if not self.enabled:
+            return None
+        path = endpoint.strip("/")
+        for pattern, seconds in self.rules:
+            if fnmatchcase(path, pattern):
+                return seconds or None
+        return None
+
+    def get(self, key: Hashable) -> Any:
+        """Obtener un valor vigente o ``MISSING``"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    def set(self, key: Hashable, endpoint: str, value: Any, ttl: float, generation: Optional[int] = None) -> None:
+        """Guardar un valor; se descarta si hubo invalidaciones desde ``generation``"""
+        if generation is not None and generation != self.generation:
+            return
+        self._entries[key] = (time.monotonic() + ttl, endpoint.strip("/"), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, prefix: str) -> int:
+        """Eliminar las entradas cuyo endpoint empieza por ``prefix``"""
+        prefix = prefix.strip("/")
+        self.generation += 1
+        keys = [key for key, (_, path, _) in self._entries.items() if path.startswith(prefix)]
+        for key in keys:
+            del self._entries[key]
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self) -> None:
+        """Vaciar la caché"""
+        self.generation += 1
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de la caché"""
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+# Caché global compartida por todos los clientes de dominio
+response_cache = ResponseCache.from_env()
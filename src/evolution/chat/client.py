@@ -1,5 +1,14 @@
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, AsyncIterator, Optional, List
 from ..http_client import EvolutionAPIClient
+from ..pagination import Page, PageIterator, decode_cursor, get_default_prefetch, query_fingerprint
+from ..streaming import Base64FieldStream
+
+def _message_page(result: Any) -> Page:
+    """Registros y total de páginas de una respuesta de findMessages"""
+    if isinstance(result, list):
+        return result, None
+    messages = result.get("messages", result) if isinstance(result, dict) else {}
+    return messages.get("records", []), messages.get("pages")
 
 class ChatClient(EvolutionAPIClient):
     async def check_whatsapp_numbers(
@@ -9,7 +18,7 @@ class ChatClient(EvolutionAPIClient):
     ) -> Dict[str, Any]:
         """Check if numbers are registered on WhatsApp"""
         data = {"numbers": numbers}
-        return await self.post(f"chat/whatsappNumbers/{instance_name}", json=data)
+        return await self.post(f"chat/whatsappNumbers/{instance_name}", json=data, idempotent=True)
 
     async def mark_message_as_read(
         self,
@@ -72,7 +81,7 @@ class ChatClient(EvolutionAPIClient):
     ) -> Dict[str, Any]:
         """Fetch profile picture URL"""
         data = {"number": number}
-        return await self.post(f"chat/fetchProfilePictureUrl/{instance_name}", json=data)
+        return await self.post(f"chat/fetchProfilePictureUrl/{instance_name}", json=data, idempotent=True)
 
     async def get_base64_from_media(
         self,
@@ -81,7 +90,24 @@ class ChatClient(EvolutionAPIClient):
         convert_to_mp4: bool = False
     ) -> Dict[str, Any]:
         """Get base64 from media message"""
-        data = {
+        data = self._media_body(message_id, convert_to_mp4)
+        return await self.post(f"chat/getBase64FromMediaMessage/{instance_name}", json=data, idempotent=True)
+
+    def stream_media(
+        self,
+        instance_name: str,
+        message_id: str,
+        convert_to_mp4: bool = False
+    ) -> AsyncIterator[Any]:
+        """Stream decoded media bytes, followed by the media metadata as the last item"""
+        data = self._media_body(message_id, convert_to_mp4)
+        return self.stream_items(
+            "POST", f"chat/getBase64FromMediaMessage/{instance_name}", json=data, parser_factory=Base64FieldStream
+        )
+
+    @staticmethod
+    def _media_body(message_id: str, convert_to_mp4: bool) -> Dict[str, Any]:
+        return {
             "message": {
                 "key": {
                     "id": message_id
@@ -89,7 +115,6 @@ class ChatClient(EvolutionAPIClient):
             },
             "convertToMp4": convert_to_mp4
         }
-        return await self.post(f"chat/getBase64FromMediaMessage/{instance_name}", json=data)
 
     async def update_message(
         self,
@@ -129,7 +154,58 @@ class ChatClient(EvolutionAPIClient):
         offset: Optional[int] = None
     ) -> Dict[str, Any]:
         """Find messages"""
-        data = {
+        data = self._find_messages_body(remote_jid, page, offset)
+        return await self.post(f"chat/findMessages/{instance_name}", json=data, idempotent=True)
+
+    def stream_messages(
+        self,
+        instance_name: str,
+        remote_jid: Optional[str] = None,
+        page: Optional[int] = None,
+        offset: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream message records one at a time as the response arrives"""
+        data = self._find_messages_body(remote_jid, page, offset)
+        return self.stream_items(
+            "POST", f"chat/findMessages/{instance_name}", ("messages", "records"), json=data, limit=limit
+        )
+
+    def iter_messages(
+        self,
+        instance_name: str,
+        where: Optional[Dict[str, Any]] = None,
+        page_size: int = 50,
+        prefetch: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> PageIterator:
+        """Iterate over every message matching ``where``, prefetching the next pages"""
+        fingerprint = query_fingerprint([instance_name, where])
+        start_page, start_index = 1, 0
+        if cursor:
+            start_page, start_index, page_size = decode_cursor(cursor, fingerprint)
+
+        async def fetch_page(page: int) -> Page:
+            data = {"where": where or {}, "page": page, "offset": page_size}
+            result = await self.post(f"chat/findMessages/{instance_name}", json=data, idempotent=True)
+            return _message_page(result)
+
+        return PageIterator(
+            fetch_page,
+            page_size,
+            prefetch=get_default_prefetch() if prefetch is None else prefetch,
+            start_page=start_page,
+            start_index=start_index,
+            fingerprint=fingerprint
+        )
+
+    @staticmethod
+    def _find_messages_body(
+        remote_jid: Optional[str],
+        page: Optional[int],
+        offset: Optional[int]
+    ) -> Dict[str, Any]:
+        return {
             "where": {
                 "key": {
                     **({"remoteJid": remote_jid} if remote_jid else {})
@@ -138,14 +214,13 @@ class ChatClient(EvolutionAPIClient):
             **({"page": page} if page else {}),
             **({"offset": offset} if offset else {})
         }
-        return await self.post(f"chat/findMessages/{instance_name}", json=data)
 
     async def find_chats(
         self,
         instance_name: str
     ) -> Dict[str, Any]:
         """Find all chats"""
-        return await self.post(f"chat/findChats/{instance_name}", json={}) 
+        return await self.post(f"chat/findChats/{instance_name}", json={}, idempotent=True) 
 
     async def update_block_status(
         self,
@@ -167,7 +242,17 @@ class ChatClient(EvolutionAPIClient):
     ) -> Dict[str, Any]:
         """Find contacts"""
         data = {"where": where} if where else {}
-        return await self.post(f"chat/findContacts/{instance_name}", json=data)
+        return await self.post(f"chat/findContacts/{instance_name}", json=data, idempotent=True)
+
+    def stream_contacts(
+        self,
+        instance_name: str,
+        where: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream contacts one at a time as the response arrives"""
+        data = {"where": where} if where else {}
+        return self.stream_items("POST", f"chat/findContacts/{instance_name}", json=data, limit=limit)
 
     async def find_status_message(
         self,
@@ -182,4 +267,4 @@ class ChatClient(EvolutionAPIClient):
             **({"page": page} if page else {}),
             **({"offset": offset} if offset else {})
         }
-        return await self.post(f"chat/findStatusMessage/{instance_name}", json=data) 
\ No newline at end of file
+        return await self.post(f"chat/findStatusMessage/{instance_name}", json=data, idempotent=True) 
\ No newline at end of file
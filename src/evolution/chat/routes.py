@@ -2,8 +2,17 @@ from typing import Dict, Any, Optional, List
 from pydantic import BaseModel, Field
 from ..base_routes import BaseRoutes
 from .client import ChatClient
+from ..streaming import collect_items
+from ..pagination import get_default_prefetch
+from ..media.cache import get_media_cache
+
+# Máximo de mensajes devueltos por llamada a find_messages_paged
+MAX_MESSAGES_WINDOW = 500
+MEDIA_CACHE_DISABLED = "Media cache is disabled; set EVOLUTION_MEDIA_CACHE_DIR"
 
 class ChatRoutes(BaseRoutes):
+    client_class = ChatClient
+
     def register_tools(self, mcp):
         @mcp.tool(
             description="Verificar números de WhatsApp",
@@ -15,7 +24,6 @@ class ChatRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Verificar si los números están registrados en WhatsApp"""
             try:
-                self.client = ChatClient()
                 result = await self.client.check_whatsapp_numbers(
                     instance_name=instance_name,
                     numbers=numbers
@@ -37,7 +45,6 @@ class ChatRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Marcar mensajes como leídos"""
             try:
-                self.client = ChatClient()
                 result = await self.client.mark_message_as_read(
                     instance_name=instance_name,
                     messages=messages
@@ -61,7 +68,6 @@ class ChatRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Archivar o desarchivar un chat"""
             try:
-                self.client = ChatClient()
                 result = await self.client.archive_chat(
                     instance_name=instance_name,
                     chat=chat,
@@ -86,7 +92,6 @@ class ChatRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Marcar un chat como no leído"""
             try:
-                self.client = ChatClient()
                 result = await self.client.mark_chat_unread(
                     instance_name=instance_name,
                     chat=chat,
@@ -112,7 +117,6 @@ class ChatRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Eliminar un mensaje"""
             try:
-                self.client = ChatClient()
                 result = await self.client.delete_message(
                     instance_name=instance_name,
                     message_id=message_id,
@@ -137,7 +141,6 @@ class ChatRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Obtener URL de foto de perfil"""
             try:
-                self.client = ChatClient()
                 result = await self.client.fetch_profile_picture(
                     instance_name=instance_name,
                     number=number
@@ -150,7 +153,7 @@ class ChatRoutes(BaseRoutes):
                 return {"error": f"Error obteniendo foto: {str(e)}"}
 
         @mcp.tool(
-            description="Obtener base64 de mensaje multimedia",
+            description="Obtener multimedia de un mensaje; con la caché de medios activa devuelve la ruta local y un handle con los metadatos en lugar del base64",
             tags={"chat", "media"}
         )
         async def get_base64_from_media(
@@ -158,9 +161,24 @@ class ChatRoutes(BaseRoutes):
             message_id: str,
             convert_to_mp4: bool = False
         ) -> Dict[str, Any]:
-            """Obtener base64 de un mensaje multimedia"""
+            """Obtener base64 de un mensaje multimedia
+
+            Si EVOLUTION_MEDIA_CACHE_DIR está configurado, el fichero se descarga
+            a disco una sola vez y las siguientes llamadas se sirven desde la caché.
+            """
             try:
-                self.client = ChatClient()
+                cache = get_media_cache()
+                if cache is not None:
+                    result = await cache.fetch(
+                        instance_name,
+                        message_id,
+                        lambda: self.client.stream_media(instance_name, message_id, convert_to_mp4),
+                        variant="mp4" if convert_to_mp4 else "original"
+                    )
+                    return {
+                        "success": True,
+                        "result": result
+                    }
                 result = await self.client.get_base64_from_media(
                     instance_name=instance_name,
                     message_id=message_id,
@@ -173,6 +191,23 @@ class ChatRoutes(BaseRoutes):
             except Exception as e:
                 return {"error": f"Error obteniendo media: {str(e)}"}
 
+        @mcp.tool(
+            description="Obtener estadísticas de la caché local de multimedia",
+            tags={"chat", "media", "diagnostics"}
+        )
+        async def get_media_cache_stats() -> Dict[str, Any]:
+            """Tamaño, aciertos y expulsiones de la caché de multimedia"""
+            try:
+                cache = get_media_cache()
+                if cache is None:
+                    return {"error": MEDIA_CACHE_DISABLED}
+                return {
+                    "success": True,
+                    "result": cache.stats()
+                }
+            except Exception as e:
+                return {"error": f"Error obteniendo estadísticas de la caché de medios: {str(e)}"}
+
         @mcp.tool(
             description="Actualizar mensaje",
             tags={"chat", "update"}
@@ -185,7 +220,6 @@ class ChatRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Actualizar un mensaje"""
             try:
-                self.client = ChatClient()
                 result = await self.client.update_message(
                     instance_name=instance_name,
                     number=number,
@@ -211,7 +245,6 @@ class ChatRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Enviar estado de presencia"""
             try:
-                self.client = ChatClient()
                 result = await self.client.send_presence(
                     instance_name=instance_name,
                     number=number,
@@ -226,18 +259,29 @@ class ChatRoutes(BaseRoutes):
                 return {"error": f"Error enviando presencia: {str(e)}"}
 
         @mcp.tool(
-            description="Buscar mensajes",
+            description="Buscar mensajes (con limit se leen en streaming y se devuelven solo los primeros)",
             tags={"chat", "search"}
         )
         async def find_messages(
             instance_name: str,
             remote_jid: Optional[str] = None,
             page: Optional[int] = None,
-            offset: Optional[int] = None
+            offset: Optional[int] = None,
+            limit: Optional[int] = None
         ) -> Dict[str, Any]:
             """Buscar mensajes"""
             try:
-                self.client = ChatClient()
+                if limit is not None:
+                    return await collect_items(
+                        self.client.stream_messages(
+                            instance_name=instance_name,
+                            remote_jid=remote_jid,
+                            page=page,
+                            offset=offset,
+                            limit=limit + 1
+                        ),
+                        limit
+                    )
                 result = await self.client.find_messages(
                     instance_name=instance_name,
                     remote_jid=remote_jid,
@@ -251,6 +295,42 @@ class ChatRoutes(BaseRoutes):
             except Exception as e:
                 return {"error": f"Error buscando mensajes: {str(e)}"}
 
+        @mcp.tool(
+            description="Recorrer mensajes por páginas: devuelve hasta `limit` mensajes y un cursor para continuar",
+            tags={"chat", "search"}
+        )
+        async def find_messages_paged(
+            instance_name: str,
+            where: Optional[Dict[str, Any]] = None,
+            remote_jid: Optional[str] = None,
+            limit: int = 50,
+            cursor: Optional[str] = None,
+            page_size: int = 50
+        ) -> Dict[str, Any]:
+            """Recorrer mensajes por páginas con cursor de continuación"""
+            try:
+                if remote_jid:
+                    where = {**(where or {}), "key": {**(where or {}).get("key", {}), "remoteJid": remote_jid}}
+                limit = max(1, min(limit, MAX_MESSAGES_WINDOW))
+                # Precargar solo las páginas que puede necesitar la ventana pedida
+                pages_needed = -(-limit // page_size)
+                async with self.client.iter_messages(
+                    instance_name=instance_name,
+                    where=where,
+                    page_size=page_size,
+                    prefetch=min(get_default_prefetch(), pages_needed - 1),
+                    cursor=cursor
+                ) as messages:
+                    result = await messages.take(limit)
+                    return {
+                        "success": True,
+                        "result": result,
+                        "count": len(result),
+                        "next_cursor": messages.cursor
+                    }
+            except Exception as e:
+                return {"error": f"Error recorriendo mensajes: {str(e)}"}
+
         @mcp.tool(
             description="Obtener lista de chats",
             tags={"chat", "list"}
@@ -260,7 +340,6 @@ class ChatRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Obtener lista de chats"""
             try:
-                self.client = ChatClient()
                 result = await self.client.find_chats(instance_name)
                 return {
                     "success": True,
@@ -280,7 +359,6 @@ class ChatRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Actualizar estado de bloqueo de un número"""
             try:
-                self.client = ChatClient()
                 result = await self.client.update_block_status(
                     instance_name=instance_name,
                     number=number,
@@ -294,16 +372,21 @@ class ChatRoutes(BaseRoutes):
                 return {"error": f"Error actualizando bloqueo: {str(e)}"}
 
         @mcp.tool(
-            description="Buscar contactos",
+            description="Buscar contactos (con limit se leen en streaming y se devuelven solo los primeros)",
             tags={"chat", "contacts"}
         )
         async def find_contacts(
             instance_name: str,
-            where: Optional[Dict[str, Any]] = None
+            where: Optional[Dict[str, Any]] = None,
+            limit: Optional[int] = None
         ) -> Dict[str, Any]:
             """Buscar contactos"""
             try:
-                self.client = ChatClient()
+                if limit is not None:
+                    return await collect_items(
+                        self.client.stream_contacts(instance_name=instance_name, where=where, limit=limit + 1),
+                        limit
+                    )
                 result = await self.client.find_contacts(
                     instance_name=instance_name,
                     where=where
@@ -327,7 +410,6 @@ class ChatRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Buscar mensajes de estado"""
             try:
-                self.client = ChatClient()
                 result = await self.client.find_status_message(
                     instance_name=instance_name,
                     where=where,
@@ -0,0 +1,134 @@
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+class CircuitBreaker:
+    """Circuit breaker con estados cerrado, abierto y semiabierto
+
+    Tras ``failure_threshold`` fallos transitorios consecutivos el circuito se
+    abre y las peticiones fallan de inmediato durante ``reset_timeout``
+    segundos. Después pasa a semiabierto y deja pasar hasta
+    ``half_open_max_calls`` peticiones de prueba: si una tiene éxito el
+    circuito se cierra, si falla vuelve a abrirse.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.half_open_calls = 0
+        self.rejected = 0
+
+    def allow_request(self) -> bool:
+        """Indica si puede enviarse una petición; False si debe fallar de inmediato"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                return False
+            self.state = self.HALF_OPEN
+            self.half_open_calls = 0
+        if self.state == self.HALF_OPEN:
+            if self.half_open_calls >= self.half_open_max_calls:
+                self.rejected += 1
+                return False
+            self.half_open_calls += 1
+        return True
+
+    def record_success(self) -> None:
+        """El upstream respondió: cerrar el circuito"""
+        self.consecutive_failures = 0
+        if self.state != self.CLOSED:
+            self.state = self.CLOSED
+            self.opened_at = None
+            self.half_open_calls = 0
+
+    def record_failure(self) -> None:
+        """Fallo transitorio (timeout, 5xx, conexión): abrir si se supera el umbral"""
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.half_open_calls = 0
+
+    def release(self) -> None:
+        """La petición no llegó a completarse: liberar la plaza de prueba sin cambiar de estado"""
+        if self.state == self.HALF_OPEN and self.half_open_calls > 0:
+            self.half_open_calls -= 1
+
+    def retry_after(self) -> Optional[float]:
+        """Segundos hasta que el circuito abierto admita una petición de prueba"""
+        if self.state != self.OPEN:
+            return None
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado actual del circuito"""
+        return {
+            "instance_name": self.name,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "rejected": self.rejected,
+            "retry_after": self.retry_after()
+        }
+
+class CircuitBreakerRegistry:
+    """Circuit breakers por instancia de WhatsApp, creados bajo demanda"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    @classmethod
+    def from_env(cls) -> "CircuitBreakerRegistry":
+        """Construir el registro desde variables de entorno"""
+        return cls(
+            failure_threshold=int(os.getenv("EVOLUTION_API_BREAKER_FAILURE_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv("EVOLUTION_API_BREAKER_RESET_TIMEOUT", "30")),
+            half_open_max_calls=int(os.getenv("EVOLUTION_API_BREAKER_HALF_OPEN_MAX_CALLS", "1"))
+        )
+
+    def get(self, instance_name: str) -> CircuitBreaker:
+        """Obtener el circuit breaker de una instancia"""
+        breaker = self._breakers.get(instance_name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                instance_name,
+                failure_threshold=self.failure_threshold,
+                reset_timeout=self.reset_timeout,
+                half_open_max_calls=self.half_open_max_calls
+            )
+            self._breakers[instance_name] = breaker
+        return breaker
+
+    def for_endpoint(self, endpoint: str) -> Optional[CircuitBreaker]:
+        """Circuit breaker de la instancia de un endpoint ``dominio/acción/{instance_name}``"""
+        instance_name = instance_from_endpoint(endpoint)
+        return self.get(instance_name) if instance_name else None
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Estado de todos los circuitos conocidos"""
+        return [breaker.snapshot() for breaker in self._breakers.values()]
+
+def instance_from_endpoint(endpoint: str) -> Optional[str]:
+    """Extraer el nombre de instancia (tercer segmento) de la ruta de un endpoint"""
+    segments = endpoint.strip("/").split("/")
+    return segments[2] if len(segments) >= 3 and segments[2] else None
+
+# Registro global compartido por todos los clientes de dominio
+circuit_breakers = CircuitBreakerRegistry.from_env()
@@ -0,0 +1,70 @@
+import os
+import json
+import logging
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+class JSONCodec:
+    """Codificación JSON de cuerpos de petición y respuesta (biblioteca estándar)"""
+
+    name = "stdlib"
+
+    def dumps(self, obj: Any) -> bytes:
+        # Mismo formato compacto que usa httpx para ``json=``
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+class OrjsonCodec(JSONCodec):
+    """Codec basado en ``orjson`` (opcional, bastante más rápido en payloads grandes)"""
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+        self._options = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._orjson.dumps(obj, option=self._options)
+
+    def loads(self, data: bytes) -> Any:
+        return self._orjson.loads(data)
+
+# Codecs disponibles por nombre, en orden de preferencia para "auto"
+CODECS: Dict[str, Callable[[], JSONCodec]] = {
+    "orjson": OrjsonCodec,
+    "stdlib": JSONCodec,
+}
+
+def register_codec(name: str, factory: Callable[[], JSONCodec]) -> None:
+    """Registrar un codec adicional (se prefiere sobre los existentes en modo "auto")"""
+    global CODECS
+    CODECS = {name: factory, **{k: v for k, v in CODECS.items() if k != name}}
+
+def create_codec(name: str = "auto") -> JSONCodec:
+    """Crear el codec indicado; "auto" usa el primero cuya biblioteca esté instalada"""
+    if name != "auto":
+        return CODECS[name]()
+    for factory in CODECS.values():
+        try:
+            return factory()
+        except ImportError:
+            continue
+    return JSONCodec()
+
+_codec = None
+
+def get_codec() -> JSONCodec:
+    """Codec compartido, elegido con EVOLUTION_API_JSON_CODEC (auto, orjson, stdlib)"""
+    global _codec
+    if _codec is None:
+        name = os.getenv("EVOLUTION_API_JSON_CODEC", "auto").lower()
+        try:
+            _codec = create_codec(name)
+        except (ImportError, KeyError) as e:
+            logger.warning(f"JSON codec '{name}' unavailable ({e}); using stdlib")
+            _codec = JSONCodec()
+    return _codec
@@ -0,0 +1,135 @@
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+class LimiterTimeout(Exception):
+    """La petición superó la espera máxima en la cola del limitador"""
+
+class AdaptiveConcurrencyLimiter:
+    """Limitador de concurrencia adaptativo (AIMD) hacia la Evolution API
+
+    Mientras la latencia se mantiene estable el límite crece de forma aditiva
+    (~+1 por cada ``limit`` respuestas); cuando la latencia supera
+    ``latency_tolerance`` veces la latencia de referencia, o aparecen errores
+    transitorios, se reduce multiplicando por ``backoff_ratio``. Las peticiones
+    que exceden el límite esperan en cola FIFO hasta ``max_wait`` segundos.
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = 20,
+        min_limit: float = 1,
+        max_limit: float = 100,
+        max_wait: float = 5.0,
+        latency_tolerance: float = 2.0,
+        backoff_ratio: float = 0.9,
+        smoothing: float = 0.05,
+        enabled: bool = True
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.max_wait = max_wait
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.smoothing = smoothing
+        self.enabled = enabled
+        self.in_flight = 0
+        self.baseline_latency: Optional[float] = None
+        self.rejected = 0
+        self._last_decrease = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @classmethod
+    def from_env(cls) -> "AdaptiveConcurrencyLimiter":
+        """Construir el limitador desde variables de entorno"""
+        return cls(
+            initial_limit=float(os.getenv("EVOLUTION_API_CONCURRENCY_INITIAL", "20")),
+            min_limit=float(os.getenv("EVOLUTION_API_CONCURRENCY_MIN", "1")),
+            max_limit=float(os.getenv("EVOLUTION_API_CONCURRENCY_MAX", "100")),
+            max_wait=float(os.getenv("EVOLUTION_API_CONCURRENCY_MAX_WAIT", "5")),
+            latency_tolerance=float(os.getenv("EVOLUTION_API_CONCURRENCY_LATENCY_TOLERANCE", "2.0")),
+            backoff_ratio=float(os.getenv("EVOLUTION_API_CONCURRENCY_BACKOFF_RATIO", "0.9")),
+            enabled=os.getenv("EVOLUTION_API_ADAPTIVE_CONCURRENCY", "true").lower() in ("1", "true", "yes")
+        )
+
+    def _has_capacity(self) -> bool:
+        return not self.enabled or self.in_flight < max(1, int(self.limit))
+
+    async def acquire(self, timeout: Optional[float] = None) -> None:
+        """Obtener una plaza, esperando en cola como máximo ``max_wait`` (o ``timeout``)"""
+        if self._has_capacity() and not self._waiters:
+            self.in_flight += 1
+            return
+
+        wait = self.max_wait if timeout is None else min(self.max_wait, timeout)
+        if wait <= 0:
+            self.rejected += 1
+            raise LimiterTimeout("Concurrency limit reached and no time left to wait")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, wait)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # La plaza se concedió justo al cancelarse la espera: devolverla
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected += 1
+                raise LimiterTimeout(f"Waited {wait:.2f}s for a concurrency slot")
+            raise
+
+    def release(self, latency: Optional[float] = None, dropped: bool = False) -> None:
+        """Liberar una plaza y ajustar el límite con la latencia medida
+
+        ``dropped`` indica un error transitorio (timeout, 5xx, conexión);
+        ``latency`` es None si la petición no llegó a completarse.
+        """
+        self.in_flight -= 1
+        if dropped:
+            self._decrease()
+        elif latency is not None:
+            if self.baseline_latency is None:
+                self.baseline_latency = latency
+            if latency > self.baseline_latency * self.latency_tolerance:
+                self._decrease()
+            elif self.in_flight + 1 >= self.limit / 2:
+                # Solo crecer si el límite actual se está aprovechando
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.baseline_latency += self.smoothing * (latency - self.baseline_latency)
+        self._wake_waiters()
+
+    def _decrease(self) -> None:
+        # Una sola reducción por ventana de latencia, para que una ráfaga de
+        # respuestas lentas simultáneas no colapse el límite al mínimo
+        now = time.monotonic()
+        if now - self._last_decrease < (self.baseline_latency or 0):
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+
+    def _wake_waiters(self) -> None:
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas actuales del limitador"""
+        return {
+            "enabled": self.enabled,
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "rejected": self.rejected,
+            "baseline_latency_ms": round(self.baseline_latency * 1000, 2) if self.baseline_latency is not None else None
+        }
+
+# Limitador global compartido por todos los clientes de dominio
+concurrency_limiter = AdaptiveConcurrencyLimiter.from_env()
@@ -0,0 +1,7 @@
+"""
+Módulo de directorio de contactos en memoria.
+"""
+
+from .routes import ContactRoutes
+
+__all__ = ["ContactRoutes"]
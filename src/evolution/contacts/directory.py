@@ -0,0 +1,219 @@
+import os
+import re
+import time
+import asyncio
+import logging
+import unicodedata
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+_PHONE = re.compile(r"\+?[\d\s().-]+")
+# Dígitos finales para encontrar números guardados sin código de país
+SUFFIX_DIGITS = 8
+
+def normalize_name(text: str) -> str:
+    """Minúsculas y sin tildes, para comparar nombres"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+def normalize_number(text: str) -> str:
+    """Solo los dígitos de un número de teléfono"""
+    return "".join(ch for ch in text if ch.isdigit())
+
+class ContactEntry:
+    """Contacto del directorio (representación compacta)"""
+
+    __slots__ = ("jid", "number", "name", "words")
+
+    def __init__(self, jid: str, number: Optional[str], name: Optional[str]):
+        self.jid = jid
+        self.number = number
+        self.name = name
+        # Palabras del nombre normalizado, las mismas que se indexan
+        self.words = tuple(_WORD.findall(normalize_name(name))) if name else ()
+
+    @classmethod
+    def from_contact(cls, contact: Dict[str, Any]) -> Optional["ContactEntry"]:
+        """Construir desde un registro de findContacts"""
+        jid = contact.get("remoteJid") or contact.get("id")
+        if not jid or "@" not in jid:
+            return None
+        user, _, server = jid.partition("@")
+        number = normalize_number(user) if server == "s.whatsapp.net" else None
+        name = contact.get("pushName") or contact.get("name") or contact.get("verifiedName")
+        return cls(jid, number or None, name)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"jid": self.jid, "number": self.number, "name": self.name}
+
+class ContactDirectory:
+    """Índices en memoria sobre los contactos de una instancia
+
+    Se construye una vez y no se modifica: para actualizarla se construye
+    otra y se sustituye. Indexa por JID, por número normalizado (y por sus
+    últimos dígitos, para números sin código de país) y por prefijo de cada
+    palabra del nombre, con un array ordenado de palabras y búsqueda
+    binaria.
+    """
+
+    def __init__(self, entries: List[ContactEntry]):
+        self.entries = entries
+        self.loaded_at = time.monotonic()
+        self._by_jid: Dict[str, ContactEntry] = {}
+        self._by_number: Dict[str, ContactEntry] = {}
+        self._by_suffix: Dict[str, List[ContactEntry]] = {}
+        words = []
+        for position, entry in enumerate(entries):
+            self._by_jid[entry.jid] = entry
+            if entry.number:
+                self._by_number[entry.number] = entry
+                self._by_suffix.setdefault(entry.number[-SUFFIX_DIGITS:], []).append(entry)
+            for word in set(entry.words):
+                words.append((word, position))
+        words.sort()
+        self._words = [word for word, _ in words]
+        self._word_entries = array("I", (position for _, position in words))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def age(self) -> float:
+        return time.monotonic() - self.loaded_at
+
+    def by_jid(self, jid: str) -> Optional[ContactEntry]:
+        return self._by_jid.get(jid)
+
+    def by_number(self, number: str) -> List[ContactEntry]:
+        """Coincidencia exacta del número o, si no la hay, por sus últimos dígitos"""
+        digits = normalize_number(number)
+        entry = self._by_number.get(digits)
+        if entry is not None:
+            return [entry]
+        if len(digits) < SUFFIX_DIGITS:
+            return []
+        return [e for e in self._by_suffix.get(digits[-SUFFIX_DIGITS:], []) if e.number.endswith(digits)]
+
+    def by_name(self, query: str, limit: int = 10) -> List[ContactEntry]:
+        """Contactos con alguna palabra del nombre que empieza por cada palabra de la búsqueda"""
+        terms = _WORD.findall(normalize_name(query))
+        if not terms:
+            return []
+        # Se recorre el rango más corto del array y el resto de palabras se comprueba en cada contacto
+        ranges = []
+        for index, term in enumerate(terms):
+            start = bisect_left(self._words, term)
+            ranges.append((bisect_left(self._words, term + "\U0010ffff", start) - start, start, index))
+        size, start, first = min(ranges)
+        end = start + size
+        others = terms[:first] + terms[first + 1:]
+        results: List[ContactEntry] = []
+        seen = set()
+        for i in range(start, end):
+            position = self._word_entries[i]
+            if position in seen:
+                continue
+            seen.add(position)
+            entry = self.entries[position]
+            if all(any(word.startswith(term) for word in entry.words) for term in others):
+                results.append(entry)
+                if len(results) >= limit:
+                    break
+        return results
+
+    def lookup(self, query: str, limit: int = 10) -> List[ContactEntry]:
+        """Buscar por JID, número o nombre según la forma de la consulta"""
+        query = query.strip()
+        if "@" in query:
+            entry = self.by_jid(query)
+            return [entry] if entry else []
+        if _PHONE.fullmatch(query) and len(normalize_number(query)) >= 6:
+            return self.by_number(query)[:limit]
+        return self.by_name(query, limit)
+
+class ContactDirectoryRegistry:
+    """Directorios de contactos por instancia, cargados una vez y refrescados en segundo plano
+
+    La primera consulta de una instancia espera a la carga; después se
+    responde siempre con el directorio en memoria y, si tiene más de
+    ``ttl`` segundos, se lanza una recarga en segundo plano que lo sustituye
+    al terminar. Las cargas simultáneas de una misma instancia se agrupan.
+    """
+
+    def __init__(self, ttl: float = 600.0):
+        self.ttl = ttl
+        self.loads = 0
+        self.failed_refreshes = 0
+        self._directories: Dict[str, ContactDirectory] = {}
+        self._loading: Dict[str, asyncio.Task] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    @classmethod
+    def from_env(cls) -> "ContactDirectoryRegistry":
+        """Construir desde variables de entorno"""
+        return cls(ttl=float(os.getenv("EVOLUTION_CONTACTS_REFRESH", "600")))
+
+    async def get(self, instance_name: str, client: Any) -> ContactDirectory:
+        """Directorio de la instancia, cargándolo la primera vez"""
+        directory = self._directories.get(instance_name)
+        if directory is None:
+            return await self.refresh(instance_name, client)
+        if directory.age() > self.ttl and instance_name not in self._loading:
+            task = asyncio.ensure_future(self._refresh_in_background(instance_name, client))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+        return directory
+
+    async def refresh(self, instance_name: str, client: Any) -> ContactDirectory:
+        """Recargar el directorio desde findContacts"""
+        task = self._loading.get(instance_name)
+        if task is None:
+            task = asyncio.ensure_future(self._load(instance_name, client))
+            self._loading[instance_name] = task
+            task.add_done_callback(lambda _: self._loading.pop(instance_name, None))
+        return await asyncio.shield(task)
+
+    async def _refresh_in_background(self, instance_name: str, client: Any) -> None:
+        try:
+            await self.refresh(instance_name, client)
+        except Exception as e:
+            self.failed_refreshes += 1
+            logger.warning(f"Background refresh of contacts for '{instance_name}' failed: {e}")
+
+    async def close(self) -> None:
+        """Cancelar las cargas y recargas en segundo plano en curso"""
+        tasks = list(self._background) + list(self._loading.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _load(self, instance_name: str, client: Any) -> ContactDirectory:
+        entries = []
+        async for contact in client.stream_contacts(instance_name):
+            entry = ContactEntry.from_contact(contact)
+            if entry is not None:
+                entries.append(entry)
+        # Construir los índices fuera del bucle de eventos
+        directory = await asyncio.to_thread(ContactDirectory, entries)
+        self._directories[instance_name] = directory
+        self.loads += 1
+        return directory
+
+    def stats(self) -> Dict[str, Any]:
+        """Contactos y antigüedad de cada directorio cargado"""
+        return {
+            "ttl": self.ttl,
+            "loads": self.loads,
+            "failed_refreshes": self.failed_refreshes,
+            "instances": {
+                name: {"contacts": len(directory), "age_seconds": round(directory.age(), 1)}
+                for name, directory in self._directories.items()
+            }
+        }
+
+# Registro global de directorios compartido por las herramientas
+contact_directories = ContactDirectoryRegistry.from_env()
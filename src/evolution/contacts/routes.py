@@ -0,0 +1,50 @@
+from typing import Dict, Any
+from ..base_routes import BaseRoutes
+from ..chat.client import ChatClient
+from .directory import contact_directories
+
+class ContactRoutes(BaseRoutes):
+    client_class = ChatClient
+
+    def register_tools(self, mcp):
+        @mcp.tool(
+            description="Buscar contactos por número, JID o prefijo del nombre en el directorio en memoria de la instancia",
+            tags={"contact", "chat"}
+        )
+        async def lookup_contact(
+            instance_name: str,
+            query: str,
+            limit: int = 10
+        ) -> Dict[str, Any]:
+            """Resolver un contacto sin recorrer findContacts en cada consulta
+
+            La primera consulta de la instancia carga el directorio; después se
+            refresca en segundo plano cada EVOLUTION_CONTACTS_REFRESH segundos.
+            """
+            try:
+                directory = await contact_directories.get(instance_name, self.client)
+                result = [entry.to_dict() for entry in directory.lookup(query, max(1, min(limit, 100)))]
+                return {
+                    "success": True,
+                    "result": result,
+                    "count": len(result)
+                }
+            except Exception as e:
+                return {"error": f"Error buscando contacto: {str(e)}"}
+
+        @mcp.tool(
+            description="Recargar el directorio de contactos en memoria de una instancia",
+            tags={"contact", "chat"}
+        )
+        async def refresh_contact_directory(
+            instance_name: str
+        ) -> Dict[str, Any]:
+            """Volver a cargar los contactos desde la Evolution API"""
+            try:
+                directory = await contact_directories.refresh(instance_name, self.client)
+                return {
+                    "success": True,
+                    "result": {"contacts": len(directory)}
+                }
+            except Exception as e:
+                return {"error": f"Error recargando directorio de contactos: {str(e)}"}
@@ -0,0 +1,7 @@
+"""
+Módulo de diagnóstico del cliente HTTP hacia la Evolution API.
+"""
+
+from .routes import DiagnosticsRoutes
+
+__all__ = ["DiagnosticsRoutes"]
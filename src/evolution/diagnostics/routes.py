@@ -0,0 +1,145 @@
+from typing import Dict, Any, Optional
+from ..base_routes import BaseRoutes
+from ..http_client import get_connection_stats
+from ..retry import retry_budget
+from ..circuit_breaker import circuit_breakers
+from ..concurrency import concurrency_limiter
+from ..rate_limit import send_rate_limiter
+from ..scheduler import send_scheduler
+from ..idempotency import idempotency_store
+from ..singleflight import single_flight
+from ..cache import response_cache
+
+class DiagnosticsRoutes(BaseRoutes):
+    def register_tools(self, mcp):
+        @mcp.tool(
+            description="Obtener estadísticas de conexiones hacia la Evolution API",
+            tags={"diagnostics", "http"}
+        )
+        async def get_http_connection_stats() -> Dict[str, Any]:
+            """Obtener contadores de conexiones y streams del pool HTTP compartido"""
+            try:
+                return {
+                    "success": True,
+                    "result": get_connection_stats()
+                }
+            except Exception as e:
+                return {"error": f"Error obteniendo estadísticas de conexión: {str(e)}"}
+
+        @mcp.tool(
+            description="Obtener estadísticas de reintentos hacia la Evolution API",
+            tags={"diagnostics", "retry"}
+        )
+        async def get_retry_stats() -> Dict[str, Any]:
+            """Obtener contadores de reintentos y del presupuesto de reintentos"""
+            try:
+                return {
+                    "success": True,
+                    "result": retry_budget.stats()
+                }
+            except Exception as e:
+                return {"error": f"Error obteniendo estadísticas de reintentos: {str(e)}"}
+
+        @mcp.tool(
+            description="Obtener el estado de los circuit breakers por instancia",
+            tags={"diagnostics", "circuit_breaker"}
+        )
+        async def get_circuit_breakers(
+            instance_name: Optional[str] = None
+        ) -> Dict[str, Any]:
+            """Obtener el estado (closed, open, half_open) de los circuit breakers"""
+            try:
+                if instance_name:
+                    result = [circuit_breakers.get(instance_name).snapshot()]
+                else:
+                    result = circuit_breakers.snapshot()
+                return {
+                    "success": True,
+                    "result": result
+                }
+            except Exception as e:
+                return {"error": f"Error obteniendo circuit breakers: {str(e)}"}
+
+        @mcp.tool(
+            description="Obtener métricas del limitador de concurrencia adaptativo",
+            tags={"diagnostics", "concurrency"}
+        )
+        async def get_concurrency_stats() -> Dict[str, Any]:
+            """Obtener límite actual, peticiones en curso y profundidad de la cola"""
+            try:
+                return {
+                    "success": True,
+                    "result": concurrency_limiter.stats()
+                }
+            except Exception as e:
+                return {"error": f"Error obteniendo métricas de concurrencia: {str(e)}"}
+
+        @mcp.tool(
+            description="Obtener el estado del limitador de ritmo de envíos",
+            tags={"diagnostics", "rate_limit"}
+        )
+        async def get_send_rate_stats() -> Dict[str, Any]:
+            """Obtener tokens disponibles por instancia y envíos demorados o rechazados"""
+            try:
+                return {
+                    "success": True,
+                    "result": send_rate_limiter.stats()
+                }
+            except Exception as e:
+                return {"error": f"Error obteniendo estado del limitador de envíos: {str(e)}"}
+
+        @mcp.tool(
+            description="Obtener el estado del planificador de envíos: envíos en curso y espera en cola por clase de prioridad",
+            tags={"diagnostics", "rate_limit"}
+        )
+        async def get_send_scheduler_stats() -> Dict[str, Any]:
+            """Obtener envíos esperando por clase e instancia y percentiles de espera en cola"""
+            try:
+                return {
+                    "success": True,
+                    "result": send_scheduler.stats()
+                }
+            except Exception as e:
+                return {"error": f"Error obteniendo estado del planificador de envíos: {str(e)}"}
+
+        @mcp.tool(
+            description="Obtener estadísticas de las claves de idempotencia de los envíos: claves guardadas, envíos repetidos, agrupados y de desenlace desconocido",
+            tags={"diagnostics", "idempotency"}
+        )
+        async def get_idempotency_stats() -> Dict[str, Any]:
+            """Obtener claves guardadas y envíos ejecutados, devueltos de nuevo o unidos a uno en curso"""
+            try:
+                return {
+                    "success": True,
+                    "result": idempotency_store.stats()
+                }
+            except Exception as e:
+                return {"error": f"Error obteniendo estadísticas de idempotencia: {str(e)}"}
+
+        @mcp.tool(
+            description="Obtener estadísticas de agrupación de lecturas simultáneas",
+            tags={"diagnostics", "single_flight"}
+        )
+        async def get_single_flight_stats() -> Dict[str, Any]:
+            """Obtener cuántas lecturas idénticas se agruparon en una sola llamada"""
+            try:
+                return {
+                    "success": True,
+                    "result": single_flight.stats()
+                }
+            except Exception as e:
+                return {"error": f"Error obteniendo estadísticas de agrupación: {str(e)}"}
+
+        @mcp.tool(
+            description="Obtener estadísticas de la caché de respuestas",
+            tags={"diagnostics", "cache"}
+        )
+        async def get_cache_stats() -> Dict[str, Any]:
+            """Obtener entradas, aciertos, fallos y expulsiones de la caché de respuestas"""
+            try:
+                return {
+                    "success": True,
+                    "result": response_cache.stats()
+                }
+            except Exception as e:
+                return {"error": f"Error obteniendo estadísticas de caché: {str(e)}"}
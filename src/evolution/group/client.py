@@ -1,4 +1,4 @@
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, AsyncIterator, Optional, List
 from ..http_client import EvolutionAPIClient
 
 class GroupClient(EvolutionAPIClient):
@@ -102,6 +102,17 @@ class GroupClient(EvolutionAPIClient):
         """Fetch all groups"""
         return await self.get(f"group/fetchAllGroups/{instance_name}", params={"getParticipants": getParticipants})
 
+    def stream_groups(
+        self,
+        instance_name: str,
+        getParticipants: bool = False,
+        limit: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream groups one at a time as the response arrives"""
+        return self.stream_items(
+            "GET", f"group/fetchAllGroups/{instance_name}", params={"getParticipants": getParticipants}, limit=limit
+        )
+
     async def get_participants(
         self,
         instance_name: str,
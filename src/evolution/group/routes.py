@@ -2,8 +2,11 @@ from typing import Dict, Any, Optional, List
 from pydantic import BaseModel, Field
 from ..base_routes import BaseRoutes
 from .client import GroupClient
+from ..streaming import collect_items
 
 class GroupRoutes(BaseRoutes):
+    client_class = GroupClient
+
     def register_tools(self, mcp):
         @mcp.tool(
             description="Crear un nuevo grupo",
@@ -17,7 +20,6 @@ class GroupRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Crear un nuevo grupo"""
             try:
-                self.client = GroupClient()
                 result = await self.client.create_group(
                     instance_name=instance_name,
                     subject=subject,
@@ -42,7 +44,6 @@ class GroupRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Actualizar foto de grupo"""
             try:
-                self.client = GroupClient()
                 result = await self.client.update_group_picture(
                     instance_name=instance_name,
                     groupJid=groupJid,
@@ -66,7 +67,6 @@ class GroupRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Actualizar nombre de grupo"""
             try:
-                self.client = GroupClient()
                 result = await self.client.update_group_subject(
                     instance_name=instance_name,
                     groupJid=groupJid,
@@ -90,7 +90,6 @@ class GroupRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Actualizar descripción de grupo"""
             try:
-                self.client = GroupClient()
                 result = await self.client.update_group_description(
                     instance_name=instance_name,
                     groupJid=groupJid,
@@ -113,7 +112,6 @@ class GroupRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Obtener código de invitación"""
             try:
-                self.client = GroupClient()
                 result = await self.client.fetch_invite_code(
                     instance_name=instance_name,
                     groupJid=groupJid
@@ -135,7 +133,6 @@ class GroupRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Revocar código de invitación"""
             try:
-                self.client = GroupClient()
                 result = await self.client.revoke_invite_code(
                     instance_name=instance_name,
                     groupJid=groupJid
@@ -159,7 +156,6 @@ class GroupRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Enviar invitación de grupo"""
             try:
-                self.client = GroupClient()
                 result = await self.client.send_invite(
                     instance_name=instance_name,
                     groupJid=groupJid,
@@ -183,7 +179,6 @@ class GroupRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Buscar grupo por código de invitación"""
             try:
-                self.client = GroupClient()
                 result = await self.client.find_group_by_invite(
                     instance_name=instance_name,
                     inviteCode=inviteCode
@@ -205,7 +200,6 @@ class GroupRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Obtener información de grupo"""
             try:
-                self.client = GroupClient()
                 result = await self.client.find_group_info(
                     instance_name=instance_name,
                     groupJid=groupJid
@@ -218,16 +212,25 @@ class GroupRoutes(BaseRoutes):
                 return {"error": f"Error obteniendo información: {str(e)}"}
 
         @mcp.tool(
-            description="Obtener todos los grupos",
+            description="Obtener todos los grupos (con limit se leen en streaming y se devuelven solo los primeros)",
             tags={"group", "list"}
         )
         async def fetch_all_groups(
             instance_name: str,
-            getParticipants: bool = False
+            getParticipants: bool = False,
+            limit: Optional[int] = None
         ) -> Dict[str, Any]:
             """Obtener todos los grupos"""
             try:
-                self.client = GroupClient()
+                if limit is not None:
+                    return await collect_items(
+                        self.client.stream_groups(
+                            instance_name=instance_name,
+                            getParticipants=getParticipants,
+                            limit=limit + 1
+                        ),
+                        limit
+                    )
                 result = await self.client.fetch_all_groups(
                     instance_name=instance_name,
                     getParticipants=getParticipants
@@ -249,7 +252,6 @@ class GroupRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Obtener participantes del grupo"""
             try:
-                self.client = GroupClient()
                 result = await self.client.get_participants(
                     instance_name=instance_name,
                     groupJid=groupJid
@@ -273,7 +275,6 @@ class GroupRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Actualizar participante del grupo"""
             try:
-                self.client = GroupClient()
                 result = await self.client.update_participant(
                     instance_name=instance_name,
                     groupJid=groupJid,
@@ -298,7 +299,6 @@ class GroupRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Actualizar configuración del grupo"""
             try:
-                self.client = GroupClient()
                 result = await self.client.update_setting(
                     instance_name=instance_name,
                     groupJid=groupJid,
@@ -322,7 +322,6 @@ class GroupRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Activar/desactivar mensajes temporales"""
             try:
-                self.client = GroupClient()
                 result = await self.client.toggle_ephemeral(
                     instance_name=instance_name,
                     groupJid=groupJid,
@@ -345,7 +344,6 @@ class GroupRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Salir del grupo"""
             try:
-                self.client = GroupClient()
                 result = await self.client.leave_group(
                     instance_name=instance_name,
                     groupJid=groupJid
@@ -1,60 +1,533 @@
 import os
-from typing import Any, Dict, Optional
+import time
+import asyncio
+import logging
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Sequence
 import httpx
 from fastapi import HTTPException
+from .timeouts import DeadlineExceeded, TimeoutPolicy, effective_timeout, remaining_time
+from .retry import RETRIABLE_STATUS_CODES, RetryPolicy, retry_budget
+from .circuit_breaker import CircuitBreaker, circuit_breakers
+from .concurrency import LimiterTimeout, concurrency_limiter
+from .singleflight import request_key, single_flight
+from .cache import MISSING, response_cache
+from .codec import get_codec
+from .streaming import JSONItemStream
+from .media.upload import FileUpload, form_fields
+
+logger = logging.getLogger(__name__)
+
+# Cliente HTTP compartido por todo el proceso (pool de conexiones keep-alive)
+_shared_client: Optional[httpx.AsyncClient] = None
+
+def is_http2_enabled() -> bool:
+    """Indica si se solicitó HTTP/2 mediante EVOLUTION_API_HTTP2"""
+    return os.getenv("EVOLUTION_API_HTTP2", "false").lower() in ("1", "true", "yes")
+
+def _http2_available() -> bool:
+    """HTTP/2 en httpx requiere el paquete opcional ``h2`` (httpx[http2])"""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def get_pool_limits() -> httpx.Limits:
+    """Obtener límites del pool de conexiones desde variables de entorno"""
+    return httpx.Limits(
+        max_connections=int(os.getenv("EVOLUTION_API_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("EVOLUTION_API_MAX_KEEPALIVE_CONNECTIONS", "20")),
+        keepalive_expiry=float(os.getenv("EVOLUTION_API_KEEPALIVE_EXPIRY", "30"))
+    )
+
+def get_shared_client() -> httpx.AsyncClient:
+    """Obtener (o crear) el cliente HTTP compartido por todos los clientes de dominio"""
+    global _shared_client
+    if _shared_client is None or _shared_client.is_closed:
+        http2 = is_http2_enabled()
+        if http2 and not _http2_available():
+            logger.warning("EVOLUTION_API_HTTP2 is set but the 'h2' package is not installed; using HTTP/1.1")
+            http2 = False
+        _shared_client = httpx.AsyncClient(limits=get_pool_limits(), http2=http2)
+    return _shared_client
+
+async def close_shared_client() -> None:
+    """Cerrar el cliente HTTP compartido y liberar las conexiones del pool"""
+    global _shared_client
+    if _shared_client is not None:
+        client, _shared_client = _shared_client, None
+        await client.aclose()
+
+# Métodos HTTP que se consideran idempotentes por defecto
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+class EvolutionAPIError(HTTPException):
+    """Error de la Evolution API que conserva si es transitorio
+
+    ``retriable`` indica un fallo transitorio (5xx de gateway, timeouts,
+    conexiones reiniciadas) y ``request_sent`` si la petición pudo llegar al
+    servidor; solo es seguro reintentar una petición no idempotente cuando
+    nunca se envió.
+    """
+
+    def __init__(
+        self,
+        status_code: int,
+        detail: str,
+        retriable: bool = False,
+        request_sent: bool = True,
+        retry_after: Optional[float] = None
+    ):
+        super().__init__(status_code=status_code, detail=detail)
+        self.retriable = retriable
+        self.request_sent = request_sent
+        self.retry_after = retry_after
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Interpretar la cabecera Retry-After expresada en segundos"""
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+def _classify_error(endpoint: str, e: Exception) -> EvolutionAPIError:
+    """Convertir una excepción de transporte o HTTP en ``EvolutionAPIError``"""
+    if isinstance(e, EvolutionAPIError):
+        return e
+    if isinstance(e, DeadlineExceeded):
+        return EvolutionAPIError(504, str(e), request_sent=False)
+    if isinstance(e, (httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return EvolutionAPIError(504, f"Request to {endpoint} timed out: {e}", retriable=True, request_sent=False)
+    if isinstance(e, (asyncio.TimeoutError, httpx.TimeoutException)):
+        return EvolutionAPIError(504, f"Request to {endpoint} timed out", retriable=True)
+    if isinstance(e, httpx.HTTPStatusError):
+        status_code = e.response.status_code
+        return EvolutionAPIError(
+            status_code,
+            str(e),
+            retriable=status_code in RETRIABLE_STATUS_CODES,
+            retry_after=_parse_retry_after(e.response.headers.get("Retry-After"))
+        )
+    if isinstance(e, httpx.ConnectError):
+        return EvolutionAPIError(503, str(e), retriable=True, request_sent=False)
+    if isinstance(e, httpx.TransportError):
+        # Conexión reiniciada o error de protocolo tras enviar la petición
+        return EvolutionAPIError(502, str(e), retriable=True)
+    return EvolutionAPIError(500, str(e))
+
+def _record_error(breaker: Optional[CircuitBreaker], e: EvolutionAPIError) -> None:
+    """Registrar en el circuit breaker el resultado de un intento fallido"""
+    if breaker is None:
+        return
+    if e.retriable:
+        breaker.record_failure()
+    elif e.request_sent:
+        # Error definitivo (4xx): la instancia respondió
+        breaker.record_success()
+    else:
+        breaker.release()
+
+def get_connection_stats() -> Dict[str, Any]:
+    """Obtener contadores de conexiones y streams del pool compartido
+
+    Lee atributos internos de httpx/httpcore: si una versión los cambia,
+    se devuelve lo que se haya podido leer con ``partial`` a True.
+    """
+    stats = {
+        "http2_enabled": is_http2_enabled(),
+        "connections": 0,
+        "http1_connections": 0,
+        "http2_connections": 0,
+        "idle_connections": 0,
+        "active_streams": 0,
+        "partial": False
+    }
+    client = _shared_client
+    if client is None or client.is_closed:
+        return stats
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is None:
+        stats["partial"] = True
+        return stats
+
+    for connection in list(connections):
+        stats["connections"] += 1
+        try:
+            info = connection.info()
+            if connection.is_idle():
+                stats["idle_connections"] += 1
+        except Exception:
+            stats["partial"] = True
+            continue
+        if "HTTP/2" in info:
+            stats["http2_connections"] += 1
+            # Streams abiertos multiplexados sobre la conexión HTTP/2
+            h2_state = getattr(getattr(connection, "_connection", None), "_h2_state", None)
+            open_streams = getattr(h2_state, "open_outbound_streams", None)
+            if isinstance(open_streams, int):
+                stats["active_streams"] += open_streams
+            else:
+                stats["partial"] = True
+        elif "HTTP/1.1" in info:
+            stats["http1_connections"] += 1
+            if "ACTIVE" in info:
+                stats["active_streams"] += 1
+    return stats
 
 class EvolutionAPIClient:
     def __init__(self):
         self.base_url = os.getenv("EVOLUTION_API_URL")
         self.api_key = os.getenv("EVOLUTION_API_KEY")
-        
+
         if not self.base_url:
             raise ValueError("EVOLUTION_API_URL environment variable is not set")
-            
+
         if not self.api_key:
             raise ValueError("EVOLUTION_API_KEY environment variable is not set")
-            
+
         self.headers = {
             "apikey": self.api_key,
             "Content-Type": "application/json"
         }
-        
+        self.timeout_policy = TimeoutPolicy.from_env()
+        self.retry_policy = RetryPolicy.from_env()
+
     async def _make_request(
         self,
         method: str,
         endpoint: str,
         params: Optional[Dict[str, Any]] = None,
-        json: Optional[Dict[str, Any]] = None
+        json: Optional[Dict[str, Any]] = None,
+        idempotent: Optional[bool] = None,
+        bypass_cache: bool = False
     ) -> Dict[str, Any]:
         url = f"{self.base_url.rstrip('/')}/{endpoint.lstrip('/')}"
-        
-        async with httpx.AsyncClient() as client:
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        if not idempotent:
+            return await self._request_with_retries(method, endpoint, url, params, json, idempotent)
+
+        key = request_key(method, url, params, json)
+        cache_ttl = response_cache.ttl_for(endpoint)
+        if cache_ttl and not bypass_cache:
+            cached = response_cache.get(key)
+            if cached is not MISSING:
+                return cached
+
+        # Las lecturas idénticas simultáneas comparten una única llamada al upstream
+        generation = response_cache.generation
+        result = await single_flight.do(
+            key,
+            lambda: self._request_with_retries(method, endpoint, url, params, json, idempotent)
+        )
+        if cache_ttl:
+            response_cache.set(key, endpoint, result, cache_ttl, generation)
+        return result
+
+    def invalidate_cache(self, endpoint: str) -> None:
+        """Invalidar las respuestas cacheadas de un endpoint tras modificar su configuración"""
+        response_cache.invalidate(endpoint)
+
+    async def _request_with_retries(
+        self,
+        method: str,
+        endpoint: str,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        json: Optional[Dict[str, Any]],
+        idempotent: bool,
+        upload: Optional[FileUpload] = None
+    ) -> Dict[str, Any]:
+        """Realizar la petición reintentando los errores transitorios que lo permiten"""
+        breaker = circuit_breakers.for_endpoint(endpoint)
+        retry_budget.record_request()
+        attempt = 0
+        while True:
             try:
-                response = await client.request(
+                return await self._attempt(breaker, method, endpoint, url, params, json, upload)
+            except EvolutionAPIError as e:
+                delay = self._retry_delay(e, attempt, idempotent)
+                if delay is None:
+                    raise
+                logger.debug(f"Retrying {method} {endpoint} in {delay:.3f}s after error {e.status_code}")
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    def _retry_delay(self, error: "EvolutionAPIError", attempt: int, idempotent: bool) -> Optional[float]:
+        """Espera antes de reintentar ``error``, o None si no debe reintentarse"""
+        # Solo se reintentan lecturas idempotentes con errores transitorios, o
+        # cualquier petición que nunca llegó a enviarse (p. ej. fallo de conexión)
+        if not (error.retriable and (idempotent or not error.request_sent)):
+            return None
+        if attempt >= self.retry_policy.max_retries:
+            return None
+        delay = self.retry_policy.backoff(attempt, error.retry_after)
+        remaining = remaining_time()
+        if remaining is not None and delay >= remaining:
+            return None
+        if not retry_budget.try_spend():
+            return None
+        return delay
+
+    async def _attempt(
+        self,
+        breaker: Optional[CircuitBreaker],
+        method: str,
+        endpoint: str,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        json: Optional[Dict[str, Any]],
+        upload: Optional[FileUpload] = None
+    ) -> Dict[str, Any]:
+        """Realizar un intento protegido por el circuit breaker de la instancia"""
+        self._check_breaker(breaker)
+
+        try:
+            result = await self._limited_send(method, endpoint, url, params, json, upload)
+        except EvolutionAPIError as e:
+            _record_error(breaker, e)
+            raise
+        except BaseException:
+            if breaker is not None:
+                breaker.release()
+            raise
+        if breaker is not None:
+            breaker.record_success()
+        return result
+
+    def _check_breaker(self, breaker: Optional[CircuitBreaker]) -> None:
+        if breaker is not None and not breaker.allow_request():
+            raise EvolutionAPIError(
+                503,
+                f"Circuit breaker open for instance '{breaker.name}'",
+                request_sent=False,
+                retry_after=breaker.retry_after()
+            )
+
+    async def _limited_send(
+        self,
+        method: str,
+        endpoint: str,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        json: Optional[Dict[str, Any]],
+        upload: Optional[FileUpload] = None
+    ) -> Dict[str, Any]:
+        """Enviar respetando el limitador de concurrencia adaptativo"""
+        try:
+            await concurrency_limiter.acquire(remaining_time())
+        except LimiterTimeout as e:
+            raise EvolutionAPIError(503, str(e), request_sent=False)
+
+        start = time.monotonic()
+        latency = None
+        dropped = False
+        try:
+            result = await self._send(method, endpoint, url, params, json, upload)
+            latency = time.monotonic() - start
+            return result
+        except EvolutionAPIError as e:
+            dropped = e.retriable
+            if e.request_sent and not e.retriable:
+                latency = time.monotonic() - start
+            raise
+        finally:
+            concurrency_limiter.release(latency, dropped)
+
+    async def _send(
+        self,
+        method: str,
+        endpoint: str,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        json: Optional[Dict[str, Any]],
+        upload: Optional[FileUpload] = None
+    ) -> Dict[str, Any]:
+        """Realizar un único intento, clasificando los errores en transitorios o definitivos"""
+        client = get_shared_client()
+        codec = get_codec()
+
+        try:
+            # Timeout del endpoint acotado por el plazo restante de la herramienta
+            timeout = effective_timeout(self.timeout_policy.timeout_for(endpoint))
+            if upload is None:
+                request = client.request(
                     method=method,
                     url=url,
                     params=params,
-                    json=json,
-                    headers=self.headers
-                )
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPError as e:
-                raise HTTPException(
-                    status_code=e.response.status_code if hasattr(e, 'response') else 500,
-                    detail=str(e)
+                    content=codec.dumps(json) if json is not None else None,
+                    headers=self.headers,
+                    timeout=timeout
                 )
+                response = await asyncio.wait_for(request, timeout=timeout)
+            else:
+                # httpx lee el fichero por trozos mientras lo envía; el Content-Type lo pone httpx
+                headers = {k: v for k, v in self.headers.items() if k != "Content-Type"}
+                with upload.open() as f:
+                    request = client.request(
+                        method=method,
+                        url=url,
+                        params=params,
+                        data=form_fields(json or {}),
+                        files={upload.field: (upload.filename, f, upload.mimetype)},
+                        headers=headers,
+                        timeout=timeout
+                    )
+                    response = await asyncio.wait_for(request, timeout=timeout)
+            response.raise_for_status()
+            return codec.loads(response.content)
+        except Exception as e:
+            raise _classify_error(endpoint, e)
+
+    async def stream_items(
+        self,
+        method: str,
+        endpoint: str,
+        item_path: Sequence[str] = (),
+        params: Optional[Dict[str, Any]] = None,
+        json: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        parser_factory: Optional[Callable[[], Any]] = None
+    ) -> AsyncIterator[Any]:
+        """Iterar los elementos de la lista JSON en ``item_path`` a medida que llegan
+
+        Pensado para listados que pueden ocupar decenas de megabytes: la
+        respuesta nunca se carga entera en memoria y se puede dejar de leer en
+        cualquier momento (o tras ``limit`` elementos), lo que cierra la
+        conexión. Solo se reintenta si el error ocurre antes del primer
+        elemento; las respuestas en streaming no pasan por la caché ni por
+        single-flight. ``parser_factory`` permite sustituir el analizador
+        de la lista por otro con la misma interfaz (``feed``/``close``/``done``),
+        como ``Base64FieldStream``.
+        """
+        url = f"{self.base_url.rstrip('/')}/{endpoint.lstrip('/')}"
+        breaker = circuit_breakers.for_endpoint(endpoint)
+        retry_budget.record_request()
+        if limit is not None and limit <= 0:
+            return
+        attempt = 0
+        count = 0
+        while True:
+            try:
+                async with aclosing(self._stream_attempt(
+                    breaker, method, endpoint, url, params, json,
+                    parser_factory() if parser_factory else JSONItemStream(item_path, get_codec())
+                )) as items:
+                    async for item in items:
+                        count += 1
+                        yield item
+                        if limit is not None and count >= limit:
+                            return
+                return
+            except EvolutionAPIError as e:
+                delay = None if count else self._retry_delay(e, attempt, idempotent=True)
+                if delay is None:
+                    raise
+                logger.debug(f"Retrying stream {method} {endpoint} in {delay:.3f}s after error {e.status_code}")
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _stream_attempt(
+        self,
+        breaker: Optional[CircuitBreaker],
+        method: str,
+        endpoint: str,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        json: Optional[Dict[str, Any]],
+        parser: Any
+    ) -> AsyncIterator[Any]:
+        """Un intento de lectura en streaming con breaker y limitador de concurrencia"""
+        self._check_breaker(breaker)
+        try:
+            await concurrency_limiter.acquire(remaining_time())
+        except LimiterTimeout as e:
+            if breaker is not None:
+                breaker.release()
+            raise EvolutionAPIError(503, str(e), request_sent=False)
+
+        codec = get_codec()
+        responded = False
+        dropped = False
+        try:
+            try:
+                # El timeout del endpoint se aplica a cada lectura, no a toda la respuesta
+                timeout = effective_timeout(self.timeout_policy.timeout_for(endpoint))
+                async with get_shared_client().stream(
+                    method=method,
+                    url=url,
+                    params=params,
+                    content=codec.dumps(json) if json is not None else None,
+                    headers=self.headers,
+                    timeout=timeout
+                ) as response:
+                    response.raise_for_status()
+                    responded = True
+                    async for chunk in response.aiter_bytes():
+                        for item in parser.feed(chunk):
+                            yield item
+                        if parser.done:
+                            break
+                    parser.close()
             except Exception as e:
-                raise HTTPException(status_code=500, detail=str(e))
+                raise _classify_error(endpoint, e)
+        except EvolutionAPIError as e:
+            dropped = e.retriable
+            _record_error(breaker, e)
+            raise
+        except BaseException:
+            # Lectura interrumpida por el consumidor (GeneratorExit) o cancelada
+            if breaker is not None:
+                if responded:
+                    breaker.record_success()
+                else:
+                    breaker.release()
+            raise
+        else:
+            if breaker is not None:
+                breaker.record_success()
+        finally:
+            # Sin latencia: la duración depende del consumidor, no de la instancia
+            concurrency_limiter.release(None, dropped)
+
+    async def get(
+        self,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        idempotent: Optional[bool] = None,
+        bypass_cache: bool = False
+    ) -> Dict[str, Any]:
+        return await self._make_request(
+            "GET", endpoint, params=params, idempotent=idempotent, bypass_cache=bypass_cache
+        )
 
-    async def get(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        return await self._make_request("GET", endpoint, params=params)
+    async def post(
+        self,
+        endpoint: str,
+        json: Dict[str, Any],
+        params: Optional[Dict[str, Any]] = None,
+        idempotent: Optional[bool] = None,
+        bypass_cache: bool = False
+    ) -> Dict[str, Any]:
+        return await self._make_request(
+            "POST", endpoint, params=params, json=json, idempotent=idempotent, bypass_cache=bypass_cache
+        )
 
-    async def post(self, endpoint: str, json: Dict[str, Any]) -> Dict[str, Any]:
-        return await self._make_request("POST", endpoint, json=json)
+    async def post_file(
+        self,
+        endpoint: str,
+        data: Dict[str, Any],
+        upload: FileUpload,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """POST multipart con ``data`` como campos del formulario y el fichero de ``upload``"""
+        url = f"{self.base_url.rstrip('/')}/{endpoint.lstrip('/')}"
+        return await self._request_with_retries("POST", endpoint, url, params, data, False, upload)
 
-    async def put(self, endpoint: str, json: Dict[str, Any]) -> Dict[str, Any]:
-        return await self._make_request("PUT", endpoint, json=json)
+    async def put(self, endpoint: str, json: Dict[str, Any], idempotent: Optional[bool] = None) -> Dict[str, Any]:
+        return await self._make_request("PUT", endpoint, json=json, idempotent=idempotent)
 
     async def delete(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        return await self._make_request("DELETE", endpoint, params=params) 
\ No newline at end of file
+        return await self._make_request("DELETE", endpoint, params=params)
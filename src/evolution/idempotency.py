@@ -0,0 +1,284 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from .http_client import EvolutionAPIError
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotency (
+    key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency (expires_at);
+"""
+
+PENDING = "pending"
+DONE = "done"
+# La petición llegó a Evolution pero falló sin saberse si el mensaje salió
+UNKNOWN = "unknown"
+# Vida de la reserva de un envío en curso: si su proceso muere, otro puede enviarlo pasado este plazo
+PENDING_LEASE = 120.0
+POLL_INTERVAL = 0.1
+
+def fingerprint(*parts: Any) -> str:
+    """Huella de los parámetros de una llamada, para detectar una clave reutilizada con otro contenido"""
+    data = json.dumps(parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+class IdempotencyConflict(ValueError):
+    """La clave ya se usó para una llamada con parámetros distintos"""
+
+    def __init__(self, key: str):
+        super().__init__(f"Idempotency key '{key}' was already used with different parameters")
+        self.key = key
+
+class IdempotencyOutcomeUnknown(RuntimeError):
+    """La llamada con esta clave llegó a Evolution y falló sin saberse si se entregó"""
+
+    def __init__(self, key: str, error: str):
+        super().__init__(
+            f"Outcome of the call with idempotency key '{key}' is unknown ({error}): "
+            "it may have been delivered, check before sending it again with a new key"
+        )
+        self.key = key
+        self.error = error
+
+def outcome_unknown(e: BaseException) -> bool:
+    """Fallo tras llegar la petición a Evolution (timeout de respuesta o 5xx): el envío pudo salir"""
+    return isinstance(e, EvolutionAPIError) and e.request_sent and not 400 <= e.status_code < 500
+
+class _Unknown:
+    """Resultado recordado de una llamada de desenlace desconocido"""
+    __slots__ = ("error",)
+
+    def __init__(self, error: str):
+        self.error = error
+
+class _SharedStore:
+    """Claves en SQLite compartidas entre procesos (modo WAL)
+
+    Una fila ``pending`` marca el envío en curso en algún proceso y caduca a
+    los ``PENDING_LEASE`` segundos por si ese proceso muere; al terminar pasa
+    a ``done`` con el resultado (o a ``unknown`` con el error si no se sabe
+    si salió) y caduca con el TTL de la clave.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def claim(self, key: str, digest: str) -> Tuple[str, Any]:
+        """``("owner", None)`` si la clave queda reservada para este proceso; si no ``(estado, resultado)``"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM idempotency WHERE key = ? AND expires_at <= ?", (key, now))
+                row = self._conn.execute(
+                    "SELECT fingerprint, status, result FROM idempotency WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute(
+                        "INSERT INTO idempotency (key, fingerprint, status, expires_at) VALUES (?, ?, ?, ?)",
+                        (key, digest, PENDING, now + PENDING_LEASE)
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return "owner", None
+        if row[0] != digest:
+            raise IdempotencyConflict(key)
+        return row[1], json.loads(row[2]) if row[2] is not None else None
+
+    def finish(self, key: str, result: Any, ttl: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE idempotency SET status = ?, result = ?, expires_at = ? WHERE key = ?",
+                (DONE, json.dumps(result, ensure_ascii=False, default=str), time.time() + ttl, key)
+            )
+
+    def fail(self, key: str, error: str, ttl: float) -> None:
+        """Recordar que el envío falló tras llegar a Evolution, para no repetirlo a ciegas"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE idempotency SET status = ?, result = ?, expires_at = ? WHERE key = ?",
+                (UNKNOWN, json.dumps(error, ensure_ascii=False), time.time() + ttl, key)
+            )
+
+    def abandon(self, key: str) -> None:
+        """Liberar la reserva de un envío que falló, para que un reintento lo vuelva a intentar"""
+        with self._lock:
+            self._conn.execute("DELETE FROM idempotency WHERE key = ? AND status = ?", (key, PENDING))
+
+    def purge(self) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM idempotency WHERE expires_at <= ?", (time.time(),)).rowcount
+
+class _Call:
+    __slots__ = ("task", "fingerprint")
+
+    def __init__(self, task: asyncio.Future, digest: str):
+        self.task = task
+        self.fingerprint = digest
+
+class IdempotencyStore:
+    """Resultados de envíos por clave de idempotencia
+
+    La primera llamada con una clave se ejecuta y su resultado se guarda
+    durante ``ttl`` segundos; las repeticiones en ese plazo devuelven el
+    resultado original sin volver a enviar, y las que llegan mientras la
+    primera sigue en curso esperan a su resultado. Si la primera falla sin
+    llegar a Evolution no se guarda nada: las que la esperaban reciben el
+    mismo error y un reintento posterior vuelve a enviar. Si falla después
+    (timeout de respuesta o 5xx) el mensaje pudo salir, así que la clave
+    recuerda el fallo durante ``ttl`` y todas, la primera incluida, reciben
+    ``IdempotencyOutcomeUnknown`` en lugar de volver a enviar. En memoria se conservan como mucho
+    ``max_entries`` claves (LRU); con ``path`` se comparten además en SQLite
+    entre procesos. Reutilizar una clave con otros parámetros es un error.
+    """
+
+    def __init__(self, ttl: float = 86400.0, max_entries: int = 10000, path: Optional[str] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.joined = 0
+        self.executed = 0
+        self.unknown = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[float, str, Any]]" = OrderedDict()
+        self._calls: Dict[str, _Call] = {}
+        self._shared = _SharedStore(path) if path else None
+        self._last_purge = 0.0
+
+    @classmethod
+    def from_env(cls) -> "IdempotencyStore":
+        """Construir desde variables de entorno"""
+        return cls(
+            ttl=float(os.getenv("EVOLUTION_IDEMPOTENCY_TTL", "86400")),
+            max_entries=int(os.getenv("EVOLUTION_IDEMPOTENCY_MAX_KEYS", "10000")),
+            path=os.getenv("EVOLUTION_IDEMPOTENCY_PATH") or None
+        )
+
+    def _lookup(self, key: str, digest: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self._entries[key]
+            return None
+        if entry[1] != digest:
+            raise IdempotencyConflict(key)
+        self._entries.move_to_end(key)
+        return entry
+
+    def _remember(self, key: str, digest: str, result: Any, expires_at: float) -> None:
+        self._entries[key] = (expires_at, digest, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def run(self, key: str, digest: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Ejecutar ``fn`` una sola vez por clave, o devolver el resultado de la llamada que ya la usó"""
+        entry = self._lookup(key, digest)
+        if entry is not None:
+            self.hits += 1
+            if isinstance(entry[2], _Unknown):
+                raise IdempotencyOutcomeUnknown(key, entry[2].error)
+            return entry[2]
+
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(self._execute(key, digest, fn)), digest)
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _, key=key, call=call: self._forget(key, call))
+        elif call.fingerprint != digest:
+            raise IdempotencyConflict(key)
+        else:
+            self.joined += 1
+
+        return await asyncio.shield(call.task)
+
+    async def _execute(self, key: str, digest: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        # Tarea propia: cancelar al llamante no interrumpe un envío que otros esperan
+        if self._shared is not None:
+            while True:
+                state, result = await asyncio.to_thread(self._shared.claim, key, digest)
+                if state == DONE:
+                    self.hits += 1
+                    self._remember(key, digest, result, time.time() + self.ttl)
+                    return result
+                if state == UNKNOWN:
+                    self.hits += 1
+                    self._remember(key, digest, _Unknown(result), time.time() + self.ttl)
+                    raise IdempotencyOutcomeUnknown(key, result)
+                if state != PENDING:
+                    break
+                # Otro proceso está enviando con la misma clave (su reserva caduca si muere)
+                await asyncio.sleep(POLL_INTERVAL)
+        self.executed += 1
+        # Si se cancela a medias (p. ej. al parar el servidor) la reserva compartida caduca sola
+        try:
+            result = await fn()
+        except Exception as e:
+            if not outcome_unknown(e):
+                if self._shared is not None:
+                    await asyncio.to_thread(self._shared.abandon, key)
+                raise
+            error = str(e) or e.__class__.__name__
+            self.unknown += 1
+            self._remember(key, digest, _Unknown(error), time.time() + self.ttl)
+            if self._shared is not None:
+                await asyncio.to_thread(self._shared.fail, key, error, self.ttl)
+            raise IdempotencyOutcomeUnknown(key, error) from e
+        self._remember(key, digest, result, time.time() + self.ttl)
+        if self._shared is not None:
+            await asyncio.to_thread(self._shared.finish, key, result, self.ttl)
+            if time.monotonic() - self._last_purge > 3600:
+                self._last_purge = time.monotonic()
+                await asyncio.to_thread(self._shared.purge)
+        return result
+
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.task.cancelled():
+            # Marca la excepción como recogida aunque ya nadie esperase el envío
+            call.task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Claves guardadas y llamadas ejecutadas, repetidas y agrupadas"""
+        return {
+            "ttl": self.ttl,
+            "max_entries": self.max_entries,
+            "entries": len(self._entries),
+            "in_flight": len(self._calls),
+            "executed": self.executed,
+            "replayed": self.hits,
+            "joined": self.joined,
+            "unknown_outcome": self.unknown,
+            "evictions": self.evictions,
+            "shared_path": self._shared.path if self._shared is not None else None
+        }
+
+# Instancia global compartida por las herramientas de envío
+idempotency_store = IdempotencyStore.from_env()
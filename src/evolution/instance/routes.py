@@ -4,6 +4,8 @@ from ..base_routes import BaseRoutes
 from .client import InstanceClient
 
 class InstanceRoutes(BaseRoutes):
+    client_class = InstanceClient
+
     def register_tools(self, mcp):
         @mcp.tool(
             description="Crear una nueva instancia de WhatsApp",
@@ -18,7 +20,6 @@ class InstanceRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Crear una nueva instancia de WhatsApp"""
             try:
-                self.client = InstanceClient()
                 result = await self.client.create_instance(
                     instance_name=instance_name,
                     qrcode=qrcode,
@@ -42,7 +43,6 @@ class InstanceRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Obtener lista de instancias"""
             try:
-                self.client = InstanceClient()
                 instances = await self.client.fetch_instances(instance_name)
                 return {
                     "success": True,
@@ -60,7 +60,6 @@ class InstanceRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Conectar a una instancia"""
             try:
-                self.client = InstanceClient()
                 result = await self.client.connect_instance(instance_name)
                 return {
                     "success": True,
@@ -78,7 +77,6 @@ class InstanceRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Reiniciar una instancia"""
             try:
-                self.client = InstanceClient()
                 result = await self.client.restart_instance(instance_name)
                 return {
                     "success": True,
@@ -97,7 +95,6 @@ class InstanceRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Establecer presencia de una instancia"""
             try:
-                self.client = InstanceClient()
                 result = await self.client.set_presence(instance_name, presence)
                 return {
                     "success": True,
@@ -115,7 +112,6 @@ class InstanceRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Obtener estado de conexión de una instancia"""
             try:
-                self.client = InstanceClient()
                 state = await self.client.get_connection_state(instance_name)
                 return {
                     "success": True,
@@ -133,7 +129,6 @@ class InstanceRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Cerrar sesión de una instancia"""
             try:
-                self.client = InstanceClient()
                 result = await self.client.logout_instance(instance_name)
                 return {
                     "success": True,
@@ -151,7 +146,6 @@ class InstanceRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Eliminar una instancia"""
             try:
-                self.client = InstanceClient()
                 result = await self.client.delete_instance(instance_name)
                 return {
                     "success": True,
@@ -1,5 +1,6 @@
 from typing import Dict, Any, List, Optional
 from ..http_client import EvolutionAPIClient
+from ..base_routes import BaseRoutes
 from pydantic import BaseModel, Field, validator
 
 class IntegrationConfig(BaseModel):
@@ -38,15 +39,18 @@ class BaseIntegrationClient(EvolutionAPIClient):
                 **kwargs
             }
         }
-        return await self.post(f"/{self.integration_type}/set/{instance_name}", json=data)
+        try:
+            return await self.post(f"/{self.integration_type}/set/{instance_name}", json=data)
+        finally:
+            self.invalidate_cache(f"{self.integration_type}/find/{instance_name}")
 
-    async def find_integration(self, instance_name: str) -> Dict[str, Any]:
+    async def find_integration(self, instance_name: str, bypass_cache: bool = False) -> Dict[str, Any]:
         """
         Obtiene la configuración de una integración
         """
-        return await self.get(f"/{self.integration_type}/find/{instance_name}")
+        return await self.get(f"/{self.integration_type}/find/{instance_name}", bypass_cache=bypass_cache)
 
-class BaseIntegrationRoutes:
+class BaseIntegrationRoutes(BaseRoutes):
     def __init__(self, integration_type: str):
         self.integration_type = integration_type
 
@@ -2,6 +2,7 @@ from typing import Dict, Any, List, Optional
 from fastapi import FastAPI
 from pydantic import BaseModel, Field
 from ..base import BaseIntegrationRoutes, IntegrationConfig
+from .client import WebhookClient
 
 class WebhookConfig(IntegrationConfig):
     url: str = Field(description="URL del webhook")
@@ -10,6 +11,8 @@ class WebhookConfig(IntegrationConfig):
     base64: bool = Field(False, description="Codificar contenido multimedia en base64")
 
 class WebhookRoutes(BaseIntegrationRoutes):
+    client_class = WebhookClient
+
     def __init__(self):
         super().__init__("webhook")
 
@@ -25,7 +28,7 @@ class WebhookRoutes(BaseIntegrationRoutes):
             """
             Configura un webhook para una instancia específica
             """
-            return await self.webhook_client.set_webhook(
+            return await self.client.set_webhook(
                 instance_name=instance_name,
                 enabled=config.enabled,
                 url=config.url,
@@ -40,9 +43,10 @@ class WebhookRoutes(BaseIntegrationRoutes):
             tags={"webhook", "info"}
         )
         async def find_webhook(
-            instance_name: str
+            instance_name: str,
+            bypass_cache: bool = False
         ) -> Dict[str, Any]:
             """
             Obtiene la configuración actual del webhook
             """
-            return await self.webhook_client.find_integration(instance_name) 
\ No newline at end of file
+            return await self.client.find_integration(instance_name, bypass_cache=bypass_cache) 
\ No newline at end of file
@@ -4,10 +4,11 @@ from ..http_client import EvolutionAPIClient
 class LabelClient(EvolutionAPIClient):
     async def find_labels(
         self,
-        instance_name: str
+        instance_name: str,
+        bypass_cache: bool = False
     ) -> Dict[str, Any]:
         """Find all labels"""
-        return await self.get(f"label/findLabels/{instance_name}")
+        return await self.get(f"label/findLabels/{instance_name}", bypass_cache=bypass_cache)
 
     async def handle_label(
         self,
@@ -4,18 +4,20 @@ from ..base_routes import BaseRoutes
 from .client import LabelClient
 
 class LabelRoutes(BaseRoutes):
+    client_class = LabelClient
+
     def register_tools(self, mcp):
         @mcp.tool(
             description="Buscar etiquetas",
             tags={"label", "list"}
         )
         async def find_labels(
-            instance_name: str
+            instance_name: str,
+            bypass_cache: bool = False
         ) -> Dict[str, Any]:
             """Buscar todas las etiquetas"""
             try:
-                self.client = LabelClient()
-                result = await self.client.find_labels(instance_name)
+                result = await self.client.find_labels(instance_name, bypass_cache=bypass_cache)
                 return {
                     "success": True,
                     "result": result
@@ -35,7 +37,6 @@ class LabelRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Manejar operaciones de etiquetas"""
             try:
-                self.client = LabelClient()
                 result = await self.client.handle_label(
                     instance_name=instance_name,
                     number=number,
@@ -0,0 +1,12 @@
+"""
+Módulo de medios: caché en disco de multimedia descargada y envío de
+ficheros locales como multipart, deduplicación y preparación de
+imágenes y stickers antes del envío.
+"""
+
+from .cache import MediaCache, get_media_cache
+from .upload import FileUpload, resolve_upload
+from .preprocess import MediaPolicy, MediaPreprocessor, media_preprocessor
+
+__all__ = ["MediaCache", "get_media_cache", "FileUpload", "resolve_upload",
+           "MediaPolicy", "MediaPreprocessor", "media_preprocessor"]
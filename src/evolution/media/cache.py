@@ -0,0 +1,307 @@
+import os
+import re
+import time
+import asyncio
+import hashlib
+import json
+import mimetypes
+import sqlite3
+import tempfile
+import threading
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+from ..singleflight import SingleFlight
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    file_name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blobs_lru ON blobs(last_used);
+CREATE TABLE IF NOT EXISTS media (
+    instance TEXT NOT NULL,
+    message_id TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    digest TEXT NOT NULL REFERENCES blobs(digest) ON DELETE CASCADE,
+    metadata TEXT NOT NULL,
+    PRIMARY KEY (instance, message_id, variant)
+);
+CREATE INDEX IF NOT EXISTS media_digest ON media(digest);
+"""
+
+_EXTENSION = re.compile(r"\.[A-Za-z0-9]{1,10}$")
+COPY_CHUNK = 1024 * 1024
+
+def file_extension(metadata: Dict[str, Any]) -> str:
+    """Extensión para el fichero: la del nombre original o la del tipo MIME"""
+    match = _EXTENSION.search(metadata.get("fileName") or "")
+    if match:
+        return match.group(0).lower()
+    mimetype = (metadata.get("mimetype") or "").split(";")[0].strip()
+    return (mimetypes.guess_extension(mimetype) or "") if mimetype else ""
+
+class MediaCache:
+    """Caché en disco de la multimedia descargada, direccionada por contenido
+
+    Cada fichero se guarda una sola vez con su SHA-256 como nombre (el
+    *handle*), aunque lo referencien varios mensajes, y una tabla SQLite
+    relaciona instancia + id de mensaje con el fichero y sus metadatos.
+    Los bytes se escriben en disco a medida que llegan, sin tener el
+    base64 entero en memoria. Cuando el tamaño total supera ``max_bytes``
+    se borran los ficheros usados hace más tiempo (LRU). Las descargas
+    simultáneas del mismo mensaje se agrupan en una sola.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 1024 * 1024 * 1024):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_downloaded = 0
+        self._blob_dir = os.path.join(self.directory, "blobs")
+        self._tmp_dir = os.path.join(self.directory, "tmp")
+        os.makedirs(self._blob_dir, exist_ok=True)
+        os.makedirs(self._tmp_dir, exist_ok=True)
+        # Descargas interrumpidas por un reinicio
+        for name in os.listdir(self._tmp_dir):
+            os.remove(os.path.join(self._tmp_dir, name))
+        self._flights = SingleFlight()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(self.directory, "media.db"), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _blob_path(self, file_name: str) -> str:
+        return os.path.join(self._blob_dir, file_name[:2], file_name)
+
+    def _entry(self, row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            **json.loads(row["metadata"]),
+            "handle": row["digest"],
+            "path": self._blob_path(row["file_name"]),
+            "size": row["size"]
+        }
+
+    def lookup(self, instance_name: str, message_id: str, variant: str = "original") -> Optional[Dict[str, Any]]:
+        """Entrada en caché de un mensaje, marcándola como usada"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT m.digest, m.metadata, b.file_name, b.size FROM media m JOIN blobs b ON b.digest = m.digest "
+                "WHERE m.instance = ? AND m.message_id = ? AND m.variant = ?",
+                (instance_name, message_id, variant)
+            ).fetchone()
+            if row is None or not self._touch(row["digest"], row["file_name"], row["size"]):
+                return None
+            return self._entry(row)
+
+    def blob_path(self, handle: str) -> Optional[str]:
+        """Ruta local de un handle, o None si no está (o ya no está) en caché"""
+        with self._lock:
+            row = self._conn.execute("SELECT file_name, size FROM blobs WHERE digest = ?", (handle,)).fetchone()
+            if row is None or not self._touch(handle, row["file_name"], row["size"]):
+                return None
+            return self._blob_path(row["file_name"])
+
+    def _touch(self, digest: str, file_name: str, size: int) -> bool:
+        if not os.path.exists(self._blob_path(file_name)):
+            # Borrado desde fuera: se olvida la entrada
+            self._conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+            self._total -= size
+            return False
+        self._conn.execute("UPDATE blobs SET last_used = ? WHERE digest = ?", (time.time(), digest))
+        return True
+
+    async def fetch(
+        self,
+        instance_name: str,
+        message_id: str,
+        download: Callable[[], AsyncIterator[Any]],
+        variant: str = "original"
+    ) -> Dict[str, Any]:
+        """Entrada del mensaje desde la caché o, si no está, descargándola con ``download``
+
+        ``download`` devuelve un iterador de trozos de bytes seguido de un
+        diccionario con los metadatos, como ``ChatClient.stream_media``.
+        """
+        entry = await asyncio.to_thread(self.lookup, instance_name, message_id, variant)
+        if entry is not None:
+            self.hits += 1
+            return {**entry, "cached": True}
+        return await self._flights.do(
+            (instance_name, message_id, variant),
+            lambda: self._download(instance_name, message_id, variant, download)
+        )
+
+    async def _download(
+        self,
+        instance_name: str,
+        message_id: str,
+        variant: str,
+        download: Callable[[], AsyncIterator[Any]]
+    ) -> Dict[str, Any]:
+        self.misses += 1
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp_dir)
+        hasher = hashlib.sha256()
+        size = 0
+        metadata: Dict[str, Any] = {}
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async with aclosing(download()) as items:
+                    async for item in items:
+                        if isinstance(item, dict):
+                            metadata = item
+                            continue
+                        f.write(item)
+                        hasher.update(item)
+                        size += len(item)
+            entry = await asyncio.to_thread(
+                self._store, instance_name, message_id, variant, hasher.hexdigest(), size, tmp_path, metadata
+            )
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.bytes_downloaded += size
+        return {**entry, "cached": False}
+
+    def _store(
+        self,
+        instance_name: str,
+        message_id: str,
+        variant: str,
+        digest: str,
+        size: int,
+        tmp_path: str,
+        metadata: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        metadata = {key: value for key, value in metadata.items() if key != "base64"}
+        with self._lock:
+            file_name = self._store_blob(digest, size, tmp_path, metadata)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO media (instance, message_id, variant, digest, metadata) VALUES (?, ?, ?, ?, ?)",
+                (instance_name, message_id, variant, digest, json.dumps(metadata))
+            )
+            self._evict(keep=digest)
+        return {**metadata, "handle": digest, "path": self._blob_path(file_name), "size": size}
+
+    def _store_blob(self, digest: str, size: int, tmp_path: str, metadata: Dict[str, Any]) -> str:
+        """Mover un fichero descargado a su sitio definitivo (o descartarlo si ya estaba)"""
+        row = self._conn.execute("SELECT file_name FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        if row is not None and os.path.exists(self._blob_path(row["file_name"])):
+            # Mismo contenido ya guardado (p. ej. un reenvío)
+            os.remove(tmp_path)
+            self._conn.execute("UPDATE blobs SET last_used = ? WHERE digest = ?", (time.time(), digest))
+            return row["file_name"]
+        file_name = digest + file_extension(metadata)
+        path = self._blob_path(file_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        if row is None:
+            self._total += size
+        self._conn.execute(
+            "INSERT OR REPLACE INTO blobs (digest, file_name, size, last_used) VALUES (?, ?, ?, ?)",
+            (digest, file_name, size, time.time())
+        )
+        return file_name
+
+    def register_file(self, path: str, filename: Optional[str] = None, mimetype: Optional[str] = None) -> Dict[str, Any]:
+        """Copiar un fichero local a la caché y devolver su handle"""
+        metadata = {
+            "fileName": filename or os.path.basename(path),
+            "mimetype": mimetype or mimetypes.guess_type(filename or path)[0]
+        }
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as dst, open(path, "rb") as src:
+                while chunk := src.read(COPY_CHUNK):
+                    dst.write(chunk)
+                    hasher.update(chunk)
+                    size += len(chunk)
+            digest = hasher.hexdigest()
+            with self._lock:
+                file_name = self._store_blob(digest, size, tmp_path, metadata)
+                self._evict(keep=digest)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return {**metadata, "handle": digest, "path": self._blob_path(file_name), "size": size}
+
+    def register_bytes(self, data: bytes, filename: str, mimetype: Optional[str] = None) -> Dict[str, Any]:
+        """Guardar contenido generado (p. ej. un medio preparado) en la caché y devolver su handle"""
+        metadata = {"fileName": filename, "mimetype": mimetype or mimetypes.guess_type(filename)[0]}
+        digest = hashlib.sha256(data).hexdigest()
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as dst:
+                dst.write(data)
+            with self._lock:
+                file_name = self._store_blob(digest, len(data), tmp_path, metadata)
+                self._evict(keep=digest)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return {**metadata, "handle": digest, "path": self._blob_path(file_name), "size": len(data)}
+
+    def _evict(self, keep: str) -> None:
+        """Borrar los ficheros menos usados hasta volver por debajo del límite"""
+        while self._total > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT digest, file_name, size FROM blobs WHERE digest != ? ORDER BY last_used LIMIT 1", (keep,)
+            ).fetchone()
+            if row is None:
+                break
+            try:
+                os.remove(self._blob_path(row["file_name"]))
+            except FileNotFoundError:
+                pass
+            self._conn.execute("DELETE FROM blobs WHERE digest = ?", (row["digest"],))
+            self._total -= row["size"]
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Tamaño de la caché y tasa de aciertos"""
+        with self._lock:
+            blobs = self._conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+            entries = self._conn.execute("SELECT COUNT(*) FROM media").fetchone()[0]
+        requests = self.hits + self.misses
+        return {
+            "directory": self.directory,
+            "entries": entries,
+            "files": blobs,
+            "size_bytes": self._total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / requests, 3) if requests else None,
+            "coalesced": self._flights.coalesced,
+            "evictions": self.evictions,
+            "bytes_downloaded": self.bytes_downloaded
+        }
+
+_cache: Optional[MediaCache] = None
+
+def get_media_cache() -> Optional[MediaCache]:
+    """Caché compartida en EVOLUTION_MEDIA_CACHE_DIR, o None si no está configurada"""
+    global _cache
+    directory = os.getenv("EVOLUTION_MEDIA_CACHE_DIR")
+    if not directory:
+        return None
+    if _cache is None or _cache.directory != os.path.abspath(directory):
+        max_mb = float(os.getenv("EVOLUTION_MEDIA_CACHE_MAX_MB", "1024"))
+        _cache = MediaCache(directory, int(max_mb * 1024 * 1024))
+    return _cache
@@ -0,0 +1,209 @@
+import os
+import time
+import asyncio
+import hashlib
+import binascii
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from .upload import FileUpload
+
+# Valores base64 a partir de los que la huella se calcula en un hilo aparte
+THREAD_THRESHOLD = 1024 * 1024
+_HASH_CHUNK = 4 * 1024 * 1024
+
+def base64_digest(value: str) -> Tuple[str, int]:
+    """SHA-256 y tamaño de los bytes de un valor base64, decodificándolo por trozos
+
+    Devuelve la misma huella que ``file_digest`` para el mismo contenido,
+    así un fichero enviado por ruta y luego en base64 se reconoce.
+    """
+    if value.startswith("data:") and "," in value[:256]:
+        value = value[value.index(",") + 1:]
+    hasher = hashlib.sha256()
+    size = 0
+    for start in range(0, len(value), _HASH_CHUNK):
+        chunk = binascii.a2b_base64(value[start:start + _HASH_CHUNK])
+        hasher.update(chunk)
+        size += len(chunk)
+    return hasher.hexdigest(), size
+
+def file_digest(path: str) -> Tuple[str, int]:
+    """SHA-256 y tamaño de un fichero, leyéndolo por trozos"""
+    hasher = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK):
+            hasher.update(chunk)
+            size += len(chunk)
+    return hasher.hexdigest(), size
+
+def is_url(value: str) -> bool:
+    return value.startswith(("http://", "https://"))
+
+def response_media_url(result: Any) -> Optional[str]:
+    """URL del medio guardado por la Evolution API (con S3/MinIO activado) en la respuesta de un envío"""
+    if not isinstance(result, dict):
+        return None
+    message = result.get("message")
+    for source in (result, message if isinstance(message, dict) else {}):
+        url = source.get("mediaUrl")
+        if isinstance(url, str) and is_url(url):
+            return url
+    return None
+
+class UploadRegistry:
+    """Registro acotado de multimedia ya enviada: huella del contenido → URL
+
+    Cuando la Evolution API guarda los medios en S3/MinIO, la respuesta de
+    cada envío incluye ``mediaUrl``. Los envíos posteriores del mismo
+    contenido (misma SHA-256) mandan esa URL en lugar de los bytes, y la
+    Evolution API la descarga de su propio almacenamiento. Se guardan como
+    mucho ``max_entries`` URLs durante ``ttl`` segundos (las URLs firmadas
+    caducan); si una URL deja de funcionar se olvida y se envían los bytes.
+    Mientras se sube un contenido, los demás envíos del mismo esperan a su
+    URL en lugar de subirlo también.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 86400.0, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.uncacheable = 0
+        self.stale = 0
+        self.bytes_saved = 0
+        self._urls: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._uncacheable: "OrderedDict[str, float]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._file_digests: "OrderedDict[Tuple[str, int, int], Tuple[str, int]]" = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> "UploadRegistry":
+        """Construir desde variables de entorno"""
+        return cls(
+            max_entries=int(os.getenv("EVOLUTION_MEDIA_DEDUP_MAX_ENTRIES", "1000")),
+            ttl=float(os.getenv("EVOLUTION_MEDIA_DEDUP_TTL", "86400")),
+            enabled=os.getenv("EVOLUTION_MEDIA_DEDUP", "true").lower() in ("1", "true", "yes")
+        )
+
+    async def digest_base64(self, value: str) -> Optional[Tuple[str, int]]:
+        """Huella de un valor base64, o None si es una URL o no es base64 válido"""
+        if not self.enabled or is_url(value):
+            return None
+        try:
+            if len(value) >= THREAD_THRESHOLD:
+                return await asyncio.to_thread(base64_digest, value)
+            return base64_digest(value)
+        except binascii.Error:
+            return None
+
+    async def digest_file(self, path: str) -> Optional[Tuple[str, int]]:
+        """Huella de un fichero, recordada mientras no cambien su tamaño ni su fecha"""
+        if not self.enabled:
+            return None
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        digest = self._file_digests.get(key)
+        if digest is None:
+            digest = await asyncio.to_thread(file_digest, path)
+            self._file_digests[key] = digest
+            if len(self._file_digests) > self.max_entries:
+                self._file_digests.popitem(last=False)
+        else:
+            self._file_digests.move_to_end(key)
+        return digest
+
+    async def digest_upload(self, upload: FileUpload) -> Optional[Tuple[str, int]]:
+        """Huella de un FileUpload (la de la caché de medios si viene de un handle)"""
+        if not self.enabled:
+            return None
+        if upload.digest is not None:
+            return upload.digest, upload.size
+        if upload.path is not None:
+            return await self.digest_file(upload.path)
+        return hashlib.sha256(upload.content).hexdigest(), len(upload.content)
+
+    async def claim(self, digest: str) -> Tuple[Optional[str], bool]:
+        """(URL conocida del contenido, si quien llama debe subirlo y luego llamar a ``finish``)
+
+        Si otro envío está subiendo el mismo contenido se espera a su URL.
+        """
+        url = self.lookup(digest)
+        if url is not None:
+            return url, False
+        expires_at = self._uncacheable.get(digest)
+        if expires_at is not None and time.monotonic() < expires_at:
+            return None, False
+        pending = self._pending.get(digest)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending), False
+        self._pending[digest] = asyncio.get_running_loop().create_future()
+        return None, True
+
+    def lookup(self, digest: str) -> Optional[str]:
+        entry = self._urls.get(digest)
+        if entry is None:
+            return None
+        url, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._urls[digest]
+            return None
+        self._urls.move_to_end(digest)
+        return url
+
+    def finish(self, digest: str, result: Any) -> None:
+        """Guardar la URL de la respuesta (si la hay) y despertar a quien esperaba
+
+        ``result`` es None si el envío falló.
+        """
+        url = response_media_url(result)
+        if url is not None:
+            self._remember(self._urls, digest, (url, time.monotonic() + self.ttl))
+        elif result is not None:
+            # Sin S3/MinIO la respuesta no trae URL: no se vuelve a esperar por este contenido
+            self.uncacheable += 1
+            self._remember(self._uncacheable, digest, time.monotonic() + self.ttl)
+        pending = self._pending.pop(digest, None)
+        if pending is not None and not pending.done():
+            pending.set_result(url)
+
+    def _remember(self, entries: "OrderedDict[str, Any]", digest: str, value: Any) -> None:
+        entries[digest] = value
+        entries.move_to_end(digest)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def record_hit(self, size: int) -> None:
+        self.hits += 1
+        self.bytes_saved += size
+
+    def record_miss(self) -> None:
+        self.misses += 1
+
+    def forget(self, digest: str) -> None:
+        """Olvidar una URL que la Evolution API ya no pudo descargar"""
+        if self._urls.pop(digest, None) is not None:
+            self.stale += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Aciertos, bytes ahorrados y tamaño del registro"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._urls),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "coalesced": self.coalesced,
+            "uncacheable": self.uncacheable,
+            "stale": self.stale,
+            "bytes_saved": self.bytes_saved
+        }
+
+# Registro global compartido por todos los clientes de mensajes
+upload_registry = UploadRegistry.from_env()
@@ -0,0 +1,270 @@
+import io
+import os
+import time
+import base64
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+from .upload import FileUpload
+
+logger = logging.getLogger(__name__)
+
+# Límite de WhatsApp para stickers estáticos
+STICKER_MAX_BYTES = 100 * 1024
+
+class MediaPolicy:
+    """Cómo preparar un tipo de medio antes de enviarlo
+
+    ``max_side`` es el lado máximo en píxeles, ``quality`` la calidad de
+    recompresión y ``min_bytes`` el tamaño por debajo del cual una imagen
+    que ya cabe en ``max_side`` se envía tal cual. Con ``canvas`` la imagen
+    se centra en un lienzo cuadrado transparente de ese lado (stickers).
+    """
+
+    def __init__(
+        self,
+        format: str = "JPEG",
+        max_side: int = 1600,
+        quality: int = 80,
+        min_bytes: int = 0,
+        canvas: int = 0,
+        max_bytes: int = 0,
+        thumbnail_side: int = 96
+    ):
+        self.format = format
+        self.max_side = max_side
+        self.quality = quality
+        self.min_bytes = min_bytes
+        self.canvas = canvas
+        self.max_bytes = max_bytes
+        self.thumbnail_side = thumbnail_side
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+def default_policies() -> Dict[str, MediaPolicy]:
+    """Políticas por tipo de medio; los que no aparecen (video, audio, document) no se tocan"""
+    quality = int(os.getenv("EVOLUTION_MEDIA_IMAGE_QUALITY", "80"))
+    return {
+        "image": MediaPolicy(
+            format="JPEG",
+            max_side=int(os.getenv("EVOLUTION_MEDIA_IMAGE_MAX_SIDE", "1600")),
+            quality=quality,
+            min_bytes=int(float(os.getenv("EVOLUTION_MEDIA_IMAGE_MIN_KB", "300")) * 1024)
+        ),
+        "sticker": MediaPolicy(format="WEBP", max_side=512, quality=quality, canvas=512, max_bytes=STICKER_MAX_BYTES)
+    }
+
+def pillow_available() -> bool:
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def _read_source(source: Tuple[str, Any]) -> bytes:
+    kind, value = source
+    if kind == "path":
+        with open(value, "rb") as f:
+            return f.read()
+    if kind == "base64":
+        if value.startswith("data:") and "," in value[:256]:
+            value = value[value.index(",") + 1:]
+        return base64.b64decode(value)
+    return value
+
+def process_media(source: Tuple[str, Any], policy: Dict[str, Any], thumbnail: bool = False) -> Optional[Dict[str, Any]]:
+    """Redimensionar y recomprimir una imagen según ``policy`` (se ejecuta en un proceso aparte)
+
+    ``source`` es ``("path", ruta)``, ``("base64", texto)`` o ``("bytes", datos)``.
+    Devuelve None si conviene enviar el original: imágenes animadas, ya
+    pequeñas o que no se reducen al recomprimirlas.
+    """
+    from PIL import Image, ImageOps
+
+    data = _read_source(source)
+    image = Image.open(io.BytesIO(data))
+    if getattr(image, "is_animated", False):
+        return None
+    image = ImageOps.exif_transpose(image)
+    width, height = image.size
+    canvas = policy["canvas"]
+    if not canvas and max(width, height) <= policy["max_side"] and len(data) <= policy["min_bytes"]:
+        return None
+
+    if canvas:
+        # Los stickers se escalan (también hacia arriba) para ocupar el lienzo
+        scale = canvas / max(width, height)
+        image = image.convert("RGBA").resize(
+            (max(1, round(width * scale)), max(1, round(height * scale))), Image.LANCZOS
+        )
+        sticker = Image.new("RGBA", (canvas, canvas), (0, 0, 0, 0))
+        sticker.paste(image, ((canvas - image.width) // 2, (canvas - image.height) // 2), image)
+        image = sticker
+    else:
+        image.thumbnail((policy["max_side"], policy["max_side"]), Image.LANCZOS)
+    if not canvas and image.mode != "RGB":
+        # JPEG no admite transparencia: se aplana sobre blanco
+        rgba = image.convert("RGBA")
+        image = Image.new("RGB", rgba.size, (255, 255, 255))
+        image.paste(rgba, mask=rgba.getchannel("A"))
+
+    quality = policy["quality"]
+    while True:
+        out = io.BytesIO()
+        image.save(out, policy["format"], quality=quality, optimize=True)
+        encoded = out.getvalue()
+        if not policy["max_bytes"] or len(encoded) <= policy["max_bytes"] or quality <= 30:
+            break
+        quality -= 15
+    if not canvas and len(encoded) >= len(data):
+        return None
+
+    result = {
+        "data": encoded,
+        "mimetype": f"image/{policy['format'].lower()}",
+        "extension": ".jpg" if policy["format"] == "JPEG" else f".{policy['format'].lower()}",
+        "width": image.width,
+        "height": image.height,
+        "original_bytes": len(data),
+        "original_width": width,
+        "original_height": height,
+        "thumbnail": None
+    }
+    if thumbnail and policy["thumbnail_side"]:
+        preview = image.convert("RGB")
+        preview.thumbnail((policy["thumbnail_side"], policy["thumbnail_side"]))
+        out = io.BytesIO()
+        preview.save(out, "JPEG", quality=70)
+        result["thumbnail"] = out.getvalue()
+    return result
+
+def rename(filename: Optional[str], extension: str) -> Optional[str]:
+    """Cambiar la extensión de un nombre de fichero tras recodificarlo"""
+    if not filename:
+        return filename
+    return os.path.splitext(filename)[0] + extension
+
+class MediaPreprocessor:
+    """Preparación de multimedia antes del envío en un pool de procesos
+
+    Reduce y recomprime las imágenes grandes y convierte los stickers a
+    WebP de 512x512 según la política de cada tipo de medio. El trabajo se
+    hace en un ``ProcessPoolExecutor``, así que no bloquea el bucle de
+    eventos ni compite por el GIL. Requiere Pillow (``pip install Pillow``);
+    sin él, o si la preparación falla, se envía el original. ``enabled``
+    controla la preparación automática en los envíos; ``prepare`` se puede
+    usar igualmente si Pillow está instalado.
+    """
+
+    def __init__(
+        self,
+        policies: Optional[Dict[str, MediaPolicy]] = None,
+        workers: Optional[int] = None,
+        enabled: bool = False
+    ):
+        self.policies = policies if policies is not None else default_policies()
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.available = pillow_available()
+        self.enabled = enabled and self.available
+        if enabled and not self.available:
+            logger.warning("Media preprocessing needs Pillow (pip install Pillow); sending media unchanged")
+        self.processed = 0
+        self.unchanged = 0
+        self.failed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @classmethod
+    def from_env(cls) -> "MediaPreprocessor":
+        """Construir desde variables de entorno"""
+        workers = os.getenv("EVOLUTION_MEDIA_PREPROCESS_WORKERS")
+        return cls(
+            workers=int(workers) if workers else None,
+            enabled=os.getenv("EVOLUTION_MEDIA_PREPROCESS", "false").lower() in ("1", "true", "yes")
+        )
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: el proceso principal tiene hilos (SQLite, to_thread) y fork no es seguro con ellos
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    async def prepare(
+        self,
+        media_type: str,
+        source: Tuple[str, Any],
+        thumbnail: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """Medio preparado según la política de ``media_type``, o None si se envía el original"""
+        policy = self.policies.get(media_type)
+        if policy is None or not self.available:
+            return None
+        start = time.monotonic()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self._pool(), process_media, source, policy.to_dict(), thumbnail
+            )
+        except Exception as e:
+            self.failed += 1
+            logger.warning(f"Preprocessing of {media_type} failed, sending original: {e}")
+            return None
+        finally:
+            self.seconds += time.monotonic() - start
+        if result is None:
+            self.unchanged += 1
+            return None
+        self.processed += 1
+        self.bytes_in += result["original_bytes"]
+        self.bytes_out += len(result["data"])
+        return result
+
+    async def prepare_base64(self, media_type: str, value: str) -> Optional[Dict[str, Any]]:
+        """Preparar un medio en base64 antes de un envío (si la preparación automática está activa)"""
+        if not self.enabled or value.startswith(("http://", "https://")):
+            return None
+        return await self.prepare(media_type, ("base64", value))
+
+    async def prepare_upload(self, media_type: str, upload: FileUpload) -> Optional[FileUpload]:
+        """FileUpload con el medio preparado, o None para enviar el original"""
+        if not self.enabled:
+            return None
+        source = ("path", upload.path) if upload.path else ("bytes", upload.content)
+        result = await self.prepare(media_type, source)
+        if result is None:
+            return None
+        return FileUpload(
+            content=result["data"],
+            filename=rename(upload.filename, result["extension"]),
+            mimetype=result["mimetype"],
+            field=upload.field
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Medios preparados y bytes ahorrados"""
+        return {
+            "enabled": self.enabled,
+            "available": self.available,
+            "workers": self.workers,
+            "policies": {name: policy.to_dict() for name, policy in self.policies.items()},
+            "processed": self.processed,
+            "unchanged": self.unchanged,
+            "failed": self.failed,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "bytes_saved": self.bytes_in - self.bytes_out,
+            "seconds": round(self.seconds, 3)
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Cerrar el pool; las preparaciones pendientes se cancelan"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+# Preparador global compartido por todos los clientes de mensajes
+media_preprocessor = MediaPreprocessor.from_env()
@@ -0,0 +1,113 @@
+import io
+import os
+import json
+import mimetypes
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+from .cache import MediaCache, get_media_cache
+
+class FileUpload:
+    """Fichero a enviar como ``multipart/form-data`` en lugar de base64 en el JSON
+
+    Con ``path`` el fichero se lee del disco por trozos mientras se envía;
+    ``content`` permite enviar bytes que ya están en memoria. Se abre de
+    nuevo en cada intento, así que los reintentos reenvían el fichero
+    desde el principio.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        content: Optional[bytes] = None,
+        filename: Optional[str] = None,
+        mimetype: Optional[str] = None,
+        field: str = "file",
+        digest: Optional[str] = None
+    ):
+        if (path is None) == (content is None):
+            raise ValueError("FileUpload needs exactly one of path or content")
+        self.path = path
+        self.content = content
+        self.filename = filename or (os.path.basename(path) if path else "file")
+        self.mimetype = mimetype or mimetypes.guess_type(self.filename)[0] or "application/octet-stream"
+        self.field = field
+        # SHA-256 del contenido, si ya se conoce (handles de la caché de medios)
+        self.digest = digest
+
+    @property
+    def size(self) -> int:
+        return os.path.getsize(self.path) if self.path else len(self.content)
+
+    def open(self) -> BinaryIO:
+        return open(self.path, "rb") if self.path else io.BytesIO(self.content)
+
+    @property
+    def media_type(self) -> str:
+        """Tipo de medio de la Evolution API (image, video, audio o document) según el MIME"""
+        kind = self.mimetype.split("/")[0]
+        return kind if kind in ("image", "video", "audio") else "document"
+
+def form_fields(data: Dict[str, Any]) -> Dict[str, str]:
+    """Campos de un formulario multipart: los valores complejos van como JSON"""
+    fields = {}
+    for key, value in data.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            fields[key] = "true" if value else "false"
+        elif isinstance(value, (dict, list)):
+            fields[key] = json.dumps(value)
+        else:
+            fields[key] = str(value)
+    return fields
+
+def get_media_roots() -> List[str]:
+    """Directorios desde los que se permite enviar ficheros locales (EVOLUTION_MEDIA_ROOTS)"""
+    roots = os.getenv("EVOLUTION_MEDIA_ROOTS", "")
+    return [os.path.realpath(root) for root in roots.split(os.pathsep) if root.strip()]
+
+def check_local_path(path: str) -> str:
+    """Ruta real de un fichero local, si está dentro de EVOLUTION_MEDIA_ROOTS"""
+    roots = get_media_roots()
+    if not roots:
+        raise ValueError("Local file paths are disabled; set EVOLUTION_MEDIA_ROOTS")
+    real = os.path.realpath(path)
+    if not any(os.path.commonpath([real, root]) == root for root in roots):
+        raise ValueError(f"Path '{path}' is outside EVOLUTION_MEDIA_ROOTS")
+    if not os.path.isfile(real):
+        raise ValueError(f"File not found: '{path}'")
+    return real
+
+def resolve_upload(
+    path: Optional[str] = None,
+    handle: Optional[str] = None,
+    filename: Optional[str] = None,
+    mimetype: Optional[str] = None,
+    cache: Optional[MediaCache] = None
+) -> FileUpload:
+    """FileUpload a partir de una ruta local o de un handle de la caché de medios"""
+    if (path is None) == (handle is None):
+        raise ValueError("Provide exactly one of path or handle")
+    if handle is not None:
+        cache = cache or get_media_cache()
+        if cache is None:
+            raise ValueError("Media handles need the media cache; set EVOLUTION_MEDIA_CACHE_DIR")
+        blob = cache.blob_path(handle)
+        if blob is None:
+            raise ValueError(f"Unknown or evicted media handle '{handle}'")
+        return FileUpload(path=blob, filename=filename, mimetype=mimetype, digest=handle)
+    return FileUpload(path=check_local_path(path), filename=filename, mimetype=mimetype)
+
+def media_source(
+    value: Optional[str],
+    path: Optional[str],
+    handle: Optional[str],
+    filename: Optional[str] = None,
+    mimetype: Optional[str] = None
+) -> Tuple[Optional[str], Optional[FileUpload]]:
+    """Validar que se indica una sola fuente: URL/base64, ruta local o handle"""
+    given = sum(source is not None for source in (value, path, handle))
+    if given != 1:
+        raise ValueError("Provide exactly one of the URL/base64 value, path or handle")
+    if value is not None:
+        return value, None
+    return None, resolve_upload(path, handle, filename, mimetype)
@@ -0,0 +1,176 @@
+import os
+import re
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from ..http_client import EvolutionAPIError
+from ..timeouts import deadline, remaining_time
+
+logger = logging.getLogger(__name__)
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+# Margen que se reserva del plazo de la herramienta para devolver el resumen
+DEADLINE_MARGIN = 2.0
+
+# Destinatario: número/JID o {"number": ..., "variables": {...}} (o las variables al mismo nivel)
+Recipient = Union[str, Dict[str, Any]]
+
+def get_default_concurrency() -> int:
+    """Envíos simultáneos por defecto de un envío masivo (EVOLUTION_BULK_CONCURRENCY)"""
+    return int(os.getenv("EVOLUTION_BULK_CONCURRENCY", "4"))
+
+def render(template: Optional[str], variables: Dict[str, Any]) -> Optional[str]:
+    """Sustituir ``{variable}``; los marcadores sin valor se dejan como están"""
+    if not template or not variables:
+        return template
+    return _PLACEHOLDER.sub(lambda m: str(variables[m.group(1)]) if m.group(1) in variables else m.group(0), template)
+
+def parse_recipient(recipient: Recipient) -> Dict[str, Any]:
+    """Normalizar un destinatario a ``{"number": ..., "variables": {...}}``"""
+    if isinstance(recipient, str):
+        number, variables = recipient, {}
+    elif isinstance(recipient, dict):
+        number = recipient.get("number")
+        variables = recipient.get("variables")
+        if variables is None:
+            variables = {k: v for k, v in recipient.items() if k != "number"}
+    else:
+        raise ValueError(f"Invalid recipient: {recipient!r}")
+    number = str(number or "").strip()
+    if not number:
+        raise ValueError(f"Recipient without number: {recipient!r}")
+    return {"number": number, "variables": variables}
+
+def message_id(result: Any) -> Optional[str]:
+    """ID del mensaje enviado según la respuesta de message/send*"""
+    if isinstance(result, dict) and isinstance(result.get("key"), dict):
+        return result["key"].get("id")
+    return None
+
+def plan(recipients: List[Recipient]) -> Tuple[List[Dict[str, Any]], List[Optional[Dict[str, Any]]]]:
+    """Normalizar los destinatarios; los inválidos y repetidos ya llevan su resultado (``skipped``)"""
+    entries: List[Dict[str, Any]] = []
+    results: List[Optional[Dict[str, Any]]] = []
+    seen = set()
+    for recipient in recipients:
+        try:
+            entry = parse_recipient(recipient)
+        except ValueError as e:
+            entries.append({})
+            results.append({"number": None, "status": "skipped", "error": str(e)})
+            continue
+        entries.append(entry)
+        if entry["number"] in seen:
+            results.append({"number": entry["number"], "status": "skipped", "error": "Duplicate recipient"})
+            continue
+        seen.add(entry["number"])
+        results.append(None)
+    return entries, results
+
+async def enqueue_bulk(
+    recipients: List[Recipient],
+    build: Callable[[str, Dict[str, Any]], Dict[str, Any]],
+    enqueue_many: Callable[[List[Dict[str, Any]]], Awaitable[List[int]]]
+) -> Dict[str, Any]:
+    """Encolar un envío por destinatario en una sola transacción, con el mismo resumen que ``BulkSender``
+
+    ``build(number, variables)`` devuelve los parámetros del envío de cada
+    destinatario y ``enqueue_many`` los encola y devuelve sus ids.
+    """
+    entries, results = plan(recipients)
+    queued = [i for i, result in enumerate(results) if result is None]
+    ids = await enqueue_many([build(entries[i]["number"], entries[i]["variables"]) for i in queued])
+    for i, queue_id in zip(queued, ids):
+        results[i] = {"number": entries[i]["number"], "status": "queued", "queue_id": queue_id}
+    return {
+        "total": len(recipients),
+        "queued": len(queued),
+        "skipped": len(recipients) - len(queued),
+        "results": results
+    }
+
+class _OutOfTime(Exception):
+    """No queda plazo para enviar a este destinatario"""
+
+class BulkSender:
+    """Envío del mismo mensaje a muchos destinatarios con concurrencia acotada
+
+    Cada destinatario se envía con ``send(number, variables)`` desde
+    ``concurrency`` trabajadores; los envíos siguen pasando por el limitador
+    de ritmo de la instancia, y si este pide esperar más de lo permitido el
+    trabajador espera y reintenta. Si el plazo de la herramienta no da para
+    todos, los que no llegaron a enviarse se devuelven como ``pending`` para
+    repetir la llamada solo con ellos. El resultado es un resumen compacto
+    por destinatario (ID del mensaje o error), no las respuestas completas.
+    """
+
+    def __init__(self, concurrency: Optional[int] = None):
+        self.concurrency = max(1, concurrency or get_default_concurrency())
+
+    async def run(
+        self,
+        recipients: List[Recipient],
+        send: Callable[[str, Dict[str, Any]], Awaitable[Any]],
+        only_failures: bool = False
+    ) -> Dict[str, Any]:
+        """Enviar a todos los destinatarios y devolver el resumen por destinatario"""
+        start = time.monotonic()
+        entries, results = plan(recipients)
+        pending: "asyncio.Queue[int]" = asyncio.Queue()
+        for i, result in enumerate(results):
+            if result is None:
+                pending.put_nowait(i)
+
+        async def send_one(entry: Dict[str, Any]) -> Any:
+            while True:
+                try:
+                    return await send(entry["number"], entry["variables"])
+                except EvolutionAPIError as e:
+                    if e.request_sent:
+                        raise
+                    remaining = remaining_time()
+                    if remaining is not None and remaining <= (e.retry_after or 0):
+                        raise _OutOfTime()
+                    if e.status_code != 429:
+                        raise
+                    # El limitador de ritmo pidió esperar más de lo que admite una sola llamada
+                    await asyncio.sleep(e.retry_after or 1.0)
+
+        async def worker() -> None:
+            while not pending.empty():
+                remaining = remaining_time()
+                if remaining is not None and remaining <= 0:
+                    return
+                i = pending.get_nowait()
+                number = entries[i]["number"]
+                try:
+                    result = await send_one(entries[i])
+                    results[i] = {"number": number, "status": "sent", "id": message_id(result)}
+                except _OutOfTime:
+                    pending.put_nowait(i)
+                    return
+                except Exception as e:
+                    logger.warning(f"Bulk send to {number} failed: {e}")
+                    results[i] = {"number": number, "status": "failed", "error": str(e)}
+
+        remaining = remaining_time()
+        budget = None if remaining is None else max(0.0, remaining - DEADLINE_MARGIN)
+        with deadline(budget):
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, pending.qsize()))))
+
+        counts = {"sent": 0, "failed": 0, "skipped": 0, "pending": 0}
+        unsent = []
+        for i, result in enumerate(results):
+            if result is None:
+                result = results[i] = {"number": entries[i]["number"], "status": "pending"}
+                unsent.append(recipients[i])
+            counts[result["status"]] += 1
+        return {
+            "total": len(recipients),
+            **counts,
+            "seconds": round(time.monotonic() - start, 3),
+            "results": [r for r in results if r["status"] != "sent"] if only_failures else results,
+            # Destinatarios sin enviar por falta de plazo, tal como llegaron, para repetir la llamada
+            "pending_recipients": unsent
+        }
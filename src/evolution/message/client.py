@@ -1,7 +1,148 @@
-from typing import Dict, Any, Optional, List
-from ..http_client import EvolutionAPIClient
+import base64
+from contextlib import asynccontextmanager
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, Optional, List, Tuple, Union
+from ..http_client import EvolutionAPIClient, EvolutionAPIError
+from ..circuit_breaker import instance_from_endpoint
+from ..rate_limit import RateLimitExceeded, send_rate_limiter
+from ..scheduler import current_priority, send_scheduler
+from ..media.upload import FileUpload
+from ..media.dedup import upload_registry
+from ..media.preprocess import media_preprocessor, rename
 
 class MessageClient(EvolutionAPIClient):
+    @asynccontextmanager
+    async def _send_slot(self, endpoint: str, number: Optional[str]) -> AsyncIterator[None]:
+        """Pasar los envíos (message/send*) por el planificador y el limitador de ritmo de la instancia
+
+        El planificador reparte el token de la instancia por clase de
+        prioridad; el limitador solo comprueba después el del destinatario.
+        """
+        if not endpoint.lstrip("/").startswith("message/send"):
+            yield
+            return
+        instance_name = instance_from_endpoint(endpoint)
+        try:
+            await send_scheduler.acquire(instance_name, current_priority(), send_rate_limiter)
+        except RateLimitExceeded as e:
+            raise EvolutionAPIError(429, str(e), request_sent=False, retry_after=e.retry_after)
+        try:
+            try:
+                await send_rate_limiter.acquire(instance_name, number, include_instance=False)
+            except RateLimitExceeded as e:
+                raise EvolutionAPIError(429, str(e), request_sent=False, retry_after=e.retry_after)
+            yield
+        finally:
+            send_scheduler.release()
+
+    async def post(
+        self,
+        endpoint: str,
+        json: Dict[str, Any],
+        params: Optional[Dict[str, Any]] = None,
+        idempotent: Optional[bool] = None,
+        bypass_cache: bool = False
+    ) -> Dict[str, Any]:
+        """POST que pasa los envíos (message/send*) por el planificador de envíos"""
+        async with self._send_slot(endpoint, json.get("number")):
+            return await super().post(endpoint, json=json, params=params, idempotent=idempotent, bypass_cache=bypass_cache)
+
+    async def post_file(
+        self,
+        endpoint: str,
+        data: Dict[str, Any],
+        upload: FileUpload,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """POST multipart que también pasa por el planificador de envíos"""
+        async with self._send_slot(endpoint, data.get("number")):
+            return await super().post_file(endpoint, data, upload, params=params)
+
+    async def _post_media(
+        self,
+        endpoint: str,
+        data: Dict[str, Any],
+        field: str,
+        media_type: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Enviar un medio en base64 o URL, reutilizando la URL de un envío anterior del mismo contenido"""
+        value = data.get(field)
+        fingerprint = await upload_registry.digest_base64(value) if isinstance(value, str) else None
+
+        async def send() -> Dict[str, Any]:
+            body = data
+            if media_type and isinstance(value, str):
+                prepared = await media_preprocessor.prepare_base64(media_type, value)
+                if prepared is not None:
+                    body = {**data, field: base64.b64encode(prepared["data"]).decode("ascii")}
+                    if "mimetype" in body:
+                        body["mimetype"] = prepared["mimetype"]
+                    if body.get("fileName"):
+                        body["fileName"] = rename(body["fileName"], prepared["extension"])
+            return await self.post(endpoint, json=body)
+
+        return await self._send_deduplicated(endpoint, data, field, fingerprint, send)
+
+    async def _post_upload(
+        self,
+        endpoint: str,
+        data: Dict[str, Any],
+        upload: FileUpload,
+        field: str,
+        media_type: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Subir un fichero como multipart salvo que su contenido ya tenga URL de un envío anterior"""
+        fingerprint = await upload_registry.digest_upload(upload)
+
+        async def send() -> Dict[str, Any]:
+            # La huella de deduplicación es la del original: el mismo fichero reutiliza la URL del preparado
+            prepared = await media_preprocessor.prepare_upload(media_type, upload) if media_type else None
+            if prepared is None:
+                return await self.post_file(endpoint, data, upload)
+            body = dict(data)
+            if "mimetype" in body:
+                body["mimetype"] = prepared.mimetype
+            if body.get("fileName"):
+                body["fileName"] = prepared.filename
+            return await self.post_file(endpoint, body, prepared)
+
+        return await self._send_deduplicated(endpoint, data, field, fingerprint, send)
+
+    async def _send_deduplicated(
+        self,
+        endpoint: str,
+        data: Dict[str, Any],
+        field: str,
+        fingerprint: Optional[Tuple[str, int]],
+        send: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Mandar la URL conocida del contenido en ``field`` o, si no la hay, los bytes con ``send``"""
+        if fingerprint is None:
+            return await send()
+        digest, size = fingerprint
+        url, owner = await upload_registry.claim(digest)
+        if url is not None:
+            try:
+                result = await self.post(endpoint, json={**data, field: url})
+                upload_registry.record_hit(size)
+                return result
+            except EvolutionAPIError as e:
+                # URL caducada o borrada del almacenamiento: se olvida y se envían los bytes
+                if not (e.request_sent and 400 <= e.status_code < 500 and e.status_code != 429):
+                    raise
+                upload_registry.forget(digest)
+        upload_registry.record_miss()
+        result = None
+        try:
+            result = await send()
+        finally:
+            if owner:
+                upload_registry.finish(digest, result)
+        return result
+
+    @staticmethod
+    def _as_upload(file: Union[bytes, FileUpload], filename: Optional[str] = None) -> FileUpload:
+        return file if isinstance(file, FileUpload) else FileUpload(content=file, filename=filename)
+
     async def send_text(
         self,
         instance_name: str,
@@ -40,7 +181,7 @@ class MessageClient(EvolutionAPIClient):
             **({"fileName": filename} if filename else {}),
             **({"mimetype": mimetype} if mimetype else {})
         }
-        return await self.post(f"message/sendMedia/{instance_name}", json=data)
+        return await self._post_media(f"message/sendMedia/{instance_name}", data, "media", media_type)
 
     async def send_audio(
         self,
@@ -53,7 +194,7 @@ class MessageClient(EvolutionAPIClient):
             "number": number,
             "audio": audio
         }
-        return await self.post(f"message/sendWhatsAppAudio/{instance_name}", json=data)
+        return await self._post_media(f"message/sendWhatsAppAudio/{instance_name}", data, "audio")
 
     async def send_location(
         self,
@@ -128,7 +269,7 @@ class MessageClient(EvolutionAPIClient):
             "number": number,
             "sticker": sticker
         }
-        return await self.post(f"message/sendSticker/{instance_name}", json=data)
+        return await self._post_media(f"message/sendSticker/{instance_name}", data, "sticker", "sticker")
 
     async def send_status(
         self,
@@ -151,7 +292,9 @@ class MessageClient(EvolutionAPIClient):
             "allContacts": allContacts,
             **({"statusJidList": statusJidList} if statusJidList else [])
         }
-        return await self.post(f"message/sendStatus/{instance_name}", json=data)
+        if type == "text":
+            return await self.post(f"message/sendStatus/{instance_name}", json=data)
+        return await self._post_media(f"message/sendStatus/{instance_name}", data, "content", type)
 
     async def send_ptv(
         self,
@@ -172,53 +315,77 @@ class MessageClient(EvolutionAPIClient):
             **({"mentionsEveryOne": mentions_everyone} if mentions_everyone is not None else {}),
             **({"mentioned": mentioned} if mentioned else {})
         }
-        return await self.post(f"/message/sendPtv/{instance_name}", json=data)
+        return await self._post_media(f"/message/sendPtv/{instance_name}", data, "video")
 
     async def send_media_file(
         self,
         instance_name: str,
         number: str,
-        file: bytes,
-        filename: str,
+        file: Union[bytes, FileUpload],
+        filename: Optional[str] = None,
         caption: Optional[str] = None,
         delay: Optional[int] = None,
         quoted: Optional[Dict[str, Any]] = None,
         mentions_everyone: Optional[bool] = None,
-        mentioned: Optional[List[str]] = None
+        mentioned: Optional[List[str]] = None,
+        media_type: Optional[str] = None,
+        mimetype: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Send a media file message"""
+        """Send a media file as a multipart upload"""
+        upload = self._as_upload(file, filename)
         data = {
             "number": number,
-            "file": file,
-            "fileName": filename,
+            "mediatype": media_type or upload.media_type,
+            "fileName": filename or upload.filename,
+            "mimetype": mimetype or upload.mimetype,
             **({"caption": caption} if caption else {}),
             **({"delay": delay} if delay else {}),
             **({"quoted": quoted} if quoted else {}),
             **({"mentionsEveryOne": mentions_everyone} if mentions_everyone is not None else {}),
             **({"mentioned": mentioned} if mentioned else {})
         }
-        return await self.post(f"/message/sendMedia/{instance_name}", json=data)
+        return await self._post_upload(f"/message/sendMedia/{instance_name}", data, upload, "media", data["mediatype"])
 
     async def send_ptv_file(
         self,
         instance_name: str,
         number: str,
-        file: bytes,
+        file: Union[bytes, FileUpload],
         delay: Optional[int] = None,
         quoted: Optional[Dict[str, Any]] = None,
         mentions_everyone: Optional[bool] = None,
         mentioned: Optional[List[str]] = None
     ) -> Dict[str, Any]:
-        """Send a PTV file message"""
+        """Send a PTV file as a multipart upload"""
+        upload = self._as_upload(file, "video.mp4")
         data = {
             "number": number,
-            "file": file,
             **({"delay": delay} if delay else {}),
             **({"quoted": quoted} if quoted else {}),
             **({"mentionsEveryOne": mentions_everyone} if mentions_everyone is not None else {}),
             **({"mentioned": mentioned} if mentioned else {})
         }
-        return await self.post(f"/message/sendPtv/{instance_name}", json=data)
+        return await self._post_upload(f"/message/sendPtv/{instance_name}", data, upload, "video")
+
+    async def send_audio_file(
+        self,
+        instance_name: str,
+        number: str,
+        file: Union[bytes, FileUpload]
+    ) -> Dict[str, Any]:
+        """Send an audio file as a multipart upload"""
+        upload = self._as_upload(file, "audio.ogg")
+        return await self._post_upload(f"message/sendWhatsAppAudio/{instance_name}", {"number": number}, upload, "audio")
+
+    async def send_sticker_file(
+        self,
+        instance_name: str,
+        number: str,
+        file: Union[bytes, FileUpload]
+    ) -> Dict[str, Any]:
+        """Send a sticker file as a multipart upload"""
+        upload = self._as_upload(file, "sticker.webp")
+        return await self._post_upload(f"message/sendSticker/{instance_name}", {"number": number}, upload, "sticker", "sticker")
 
     async def send_buttons(
         self,
@@ -1,7 +1,16 @@
-from typing import Dict, Any, Optional, List
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 from pydantic import BaseModel, Field, validator
 from ..base_routes import BaseRoutes
 from .client import MessageClient
+from .bulk import BulkSender, Recipient, enqueue_bulk, render
+from ..media.cache import get_media_cache
+from ..media.upload import check_local_path, media_source, resolve_upload
+from ..media.dedup import upload_registry
+from ..media.preprocess import media_preprocessor, rename
+from ..outbox.worker import get_outbox
+from ..scheduler import BULK, NORMAL, send_priority, send_scheduler
+from ..idempotency import fingerprint, idempotency_store
 
 class ButtonModel(BaseModel):
     type: str = Field(description="Tipo de botón (reply, url, call, copy, pix)")
@@ -81,6 +90,60 @@ class ListSectionModel(BaseModel):
         return v
 
 class MessageRoutes(BaseRoutes):
+    client_class = MessageClient
+
+    async def _send(
+        self,
+        operation: str,
+        instance_name: str,
+        upload: Optional[Dict[str, Any]] = None,
+        priority: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
+        **params: Any
+    ) -> Dict[str, Any]:
+        """Enviar con MessageClient o, con la cola en modo EVOLUTION_SEND_QUEUE_MODE, encolar el envío
+
+        ``upload`` es el origen de un fichero (``path`` o ``handle``, y
+        opcionalmente ``filename`` y ``mimetype``): se valida siempre, pero en
+        la cola se guarda el origen y el fichero se lee al enviarlo.
+        ``priority`` es la clase del planificador de envíos (``high``,
+        ``normal`` o ``bulk``); en la cola se guarda con el envío. Con
+        ``idempotency_key`` una repetición de la misma llamada devuelve el
+        resultado original sin volver a enviar.
+        """
+        if idempotency_key:
+            return await self._idempotent(
+                idempotency_key,
+                instance_name,
+                (operation, upload, params),
+                lambda: self._send(operation, instance_name, upload, priority, **params)
+            )
+        if priority is not None:
+            send_scheduler.check_priority(priority)
+        file = resolve_upload(**upload) if upload is not None else None
+        outbox = get_outbox()
+        if outbox is not None and outbox.queued_mode:
+            if upload is not None:
+                params["upload"] = upload
+            params["priority"] = priority or NORMAL
+            return await outbox.enqueue(instance_name, operation, params)
+        if file is not None:
+            params["file"] = file
+        with send_priority(priority):
+            return await getattr(self.client, operation)(instance_name=instance_name, **params)
+
+    async def _idempotent(
+        self,
+        idempotency_key: Optional[str],
+        instance_name: str,
+        call: Tuple[Any, ...],
+        fn: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Ejecutar ``fn`` una sola vez por clave e instancia; ``call`` son los parámetros que la clave no puede cambiar"""
+        if not idempotency_key:
+            return await fn()
+        return await idempotency_store.run(f"{instance_name}:{idempotency_key}", fingerprint(*call), fn)
+
     def register_tools(self, mcp):
         @mcp.tool(
             description="Enviar mensaje de texto",
@@ -92,18 +155,22 @@ class MessageRoutes(BaseRoutes):
             text: str,
             quoted: Optional[Dict[str, Any]] = None,
             delay: Optional[int] = None,
-            mentions: Optional[List[str]] = None
+            mentions: Optional[List[str]] = None,
+            priority: Optional[str] = None,
+            idempotency_key: Optional[str] = None
         ) -> Dict[str, Any]:
             """Enviar mensaje de texto"""
             try:
-                self.client = MessageClient()
-                result = await self.client.send_text(
+                result = await self._send(
+                    "send_text",
                     instance_name=instance_name,
                     number=number,
                     text=text,
                     quoted=quoted,
                     delay=delay,
-                    mentions=mentions
+                    mentions=mentions,
+                    priority=priority,
+                    idempotency_key=idempotency_key
                 )
                 return {
                     "success": True,
@@ -113,29 +180,57 @@ class MessageRoutes(BaseRoutes):
                 return {"error": f"Error enviando mensaje: {str(e)}"}
 
         @mcp.tool(
-            description="Enviar mensaje multimedia",
+            description="Enviar mensaje multimedia desde una URL o base64 (media), un fichero local (path) o un handle de la caché de medios (handle)",
             tags={"message", "media"}
         )
         async def send_media(
             instance_name: str,
             number: str,
             media_type: str,
-            media: str,
+            media: Optional[str] = None,
             caption: Optional[str] = None,
             filename: Optional[str] = None,
-            mimetype: Optional[str] = None
+            mimetype: Optional[str] = None,
+            path: Optional[str] = None,
+            handle: Optional[str] = None,
+            priority: Optional[str] = None,
+            idempotency_key: Optional[str] = None
         ) -> Dict[str, Any]:
-            """Enviar mensaje multimedia (imagen, video, documento)"""
+            """Enviar mensaje multimedia (imagen, video, documento)
+
+            Con ``path`` o ``handle`` el fichero se sube como multipart leyéndolo
+            del disco, sin pasar por base64.
+            """
             try:
-                self.client = MessageClient()
-                result = await self.client.send_media(
+                media, upload = media_source(media, path, handle, filename, mimetype)
+                if upload is not None:
+                    result = await self._send(
+                        "send_media_file",
+                        instance_name=instance_name,
+                        number=number,
+                        upload={"path": path, "handle": handle, "filename": filename, "mimetype": mimetype},
+                        filename=filename,
+                        caption=caption,
+                        media_type=media_type,
+                        mimetype=mimetype,
+                        priority=priority,
+                        idempotency_key=idempotency_key
+                    )
+                    return {
+                        "success": True,
+                        "result": result
+                    }
+                result = await self._send(
+                    "send_media",
                     instance_name=instance_name,
                     number=number,
                     media_type=media_type,
                     media=media,
                     caption=caption,
                     filename=filename,
-                    mimetype=mimetype
+                    mimetype=mimetype,
+                    priority=priority,
+                    idempotency_key=idempotency_key
                 )
                 return {
                     "success": True,
@@ -144,6 +239,156 @@ class MessageRoutes(BaseRoutes):
             except Exception as e:
                 return {"error": f"Error enviando media: {str(e)}"}
 
+        @mcp.tool(
+            description="Enviar el mismo mensaje de texto a muchos destinatarios, con variables {nombre} por destinatario, y obtener un resumen por destinatario",
+            tags={"message", "text", "bulk"}
+        )
+        async def send_text_bulk(
+            instance_name: str,
+            recipients: List[Recipient],
+            text: str,
+            delay: Optional[int] = None,
+            concurrency: Optional[int] = None,
+            only_failures: bool = False,
+            priority: str = BULK,
+            idempotency_key: Optional[str] = None
+        ) -> Dict[str, Any]:
+            """Enviar un texto a una lista de destinatarios
+
+            Cada destinatario es un número o ``{"number": ..., "variables": {...}}``;
+            ``{variable}`` en el texto se sustituye por su valor. Los envíos
+            respetan el límite de ritmo de la instancia; los que no caben en el
+            plazo de la llamada se devuelven en ``pending_recipients``. En modo
+            cola se encola un envío por destinatario y se devuelven sus ids.
+            Por defecto van con prioridad ``bulk`` para no retrasar los envíos
+            individuales de la instancia.
+            """
+            try:
+                send_scheduler.check_priority(priority)
+
+                async def send(number: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+                    return await self.client.send_text(
+                        instance_name=instance_name,
+                        number=number,
+                        text=render(text, variables),
+                        delay=delay
+                    )
+
+                async def run() -> Dict[str, Any]:
+                    outbox = get_outbox()
+                    if outbox is not None and outbox.queued_mode:
+                        # Modo cola: un envío encolado por destinatario, en una sola transacción
+                        return await enqueue_bulk(
+                            recipients,
+                            lambda number, variables: {"number": number, "text": render(text, variables), "delay": delay, "priority": priority},
+                            lambda items: outbox.enqueue_many([(instance_name, "send_text", item) for item in items])
+                        )
+                    with send_priority(priority):
+                        return await BulkSender(concurrency).run(recipients, send, only_failures)
+
+                result = await self._idempotent(
+                    idempotency_key,
+                    instance_name,
+                    ("send_text_bulk", recipients, text, delay, only_failures),
+                    run
+                )
+                return {
+                    "success": True,
+                    "result": result
+                }
+            except Exception as e:
+                return {"error": f"Error en el envío masivo: {str(e)}"}
+
+        @mcp.tool(
+            description="Enviar el mismo multimedia (URL, base64, fichero local o handle) a muchos destinatarios, con variables {nombre} en el pie, y obtener un resumen por destinatario",
+            tags={"message", "media", "bulk"}
+        )
+        async def send_media_bulk(
+            instance_name: str,
+            recipients: List[Recipient],
+            media_type: str,
+            media: Optional[str] = None,
+            caption: Optional[str] = None,
+            filename: Optional[str] = None,
+            mimetype: Optional[str] = None,
+            path: Optional[str] = None,
+            handle: Optional[str] = None,
+            concurrency: Optional[int] = None,
+            only_failures: bool = False,
+            priority: str = BULK,
+            idempotency_key: Optional[str] = None
+        ) -> Dict[str, Any]:
+            """Enviar un medio a una lista de destinatarios
+
+            Igual que ``send_text_bulk``, con ``{variable}`` sustituidas en
+            ``caption``. El fichero de ``path`` o ``handle`` se resuelve una vez.
+            """
+            try:
+                send_scheduler.check_priority(priority)
+                media, upload = media_source(media, path, handle, filename, mimetype)
+
+                async def send(number: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+                    if upload is not None:
+                        return await self.client.send_media_file(
+                            instance_name=instance_name,
+                            number=number,
+                            file=upload,
+                            filename=filename,
+                            caption=render(caption, variables),
+                            media_type=media_type,
+                            mimetype=mimetype
+                        )
+                    return await self.client.send_media(
+                        instance_name=instance_name,
+                        number=number,
+                        media_type=media_type,
+                        media=media,
+                        caption=render(caption, variables),
+                        filename=filename,
+                        mimetype=mimetype
+                    )
+
+                async def run() -> Dict[str, Any]:
+                    outbox = get_outbox()
+                    if outbox is not None and outbox.queued_mode:
+                        if upload is not None:
+                            operation = "send_media_file"
+                            source = {"upload": {"path": path, "handle": handle, "filename": filename, "mimetype": mimetype}}
+                        else:
+                            operation, source = "send_media", {"media": media}
+
+                        def build(number: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+                            return {
+                                "number": number,
+                                "media_type": media_type,
+                                "caption": render(caption, variables),
+                                "filename": filename,
+                                "mimetype": mimetype,
+                                "priority": priority,
+                                **source
+                            }
+
+                        return await enqueue_bulk(
+                            recipients,
+                            build,
+                            lambda items: outbox.enqueue_many([(instance_name, operation, item) for item in items])
+                        )
+                    with send_priority(priority):
+                        return await BulkSender(concurrency).run(recipients, send, only_failures)
+
+                result = await self._idempotent(
+                    idempotency_key,
+                    instance_name,
+                    ("send_media_bulk", recipients, media_type, media, caption, filename, mimetype, path, handle, only_failures),
+                    run
+                )
+                return {
+                    "success": True,
+                    "result": result
+                }
+            except Exception as e:
+                return {"error": f"Error en el envío masivo de media: {str(e)}"}
+
         @mcp.tool(
             description="Enviar mensaje de audio",
             tags={"message", "audio"}
@@ -151,15 +396,35 @@ class MessageRoutes(BaseRoutes):
         async def send_audio(
             instance_name: str,
             number: str,
-            audio: str
+            audio: Optional[str] = None,
+            path: Optional[str] = None,
+            handle: Optional[str] = None,
+            priority: Optional[str] = None,
+            idempotency_key: Optional[str] = None
         ) -> Dict[str, Any]:
-            """Enviar mensaje de audio"""
+            """Enviar mensaje de audio desde URL/base64, fichero local o handle"""
             try:
-                self.client = MessageClient()
-                result = await self.client.send_audio(
+                audio, upload = media_source(audio, path, handle)
+                if upload is not None:
+                    result = await self._send(
+                        "send_audio_file",
+                        instance_name=instance_name,
+                        number=number,
+                        upload={"path": path, "handle": handle},
+                        priority=priority,
+                        idempotency_key=idempotency_key
+                    )
+                    return {
+                        "success": True,
+                        "result": result
+                    }
+                result = await self._send(
+                    "send_audio",
                     instance_name=instance_name,
                     number=number,
-                    audio=audio
+                    audio=audio,
+                    priority=priority,
+                    idempotency_key=idempotency_key
                 )
                 return {
                     "success": True,
@@ -178,18 +443,22 @@ class MessageRoutes(BaseRoutes):
             latitude: float,
             longitude: float,
             name: Optional[str] = None,
-            address: Optional[str] = None
+            address: Optional[str] = None,
+            priority: Optional[str] = None,
+            idempotency_key: Optional[str] = None
         ) -> Dict[str, Any]:
             """Enviar ubicación"""
             try:
-                self.client = MessageClient()
-                result = await self.client.send_location(
+                result = await self._send(
+                    "send_location",
                     instance_name=instance_name,
                     number=number,
                     latitude=latitude,
                     longitude=longitude,
                     name=name,
-                    address=address
+                    address=address,
+                    priority=priority,
+                    idempotency_key=idempotency_key
                 )
                 return {
                     "success": True,
@@ -205,15 +474,19 @@ class MessageRoutes(BaseRoutes):
         async def send_contact(
             instance_name: str,
             number: str,
-            contacts: List[Dict[str, str]]
+            contacts: List[Dict[str, str]],
+            priority: Optional[str] = None,
+            idempotency_key: Optional[str] = None
         ) -> Dict[str, Any]:
             """Enviar información de contacto"""
             try:
-                self.client = MessageClient()
-                result = await self.client.send_contact(
+                result = await self._send(
+                    "send_contact",
                     instance_name=instance_name,
                     number=number,
-                    contacts=contacts
+                    contacts=contacts,
+                    priority=priority,
+                    idempotency_key=idempotency_key
                 )
                 return {
                     "success": True,
@@ -229,15 +502,19 @@ class MessageRoutes(BaseRoutes):
         async def send_reaction(
             instance_name: str,
             message_key: Dict[str, Any],
-            reaction: str
+            reaction: str,
+            priority: Optional[str] = None,
+            idempotency_key: Optional[str] = None
         ) -> Dict[str, Any]:
             """Enviar reacción a un mensaje"""
             try:
-                self.client = MessageClient()
-                result = await self.client.send_reaction(
+                result = await self._send(
+                    "send_reaction",
                     instance_name=instance_name,
                     message_key=message_key,
-                    reaction=reaction
+                    reaction=reaction,
+                    priority=priority,
+                    idempotency_key=idempotency_key
                 )
                 return {
                     "success": True,
@@ -255,17 +532,21 @@ class MessageRoutes(BaseRoutes):
             number: str,
             name: str,
             options: List[str],
-            selectable_count: int = 1
+            selectable_count: int = 1,
+            priority: Optional[str] = None,
+            idempotency_key: Optional[str] = None
         ) -> Dict[str, Any]:
             """Enviar encuesta"""
             try:
-                self.client = MessageClient()
-                result = await self.client.send_poll(
+                result = await self._send(
+                    "send_poll",
                     instance_name=instance_name,
                     number=number,
                     name=name,
                     options=options,
-                    selectable_count=selectable_count
+                    selectable_count=selectable_count,
+                    priority=priority,
+                    idempotency_key=idempotency_key
                 )
                 return {
                     "success": True,
@@ -281,15 +562,35 @@ class MessageRoutes(BaseRoutes):
         async def send_sticker(
             instance_name: str,
             number: str,
-            sticker: str  # url o base64
+            sticker: Optional[str] = None,  # url o base64
+            path: Optional[str] = None,
+            handle: Optional[str] = None,
+            priority: Optional[str] = None,
+            idempotency_key: Optional[str] = None
         ) -> Dict[str, Any]:
-            """Enviar sticker"""
+            """Enviar sticker desde URL/base64, fichero local o handle"""
             try:
-                self.client = MessageClient()
-                result = await self.client.send_sticker(
+                sticker, upload = media_source(sticker, path, handle)
+                if upload is not None:
+                    result = await self._send(
+                        "send_sticker_file",
+                        instance_name=instance_name,
+                        number=number,
+                        upload={"path": path, "handle": handle},
+                        priority=priority,
+                        idempotency_key=idempotency_key
+                    )
+                    return {
+                        "success": True,
+                        "result": result
+                    }
+                result = await self._send(
+                    "send_sticker",
                     instance_name=instance_name,
                     number=number,
-                    sticker=sticker
+                    sticker=sticker,
+                    priority=priority,
+                    idempotency_key=idempotency_key
                 )
                 return {
                     "success": True,
@@ -310,12 +611,14 @@ class MessageRoutes(BaseRoutes):
             backgroundColor: Optional[str] = None,
             font: Optional[int] = None,  # 1=SERIF, 2=NORICAN_REGULAR, 3=BRYNDAN_WRITE, 4=BEBASNEUE_REGULAR, 5=OSWALD_HEAVY
             allContacts: bool = False,
-            statusJidList: Optional[List[str]] = None
+            statusJidList: Optional[List[str]] = None,
+            priority: Optional[str] = None,
+            idempotency_key: Optional[str] = None
         ) -> Dict[str, Any]:
             """Enviar estado/historia"""
             try:
-                self.client = MessageClient()
-                result = await self.client.send_status(
+                result = await self._send(
+                    "send_status",
                     instance_name=instance_name,
                     type=type,
                     content=content,
@@ -323,7 +626,9 @@ class MessageRoutes(BaseRoutes):
                     backgroundColor=backgroundColor,
                     font=font,
                     allContacts=allContacts,
-                    statusJidList=statusJidList
+                    statusJidList=statusJidList,
+                    priority=priority,
+                    idempotency_key=idempotency_key
                 )
                 return {
                     "success": True,
@@ -343,19 +648,23 @@ class MessageRoutes(BaseRoutes):
             delay: Optional[int] = None,
             quoted: Optional[Dict[str, Any]] = None,
             mentions_everyone: Optional[bool] = None,
-            mentioned: Optional[List[str]] = None
+            mentioned: Optional[List[str]] = None,
+            priority: Optional[str] = None,
+            idempotency_key: Optional[str] = None
         ) -> Dict[str, Any]:
             """Enviar video PTV (Play Through Video)"""
             try:
-                self.client = MessageClient()
-                result = await self.client.send_ptv(
+                result = await self._send(
+                    "send_ptv",
                     instance_name=instance_name,
                     number=number,
                     video=video,
                     delay=delay,
                     quoted=quoted,
                     mentions_everyone=mentions_everyone,
-                    mentioned=mentioned
+                    mentioned=mentioned,
+                    priority=priority,
+                    idempotency_key=idempotency_key
                 )
                 return {
                     "success": True,
@@ -379,7 +688,9 @@ class MessageRoutes(BaseRoutes):
             link_preview: Optional[bool] = None,
             mentions_everyone: Optional[bool] = None,
             mentioned: Optional[List[str]] = None,
-            quoted: Optional[Dict[str, Any]] = None
+            quoted: Optional[Dict[str, Any]] = None,
+            priority: Optional[str] = None,
+            idempotency_key: Optional[str] = None
         ) -> Dict[str, Any]:
             """Enviar mensaje con botones"""
             try:
@@ -407,7 +718,6 @@ class MessageRoutes(BaseRoutes):
                     button = ButtonModel(**button_data)
                     validated_buttons.append(button)
 
-                self.client = MessageClient()
                 # Formatear los botones según la estructura requerida por la API
                 formatted_buttons = []
                 for button in validated_buttons:
@@ -447,7 +757,8 @@ class MessageRoutes(BaseRoutes):
                         }
                     formatted_buttons.append(formatted_button)
 
-                result = await self.client.send_buttons(
+                result = await self._send(
+                    "send_buttons",
                     instance_name=instance_name,
                     number=str(number),
                     title=str(title),
@@ -458,7 +769,9 @@ class MessageRoutes(BaseRoutes):
                     link_preview=link_preview,
                     mentions_everyone=mentions_everyone,
                     mentioned=mentioned,
-                    quoted=quoted
+                    quoted=quoted,
+                    priority=priority,
+                    idempotency_key=idempotency_key
                 )
                 return {
                     "success": True,
@@ -483,12 +796,14 @@ class MessageRoutes(BaseRoutes):
             link_preview: Optional[bool] = None,
             mentions_everyone: Optional[bool] = None,
             mentioned: Optional[List[str]] = None,
-            quoted: Optional[Dict[str, Any]] = None
+            quoted: Optional[Dict[str, Any]] = None,
+            priority: Optional[str] = None,
+            idempotency_key: Optional[str] = None
         ) -> Dict[str, Any]:
             """Enviar mensaje con lista"""
             try:
-                self.client = MessageClient()
-                result = await self.client.send_list(
+                result = await self._send(
+                    "send_list",
                     instance_name=instance_name,
                     number=number,
                     title=title,
@@ -500,7 +815,9 @@ class MessageRoutes(BaseRoutes):
                     link_preview=link_preview,
                     mentions_everyone=mentions_everyone,
                     mentioned=mentioned,
-                    quoted=quoted
+                    quoted=quoted,
+                    priority=priority,
+                    idempotency_key=idempotency_key
                 )
                 return {
                     "success": True,
@@ -510,33 +827,42 @@ class MessageRoutes(BaseRoutes):
                 return {"error": f"Error enviando mensaje con lista: {str(e)}"} 
 
         @mcp.tool(
-            description="Enviar archivo multimedia",
+            description="Enviar archivo multimedia desde un fichero local (path) o un handle de la caché de medios, subido como multipart",
             tags={"message", "media"}
         )
         async def send_media_file(
             instance_name: str,
             number: str,
-            file: bytes,
-            filename: str,
+            path: Optional[str] = None,
+            handle: Optional[str] = None,
+            filename: Optional[str] = None,
             caption: Optional[str] = None,
             delay: Optional[int] = None,
             quoted: Optional[Dict[str, Any]] = None,
             mentions_everyone: Optional[bool] = None,
-            mentioned: Optional[List[str]] = None
+            mentioned: Optional[List[str]] = None,
+            media_type: Optional[str] = None,
+            mimetype: Optional[str] = None,
+            priority: Optional[str] = None,
+            idempotency_key: Optional[str] = None
         ) -> Dict[str, Any]:
             """Enviar archivo multimedia"""
             try:
-                self.client = MessageClient()
-                result = await self.client.send_media_file(
+                result = await self._send(
+                    "send_media_file",
                     instance_name=instance_name,
                     number=number,
-                    file=file,
+                    upload={"path": path, "handle": handle, "filename": filename, "mimetype": mimetype},
                     filename=filename,
+                    media_type=media_type,
+                    mimetype=mimetype,
                     caption=caption,
                     delay=delay,
                     quoted=quoted,
                     mentions_everyone=mentions_everyone,
-                    mentioned=mentioned
+                    mentioned=mentioned,
+                    priority=priority,
+                    idempotency_key=idempotency_key
                 )
                 return {
                     "success": True,
@@ -546,33 +872,140 @@ class MessageRoutes(BaseRoutes):
                 return {"error": f"Error enviando archivo multimedia: {str(e)}"}
 
         @mcp.tool(
-            description="Enviar archivo PTV",
+            description="Enviar archivo PTV desde un fichero local (path) o un handle de la caché de medios, subido como multipart",
             tags={"message", "ptv"}
         )
         async def send_ptv_file(
             instance_name: str,
             number: str,
-            file: bytes,
+            path: Optional[str] = None,
+            handle: Optional[str] = None,
             delay: Optional[int] = None,
             quoted: Optional[Dict[str, Any]] = None,
             mentions_everyone: Optional[bool] = None,
-            mentioned: Optional[List[str]] = None
+            mentioned: Optional[List[str]] = None,
+            priority: Optional[str] = None,
+            idempotency_key: Optional[str] = None
         ) -> Dict[str, Any]:
             """Enviar archivo PTV (Play Through Video)"""
             try:
-                self.client = MessageClient()
-                result = await self.client.send_ptv_file(
+                result = await self._send(
+                    "send_ptv_file",
                     instance_name=instance_name,
                     number=number,
-                    file=file,
+                    upload={"path": path, "handle": handle},
                     delay=delay,
                     quoted=quoted,
                     mentions_everyone=mentions_everyone,
-                    mentioned=mentioned
+                    mentioned=mentioned,
+                    priority=priority,
+                    idempotency_key=idempotency_key
                 )
                 return {
                     "success": True,
                     "result": result
                 }
             except Exception as e:
-                return {"error": f"Error enviando archivo PTV: {str(e)}"} 
\ No newline at end of file
+                return {"error": f"Error enviando archivo PTV: {str(e)}"} 
+
+        @mcp.tool(
+            description="Registrar un fichero local en la caché de medios y obtener un handle reutilizable en los envíos",
+            tags={"message", "media"}
+        )
+        async def register_media(
+            path: str,
+            filename: Optional[str] = None,
+            mimetype: Optional[str] = None
+        ) -> Dict[str, Any]:
+            """Copiar un fichero de EVOLUTION_MEDIA_ROOTS a la caché de medios"""
+            try:
+                cache = get_media_cache()
+                if cache is None:
+                    return {"error": "Media cache is disabled; set EVOLUTION_MEDIA_CACHE_DIR"}
+                result = await asyncio.to_thread(cache.register_file, check_local_path(path), filename, mimetype)
+                return {
+                    "success": True,
+                    "result": result
+                }
+            except Exception as e:
+                return {"error": f"Error registrando media: {str(e)}"}
+
+        @mcp.tool(
+            description="Obtener estadísticas de la deduplicación de multimedia enviada (aciertos y bytes ahorrados)",
+            tags={"message", "media", "diagnostics"}
+        )
+        async def get_media_dedup_stats() -> Dict[str, Any]:
+            """Aciertos del registro de multimedia ya enviada y bytes que no se volvieron a subir"""
+            try:
+                return {
+                    "success": True,
+                    "result": upload_registry.stats()
+                }
+            except Exception as e:
+                return {"error": f"Error obteniendo estadísticas de deduplicación: {str(e)}"}
+
+        @mcp.tool(
+            description="Reducir y recomprimir una imagen (o convertirla en sticker WebP) y guardarla en la caché de medios con su miniatura",
+            tags={"message", "media"}
+        )
+        async def preprocess_media(
+            path: Optional[str] = None,
+            handle: Optional[str] = None,
+            media_type: str = "image",
+            thumbnail: bool = True
+        ) -> Dict[str, Any]:
+            """Preparar un medio según la política de su tipo y devolver el handle del resultado"""
+            try:
+                cache = get_media_cache()
+                if cache is None:
+                    return {"error": "Media cache is disabled; set EVOLUTION_MEDIA_CACHE_DIR"}
+                if not media_preprocessor.available:
+                    return {"error": "Media preprocessing needs Pillow (pip install Pillow)"}
+                if media_type not in media_preprocessor.policies:
+                    return {"error": f"No preprocessing policy for media type '{media_type}'"}
+                upload = resolve_upload(path, handle, cache=cache)
+                prepared = await media_preprocessor.prepare(media_type, ("path", upload.path), thumbnail)
+                if prepared is None:
+                    return {
+                        "success": True,
+                        "result": {"changed": False, "size": upload.size}
+                    }
+                filename = rename(upload.filename, prepared["extension"])
+                stored = await asyncio.to_thread(cache.register_bytes, prepared["data"], filename, prepared["mimetype"])
+                result = {
+                    "changed": True,
+                    "handle": stored["handle"],
+                    "fileName": filename,
+                    "mimetype": prepared["mimetype"],
+                    "size": stored["size"],
+                    "original_size": prepared["original_bytes"],
+                    "width": prepared["width"],
+                    "height": prepared["height"],
+                    "original_width": prepared["original_width"],
+                    "original_height": prepared["original_height"]
+                }
+                if prepared["thumbnail"]:
+                    preview = await asyncio.to_thread(
+                        cache.register_bytes, prepared["thumbnail"], rename(filename, "_thumb.jpg"), "image/jpeg"
+                    )
+                    result["thumbnail_handle"] = preview["handle"]
+                return {
+                    "success": True,
+                    "result": result
+                }
+            except Exception as e:
+                return {"error": f"Error preparando media: {str(e)}"}
+
+        @mcp.tool(
+            description="Obtener estadísticas de la preparación de multimedia antes del envío (imágenes reducidas y bytes ahorrados)",
+            tags={"message", "media", "diagnostics"}
+        )
+        async def get_media_preprocess_stats() -> Dict[str, Any]:
+            """Políticas por tipo de medio, medios preparados y bytes ahorrados"""
+            try:
+                return {
+                    "success": True,
+                    "result": media_preprocessor.stats()
+                }
+            except Exception as e:
+                return {"error": f"Error obteniendo estadísticas de preparación: {str(e)}"}
@@ -0,0 +1,21 @@
+import asyncio
+from fastmcp.exceptions import ToolError
+from fastmcp.server.middleware import Middleware
+from .timeouts import deadline
+
+class DeadlineMiddleware(Middleware):
+    """Asigna a cada llamada a herramienta un plazo global
+
+    El plazo se propaga a las peticiones hacia la Evolution API, que acotan su
+    timeout con el tiempo restante, y la llamada se cancela al vencer.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    async def on_call_tool(self, context, call_next):
+        with deadline(self.seconds):
+            try:
+                return await asyncio.wait_for(call_next(context), timeout=self.seconds)
+            except asyncio.TimeoutError:
+                raise ToolError(f"Tool call exceeded its deadline of {self.seconds:g}s")
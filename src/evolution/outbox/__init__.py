@@ -0,0 +1,11 @@
+"""
+Módulo de cola persistente de envíos (SQLite) con trabajadores asyncio
+y envíos programados.
+"""
+
+from .queue import OutboundQueue
+from .worker import Outbox, get_outbox
+from .schedule import MessageSchedule, ScheduleStore, get_message_schedule
+from .routes import OutboxRoutes
+
+__all__ = ["OutboundQueue", "Outbox", "get_outbox", "MessageSchedule", "ScheduleStore", "get_message_schedule", "OutboxRoutes"]
@@ -0,0 +1,293 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from ..scheduler import DEFAULT_WEIGHTS, NORMAL
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY,
+    instance TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    message_id TEXT,
+    error TEXT,
+    priority TEXT NOT NULL DEFAULT 'normal'
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_ready ON outbox (status, available_at);
+CREATE INDEX IF NOT EXISTS idx_outbox_instance ON outbox (instance, status);
+"""
+# Colas creadas antes de guardar la prioridad en su propia columna
+PRIORITY_INDEX = "CREATE INDEX IF NOT EXISTS idx_outbox_priority ON outbox (status, priority, available_at)"
+
+PENDING = "pending"
+INFLIGHT = "inflight"
+SENT = "sent"
+DEAD = "dead"
+CANCELLED = "cancelled"
+STATUSES = (PENDING, INFLIGHT, SENT, DEAD, CANCELLED)
+
+# Un envío encolado: (instancia, operación de MessageClient, parámetros JSON)
+QueueItem = Tuple[str, str, Dict[str, Any]]
+
+def _row(row: sqlite3.Row) -> Dict[str, Any]:
+    item = dict(row)
+    if "params" in item:
+        item["params"] = json.loads(item["params"])
+    return item
+
+class OutboundQueue:
+    """Cola persistente de envíos en SQLite (modo WAL)
+
+    Cada envío pasa por ``pending`` → ``inflight`` → ``sent``. Al reclamarlo
+    un trabajador queda invisible durante ``visibility_timeout`` segundos;
+    si el proceso muere antes de confirmarlo, vuelve a ``pending`` al vencer
+    el plazo (entrega al menos una vez). Los que agotan sus intentos pasan
+    a ``dead`` y se pueden reintentar a mano; los ``pending`` se pueden
+    cancelar. ``available_at`` es a la vez el momento en que un pendiente
+    puede enviarse y el vencimiento del plazo de un ``inflight``.
+
+    La clase de prioridad (``params["priority"]``) se guarda en su propia
+    columna y ``claim`` reparte los envíos listos entre clases según
+    ``weights`` (stride scheduling): un ``high`` encolado tras miles de
+    ``bulk`` sale en el siguiente reclamo, y ``bulk`` sigue avanzando.
+    """
+
+    def __init__(self, path: str, weights: Optional[Dict[str, float]] = None):
+        self.path = path
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self._pass: Dict[str, float] = dict.fromkeys(self.weights, 0.0)
+        self._virtual_time = 0.0
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(outbox)")}
+        if "priority" not in columns:
+            self._conn.execute(f"ALTER TABLE outbox ADD COLUMN priority TEXT NOT NULL DEFAULT '{NORMAL}'")
+        self._conn.execute(PRIORITY_INDEX)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def enqueue(self, instance_name: str, operation: str, params: Dict[str, Any], delay: float = 0.0) -> int:
+        """Encolar un envío; devuelve su id"""
+        return self.enqueue_many([(instance_name, operation, params)], delay)[0]
+
+    def enqueue_many(self, items: Iterable[QueueItem], delay: float = 0.0) -> List[int]:
+        """Encolar varios envíos en una sola transacción"""
+        now = time.time()
+        rows = [
+            (
+                instance,
+                operation,
+                json.dumps(params, separators=(",", ":"), ensure_ascii=False),
+                params.get("priority") or NORMAL,
+                now + delay,
+                now,
+                now
+            )
+            for instance, operation, params in items
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                ids = [
+                    self._conn.execute(
+                        "INSERT INTO outbox (instance, operation, params, priority, available_at, created_at, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        row
+                    ).lastrowid
+                    for row in rows
+                ]
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return ids
+
+    def claim(self, limit: int, visibility_timeout: float, max_attempts: int) -> List[Dict[str, Any]]:
+        """Reclamar hasta ``limit`` envíos listos, repartidos entre clases por peso, ocultándolos durante ``visibility_timeout``"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._expire_leases(now, max_attempts)
+                ids = self._pick(now, limit)
+                rows = self._conn.execute(
+                    "UPDATE outbox SET status = ?, attempts = attempts + 1, available_at = ?, updated_at = ? "
+                    f"WHERE id IN ({', '.join('?' * len(ids))}) "
+                    "RETURNING id, instance, operation, params, priority, attempts",
+                    (INFLIGHT, now + visibility_timeout, now, *ids)
+                ).fetchall() if ids else []
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        order = {item_id: n for n, item_id in enumerate(ids)}
+        return sorted((_row(row) for row in rows), key=lambda item: order[item["id"]])
+
+    def _pick(self, now: float, limit: int) -> List[int]:
+        """Ids de hasta ``limit`` envíos listos, eligiendo cada vez la clase con menor pase (stride scheduling)"""
+        ready: Dict[str, List[int]] = {}
+        for priority in self.weights:
+            ids = [row[0] for row in self._conn.execute(
+                "SELECT id FROM outbox WHERE status = ? AND priority = ? AND available_at <= ? "
+                "ORDER BY available_at LIMIT ?",
+                (PENDING, priority, now, limit)
+            )]
+            if ids:
+                ready[priority] = ids[::-1]
+        picked: List[int] = []
+        while ready and len(picked) < limit:
+            # Una clase que estaba vacía no acumula crédito: entra con el pase actual
+            priority = min(ready, key=lambda name: (max(self._pass[name], self._virtual_time), -self.weights[name]))
+            self._virtual_time = max(self._pass[priority], self._virtual_time)
+            self._pass[priority] = self._virtual_time + 1.0 / self.weights[priority]
+            picked.append(ready[priority].pop())
+            if not ready[priority]:
+                del ready[priority]
+        return picked
+
+    def _expire_leases(self, now: float, max_attempts: int) -> None:
+        """Devolver a la cola los envíos cuyo trabajador no confirmó a tiempo"""
+        self._conn.execute(
+            "UPDATE outbox SET status = ?, error = 'Visibility timeout expired', updated_at = ? "
+            "WHERE status = ? AND available_at <= ? AND attempts >= ?",
+            (DEAD, now, INFLIGHT, now, max_attempts)
+        )
+        self._conn.execute(
+            "UPDATE outbox SET status = ?, updated_at = ? WHERE status = ? AND available_at <= ?",
+            (PENDING, now, INFLIGHT, now)
+        )
+
+    def _finish(self, sql: str, args: tuple) -> bool:
+        with self._lock:
+            return self._conn.execute(sql, args).rowcount > 0
+
+    def complete(self, item_id: int, message_id: Optional[str] = None) -> bool:
+        """Marcar un envío como entregado a la Evolution API"""
+        return self._finish(
+            "UPDATE outbox SET status = ?, message_id = ?, error = NULL, updated_at = ? WHERE id = ? AND status = ?",
+            (SENT, message_id, time.time(), item_id, INFLIGHT)
+        )
+
+    def retry(self, item_id: int, error: str, delay: float) -> bool:
+        """Devolver un envío fallido a la cola tras ``delay`` segundos"""
+        now = time.time()
+        return self._finish(
+            "UPDATE outbox SET status = ?, error = ?, available_at = ?, updated_at = ? WHERE id = ? AND status = ?",
+            (PENDING, error, now + delay, now, item_id, INFLIGHT)
+        )
+
+    def release(self, item_id: int, delay: float) -> bool:
+        """Devolver un envío a la cola sin contar el intento (p. ej. por el límite de ritmo)"""
+        now = time.time()
+        return self._finish(
+            "UPDATE outbox SET status = ?, attempts = attempts - 1, available_at = ?, updated_at = ? "
+            "WHERE id = ? AND status = ?",
+            (PENDING, now + delay, now, item_id, INFLIGHT)
+        )
+
+    def dead_letter(self, item_id: int, error: str) -> bool:
+        """Apartar un envío que no se va a poder entregar"""
+        return self._finish(
+            "UPDATE outbox SET status = ?, error = ?, updated_at = ? WHERE id = ? AND status = ?",
+            (DEAD, error, time.time(), item_id, INFLIGHT)
+        )
+
+    def _select(self, item_id: Optional[int], instance_name: Optional[str]) -> Tuple[str, tuple]:
+        if item_id is None and instance_name is None:
+            raise ValueError("Provide a queue id or an instance name")
+        clauses, args = [], []
+        if item_id is not None:
+            clauses.append("id = ?")
+            args.append(item_id)
+        if instance_name is not None:
+            clauses.append("instance = ?")
+            args.append(instance_name)
+        return " AND ".join(clauses), tuple(args)
+
+    def cancel(self, item_id: Optional[int] = None, instance_name: Optional[str] = None) -> int:
+        """Cancelar un envío pendiente, o todos los de una instancia; devuelve cuántos"""
+        where, args = self._select(item_id, instance_name)
+        return self._update(
+            f"UPDATE outbox SET status = ?, updated_at = ? WHERE status = ? AND {where}",
+            (CANCELLED, time.time(), PENDING) + args
+        )
+
+    def requeue_dead(self, item_id: Optional[int] = None, instance_name: Optional[str] = None) -> int:
+        """Volver a encolar envíos de la cola de muertos con los intentos a cero"""
+        where, args = self._select(item_id, instance_name)
+        now = time.time()
+        return self._update(
+            f"UPDATE outbox SET status = ?, attempts = 0, available_at = ?, updated_at = ? WHERE status = ? AND {where}",
+            (PENDING, now, now, DEAD) + args
+        )
+
+    def _update(self, sql: str, args: tuple) -> int:
+        with self._lock:
+            return self._conn.execute(sql, args).rowcount
+
+    def get(self, item_id: int) -> Optional[Dict[str, Any]]:
+        """Estado de un envío encolado"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM outbox WHERE id = ?", (item_id,)).fetchone()
+        return _row(row) if row else None
+
+    def list(self, status: str = PENDING, instance_name: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Envíos en un estado, los más antiguos primero"""
+        if status not in STATUSES:
+            raise ValueError(f"Unknown status '{status}'; expected one of {', '.join(STATUSES)}")
+        sql = "SELECT id, instance, operation, priority, status, attempts, available_at, created_at, message_id, error FROM outbox WHERE status = ?"
+        args: List[Any] = [status]
+        if instance_name:
+            sql += " AND instance = ?"
+            args.append(instance_name)
+        sql += " ORDER BY id LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            return [_row(row) for row in self._conn.execute(sql, args).fetchall()]
+
+    def depth(self) -> Dict[str, Any]:
+        """Envíos por estado, en total y por instancia, y antigüedad del pendiente más viejo"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT instance, status, COUNT(*) AS n FROM outbox GROUP BY instance, status"
+            ).fetchall()
+            oldest = self._conn.execute(
+                "SELECT MIN(created_at) FROM outbox WHERE status = ?", (PENDING,)
+            ).fetchone()[0]
+            by_priority = self._conn.execute(
+                "SELECT priority, COUNT(*) FROM outbox WHERE status = ? GROUP BY priority", (PENDING,)
+            ).fetchall()
+        totals = dict.fromkeys(STATUSES, 0)
+        instances: Dict[str, Dict[str, int]] = {}
+        for row in rows:
+            totals[row["status"]] += row["n"]
+            instances.setdefault(row["instance"], {})[row["status"]] = row["n"]
+        return {
+            **totals,
+            "oldest_pending_seconds": round(time.time() - oldest, 1) if oldest else None,
+            "pending_by_priority": {row[0]: row[1] for row in by_priority},
+            "instances": instances
+        }
+
+    def purge(self, older_than: float) -> int:
+        """Borrar envíos entregados o cancelados hace más de ``older_than`` segundos"""
+        return self._update(
+            "DELETE FROM outbox WHERE status IN (?, ?) AND updated_at < ?",
+            (SENT, CANCELLED, time.time() - older_than)
+        )
@@ -0,0 +1,216 @@
+import asyncio
+from typing import Dict, Any, Optional
+from ..base_routes import BaseRoutes
+from ..message.client import MessageClient
+from .queue import PENDING
+from .schedule import SCHEDULED, get_message_schedule, parse_send_at
+from .worker import get_outbox
+
+QUEUE_DISABLED = "Send queue is disabled; set EVOLUTION_SEND_QUEUE_PATH"
+SCHEDULE_DISABLED = "Scheduled messages are disabled; set EVOLUTION_SCHEDULE_PATH"
+
+class OutboxRoutes(BaseRoutes):
+    client_class = MessageClient
+
+    def register_tools(self, mcp):
+        @mcp.tool(
+            description="Encolar un envío en la cola persistente. operation es un método de envío de MessageClient (send_text, send_media, send_media_file, ...) y params sus argumentos sin instance_name, p. ej. {\"number\": ..., \"text\": ...}; los ficheros se envían con las operaciones *_file y params.upload = {\"path\": ...} o {\"handle\": ...}, y params.priority fija la clase de prioridad",
+            tags={"message", "queue"}
+        )
+        async def enqueue_message(
+            instance_name: str,
+            operation: str,
+            params: Dict[str, Any],
+            delay_seconds: float = 0
+        ) -> Dict[str, Any]:
+            """Encolar un envío para que lo entreguen los trabajadores de la cola
+
+            ``params`` son los argumentos del método de MessageClient, no los
+            de la herramienta ``send_*``: ``path``, ``handle`` o
+            ``idempotency_key`` no valen. Los ficheros se indican con
+            ``params["upload"] = {"path": ...}`` o ``{"handle": ...}`` en las
+            operaciones ``*_file`` y se leen en el momento del envío. Los
+            parámetros se validan contra el método al encolar.
+            """
+            try:
+                outbox = get_outbox()
+                if outbox is None:
+                    return {"error": QUEUE_DISABLED}
+                result = await outbox.enqueue(instance_name, operation, params, delay_seconds)
+                return {
+                    "success": True,
+                    "result": result
+                }
+            except Exception as e:
+                return {"error": f"Error encolando envío: {str(e)}"}
+
+        @mcp.tool(
+            description="Ver la profundidad de la cola de envíos por estado e instancia, o el estado de un envío encolado",
+            tags={"message", "queue", "diagnostics"}
+        )
+        async def get_send_queue_status(queue_id: Optional[int] = None) -> Dict[str, Any]:
+            """Estado de la cola de envíos o de un envío concreto"""
+            try:
+                outbox = get_outbox()
+                if outbox is None:
+                    return {"error": QUEUE_DISABLED}
+                if queue_id is None:
+                    result = await outbox.status()
+                else:
+                    result = await asyncio.to_thread(outbox.queue.get, queue_id)
+                    if result is None:
+                        return {"error": f"Queued send {queue_id} not found"}
+                return {
+                    "success": True,
+                    "result": result
+                }
+            except Exception as e:
+                return {"error": f"Error obteniendo estado de la cola: {str(e)}"}
+
+        @mcp.tool(
+            description="Listar envíos de la cola en un estado (pending, inflight, sent, dead, cancelled)",
+            tags={"message", "queue"}
+        )
+        async def list_send_queue(
+            status: str = PENDING,
+            instance_name: Optional[str] = None,
+            limit: int = 50
+        ) -> Dict[str, Any]:
+            """Envíos encolados en un estado, los más antiguos primero"""
+            try:
+                outbox = get_outbox()
+                if outbox is None:
+                    return {"error": QUEUE_DISABLED}
+                items = await asyncio.to_thread(outbox.queue.list, status, instance_name, limit)
+                return {
+                    "success": True,
+                    "result": items
+                }
+            except Exception as e:
+                return {"error": f"Error listando la cola de envíos: {str(e)}"}
+
+        @mcp.tool(
+            description="Cancelar un envío pendiente de la cola, o todos los pendientes de una instancia",
+            tags={"message", "queue"}
+        )
+        async def cancel_queued_message(
+            queue_id: Optional[int] = None,
+            instance_name: Optional[str] = None
+        ) -> Dict[str, Any]:
+            """Cancelar envíos que aún no se han entregado"""
+            try:
+                outbox = get_outbox()
+                if outbox is None:
+                    return {"error": QUEUE_DISABLED}
+                cancelled = await asyncio.to_thread(outbox.queue.cancel, queue_id, instance_name)
+                return {
+                    "success": True,
+                    "result": {"cancelled": cancelled}
+                }
+            except Exception as e:
+                return {"error": f"Error cancelando envío: {str(e)}"}
+
+        @mcp.tool(
+            description="Reintentar envíos de la cola de muertos (uno o todos los de una instancia)",
+            tags={"message", "queue"}
+        )
+        async def retry_dead_messages(
+            queue_id: Optional[int] = None,
+            instance_name: Optional[str] = None
+        ) -> Dict[str, Any]:
+            """Volver a encolar envíos que agotaron sus intentos"""
+            try:
+                outbox = get_outbox()
+                if outbox is None:
+                    return {"error": QUEUE_DISABLED}
+                requeued = await asyncio.to_thread(outbox.queue.requeue_dead, queue_id, instance_name)
+                if requeued:
+                    outbox.start()
+                    outbox.notify()
+                return {
+                    "success": True,
+                    "result": {"requeued": requeued}
+                }
+            except Exception as e:
+                return {"error": f"Error reintentando envíos: {str(e)}"}
+
+        @mcp.tool(
+            description="Programar un envío para una fecha (send_at en ISO 8601, UTC si no lleva zona) o dentro de delay_seconds; operation y params son como en enqueue_message: un método de envío de MessageClient y sus argumentos sin instance_name",
+            tags={"message", "queue", "schedule"}
+        )
+        async def schedule_message(
+            instance_name: str,
+            operation: str,
+            params: Dict[str, Any],
+            send_at: Optional[str] = None,
+            delay_seconds: Optional[float] = None
+        ) -> Dict[str, Any]:
+            """Programar un envío; sobrevive a reinicios del servidor
+
+            A diferencia del ``delay`` de la Evolution API no mantiene ninguna
+            conexión abierta: el envío se guarda y sale a su hora, por la cola
+            de envíos si está configurada.
+            """
+            try:
+                schedule = get_message_schedule()
+                if schedule is None:
+                    return {"error": SCHEDULE_DISABLED}
+                result = await schedule.schedule(instance_name, operation, params, parse_send_at(send_at, delay_seconds))
+                return {
+                    "success": True,
+                    "result": result
+                }
+            except Exception as e:
+                return {"error": f"Error programando envío: {str(e)}"}
+
+        @mcp.tool(
+            description="Listar envíos programados en un estado (scheduled, sending, queued, sent, failed, cancelled), por fecha de envío, o ver un envío programado",
+            tags={"message", "queue", "schedule"}
+        )
+        async def list_scheduled_messages(
+            status: str = SCHEDULED,
+            instance_name: Optional[str] = None,
+            limit: int = 50,
+            schedule_id: Optional[int] = None
+        ) -> Dict[str, Any]:
+            """Envíos programados, o el estado de uno concreto"""
+            try:
+                schedule = get_message_schedule()
+                if schedule is None:
+                    return {"error": SCHEDULE_DISABLED}
+                if schedule_id is not None:
+                    result = await asyncio.to_thread(schedule.store.get, schedule_id)
+                    if result is None:
+                        return {"error": f"Scheduled send {schedule_id} not found"}
+                else:
+                    result = {
+                        "items": await asyncio.to_thread(schedule.store.list, status, instance_name, limit),
+                        "status": await schedule.status()
+                    }
+                return {
+                    "success": True,
+                    "result": result
+                }
+            except Exception as e:
+                return {"error": f"Error listando envíos programados: {str(e)}"}
+
+        @mcp.tool(
+            description="Cancelar un envío programado que aún no ha salido, o todos los de una instancia",
+            tags={"message", "queue", "schedule"}
+        )
+        async def cancel_scheduled_message(
+            schedule_id: Optional[int] = None,
+            instance_name: Optional[str] = None
+        ) -> Dict[str, Any]:
+            """Cancelar envíos programados"""
+            try:
+                schedule = get_message_schedule()
+                if schedule is None:
+                    return {"error": SCHEDULE_DISABLED}
+                cancelled = await schedule.cancel(schedule_id, instance_name)
+                return {
+                    "success": True,
+                    "result": {"cancelled": cancelled}
+                }
+            except Exception as e:
+                return {"error": f"Error cancelando envío programado: {str(e)}"}
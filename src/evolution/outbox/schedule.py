@@ -0,0 +1,505 @@
+import os
+import json
+import time
+import heapq
+import random
+import asyncio
+import logging
+import sqlite3
+import threading
+import contextvars
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from ..http_client import EvolutionAPIError
+from .worker import check_operation, dispatch, get_outbox, is_permanent, sent_message_id
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scheduled (
+    id INTEGER PRIMARY KEY,
+    instance TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    params TEXT NOT NULL,
+    send_at REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'scheduled',
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    queue_id INTEGER,
+    message_id TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_scheduled_due ON scheduled (status, send_at);
+CREATE INDEX IF NOT EXISTS idx_scheduled_instance ON scheduled (instance, status);
+"""
+
+SCHEDULED = "scheduled"
+SENDING = "sending"
+QUEUED = "queued"
+SENT = "sent"
+FAILED = "failed"
+CANCELLED = "cancelled"
+STATUSES = (SCHEDULED, SENDING, QUEUED, SENT, FAILED, CANCELLED)
+
+# Envíos vencidos que se reclaman por transacción
+CLAIM_BATCH = 500
+# Espera máxima del temporizador: acota el efecto de un cambio de hora del sistema
+MAX_SLEEP = 60.0
+# Espera inicial (se duplica en cada fallo seguido) si no se pueden entregar los vencidos a la cola de envíos
+HANDOFF_RETRY = 1.0
+HANDOFF_ATTEMPTS = 5
+# Tolerancia para una fecha de envío ya pasada (p. ej. "ahora" con el reloj del cliente algo adelantado)
+PAST_TOLERANCE = 60.0
+
+# Un envío programado: (instancia, operación de MessageClient, parámetros JSON, instante Unix)
+ScheduledItem = Tuple[str, str, Dict[str, Any], float]
+
+def parse_send_at(send_at: Optional[str] = None, delay_seconds: Optional[float] = None) -> float:
+    """Instante Unix de envío a partir de una fecha ISO 8601 (UTC si no lleva zona) o de un retraso en segundos"""
+    if (send_at is None) == (delay_seconds is None):
+        raise ValueError("Provide exactly one of send_at or delay_seconds")
+    if delay_seconds is not None:
+        if delay_seconds < 0:
+            raise ValueError("delay_seconds must not be negative")
+        return time.time() + delay_seconds
+    moment = datetime.fromisoformat(send_at)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    timestamp = moment.timestamp()
+    if timestamp < time.time() - PAST_TOLERANCE:
+        raise ValueError(f"send_at {send_at} is in the past")
+    return timestamp
+
+def _row(row: sqlite3.Row) -> Dict[str, Any]:
+    item = dict(row)
+    if "params" in item:
+        item["params"] = json.loads(item["params"])
+    return item
+
+class ScheduleStore:
+    """Envíos programados en SQLite (modo WAL)
+
+    Cada envío pasa por ``scheduled`` → ``sending`` → ``sent`` (o ``failed``),
+    o por ``queued`` si se entrega a la cola persistente de envíos. Solo los
+    ``scheduled`` se pueden cancelar. Los que quedaron en ``sending`` al
+    morir el proceso vuelven a ``scheduled`` al arrancar (al menos una vez).
+    ``attempts`` cuenta las veces que se ha reclamado cada envío.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        # Bases creadas antes de contar los intentos
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(scheduled)")}
+        if "attempts" not in columns:
+            self._conn.execute("ALTER TABLE scheduled ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def add_many(self, items: Iterable[ScheduledItem]) -> List[int]:
+        """Programar varios envíos en una sola transacción; devuelve sus ids"""
+        now = time.time()
+        rows = [
+            (instance, operation, json.dumps(params, separators=(",", ":"), ensure_ascii=False), send_at, now, now)
+            for instance, operation, params, send_at in items
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                ids = [
+                    self._conn.execute(
+                        "INSERT INTO scheduled (instance, operation, params, send_at, created_at, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        row
+                    ).lastrowid
+                    for row in rows
+                ]
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return ids
+
+    def recover(self) -> List[Tuple[float, int]]:
+        """Devolver a ``scheduled`` los envíos a medias y listar ``(send_at, id)`` de los pendientes"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE scheduled SET status = ?, updated_at = ? WHERE status = ?",
+                (SCHEDULED, time.time(), SENDING)
+            )
+            return [
+                (row[0], row[1])
+                for row in self._conn.execute("SELECT send_at, id FROM scheduled WHERE status = ?", (SCHEDULED,))
+            ]
+
+    def claim_due(self, now: float, limit: int) -> List[Dict[str, Any]]:
+        """Pasar a ``sending`` hasta ``limit`` envíos vencidos, los más atrasados primero, contando el intento"""
+        with self._lock:
+            rows = self._conn.execute(
+                "UPDATE scheduled SET status = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE id IN (SELECT id FROM scheduled WHERE status = ? AND send_at <= ? ORDER BY send_at LIMIT ?) "
+                "RETURNING id, instance, operation, params, send_at, attempts",
+                (SENDING, now, SCHEDULED, now, limit)
+            ).fetchall()
+        return sorted((_row(row) for row in rows), key=lambda item: (item["send_at"], item["id"]))
+
+    def finish(
+        self,
+        item_id: int,
+        status: str,
+        message_id: Optional[str] = None,
+        queue_id: Optional[int] = None,
+        error: Optional[str] = None
+    ) -> bool:
+        """Cerrar un envío en curso como ``sent``, ``queued`` o ``failed``"""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE scheduled SET status = ?, message_id = ?, queue_id = ?, error = ?, updated_at = ? "
+                "WHERE id = ? AND status = ?",
+                (status, message_id, queue_id, error, time.time(), item_id, SENDING)
+            ).rowcount > 0
+
+    def mark_queued(self, handoffs: Iterable[Tuple[int, int]]) -> None:
+        """Cerrar como ``queued`` los envíos entregados a la cola de envíos, con su id en ella"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "UPDATE scheduled SET status = ?, queue_id = ?, updated_at = ? WHERE id = ? AND status = ?",
+                    [(QUEUED, queue_id, now, item_id, SENDING) for item_id, queue_id in handoffs]
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def retry(self, item_id: int, send_at: float, error: str) -> bool:
+        """Volver a programar un envío fallido para ``send_at``"""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE scheduled SET status = ?, send_at = ?, error = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (SCHEDULED, send_at, error, time.time(), item_id, SENDING)
+            ).rowcount > 0
+
+    def reschedule(self, item_id: int, send_at: float, error: Optional[str] = None) -> bool:
+        """Volver a programar un envío en curso sin contar el intento (p. ej. por el límite de ritmo)"""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE scheduled SET status = ?, send_at = ?, attempts = attempts - 1, error = ?, updated_at = ? "
+                "WHERE id = ? AND status = ?",
+                (SCHEDULED, send_at, error, time.time(), item_id, SENDING)
+            ).rowcount > 0
+
+    def cancel(self, item_id: Optional[int] = None, instance_name: Optional[str] = None) -> int:
+        """Cancelar un envío programado, o todos los de una instancia; devuelve cuántos"""
+        if item_id is None and instance_name is None:
+            raise ValueError("Provide a schedule id or an instance name")
+        clauses, args = ["status = ?"], [SCHEDULED]
+        if item_id is not None:
+            clauses.append("id = ?")
+            args.append(item_id)
+        if instance_name is not None:
+            clauses.append("instance = ?")
+            args.append(instance_name)
+        with self._lock:
+            return self._conn.execute(
+                f"UPDATE scheduled SET status = ?, updated_at = ? WHERE {' AND '.join(clauses)}",
+                [CANCELLED, time.time()] + args
+            ).rowcount
+
+    def get(self, item_id: int) -> Optional[Dict[str, Any]]:
+        """Estado de un envío programado"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM scheduled WHERE id = ?", (item_id,)).fetchone()
+        return _row(row) if row else None
+
+    def list(self, status: str = SCHEDULED, instance_name: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Envíos programados en un estado, por fecha de envío"""
+        if status not in STATUSES:
+            raise ValueError(f"Unknown status '{status}'; expected one of {', '.join(STATUSES)}")
+        sql = "SELECT * FROM scheduled WHERE status = ?"
+        args: List[Any] = [status]
+        if instance_name:
+            sql += " AND instance = ?"
+            args.append(instance_name)
+        sql += " ORDER BY send_at, id LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            return [_row(row) for row in self._conn.execute(sql, args).fetchall()]
+
+    def counts(self) -> Dict[str, Any]:
+        """Envíos por estado y fecha del próximo pendiente"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM scheduled GROUP BY status").fetchall()
+            next_at = self._conn.execute(
+                "SELECT MIN(send_at) FROM scheduled WHERE status = ?", (SCHEDULED,)
+            ).fetchone()[0]
+        totals = dict.fromkeys(STATUSES, 0)
+        totals.update({row[0]: row[1] for row in rows})
+        return {**totals, "next_send_at": next_at}
+
+    def purge(self, older_than: float) -> int:
+        """Borrar envíos terminados o cancelados hace más de ``older_than`` segundos"""
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM scheduled WHERE status IN (?, ?, ?, ?) AND updated_at < ?",
+                (SENT, QUEUED, FAILED, CANCELLED, time.time() - older_than)
+            ).rowcount
+
+class MessageSchedule:
+    """Envíos programados para una fecha, con un único temporizador
+
+    Los pendientes se guardan en SQLite y en memoria solo se mantiene un
+    montículo de ``(send_at, id)``: una tarea duerme hasta el más próximo (o
+    hasta que se programe uno anterior) y entonces reclama los vencidos de
+    la base de datos, así que cientos de miles de envíos no cuestan una tarea
+    asyncio cada uno. Los cancelados se descartan al llegar su hora. Si la
+    cola persistente de envíos está configurada, los vencidos se le entregan
+    (con sus reintentos y cola de muertos); si no, ``workers`` tareas los
+    mandan con MessageClient. En ese caso los fallos transitorios de
+    peticiones que no llegaron a Evolution se reprograman con espera
+    exponencial hasta ``max_attempts`` intentos; los demás, que podrían
+    haberse entregado ya, quedan como ``failed``.
+    """
+
+    def __init__(
+        self,
+        store: ScheduleStore,
+        client: Any = None,
+        workers: int = 4,
+        retention: float = 7 * 86400.0,
+        max_attempts: int = 5,
+        retry_delay: float = 2.0
+    ):
+        self.store = store
+        self._client = client
+        self.workers = max(1, workers)
+        self.retention = retention
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self.fired = 0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self._handoff_failures = 0
+        self._heap: List[Tuple[float, int]] = []
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._ready: Optional[asyncio.Queue] = None
+        self._last_purge = 0.0
+
+    @classmethod
+    def from_env(cls, path: str) -> "MessageSchedule":
+        """Construir desde variables de entorno"""
+        return cls(
+            ScheduleStore(path),
+            workers=int(os.getenv("EVOLUTION_SCHEDULE_WORKERS", "4")),
+            retention=float(os.getenv("EVOLUTION_SEND_QUEUE_RETENTION", str(7 * 86400))),
+            max_attempts=int(os.getenv("EVOLUTION_SCHEDULE_MAX_ATTEMPTS", "5"))
+        )
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            from ..base_routes import client_registry
+            from ..message.client import MessageClient
+            self._client = client_registry.get(MessageClient)
+        return self._client
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    def start(self) -> None:
+        """Arrancar el temporizador y los trabajadores (si no lo estaban ya) en el bucle actual"""
+        if self.running:
+            return
+        loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._ready = asyncio.Queue(maxsize=self.workers * 2)
+        # Contexto vacío: no heredan el plazo ni la prioridad de la herramienta que los arrancó
+        self._tasks = [loop.create_task(self._run(), context=contextvars.Context())] + [
+            loop.create_task(self._work(), context=contextvars.Context())
+            for _ in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """Parar el temporizador; los envíos a medias vuelven a programarse al arrancar"""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _push(self, entries: Iterable[Tuple[float, int]]) -> None:
+        earliest = self._heap[0][0] if self._heap else None
+        for entry in entries:
+            heapq.heappush(self._heap, entry)
+        if self._wakeup is not None and self._heap and (earliest is None or self._heap[0][0] < earliest):
+            self._wakeup.set()
+
+    async def schedule(self, instance_name: str, operation: str, params: Dict[str, Any], send_at: float) -> Dict[str, Any]:
+        """Programar un envío para el instante Unix ``send_at``"""
+        ids = await self.schedule_many([(instance_name, operation, params, send_at)])
+        return {"scheduled": True, "schedule_id": ids[0], "send_at": send_at, "status": SCHEDULED}
+
+    async def schedule_many(self, items: List[ScheduledItem]) -> List[int]:
+        """Programar varios envíos en una sola transacción"""
+        for _, operation, params, _ in items:
+            check_operation(operation, params)
+        ids = await asyncio.to_thread(self.store.add_many, items)
+        self.start()
+        self._push((item[3], item_id) for item, item_id in zip(items, ids))
+        return ids
+
+    async def cancel(self, item_id: Optional[int] = None, instance_name: Optional[str] = None) -> int:
+        """Cancelar envíos programados; su entrada del montículo se descarta al vencer"""
+        return await asyncio.to_thread(self.store.cancel, item_id, instance_name)
+
+    async def _run(self) -> None:
+        # Lo programado antes de arrancar se suma a lo que ya hubiera en el montículo
+        entries = await asyncio.to_thread(self.store.recover)
+        self._heap.extend(entries)
+        heapq.heapify(self._heap)
+        while True:
+            # Se limpia antes de mirar el montículo para no perder un envío anterior que llegue mientras tanto
+            self._wakeup.clear()
+            now = time.time()
+            if self._heap and self._heap[0][0] <= now:
+                while self._heap and self._heap[0][0] <= now:
+                    heapq.heappop(self._heap)
+                try:
+                    await self._fire(now)
+                except Exception as e:
+                    logger.error(f"Message schedule error: {e}")
+                continue
+            if time.monotonic() - self._last_purge > 3600:
+                self._last_purge = time.monotonic()
+                try:
+                    await asyncio.to_thread(self.store.purge, self.retention)
+                except Exception as e:
+                    logger.error(f"Message schedule purge error: {e}")
+            timeout = min(self._heap[0][0] - now, MAX_SLEEP) if self._heap else MAX_SLEEP
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, now: float) -> None:
+        """Reclamar los envíos vencidos y entregarlos a la cola de envíos o a los trabajadores"""
+        while True:
+            items = await asyncio.to_thread(self.store.claim_due, now, CLAIM_BATCH)
+            self.fired += len(items)
+            outbox = get_outbox()
+            if outbox is not None and items:
+                if not await self._hand_off(outbox, items):
+                    return
+            else:
+                for item in items:
+                    await self._ready.put(item)
+            if len(items) < CLAIM_BATCH:
+                return
+
+    async def _hand_off(self, outbox: Any, items: List[Dict[str, Any]]) -> bool:
+        """Entregar envíos reclamados a la cola de envíos; si no se puede, vuelven a programarse"""
+        try:
+            queue_ids = await outbox.enqueue_many([(item["instance"], item["operation"], item["params"]) for item in items])
+        except Exception as e:
+            # La cola no guardó nada (una sola transacción): se reprograman sin contar el intento
+            self._handoff_failures += 1
+            delay = min(HANDOFF_RETRY * 2 ** (self._handoff_failures - 1), MAX_SLEEP)
+            error = str(e) or e.__class__.__name__
+            logger.error(f"Could not hand {len(items)} scheduled send(s) to the send queue, retrying in {delay:.1f}s: {error}")
+            send_at = time.time() + delay
+            # Primero el montículo: así el temporizador vuelve también a por los vencidos que quedaban sin reclamar
+            self._push((send_at, item["id"]) for item in items)
+            for item in items:
+                await asyncio.to_thread(self.store.reschedule, item["id"], send_at, error)
+            return False
+        self._handoff_failures = 0
+        handoffs = [(item["id"], queue_id) for item, queue_id in zip(items, queue_ids)]
+        # Ya están en la cola: reprogramarlos los duplicaría, así que se insiste en marcarlos
+        for attempt in range(HANDOFF_ATTEMPTS - 1):
+            try:
+                await asyncio.to_thread(self.store.mark_queued, handoffs)
+                return True
+            except Exception as e:
+                logger.warning(f"Could not mark {len(handoffs)} scheduled send(s) as queued, retrying: {e}")
+                await asyncio.sleep(HANDOFF_RETRY * 2 ** attempt)
+        await asyncio.to_thread(self.store.mark_queued, handoffs)
+        return True
+
+    async def _work(self) -> None:
+        while True:
+            item = await self._ready.get()
+            try:
+                await self._deliver(item)
+            except Exception as e:
+                logger.error(f"Message schedule worker error: {e}")
+
+    async def _deliver(self, item: Dict[str, Any]) -> None:
+        item_id = item["id"]
+        try:
+            result = await dispatch(self.client, item["instance"], item["operation"], item["params"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+            if isinstance(e, EvolutionAPIError) and e.status_code == 429 and not e.request_sent:
+                # Limitador de ritmo local: se reprograma sin contarlo como fallo
+                send_at = time.time() + (e.retry_after or 1.0)
+                if await asyncio.to_thread(self.store.reschedule, item_id, send_at, error):
+                    self._push([(send_at, item_id)])
+                return
+            attempts = item["attempts"]
+            if isinstance(e, EvolutionAPIError) and not e.request_sent and not is_permanent(e) and attempts < self.max_attempts:
+                # No llegó a Evolution (timeout de conexión, circuito abierto...): reintentarlo no duplica el envío
+                delay = max(e.retry_after or 0.0, self.retry_delay * 2 ** (attempts - 1) * random.uniform(0.5, 1.0))
+                send_at = time.time() + min(delay, 300.0)
+                self.retried += 1
+                if await asyncio.to_thread(self.store.retry, item_id, send_at, error):
+                    self._push([(send_at, item_id)])
+                return
+            logger.warning(f"Scheduled send {item_id} failed after {attempts} attempt(s): {error}")
+            self.failed += 1
+            await asyncio.to_thread(self.store.finish, item_id, FAILED, error=error)
+            return
+        self.sent += 1
+        await asyncio.to_thread(self.store.finish, item_id, SENT, message_id=sent_message_id(result))
+
+    async def status(self) -> Dict[str, Any]:
+        """Envíos programados por estado y contadores del temporizador"""
+        counts = await asyncio.to_thread(self.store.counts)
+        return {
+            **counts,
+            "timer_entries": len(self._heap),
+            "running": self.running,
+            "delivery": "send_queue" if get_outbox() is not None else "direct",
+            "fired": self.fired,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed
+        }
+
+_schedule: Optional[MessageSchedule] = None
+
+def get_message_schedule() -> Optional[MessageSchedule]:
+    """Envíos programados en EVOLUTION_SCHEDULE_PATH (o junto a la cola de envíos), o None si no hay ruta"""
+    global _schedule
+    path = os.getenv("EVOLUTION_SCHEDULE_PATH") or os.getenv("EVOLUTION_SEND_QUEUE_PATH")
+    if not path:
+        return None
+    if _schedule is None or _schedule.store.path != path:
+        _schedule = MessageSchedule.from_env(path)
+    return _schedule
@@ -0,0 +1,270 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import inspect
+import contextvars
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from ..http_client import EvolutionAPIError
+from ..media.upload import resolve_upload
+from ..scheduler import NORMAL, send_priority, send_scheduler
+from .queue import OutboundQueue, QueueItem
+
+logger = logging.getLogger(__name__)
+
+# Métodos de MessageClient que se pueden encolar
+OPERATIONS = frozenset({
+    "send_text", "send_media", "send_audio", "send_location", "send_contact", "send_reaction",
+    "send_poll", "send_sticker", "send_status", "send_ptv", "send_buttons", "send_list",
+    "send_media_file", "send_ptv_file", "send_audio_file", "send_sticker_file"
+})
+# Errores 4xx que no se arreglan reintentando (el resto de 4xx va directo a la cola de muertos)
+TRANSIENT_CLIENT_ERRORS = (408, 425, 429)
+
+def sent_message_id(result: Any) -> Optional[str]:
+    """ID del mensaje en la respuesta de message/send*"""
+    key = result.get("key") if isinstance(result, dict) else None
+    return key.get("id") if isinstance(key, dict) else None
+
+@lru_cache(maxsize=None)
+def _signature(operation: str) -> inspect.Signature:
+    from ..message.client import MessageClient
+    return inspect.signature(getattr(MessageClient, operation))
+
+def check_operation(operation: str, params: Optional[Dict[str, Any]] = None) -> None:
+    """Validar la operación y, si se dan, que ``params`` son argumentos válidos de su método de MessageClient
+
+    Así un envío con parámetros de las herramientas que el método no admite
+    (``path``, ``handle``, ``idempotency_key``...) se rechaza al encolarlo en
+    lugar de acabar en la cola de muertos.
+    """
+    if operation not in OPERATIONS:
+        raise ValueError(f"Unknown send operation '{operation}'; expected one of {', '.join(sorted(OPERATIONS))}")
+    if params is None:
+        return
+    kwargs = dict(params)
+    upload = kwargs.pop("upload", None)
+    priority = kwargs.pop("priority", None)
+    if priority is not None:
+        send_scheduler.check_priority(priority)
+    signature = _signature(operation)
+    if "file" in signature.parameters:
+        if not isinstance(upload, dict):
+            raise ValueError(f"{operation} needs params['upload'] with the file 'path' or media cache 'handle'")
+        if "file" in kwargs:
+            raise ValueError(f"{operation} reads the file from params['upload'], not params['file']")
+        kwargs["file"] = None
+    elif upload is not None:
+        raise ValueError(f"{operation} does not take an upload; use the matching *_file operation")
+    try:
+        signature.bind(None, instance_name=None, **kwargs)
+    except TypeError as e:
+        raise ValueError(f"Invalid params for {operation}: {e}") from None
+
+async def dispatch(client: Any, instance_name: str, operation: str, params: Dict[str, Any]) -> Any:
+    """Ejecutar un envío encolado con el método de MessageClient correspondiente
+
+    Los ficheros se guardan en la cola como ``upload`` (ruta o handle de la
+    caché de medios) y se resuelven en el momento del envío. ``priority`` es
+    la clase del planificador de envíos con la que sale (``normal`` si falta).
+    """
+    check_operation(operation)
+    kwargs = dict(params)
+    upload = kwargs.pop("upload", None)
+    priority = kwargs.pop("priority", None) or NORMAL
+    if upload is not None:
+        kwargs["file"] = resolve_upload(**upload)
+    with send_priority(priority):
+        return await getattr(client, operation)(instance_name=instance_name, **kwargs)
+
+def is_permanent(e: Exception) -> bool:
+    """Fallo que no se arregla reintentando: petición rechazada por la API o parámetros inválidos"""
+    if isinstance(e, EvolutionAPIError):
+        return 400 <= e.status_code < 500 and e.status_code not in TRANSIENT_CLIENT_ERRORS
+    return isinstance(e, (ValueError, TypeError, FileNotFoundError, PermissionError))
+
+class Outbox:
+    """Cola de envíos persistente y trabajadores asyncio que la vacían
+
+    ``workers`` tareas reclaman envíos de la cola, los mandan con
+    MessageClient (pasando por el limitador de ritmo) y los confirman. Los
+    fallos transitorios se reintentan con espera exponencial hasta
+    ``max_attempts``; los permanentes y los que agotan los intentos pasan a
+    la cola de muertos. Un rechazo del limitador de ritmo devuelve el envío
+    a la cola sin contar el intento. Con ``queued_mode`` las herramientas
+    ``send_*`` encolan en lugar de enviar.
+    """
+
+    def __init__(
+        self,
+        queue: OutboundQueue,
+        client: Any = None,
+        workers: int = 4,
+        visibility_timeout: float = 120.0,
+        max_attempts: int = 5,
+        retry_delay: float = 2.0,
+        poll_interval: float = 1.0,
+        retention: float = 7 * 86400.0,
+        queued_mode: bool = False
+    ):
+        self.queue = queue
+        self._client = client
+        self.workers = max(1, workers)
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.queued_mode = queued_mode
+        self.delivered = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_purge = 0.0
+
+    @classmethod
+    def from_env(cls, path: str) -> "Outbox":
+        """Construir desde variables de entorno"""
+        return cls(
+            OutboundQueue(path, weights=send_scheduler.weights),
+            workers=int(os.getenv("EVOLUTION_SEND_QUEUE_WORKERS", "4")),
+            visibility_timeout=float(os.getenv("EVOLUTION_SEND_QUEUE_VISIBILITY", "120")),
+            max_attempts=int(os.getenv("EVOLUTION_SEND_QUEUE_MAX_ATTEMPTS", "5")),
+            retention=float(os.getenv("EVOLUTION_SEND_QUEUE_RETENTION", str(7 * 86400))),
+            queued_mode=os.getenv("EVOLUTION_SEND_QUEUE_MODE", "false").lower() in ("1", "true", "yes")
+        )
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            from ..base_routes import client_registry
+            from ..message.client import MessageClient
+            self._client = client_registry.get(MessageClient)
+        return self._client
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    def start(self) -> None:
+        """Arrancar los trabajadores (si no lo estaban ya) en el bucle de eventos actual"""
+        if self.running:
+            return
+        loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        # Contexto vacío: los trabajadores no heredan el plazo de la herramienta que los arrancó
+        self._tasks = [
+            loop.create_task(self._work(), context=contextvars.Context())
+            for _ in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """Parar los trabajadores; los envíos a medias vuelven a la cola al vencer su plazo"""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def notify(self) -> None:
+        """Despertar a los trabajadores ociosos"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def enqueue(
+        self,
+        instance_name: str,
+        operation: str,
+        params: Dict[str, Any],
+        delay: float = 0.0
+    ) -> Dict[str, Any]:
+        """Encolar un envío y despertar a los trabajadores"""
+        check_operation(operation, params)
+        queue_id = await asyncio.to_thread(self.queue.enqueue, instance_name, operation, params, delay)
+        self.start()
+        self.notify()
+        return {"queued": True, "queue_id": queue_id, "status": "pending"}
+
+    async def enqueue_many(self, items: List[QueueItem], delay: float = 0.0) -> List[int]:
+        """Encolar varios envíos en una sola transacción"""
+        for _, operation, params in items:
+            check_operation(operation, params)
+        ids = await asyncio.to_thread(self.queue.enqueue_many, items, delay)
+        self.start()
+        self.notify()
+        return ids
+
+    async def _work(self) -> None:
+        while True:
+            # Se limpia antes de reclamar para no perder un aviso que llegue mientras tanto
+            self._wakeup.clear()
+            try:
+                items = await asyncio.to_thread(self.queue.claim, 1, self.visibility_timeout, self.max_attempts)
+                if items:
+                    await self._deliver(items[0])
+                    continue
+                if time.monotonic() - self._last_purge > 3600:
+                    self._last_purge = time.monotonic()
+                    await asyncio.to_thread(self.queue.purge, self.retention)
+            except Exception as e:
+                logger.error(f"Send queue worker error: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _deliver(self, item: Dict[str, Any]) -> None:
+        item_id, attempts = item["id"], item["attempts"]
+        try:
+            result = await dispatch(self.client, item["instance"], item["operation"], item["params"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._failed(item_id, attempts, e)
+            return
+        self.delivered += 1
+        await asyncio.to_thread(self.queue.complete, item_id, sent_message_id(result))
+
+    async def _failed(self, item_id: int, attempts: int, e: Exception) -> None:
+        error = str(e) or e.__class__.__name__
+        if isinstance(e, EvolutionAPIError) and e.status_code == 429 and not e.request_sent:
+            # Limitador de ritmo local: no es un fallo del envío
+            await asyncio.to_thread(self.queue.release, item_id, e.retry_after or 1.0)
+            return
+        if is_permanent(e) or attempts >= self.max_attempts:
+            logger.warning(f"Queued send {item_id} dead-lettered after {attempts} attempt(s): {error}")
+            self.dead_lettered += 1
+            await asyncio.to_thread(self.queue.dead_letter, item_id, error)
+            return
+        retry_after = e.retry_after if isinstance(e, EvolutionAPIError) and e.retry_after else 0.0
+        delay = max(retry_after, self.retry_delay * 2 ** (attempts - 1) * random.uniform(0.5, 1.0))
+        self.retried += 1
+        await asyncio.to_thread(self.queue.retry, item_id, error, min(delay, 300.0))
+
+    async def status(self) -> Dict[str, Any]:
+        """Profundidad de la cola y contadores de los trabajadores"""
+        depth = await asyncio.to_thread(self.queue.depth)
+        return {
+            **depth,
+            "queued_mode": self.queued_mode,
+            "workers": self.workers,
+            "running": self.running,
+            "delivered": self.delivered,
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered
+        }
+
+_outbox: Optional[Outbox] = None
+
+def get_outbox() -> Optional[Outbox]:
+    """Cola de envíos compartida en EVOLUTION_SEND_QUEUE_PATH, o None si no está configurada"""
+    global _outbox
+    path = os.getenv("EVOLUTION_SEND_QUEUE_PATH")
+    if not path:
+        return None
+    if _outbox is None or _outbox.queue.path != path:
+        _outbox = Outbox.from_env(path)
+    return _outbox
@@ -0,0 +1,169 @@
+import os
+import json
+import base64
+import asyncio
+import hashlib
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, List, Optional, Tuple
+
+# Una página: (elementos, total de páginas si la API lo indica)
+Page = Tuple[List[Any], Optional[int]]
+
+def get_default_prefetch() -> int:
+    """Páginas a precargar por defecto (EVOLUTION_API_PAGE_PREFETCH)"""
+    return int(os.getenv("EVOLUTION_API_PAGE_PREFETCH", "1"))
+
+def query_fingerprint(query: Any) -> str:
+    """Huella corta de un filtro, para rechazar cursores de otra consulta"""
+    raw = json.dumps(query, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()[:12]
+
+def encode_cursor(page: int, index: int, page_size: int, fingerprint: str) -> str:
+    """Cursor opaco con la posición del siguiente elemento"""
+    data = json.dumps({"p": page, "i": index, "s": page_size, "q": fingerprint}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, fingerprint: str) -> Tuple[int, int, int]:
+    """Obtener (página, índice, tamaño de página) de un cursor de esta consulta"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        page, index, page_size = int(data["p"]), int(data["i"]), int(data["s"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if data.get("q") != fingerprint:
+        raise ValueError("Cursor does not belong to this query")
+    return page, index, page_size
+
+class PageIterator:
+    """Iterador asíncrono sobre todos los elementos de un listado paginado
+
+    Mientras se consume la página N se piden en segundo plano las
+    ``prefetch`` siguientes (0 desactiva la precarga). Se detiene al llegar
+    a la última página o a una página vacía. ``cursor`` indica en todo
+    momento la posición del siguiente elemento, para retomar el recorrido
+    más tarde; al terminar antes de tiempo conviene llamar a ``aclose()``
+    (o usar ``async with``) para cancelar las páginas precargadas.
+    """
+
+    def __init__(
+        self,
+        fetch_page: Callable[[int], Awaitable[Page]],
+        page_size: int,
+        prefetch: int = 1,
+        start_page: int = 1,
+        start_index: int = 0,
+        fingerprint: str = ""
+    ):
+        self.fetch_page = fetch_page
+        self.page_size = page_size
+        self.prefetch = max(0, prefetch)
+        self.fingerprint = fingerprint
+        self.pages_fetched = 0
+        self._page = start_page
+        self._index = start_index
+        self._items: List[Any] = []
+        self._loaded = False
+        self._total_pages: Optional[int] = None
+        self._exhausted = False
+        self._pending: Deque[Tuple[int, asyncio.Task]] = deque()
+
+    @property
+    def cursor(self) -> Optional[str]:
+        """Cursor del siguiente elemento, o None si el recorrido terminó"""
+        if self._exhausted:
+            return None
+        page, index = self._page, self._index
+        if self._loaded and index >= len(self._items):
+            # Página consumida entera: el cursor apunta al inicio de la siguiente
+            page, index = page + 1, 0
+        return encode_cursor(page, index, self.page_size, self.fingerprint)
+
+    def __aiter__(self) -> "PageIterator":
+        return self
+
+    async def __aenter__(self) -> "PageIterator":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def __anext__(self) -> Any:
+        while not self._exhausted:
+            if not self._loaded:
+                await self._load_page()
+                continue
+            if self._index < len(self._items):
+                item = self._items[self._index]
+                self._index += 1
+                return item
+            if len(self._items) < self.page_size or self._is_last_page(self._page):
+                self._finish()
+                break
+            self._page += 1
+            self._index = 0
+            self._loaded = False
+        raise StopAsyncIteration
+
+    def _is_last_page(self, page: int) -> bool:
+        return self._total_pages is not None and page >= self._total_pages
+
+    async def _load_page(self) -> None:
+        if self._pending and self._pending[0][0] == self._page:
+            _, task = self._pending.popleft()
+        else:
+            self._cancel_pending()
+            task = asyncio.ensure_future(self.fetch_page(self._page))
+        try:
+            items, total_pages = await task
+        except BaseException:
+            self._cancel_pending()
+            raise
+        self.pages_fetched += 1
+        if total_pages is not None:
+            self._total_pages = total_pages
+        self._items = items
+        self._loaded = True
+        if not items:
+            self._finish()
+            return
+        self._schedule_prefetch()
+
+    def _schedule_prefetch(self) -> None:
+        if len(self._items) < self.page_size:
+            return
+        next_page = self._pending[-1][0] + 1 if self._pending else self._page + 1
+        while len(self._pending) < self.prefetch and not self._is_last_page(next_page - 1):
+            self._pending.append((next_page, asyncio.ensure_future(self.fetch_page(next_page))))
+            next_page += 1
+
+    def _finish(self) -> None:
+        self._exhausted = True
+        self._items = []
+        self._cancel_pending()
+
+    def _cancel_pending(self) -> None:
+        while self._pending:
+            _, task = self._pending.popleft()
+            task.cancel()
+
+    async def aclose(self) -> None:
+        """Cancelar las páginas precargadas que ya no se van a consumir"""
+        tasks = [task for _, task in self._pending]
+        self._cancel_pending()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def take(self, limit: int) -> List[Any]:
+        """Consumir hasta ``limit`` elementos dejando el cursor tras el último"""
+        items = []
+        while len(items) < limit:
+            try:
+                items.append(await self.__anext__())
+            except StopAsyncIteration:
+                break
+        # Si la página actual era la última no se devuelve un cursor a una página vacía
+        if self._loaded and self._index >= len(self._items):
+            if len(self._items) < self.page_size or self._is_last_page(self._page):
+                self._finish()
+        return items
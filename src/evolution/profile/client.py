@@ -5,11 +5,14 @@ class ProfileClient(EvolutionAPIClient):
     async def fetch_business_profile(
         self,
         instance_name: str,
-        number: str
+        number: str,
+        bypass_cache: bool = False
     ) -> Dict[str, Any]:
         """Fetch business profile"""
         data = {"number": number}
-        return await self.post(f"chat/fetchBusinessProfile/{instance_name}", json=data)
+        return await self.post(
+            f"chat/fetchBusinessProfile/{instance_name}", json=data, idempotent=True, bypass_cache=bypass_cache
+        )
 
     async def fetch_profile(
         self,
@@ -18,7 +21,7 @@ class ProfileClient(EvolutionAPIClient):
     ) -> Dict[str, Any]:
         """Fetch profile"""
         data = {"number": number}
-        return await self.post(f"chat/fetchProfile/{instance_name}", json=data)
+        return await self.post(f"chat/fetchProfile/{instance_name}", json=data, idempotent=True)
 
     async def update_profile_name(
         self,
@@ -27,7 +30,10 @@ class ProfileClient(EvolutionAPIClient):
     ) -> Dict[str, Any]:
         """Update profile name"""
         data = {"name": name}
-        return await self.post(f"chat/updateProfileName/{instance_name}", json=data)
+        try:
+            return await self.post(f"chat/updateProfileName/{instance_name}", json=data)
+        finally:
+            self.invalidate_cache(f"chat/fetchBusinessProfile/{instance_name}")
 
     async def update_profile_status(
         self,
@@ -36,7 +42,10 @@ class ProfileClient(EvolutionAPIClient):
     ) -> Dict[str, Any]:
         """Update profile status"""
         data = {"status": status}
-        return await self.post(f"chat/updateProfileStatus/{instance_name}", json=data)
+        try:
+            return await self.post(f"chat/updateProfileStatus/{instance_name}", json=data)
+        finally:
+            self.invalidate_cache(f"chat/fetchBusinessProfile/{instance_name}")
 
     async def update_profile_picture(
         self,
@@ -45,21 +54,28 @@ class ProfileClient(EvolutionAPIClient):
     ) -> Dict[str, Any]:
         """Update profile picture"""
         data = {"picture": picture}
-        return await self.post(f"chat/updateProfilePicture/{instance_name}", json=data)
+        try:
+            return await self.post(f"chat/updateProfilePicture/{instance_name}", json=data)
+        finally:
+            self.invalidate_cache(f"chat/fetchBusinessProfile/{instance_name}")
 
     async def remove_profile_picture(
         self,
         instance_name: str
     ) -> Dict[str, Any]:
         """Remove profile picture"""
-        return await self.delete(f"chat/removeProfilePicture/{instance_name}")
+        try:
+            return await self.delete(f"chat/removeProfilePicture/{instance_name}")
+        finally:
+            self.invalidate_cache(f"chat/fetchBusinessProfile/{instance_name}")
 
     async def fetch_privacy_settings(
         self,
-        instance_name: str
+        instance_name: str,
+        bypass_cache: bool = False
     ) -> Dict[str, Any]:
         """Fetch privacy settings"""
-        return await self.get(f"chat/fetchPrivacySettings/{instance_name}")
+        return await self.get(f"chat/fetchPrivacySettings/{instance_name}", bypass_cache=bypass_cache)
 
     async def update_privacy_settings(
         self,
@@ -80,4 +96,7 @@ class ProfileClient(EvolutionAPIClient):
             "last": last,
             "groupadd": groupadd
         }
-        return await self.post(f"chat/updatePrivacySettings/{instance_name}", json=data) 
\ No newline at end of file
+        try:
+            return await self.post(f"chat/updatePrivacySettings/{instance_name}", json=data)
+        finally:
+            self.invalidate_cache(f"chat/fetchPrivacySettings/{instance_name}") 
\ No newline at end of file
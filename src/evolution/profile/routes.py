@@ -4,6 +4,8 @@ from ..base_routes import BaseRoutes
 from .client import ProfileClient
 
 class ProfileRoutes(BaseRoutes):
+    client_class = ProfileClient
+
     def register_tools(self, mcp):
         @mcp.tool(
             description="Obtener perfil de negocio",
@@ -11,14 +13,15 @@ class ProfileRoutes(BaseRoutes):
         )
         async def fetch_business_profile(
             instance_name: str,
-            number: str
+            number: str,
+            bypass_cache: bool = False
         ) -> Dict[str, Any]:
             """Obtener perfil de negocio"""
             try:
-                self.client = ProfileClient()
                 result = await self.client.fetch_business_profile(
                     instance_name=instance_name,
-                    number=number
+                    number=number,
+                    bypass_cache=bypass_cache
                 )
                 return {
                     "success": True,
@@ -37,7 +40,6 @@ class ProfileRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Obtener perfil"""
             try:
-                self.client = ProfileClient()
                 result = await self.client.fetch_profile(
                     instance_name=instance_name,
                     number=number
@@ -59,7 +61,6 @@ class ProfileRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Actualizar nombre de perfil"""
             try:
-                self.client = ProfileClient()
                 result = await self.client.update_profile_name(
                     instance_name=instance_name,
                     name=name
@@ -81,7 +82,6 @@ class ProfileRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Actualizar estado de perfil"""
             try:
-                self.client = ProfileClient()
                 result = await self.client.update_profile_status(
                     instance_name=instance_name,
                     status=status
@@ -103,7 +103,6 @@ class ProfileRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Actualizar foto de perfil"""
             try:
-                self.client = ProfileClient()
                 result = await self.client.update_profile_picture(
                     instance_name=instance_name,
                     picture=picture
@@ -124,7 +123,6 @@ class ProfileRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Eliminar foto de perfil"""
             try:
-                self.client = ProfileClient()
                 result = await self.client.remove_profile_picture(instance_name)
                 return {
                     "success": True,
@@ -138,12 +136,12 @@ class ProfileRoutes(BaseRoutes):
             tags={"privacy"}
         )
         async def fetch_privacy_settings(
-            instance_name: str
+            instance_name: str,
+            bypass_cache: bool = False
         ) -> Dict[str, Any]:
             """Obtener configuración de privacidad"""
             try:
-                self.client = ProfileClient()
-                result = await self.client.fetch_privacy_settings(instance_name)
+                result = await self.client.fetch_privacy_settings(instance_name, bypass_cache=bypass_cache)
                 return {
                     "success": True,
                     "result": result
@@ -166,7 +164,6 @@ class ProfileRoutes(BaseRoutes):
         ) -> Dict[str, Any]:
             """Actualizar configuración de privacidad"""
             try:
-                self.client = ProfileClient()
                 result = await self.client.update_privacy_settings(
                     instance_name=instance_name,
                     readreceipts=readreceipts,
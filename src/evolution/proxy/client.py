@@ -26,10 +26,13 @@ class ProxyClient(EvolutionAPIClient):
         if password:
             data["password"] = password
 
-        return await self.post(f"/proxy/set/{instance_name}", json=data)
+        try:
+            return await self.post(f"/proxy/set/{instance_name}", json=data)
+        finally:
+            self.invalidate_cache(f"proxy/find/{instance_name}")
 
-    async def find_proxy(self, instance_name: str) -> Dict[str, Any]:
+    async def find_proxy(self, instance_name: str, bypass_cache: bool = False) -> Dict[str, Any]:
         """
         Obtiene la configuración actual del proxy
         """
-        return await self.get(f"/proxy/find/{instance_name}") 
\ No newline at end of file
+        return await self.get(f"/proxy/find/{instance_name}", bypass_cache=bypass_cache) 
\ No newline at end of file
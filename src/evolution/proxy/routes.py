@@ -2,6 +2,7 @@ from typing import Dict, Any, Optional
 from fastapi import FastAPI
 from pydantic import BaseModel, Field, validator
 from ..base_routes import BaseRoutes
+from .client import ProxyClient
 
 class ProxyConfig(BaseModel):
     enabled: bool = Field(default=False, description="Si el proxy está habilitado")
@@ -22,6 +23,8 @@ class ProxyConfig(BaseModel):
         return v
 
 class ProxyRoutes(BaseRoutes):
+    client_class = ProxyClient
+
     def register_tools(self, mcp: FastAPI):
         @mcp.tool(
             description="Configurar proxy para una instancia",
@@ -34,7 +37,7 @@ class ProxyRoutes(BaseRoutes):
             """
             Configura el proxy para una instancia específica
             """
-            return await self.proxy_client.set_proxy(
+            return await self.client.set_proxy(
                 instance_name=instance_name,
                 enabled=config.enabled,
                 host=config.host,
@@ -49,9 +52,10 @@ class ProxyRoutes(BaseRoutes):
             tags={"proxy", "info"}
         )
         async def find_proxy(
-            instance_name: str
+            instance_name: str,
+            bypass_cache: bool = False
         ) -> Dict[str, Any]:
             """
             Obtiene la configuración actual del proxy para una instancia
             """
-            return await self.proxy_client.find_proxy(instance_name) 
\ No newline at end of file
+            return await self.client.find_proxy(instance_name, bypass_cache=bypass_cache) 
\ No newline at end of file
@@ -0,0 +1,178 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from .timeouts import remaining_time
+
+class RateLimitExceeded(Exception):
+    """No hay token disponible dentro de la espera permitida"""
+
+    def __init__(self, key: str, retry_after: float):
+        super().__init__(f"Send rate limit exceeded for '{key}', retry after {retry_after:.2f}s")
+        self.key = key
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Token bucket con reserva: los tokens pueden quedar en negativo mientras
+    quien reservó espera, lo que mantiene el orden de llegada sin bucles de
+    sondeo."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def delay(self, now: float) -> float:
+        """Segundos hasta que haya un token disponible (0 si lo hay ya)"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        """Consumir (o reservar) un token"""
+        self.tokens -= 1
+
+class SendRateLimiter:
+    """Control de ritmo de envíos por instancia y, opcionalmente, por destinatario
+
+    ``rate`` se expresa en mensajes por segundo y ``burst`` en mensajes que
+    pueden enviarse seguidos. Un ``rate`` de 0 desactiva el nivel
+    correspondiente.
+    """
+
+    def __init__(
+        self,
+        rate: float = 2.0,
+        burst: float = 10.0,
+        recipient_rate: float = 0.0,
+        recipient_burst: float = 3.0,
+        max_wait: float = 30.0,
+        max_recipients: int = 10000,
+        overrides: Optional[Dict[str, Tuple[float, float]]] = None
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.recipient_rate = recipient_rate
+        self.recipient_burst = recipient_burst
+        self.max_wait = max_wait
+        self.max_recipients = max_recipients
+        self.overrides = dict(overrides or {})
+        self.waited = 0
+        self.rejected = 0
+        self._instances: Dict[str, Optional[TokenBucket]] = {}
+        self._recipients: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> "SendRateLimiter":
+        """Construir el limitador desde variables de entorno
+
+        ``EVOLUTION_SEND_RATE_OVERRIDES`` admite ``instancia=rate/burst``
+        separados por comas, p. ej. ``ventas=5/20,soporte=1/5``.
+        """
+        overrides = {}
+        for item in filter(None, (part.strip() for part in os.getenv("EVOLUTION_SEND_RATE_OVERRIDES", "").split(","))):
+            name, _, spec = item.partition("=")
+            rate, _, burst = spec.partition("/")
+            overrides[name.strip()] = (float(rate), float(burst or rate))
+        return cls(
+            rate=float(os.getenv("EVOLUTION_SEND_RATE", "2")),
+            burst=float(os.getenv("EVOLUTION_SEND_BURST", "10")),
+            recipient_rate=float(os.getenv("EVOLUTION_SEND_RECIPIENT_RATE", "0")),
+            recipient_burst=float(os.getenv("EVOLUTION_SEND_RECIPIENT_BURST", "3")),
+            max_wait=float(os.getenv("EVOLUTION_SEND_RATE_MAX_WAIT", "30")),
+            overrides=overrides
+        )
+
+    def _instance_bucket(self, instance_name: str) -> Optional[TokenBucket]:
+        try:
+            return self._instances[instance_name]
+        except KeyError:
+            rate, burst = self.overrides.get(instance_name, (self.rate, self.burst))
+            bucket = TokenBucket(rate, burst) if rate > 0 else None
+            self._instances[instance_name] = bucket
+            return bucket
+
+    def _recipient_bucket(self, instance_name: str, recipient: str) -> TokenBucket:
+        key = (instance_name, recipient)
+        bucket = self._recipients.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.recipient_rate, self.recipient_burst)
+            self._recipients[key] = bucket
+            if len(self._recipients) > self.max_recipients:
+                self._recipients.popitem(last=False)
+        else:
+            self._recipients.move_to_end(key)
+        return bucket
+
+    def instance_delay(self, instance_name: str) -> float:
+        """Segundos hasta que la instancia tenga token (0 si lo tiene o no tiene límite)"""
+        bucket = self._instance_bucket(instance_name)
+        return bucket.delay(time.monotonic()) if bucket is not None else 0.0
+
+    def take_instance(self, instance_name: str) -> None:
+        """Consumir el token de la instancia (lo usa el planificador de envíos al despachar)"""
+        bucket = self._instance_bucket(instance_name)
+        if bucket is not None:
+            bucket.take()
+
+    async def acquire(
+        self,
+        instance_name: str,
+        recipient: Optional[str] = None,
+        max_wait: Optional[float] = None,
+        include_instance: bool = True
+    ) -> None:
+        """Obtener un token de envío, esperando como máximo ``max_wait`` segundos
+
+        Con ``max_wait=0`` falla de inmediato. Si la espera necesaria supera el
+        máximo (o el plazo de la herramienta) lanza ``RateLimitExceeded`` con el
+        tiempo tras el que conviene reintentar, sin consumir tokens.
+        """
+        buckets: List[TokenBucket] = []
+        bucket = self._instance_bucket(instance_name) if include_instance else None
+        if bucket is not None:
+            buckets.append(bucket)
+        if self.recipient_rate > 0 and recipient:
+            buckets.append(self._recipient_bucket(instance_name, recipient))
+        if not buckets:
+            return
+
+        now = time.monotonic()
+        delay = max(b.delay(now) for b in buckets)
+        if delay > 0:
+            limit = self.max_wait if max_wait is None else max_wait
+            remaining = remaining_time()
+            if remaining is not None:
+                limit = min(limit, remaining)
+            if delay > limit:
+                self.rejected += 1
+                raise RateLimitExceeded(instance_name if recipient is None else f"{instance_name}/{recipient}", delay)
+        for b in buckets:
+            b.take()
+        if delay > 0:
+            self.waited += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores y tokens disponibles por instancia"""
+        now = time.monotonic()
+        instances = {}
+        for name, bucket in self._instances.items():
+            if bucket is not None:
+                bucket.delay(now)
+                instances[name] = {"rate": bucket.rate, "burst": bucket.capacity, "tokens": round(bucket.tokens, 2)}
+        return {
+            "waited": self.waited,
+            "rejected": self.rejected,
+            "tracked_recipients": len(self._recipients),
+            "instances": instances
+        }
+
+# Limitador global de envíos compartido por todos los MessageClient
+send_rate_limiter = SendRateLimiter.from_env()
@@ -0,0 +1,95 @@
+import os
+import time
+import random
+from typing import Any, Dict, Optional
+
+# Códigos de estado transitorios que vale la pena reintentar
+RETRIABLE_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+class RetryPolicy:
+    """Reintentos con backoff exponencial y jitter completo"""
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.1, max_delay: float = 2.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        """Construir la política desde variables de entorno"""
+        return cls(
+            max_retries=int(os.getenv("EVOLUTION_API_MAX_RETRIES", "3")),
+            base_delay=float(os.getenv("EVOLUTION_API_RETRY_BASE_DELAY", "0.1")),
+            max_delay=float(os.getenv("EVOLUTION_API_RETRY_MAX_DELAY", "2.0"))
+        )
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Espera antes del reintento ``attempt`` (0 = primer reintento)
+
+        Usa "full jitter": un valor aleatorio entre 0 y el backoff exponencial,
+        respetando como mínimo el Retry-After indicado por el servidor.
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+class RetryBudget:
+    """Presupuesto de reintentos compartido por todo el proceso
+
+    Cada petición original aporta ``ratio`` tokens y cada reintento consume
+    uno, de modo que los reintentos nunca superan ~``ratio`` del tráfico y no
+    amplifican una caída del upstream. ``min_per_second`` garantiza un mínimo
+    de reintentos cuando el tráfico es bajo.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1.0, max_tokens: float = 20.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.requests = 0
+        self.retries = 0
+        self.rejected = 0
+        self._updated_at = time.monotonic()
+
+    @classmethod
+    def from_env(cls) -> "RetryBudget":
+        """Construir el presupuesto desde variables de entorno"""
+        return cls(
+            ratio=float(os.getenv("EVOLUTION_API_RETRY_BUDGET_RATIO", "0.2")),
+            min_per_second=float(os.getenv("EVOLUTION_API_RETRY_MIN_PER_SECOND", "1"))
+        )
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self._updated_at) * self.min_per_second)
+        self._updated_at = now
+
+    def record_request(self) -> None:
+        """Registrar una petición original"""
+        self.requests += 1
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Consumir un token para reintentar; False si el presupuesto está agotado"""
+        self._refill()
+        if self.tokens < 1:
+            self.rejected += 1
+            return False
+        self.tokens -= 1
+        self.retries += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores del presupuesto de reintentos"""
+        self._refill()
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "rejected_by_budget": self.rejected,
+            "available_tokens": round(self.tokens, 2)
+        }
+
+# Presupuesto global compartido por todos los clientes de dominio
+retry_budget = RetryBudget.from_env()
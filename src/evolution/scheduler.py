@@ -0,0 +1,248 @@
+import os
+import time
+import asyncio
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+from .rate_limit import RateLimitExceeded, SendRateLimiter
+from .timeouts import remaining_time
+
+HIGH = "high"
+NORMAL = "normal"
+BULK = "bulk"
+DEFAULT_WEIGHTS = {HIGH: 16.0, NORMAL: 4.0, BULK: 1.0}
+# Esperas recientes por clase para los percentiles de la métrica
+WAIT_SAMPLES = 1024
+
+_priority: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("evolution_send_priority", default=None)
+
+def current_priority() -> str:
+    """Clase de prioridad de los envíos del contexto actual"""
+    return _priority.get() or NORMAL
+
+@contextmanager
+def send_priority(priority: Optional[str]) -> Iterator[None]:
+    """Fijar la clase de prioridad de los envíos hechos dentro del contexto (None no la cambia)"""
+    if priority is None:
+        yield
+        return
+    send_scheduler.check_priority(priority)
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+class _Waiter:
+    __slots__ = ("future", "limiter", "start_tag", "finish_tag", "arrived_at")
+
+    def __init__(self, future: asyncio.Future, limiter: SendRateLimiter, start_tag: float, finish_tag: float):
+        self.future = future
+        self.limiter = limiter
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.arrived_at = time.monotonic()
+
+class _ClassStats:
+    __slots__ = ("sent", "rejected", "total_wait", "max_wait", "samples")
+
+    def __init__(self):
+        self.sent = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.samples: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+
+    def record(self, wait: float) -> None:
+        self.sent += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.samples.append(wait)
+
+    def to_dict(self, waiting: int) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+
+        def percentile(p: float) -> Optional[float]:
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 1) if ordered else None
+
+        return {
+            "waiting": waiting,
+            "sent": self.sent,
+            "rejected": self.rejected,
+            "wait_mean_ms": round(self.total_wait / self.sent * 1000, 1) if self.sent else None,
+            "wait_p50_ms": percentile(0.5),
+            "wait_p95_ms": percentile(0.95),
+            "wait_max_ms": round(self.max_wait * 1000, 1)
+        }
+
+class SendScheduler:
+    """Planificador de envíos con clases de prioridad y reparto justo ponderado
+
+    Cada envío pertenece a un flujo (instancia, clase). Los flujos se
+    atienden por start-time fair queuing: al llegar, un envío recibe la
+    etiqueta ``max(V, F_flujo) + 1 / peso`` y se despacha primero el de
+    etiqueta menor entre los flujos cuya instancia tiene token en el
+    limitador de ritmo. Así la clase ``high`` adelanta a la ``bulk`` de su
+    instancia (con pesos 16:1 sale casi siempre la siguiente) sin dejarla
+    sin servicio, y ninguna instancia acapara las ``max_in_flight`` plazas
+    de envío simultáneo. El token de la instancia se consume al despachar.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, max_in_flight: int = 16):
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._virtual_time = 0.0
+        self._finish: Dict[Tuple[str, str], float] = {}
+        self._flows: Dict[Tuple[str, str], Deque[_Waiter]] = {}
+        self._stats: Dict[str, _ClassStats] = {name: _ClassStats() for name in self.weights}
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @classmethod
+    def from_env(cls) -> "SendScheduler":
+        """Construir desde variables de entorno
+
+        ``EVOLUTION_SEND_PRIORITY_WEIGHTS`` admite ``clase=peso`` separados
+        por comas, p. ej. ``high=16,normal=4,bulk=1``.
+        """
+        weights = dict(DEFAULT_WEIGHTS)
+        for item in filter(None, (part.strip() for part in os.getenv("EVOLUTION_SEND_PRIORITY_WEIGHTS", "").split(","))):
+            name, _, weight = item.partition("=")
+            weights[name.strip()] = float(weight)
+        return cls(weights=weights, max_in_flight=int(os.getenv("EVOLUTION_SEND_MAX_IN_FLIGHT", "16")))
+
+    def check_priority(self, priority: str) -> None:
+        if priority not in self.weights:
+            raise ValueError(f"Unknown send priority '{priority}'; expected one of {', '.join(self.weights)}")
+
+    def _has_capacity(self) -> bool:
+        return self.max_in_flight <= 0 or self.in_flight < self.max_in_flight
+
+    def _tag(self, flow: Tuple[str, str]) -> Tuple[float, float]:
+        start = max(self._virtual_time, self._finish.get(flow, 0.0))
+        finish = start + 1.0 / self.weights[flow[1]]
+        self._finish[flow] = finish
+        return start, finish
+
+    async def acquire(self, instance_name: str, priority: str, limiter: SendRateLimiter) -> None:
+        """Esperar turno (y token de la instancia) para un envío de clase ``priority``
+
+        Espera como máximo el ``max_wait`` del limitador (o el plazo de la
+        herramienta); si no le llega el turno lanza ``RateLimitExceeded``.
+        """
+        self.check_priority(priority)
+        flow = (instance_name, priority)
+        if not self._flows and self._has_capacity() and limiter.instance_delay(instance_name) <= 0:
+            # Nadie esperando: se despacha sin encolar
+            self._virtual_time, _ = self._tag(flow)
+            self._grant(instance_name, priority, limiter, 0.0)
+            return
+
+        start, finish = self._tag(flow)
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), limiter, start, finish)
+        self._flows.setdefault(flow, deque()).append(waiter)
+        self._dispatch()
+        if waiter.future.done():
+            return
+
+        wait = limiter.max_wait
+        remaining = remaining_time()
+        if remaining is not None:
+            wait = min(wait, remaining)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), max(0.0, wait))
+        except BaseException as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # El turno llegó justo al vencer la espera: se devuelve la plaza
+                self.release()
+            else:
+                waiter.future.cancel()
+                self._remove(flow, waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self._stats[priority].rejected += 1
+                ahead = len(self._flows.get(flow, ()))
+                retry_after = limiter.instance_delay(instance_name) + (ahead / limiter.rate if limiter.rate > 0 else 0.0)
+                raise RateLimitExceeded(instance_name, max(retry_after, 0.01))
+            raise
+
+    def _remove(self, flow: Tuple[str, str], waiter: _Waiter) -> None:
+        queue = self._flows.get(flow)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self._flows[flow]
+        self._dispatch()
+
+    def _grant(self, instance_name: str, priority: str, limiter: SendRateLimiter, wait: float) -> None:
+        limiter.take_instance(instance_name)
+        self.in_flight += 1
+        self._stats[priority].record(wait)
+
+    def release(self) -> None:
+        """Liberar la plaza de un envío terminado"""
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Despachar, por orden de etiqueta, los envíos cuya instancia tiene token"""
+        next_check: Optional[float] = None
+        while self._flows and self._has_capacity():
+            best: Optional[Tuple[str, str]] = None
+            delays: Dict[int, Dict[str, float]] = {}
+            for flow, queue in self._flows.items():
+                head = queue[0]
+                by_limiter = delays.setdefault(id(head.limiter), {})
+                if flow[0] not in by_limiter:
+                    by_limiter[flow[0]] = head.limiter.instance_delay(flow[0])
+                delay = by_limiter[flow[0]]
+                if delay > 0:
+                    next_check = delay if next_check is None else min(next_check, delay)
+                    continue
+                if best is None or head.finish_tag < self._flows[best][0].finish_tag:
+                    best = flow
+            if best is None:
+                break
+            queue = self._flows[best]
+            waiter = queue.popleft()
+            if not queue:
+                del self._flows[best]
+            if waiter.future.done():
+                continue
+            self._virtual_time = waiter.start_tag
+            self._grant(best[0], best[1], waiter.limiter, time.monotonic() - waiter.arrived_at)
+            waiter.future.set_result(None)
+            next_check = None
+        if next_check is not None and self._flows:
+            self._schedule(next_check)
+
+    def _schedule(self, delay: float) -> None:
+        loop = asyncio.get_running_loop()
+        when = loop.time() + delay
+        if self._timer is not None and not self._timer.cancelled() and self._timer.when() <= when:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = loop.call_at(when, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        """Envíos en curso, pesos y espera en cola por clase de prioridad"""
+        waiting: Dict[str, int] = dict.fromkeys(self.weights, 0)
+        instances: Dict[str, int] = {}
+        for (instance, priority), queue in self._flows.items():
+            waiting[priority] += len(queue)
+            instances[instance] = instances.get(instance, 0) + len(queue)
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "weights": self.weights,
+            "classes": {name: stats.to_dict(waiting[name]) for name, stats in self._stats.items()},
+            "waiting_by_instance": instances
+        }
+
+# Planificador global compartido por todos los MessageClient
+send_scheduler = SendScheduler.from_env()
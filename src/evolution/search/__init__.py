@@ -0,0 +1,7 @@
+"""
+Módulo de búsqueda local de mensajes (índice SQLite FTS5).
+"""
+
+from .routes import SearchRoutes
+
+__all__ = ["SearchRoutes"]
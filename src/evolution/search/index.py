@@ -0,0 +1,446 @@
+import os
+import re
+import time
+import sqlite3
+import asyncio
+import threading
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    rowid INTEGER PRIMARY KEY,
+    instance TEXT NOT NULL,
+    message_id TEXT NOT NULL,
+    remote_jid TEXT NOT NULL,
+    sender TEXT,
+    push_name TEXT,
+    from_me INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    message_type TEXT,
+    text TEXT,
+    UNIQUE (instance, message_id)
+);
+CREATE INDEX IF NOT EXISTS idx_messages_chat ON messages (instance, remote_jid, timestamp);
+CREATE INDEX IF NOT EXISTS idx_messages_time ON messages (instance, timestamp);
+CREATE INDEX IF NOT EXISTS idx_messages_sender ON messages (instance, sender, timestamp);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5 (
+    text, push_name, content='messages', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    instance TEXT NOT NULL,
+    remote_jid TEXT NOT NULL,
+    high_water INTEGER NOT NULL DEFAULT 0,
+    pending_high INTEGER,
+    resume_cursor TEXT,
+    synced_at INTEGER,
+    PRIMARY KEY (instance, remote_jid)
+);
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, text, push_name) VALUES (new.rowid, new.text, new.push_name);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, text, push_name) VALUES ('delete', old.rowid, old.text, old.push_name);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_au AFTER UPDATE OF text, push_name ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, text, push_name) VALUES ('delete', old.rowid, old.text, old.push_name);
+    INSERT INTO messages_fts (rowid, text, push_name) VALUES (new.rowid, new.text, new.push_name);
+END;
+"""
+
+# Un mensaje reeditado solo reescribe el índice si cambió el texto o el nombre
+UPSERT = """
+INSERT INTO messages (rowid, instance, message_id, remote_jid, sender, push_name, from_me, timestamp, message_type, text)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (instance, message_id) DO UPDATE SET text = excluded.text, push_name = excluded.push_name
+WHERE text IS NOT excluded.text OR push_name IS NOT excluded.push_name
+"""
+
+# El rowid empieza por el timestamp: FTS5 recorre las coincidencias ya ordenadas
+# por fecha (y por rangos de fechas) sin tener que ordenarlas todas
+ROWID_SHIFT = 20
+ROWID_MASK = (1 << ROWID_SHIFT) - 1
+
+def message_rowid(timestamp: int, instance_name: str, message_id: str) -> int:
+    return (timestamp << ROWID_SHIFT) | (zlib.crc32(f"{instance_name}/{message_id}".encode("utf-8")) & ROWID_MASK)
+
+# Rutas dentro de ``message`` de las que se extrae texto indexable
+TEXT_FIELDS: List[Tuple[str, ...]] = [
+    ("conversation",),
+    ("extendedTextMessage", "text"),
+    ("imageMessage", "caption"),
+    ("videoMessage", "caption"),
+    ("documentMessage", "fileName"),
+    ("documentMessage", "caption"),
+    ("documentWithCaptionMessage", "message", "documentMessage", "caption"),
+    ("buttonsResponseMessage", "selectedDisplayText"),
+    ("listResponseMessage", "title"),
+    ("templateButtonReplyMessage", "selectedDisplayText"),
+    ("pollCreationMessage", "name"),
+    ("locationMessage", "name"),
+    ("contactMessage", "displayName"),
+    ("reactionMessage", "text"),
+]
+
+def extract_text(message: Optional[Dict[str, Any]]) -> str:
+    """Texto indexable de un mensaje (cuerpo, pie de foto, nombre de archivo...)"""
+    parts = []
+    for path in TEXT_FIELDS:
+        value: Any = message
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        if isinstance(value, str) and value:
+            parts.append(value)
+    return " ".join(parts)
+
+def message_timestamp(value: Any) -> int:
+    """messageTimestamp como entero (segundos)"""
+    if isinstance(value, dict):
+        # Long de protobuf serializado como {"low": ..., "high": ...}
+        value = value.get("low", 0)
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+def message_row(instance_name: str, record: Dict[str, Any]) -> Optional[tuple]:
+    """Fila de la tabla ``messages`` para un registro de findMessages"""
+    key = record.get("key") or {}
+    message_id = key.get("id") or record.get("id")
+    remote_jid = key.get("remoteJid")
+    if not message_id or not remote_jid:
+        return None
+    from_me = bool(key.get("fromMe"))
+    sender = key.get("participant") or (None if from_me else remote_jid)
+    timestamp = message_timestamp(record.get("messageTimestamp"))
+    return (
+        message_rowid(timestamp, instance_name, message_id),
+        instance_name,
+        message_id,
+        remote_jid,
+        sender,
+        record.get("pushName"),
+        int(from_me),
+        timestamp,
+        record.get("messageType"),
+        extract_text(record.get("message"))
+    )
+
+def parse_time(value: Union[None, int, float, str]) -> Optional[int]:
+    """Convertir un timestamp Unix o una fecha ISO 8601 (UTC si no indica zona)"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if value.isdigit():
+        return int(value)
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+def fts_terms(text: str) -> Optional[str]:
+    """Términos de búsqueda entre comillas (``palabra*`` busca por prefijo)"""
+    terms = []
+    for token in text.split():
+        prefix = token.endswith("*")
+        token = token.rstrip("*").replace('"', '""')
+        if token:
+            terms.append(f'"{token}"' + ("*" if prefix else ""))
+    return f"({' '.join(terms)})" if terms else None
+
+PHONE_NUMBER = re.compile(r"\+?[\d\s().-]+")
+
+def normalize_jid(value: str) -> str:
+    """Número de teléfono o JID a JID"""
+    return value if "@" in value else f"{''.join(ch for ch in value if ch.isdigit())}@s.whatsapp.net"
+
+def _result(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "id": row["message_id"],
+        "remote_jid": row["remote_jid"],
+        "sender": row["sender"],
+        "push_name": row["push_name"],
+        "from_me": bool(row["from_me"]),
+        "timestamp": row["timestamp"],
+        "type": row["message_type"],
+        "text": row["snippet"] or row["text"]
+    }
+
+class MessageIndex:
+    """Índice local de mensajes en SQLite con búsqueda de texto completo (FTS5)
+
+    Guarda los mensajes sincronizados de cada instancia y chat y responde
+    búsquedas por palabras, remitente, rango de fechas y chat sin llamar a
+    la Evolution API. Todas las operaciones son síncronas y se serializan
+    con un lock; desde código asíncrono se usan las variantes ``*_async``,
+    que se ejecutan en un hilo aparte.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA cache_size=-65536")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def ingest(self, instance_name: str, records: Iterable[Dict[str, Any]]) -> int:
+        """Guardar (o actualizar) mensajes de findMessages; devuelve cuántos se procesaron"""
+        rows = [row for row in (message_row(instance_name, r) for r in records) if row is not None]
+        if not rows:
+            return 0
+        with self._lock:
+            self._write(rows)
+        return len(rows)
+
+    def _write(self, rows: List[tuple], state_sql: Optional[str] = None, state_args: tuple = ()) -> None:
+        """Guardar filas (y opcionalmente el estado de sincronización) en una transacción"""
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.execute("SAVEPOINT batch")
+            try:
+                self._conn.executemany(UPSERT, rows)
+            except sqlite3.IntegrityError:
+                # Dos mensajes del mismo segundo con el mismo rowid: fila a fila
+                self._conn.execute("ROLLBACK TO batch")
+                for row in rows:
+                    self._insert_row(row)
+            self._conn.execute("RELEASE batch")
+            if state_sql:
+                self._conn.execute(state_sql, state_args)
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _insert_row(self, row: tuple) -> None:
+        existing = self._conn.execute(
+            "SELECT rowid FROM messages WHERE instance = ? AND message_id = ?", (row[1], row[2])
+        ).fetchone()
+        if existing is not None:
+            row = (existing[0],) + row[1:]
+        while True:
+            try:
+                self._conn.execute(UPSERT, row)
+                return
+            except sqlite3.IntegrityError:
+                row = (row[0] + 1,) + row[1:]
+
+    def search(
+        self,
+        instance_name: str,
+        query: Optional[str] = None,
+        sender: Optional[str] = None,
+        remote_jid: Optional[str] = None,
+        since: Union[None, int, str] = None,
+        until: Union[None, int, str] = None,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """Buscar mensajes, del más reciente al más antiguo
+
+        ``query`` busca palabras en el texto (todas deben aparecer;
+        ``palabra*`` busca por prefijo). ``sender`` acepta un número/JID o,
+        si no lo parece, palabras del nombre visible del remitente.
+        """
+        clauses = ["m.instance = ?"]
+        args: List[Any] = [instance_name]
+        selective = False
+        matches = []
+        text_terms = fts_terms(query) if query else None
+        if text_terms:
+            matches.append(f"text : {text_terms}")
+        if sender:
+            if "@" in sender or PHONE_NUMBER.fullmatch(sender):
+                jid = normalize_jid(sender)
+                clauses.append("m.sender = ?")
+                args.append(jid)
+                selective = True
+            else:
+                name_terms = fts_terms(sender)
+                if name_terms:
+                    matches.append(f"push_name : {name_terms}")
+        if remote_jid:
+            clauses.append("m.remote_jid = ?")
+            args.append(normalize_jid(remote_jid))
+            selective = True
+        since_ts, until_ts = parse_time(since), parse_time(until)
+        if since_ts is not None:
+            clauses.append("m.timestamp >= ?")
+            args.append(since_ts)
+        if until_ts is not None:
+            clauses.append("m.timestamp <= ?")
+            args.append(until_ts)
+
+        columns = "m.message_id, m.remote_jid, m.sender, m.push_name, m.from_me, m.timestamp, m.message_type, m.text"
+        where = " AND ".join(clauses)
+        with self._lock:
+            if not matches:
+                sql = f"SELECT {columns}, NULL AS snippet FROM messages m WHERE {where} ORDER BY m.timestamp DESC LIMIT ?"
+                return [_result(row) for row in self._conn.execute(sql, [*args, limit])]
+
+            # Sin chat ni remitente se recorren las coincidencias de FTS5 de la más
+            # reciente a la más antigua; con ellos se parte de los mensajes del chat
+            match = " AND ".join(matches)
+            fts_clauses = ["messages_fts MATCH ?"]
+            fts_args: List[Any] = [match]
+            if since_ts is not None:
+                fts_clauses.append("messages_fts.rowid >= ?")
+                fts_args.append(since_ts << ROWID_SHIFT)
+            if until_ts is not None:
+                fts_clauses.append("messages_fts.rowid <= ?")
+                fts_args.append((until_ts << ROWID_SHIFT) | ROWID_MASK)
+            if selective:
+                source = "messages m JOIN messages_fts ON messages_fts.rowid = m.rowid"
+                order = "m.timestamp DESC"
+            else:
+                # CROSS JOIN fija FTS5 como tabla exterior: las filas salen ya en orden
+                # y el fragmento solo se calcula para las que se devuelven
+                source = "messages_fts CROSS JOIN messages m ON m.rowid = messages_fts.rowid"
+                order = "messages_fts.rowid DESC"
+            snippet = "snippet(messages_fts, 0, '[', ']', '…', 16)" if text_terms else "NULL"
+            rows = self._conn.execute(
+                f"SELECT {columns}, {snippet} AS snippet FROM {source} "
+                f"WHERE {' AND '.join(fts_clauses)} AND {where} ORDER BY {order} LIMIT ?",
+                [*fts_args, *args, limit]
+            ).fetchall()
+        return [_result(row) for row in rows]
+
+    def stats(self, instance_name: Optional[str] = None) -> Dict[str, Any]:
+        """Mensajes indexados por instancia y tamaño de la base de datos"""
+        sql = "SELECT instance, COUNT(*) AS messages, COUNT(DISTINCT remote_jid) AS chats, MAX(timestamp) AS newest FROM messages"
+        args: List[Any] = []
+        if instance_name:
+            sql += " WHERE instance = ?"
+            args.append(instance_name)
+        with self._lock:
+            rows = self._conn.execute(sql + " GROUP BY instance", args).fetchall()
+            page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+            page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+        return {
+            "path": self.path,
+            "size_bytes": page_count * page_size,
+            "instances": {
+                row["instance"]: {"messages": row["messages"], "chats": row["chats"], "newest_timestamp": row["newest"]}
+                for row in rows
+            }
+        }
+
+    def sync_state(self, instance_name: str, remote_jid: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Marcas de sincronización por chat: ``high_water`` es el timestamp del
+        mensaje más reciente ya guardado; ``resume_cursor`` y ``pending_high``
+        describen una sincronización del chat que quedó a medias"""
+        sql = "SELECT * FROM sync_state WHERE instance = ?"
+        args: List[Any] = [instance_name]
+        if remote_jid:
+            sql += " AND remote_jid = ?"
+            args.append(remote_jid)
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return {
+            row["remote_jid"]: {
+                "high_water": row["high_water"],
+                "pending_high": row["pending_high"],
+                "resume_cursor": row["resume_cursor"],
+                "synced_at": row["synced_at"]
+            }
+            for row in rows
+        }
+
+    def checkpoint(
+        self,
+        instance_name: str,
+        remote_jid: str,
+        records: List[Dict[str, Any]],
+        pending_high: int,
+        resume_cursor: Optional[str]
+    ) -> int:
+        """Guardar un lote de un chat a medio sincronizar y su posición, en una transacción"""
+        rows = [row for row in (message_row(instance_name, r) for r in records) if row is not None]
+        with self._lock:
+            self._write(
+                rows,
+                """INSERT INTO sync_state (instance, remote_jid, pending_high, resume_cursor) VALUES (?, ?, ?, ?)
+                ON CONFLICT (instance, remote_jid) DO UPDATE
+                SET pending_high = excluded.pending_high, resume_cursor = excluded.resume_cursor""",
+                (instance_name, remote_jid, pending_high, resume_cursor)
+            )
+        return len(rows)
+
+    def complete_sync(
+        self,
+        instance_name: str,
+        remote_jid: str,
+        records: List[Dict[str, Any]],
+        high_water: int
+    ) -> int:
+        """Guardar el último lote de un chat y avanzar su marca de sincronización"""
+        rows = [row for row in (message_row(instance_name, r) for r in records) if row is not None]
+        with self._lock:
+            self._write(
+                rows,
+                """INSERT INTO sync_state (instance, remote_jid, high_water, synced_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (instance, remote_jid) DO UPDATE
+                SET high_water = MAX(high_water, excluded.high_water), synced_at = excluded.synced_at,
+                    pending_high = NULL, resume_cursor = NULL""",
+                (instance_name, remote_jid, high_water, int(time.time()))
+            )
+        return len(rows)
+
+    async def ingest_async(self, instance_name: str, records: Iterable[Dict[str, Any]]) -> int:
+        return await asyncio.to_thread(self.ingest, instance_name, list(records))
+
+    async def search_async(self, instance_name: str, **filters: Any) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.search, instance_name, **filters)
+
+    async def sync(
+        self,
+        client: Any,
+        instance_name: str,
+        remote_jid: Optional[str] = None,
+        max_messages: Optional[int] = None,
+        page_size: int = 100
+    ) -> Dict[str, Any]:
+        """Descargar mensajes de la Evolution API (todo o un chat) e indexarlos"""
+        where = {"key": {"remoteJid": normalize_jid(remote_jid)}} if remote_jid else None
+        start = time.monotonic()
+        ingested = 0
+        batch: List[Dict[str, Any]] = []
+        async with client.iter_messages(instance_name, where=where, page_size=page_size) as messages:
+            async for record in messages:
+                batch.append(record)
+                if len(batch) >= page_size:
+                    ingested += await self.ingest_async(instance_name, batch)
+                    batch = []
+                if max_messages is not None and ingested + len(batch) >= max_messages:
+                    break
+            pages = messages.pages_fetched
+        if batch:
+            ingested += await self.ingest_async(instance_name, batch)
+        return {
+            "ingested": ingested,
+            "pages": pages,
+            "seconds": round(time.monotonic() - start, 3)
+        }
+
+_index: Optional[MessageIndex] = None
+
+def get_message_index() -> Optional[MessageIndex]:
+    """Índice compartido en EVOLUTION_MESSAGE_INDEX_PATH, o None si no está configurado"""
+    global _index
+    path = os.getenv("EVOLUTION_MESSAGE_INDEX_PATH")
+    if not path:
+        return None
+    if _index is None or _index.path != path:
+        _index = MessageIndex(path)
+    return _index
@@ -0,0 +1,144 @@
+from typing import Dict, Any, List, Optional, Union
+from ..base_routes import BaseRoutes
+from ..chat.client import ChatClient
+from .index import get_message_index, normalize_jid
+from .sync import ChatSync
+
+INDEX_DISABLED = "Local message index is disabled; set EVOLUTION_MESSAGE_INDEX_PATH"
+
+class SearchRoutes(BaseRoutes):
+    client_class = ChatClient
+
+    def register_tools(self, mcp):
+        @mcp.tool(
+            description="Sincronizar mensajes de una instancia (o de un chat) en el índice local de búsqueda",
+            tags={"search", "sync"}
+        )
+        async def sync_message_index(
+            instance_name: str,
+            remote_jid: Optional[str] = None,
+            max_messages: Optional[int] = None
+        ) -> Dict[str, Any]:
+            """Descargar mensajes de la Evolution API e indexarlos localmente"""
+            try:
+                index = get_message_index()
+                if index is None:
+                    return {"error": INDEX_DISABLED}
+                result = await index.sync(
+                    self.client,
+                    instance_name,
+                    remote_jid=remote_jid,
+                    max_messages=max_messages
+                )
+                return {
+                    "success": True,
+                    "result": result
+                }
+            except Exception as e:
+                return {"error": f"Error sincronizando índice de mensajes: {str(e)}"}
+
+        @mcp.tool(
+            description="Sincronizar de forma incremental los chats de una instancia: solo se descargan los mensajes nuevos desde la última sincronización",
+            tags={"search", "sync"}
+        )
+        async def sync_chats(
+            instance_name: str,
+            remote_jids: Optional[List[str]] = None
+        ) -> Dict[str, Any]:
+            """Sincronizar chats (todos o los indicados) desde su última marca"""
+            try:
+                index = get_message_index()
+                if index is None:
+                    return {"error": INDEX_DISABLED}
+                result = await ChatSync.from_env(index, self.client).sync_instance(instance_name, remote_jids)
+                return {
+                    "success": True,
+                    "result": result
+                }
+            except Exception as e:
+                return {"error": f"Error sincronizando chats: {str(e)}"}
+
+        @mcp.tool(
+            description="Obtener el estado de sincronización por chat del índice local",
+            tags={"search", "sync"}
+        )
+        async def get_sync_status(
+            instance_name: str,
+            remote_jid: Optional[str] = None
+        ) -> Dict[str, Any]:
+            """Marcas de sincronización y chats con una sincronización a medias"""
+            try:
+                index = get_message_index()
+                if index is None:
+                    return {"error": INDEX_DISABLED}
+                state = index.sync_state(instance_name, normalize_jid(remote_jid) if remote_jid else None)
+                return {
+                    "success": True,
+                    "result": {
+                        jid: {
+                            "high_water": chat["high_water"],
+                            "synced_at": chat["synced_at"],
+                            "in_progress": chat["resume_cursor"] is not None
+                        }
+                        for jid, chat in state.items()
+                    }
+                }
+            except Exception as e:
+                return {"error": f"Error obteniendo estado de sincronización: {str(e)}"}
+
+        @mcp.tool(
+            description="Buscar mensajes en el índice local por palabras, remitente, rango de fechas y chat",
+            tags={"search", "chat"}
+        )
+        async def search_messages(
+            instance_name: str,
+            query: Optional[str] = None,
+            sender: Optional[str] = None,
+            remote_jid: Optional[str] = None,
+            since: Optional[Union[int, str]] = None,
+            until: Optional[Union[int, str]] = None,
+            limit: int = 20
+        ) -> Dict[str, Any]:
+            """Buscar mensajes sin llamar a la Evolution API
+
+            ``since``/``until`` aceptan timestamps Unix o fechas ISO 8601.
+            """
+            try:
+                index = get_message_index()
+                if index is None:
+                    return {"error": INDEX_DISABLED}
+                result = await index.search_async(
+                    instance_name,
+                    query=query,
+                    sender=sender,
+                    remote_jid=remote_jid,
+                    since=since,
+                    until=until,
+                    limit=max(1, min(limit, 200))
+                )
+                return {
+                    "success": True,
+                    "result": result,
+                    "count": len(result)
+                }
+            except Exception as e:
+                return {"error": f"Error buscando mensajes: {str(e)}"}
+
+        @mcp.tool(
+            description="Obtener estadísticas del índice local de mensajes",
+            tags={"search", "diagnostics"}
+        )
+        async def get_message_index_stats(
+            instance_name: Optional[str] = None
+        ) -> Dict[str, Any]:
+            """Mensajes indexados por instancia y tamaño de la base de datos"""
+            try:
+                index = get_message_index()
+                if index is None:
+                    return {"error": INDEX_DISABLED}
+                return {
+                    "success": True,
+                    "result": index.stats(instance_name)
+                }
+            except Exception as e:
+                return {"error": f"Error obteniendo estadísticas del índice: {str(e)}"}
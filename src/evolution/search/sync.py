@@ -0,0 +1,135 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from .index import MessageIndex, message_timestamp, normalize_jid
+
+logger = logging.getLogger(__name__)
+
+def last_activity(chat: Dict[str, Any]) -> Optional[int]:
+    """Timestamp del último mensaje de un chat de findChats, si la API lo indica"""
+    last_message = chat.get("lastMessage")
+    if isinstance(last_message, dict) and last_message.get("messageTimestamp"):
+        return message_timestamp(last_message["messageTimestamp"])
+    updated_at = chat.get("updatedAt")
+    if isinstance(updated_at, str):
+        try:
+            return int(datetime.fromisoformat(updated_at.replace("Z", "+00:00")).timestamp())
+        except ValueError:
+            return None
+    return None
+
+class ChatSync:
+    """Sincronización incremental del historial de chats hacia el índice local
+
+    Por cada ``remoteJid`` se guarda una marca con el timestamp del mensaje
+    más reciente ya indexado; las siguientes sincronizaciones solo piden
+    los mensajes desde esa marca y paran al alcanzarla. Cada lote se guarda
+    junto con la posición (cursor) del chat, así que tras un reinicio se
+    retoma la página donde se quedó; la marca solo avanza cuando el chat se
+    completa. Los chats se procesan en paralelo con ``concurrency``
+    trabajadores.
+    """
+
+    def __init__(self, index: MessageIndex, client: Any, concurrency: int = 4, page_size: int = 100):
+        self.index = index
+        self.client = client
+        self.concurrency = max(1, concurrency)
+        self.page_size = page_size
+
+    @classmethod
+    def from_env(cls, index: MessageIndex, client: Any) -> "ChatSync":
+        """Construir desde variables de entorno"""
+        return cls(
+            index,
+            client,
+            concurrency=int(os.getenv("EVOLUTION_SYNC_CONCURRENCY", "4")),
+            page_size=int(os.getenv("EVOLUTION_SYNC_PAGE_SIZE", "100"))
+        )
+
+    async def sync_instance(self, instance_name: str, remote_jids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Sincronizar los chats indicados o, si no se indican, todos los de findChats"""
+        start = time.monotonic()
+        state = await asyncio.to_thread(self.index.sync_state, instance_name)
+        activity: Dict[str, Optional[int]] = {}
+        if remote_jids:
+            for jid in remote_jids:
+                activity[normalize_jid(jid)] = None
+        else:
+            for chat in await self.client.find_chats(instance_name):
+                jid = chat.get("remoteJid") or chat.get("id")
+                if jid and "@" in jid:
+                    activity[jid] = last_activity(chat)
+
+        pending: "asyncio.Queue[str]" = asyncio.Queue()
+        skipped = 0
+        for jid, last in activity.items():
+            chat_state = state.get(jid)
+            # Sin mensajes nuevos según findChats y sin sincronización a medias
+            if chat_state and last is not None and last <= chat_state["high_water"] and not chat_state["resume_cursor"]:
+                skipped += 1
+            else:
+                pending.put_nowait(jid)
+
+        saved: Dict[str, int] = {}
+        failed: Dict[str, str] = {}
+
+        async def worker() -> None:
+            while not pending.empty():
+                jid = pending.get_nowait()
+                try:
+                    saved[jid] = await self.sync_chat(instance_name, jid, state.get(jid))
+                except Exception as e:
+                    logger.warning(f"Sync of {instance_name}/{jid} failed: {e}")
+                    failed[jid] = str(e)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, pending.qsize()))))
+        return {
+            "chats": len(activity),
+            "synced": len(saved),
+            "skipped": skipped,
+            "messages_saved": sum(saved.values()),
+            "failed": failed,
+            "seconds": round(time.monotonic() - start, 3)
+        }
+
+    async def sync_chat(
+        self,
+        instance_name: str,
+        remote_jid: str,
+        state: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """Traer los mensajes de un chat posteriores a su marca; devuelve cuántos se guardaron"""
+        if state is None:
+            state = (await asyncio.to_thread(self.index.sync_state, instance_name, remote_jid)).get(remote_jid, {})
+        high_water = state.get("high_water") or 0
+        pending_high = state.get("pending_high") or high_water
+        where: Dict[str, Any] = {"key": {"remoteJid": remote_jid}}
+        if high_water:
+            # Los mensajes del mismo segundo que la marca se vuelven a pedir (el guardado es idempotente)
+            where["messageTimestamp"] = {"gte": high_water}
+
+        saved = 0
+        batch: List[Dict[str, Any]] = []
+        async with self.client.iter_messages(
+            instance_name,
+            where=where,
+            page_size=self.page_size,
+            cursor=state.get("resume_cursor")
+        ) as messages:
+            async for record in messages:
+                timestamp = message_timestamp(record.get("messageTimestamp"))
+                if timestamp < high_water:
+                    # findMessages devuelve primero los más recientes: el resto ya está guardado
+                    break
+                batch.append(record)
+                pending_high = max(pending_high, timestamp)
+                if len(batch) >= self.page_size:
+                    saved += await asyncio.to_thread(
+                        self.index.checkpoint, instance_name, remote_jid, batch, pending_high, messages.cursor
+                    )
+                    batch = []
+        saved += await asyncio.to_thread(self.index.complete_sync, instance_name, remote_jid, batch, pending_high)
+        return saved
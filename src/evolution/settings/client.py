@@ -27,10 +27,13 @@ class SettingsClient(EvolutionAPIClient):
         if msg_call:
             data["msgCall"] = msg_call
 
-        return await self.post(f"/settings/set/{instance_name}", json=data)
+        try:
+            return await self.post(f"/settings/set/{instance_name}", json=data)
+        finally:
+            self.invalidate_cache(f"settings/find/{instance_name}")
 
-    async def find_settings(self, instance_name: str) -> Dict[str, Any]:
+    async def find_settings(self, instance_name: str, bypass_cache: bool = False) -> Dict[str, Any]:
         """
         Obtiene la configuración actual de la instancia
         """
-        return await self.get(f"/settings/find/{instance_name}") 
\ No newline at end of file
+        return await self.get(f"/settings/find/{instance_name}", bypass_cache=bypass_cache) 
\ No newline at end of file
@@ -2,6 +2,7 @@ from typing import Dict, Any, Optional
 from fastapi import FastAPI
 from pydantic import BaseModel, Field, validator
 from ..base_routes import BaseRoutes
+from .client import SettingsClient
 
 class SettingsConfig(BaseModel):
     reject_call: bool = Field(default=False, description="Rechazar llamadas entrantes")
@@ -23,6 +24,8 @@ class SettingsConfig(BaseModel):
         return v
 
 class SettingsRoutes(BaseRoutes):
+    client_class = SettingsClient
+
     def register_tools(self, mcp: FastAPI):
         @mcp.tool(
             description="Configurar ajustes de una instancia",
@@ -35,7 +38,7 @@ class SettingsRoutes(BaseRoutes):
             """
             Configura los ajustes para una instancia específica
             """
-            return await self.settings_client.set_settings(
+            return await self.client.set_settings(
                 instance_name=instance_name,
                 reject_call=config.reject_call,
                 msg_call=config.msg_call,
@@ -51,9 +54,10 @@ class SettingsRoutes(BaseRoutes):
             tags={"settings", "info"}
         )
         async def find_settings(
-            instance_name: str
+            instance_name: str,
+            bypass_cache: bool = False
         ) -> Dict[str, Any]:
             """
             Obtiene la configuración actual de una instancia
             """
-            return await self.settings_client.find_settings(instance_name) 
\ No newline at end of file
+            return await self.client.find_settings(instance_name, bypass_cache=bypass_cache) 
\ No newline at end of file
@@ -0,0 +1,88 @@
+import os
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """Agrupa peticiones idénticas simultáneas en una sola llamada al upstream
+
+    Mientras una llamada con la misma clave está en curso, los siguientes
+    llamantes esperan su resultado (o su excepción) en lugar de lanzar otra.
+    La llamada compartida se ejecuta como tarea propia: cancelar a un
+    llamante no afecta al resto, y solo se cancela si ya nadie la espera.
+    El resultado es el mismo objeto para todos los llamantes y no debe
+    modificarse.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.executed = 0
+        self.coalesced = 0
+        self._calls: Dict[Hashable, _Call] = {}
+
+    @classmethod
+    def from_env(cls) -> "SingleFlight":
+        """Construir desde variables de entorno"""
+        return cls(enabled=os.getenv("EVOLUTION_API_SINGLE_FLIGHT", "true").lower() in ("1", "true", "yes"))
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Ejecutar ``fn`` o unirse a la llamada en curso con la misma clave"""
+        if not self.enabled:
+            return await fn()
+
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _, key=key, call=call: self._forget(key, call))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+            raise
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de llamadas ejecutadas y agrupadas"""
+        total = self.executed + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / total, 4) if total else 0.0,
+            "in_flight": len(self._calls)
+        }
+
+def request_key(
+    method: str,
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    body: Optional[Dict[str, Any]] = None
+) -> Hashable:
+    """Clave que identifica peticiones idénticas (método, URL, parámetros y cuerpo)"""
+    return (
+        method,
+        url,
+        json.dumps(params, sort_keys=True, default=str) if params else None,
+        json.dumps(body, sort_keys=True, default=str) if body else None
+    )
+
+# Instancia global compartida por todos los clientes de dominio
+single_flight = SingleFlight.from_env()
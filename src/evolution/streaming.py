@@ -0,0 +1,294 @@
+import re
+import binascii
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+from .codec import JSONCodec, get_codec
+
+# Fuera de la lista buscada: cadenas completas, caracteres estructurales o una
+# comilla suelta (cadena sin terminar)
+_TOKEN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\],]|"', re.S)
+# Dentro de un elemento: todo lo que no cambia la profundidad, cadenas incluidas
+_NESTED_RUN = re.compile(rb'(?:[^"{}\[\]]++|"[^"\\]*+(?:\\.[^"\\]*+)*+")*+', re.S)
+_ITEM_RUN = re.compile(rb'(?:[^"{}\[\],]++|"[^"\\]*+(?:\\.[^"\\]*+)*+")*+', re.S)
+
+_QUOTE, _COMMA = ord('"'), ord(',')
+_OPEN = (ord('{'), ord('['))
+_CLOSE = (ord('}'), ord(']'))
+
+class _Frame:
+    __slots__ = ("is_object", "key", "expect_key")
+
+    def __init__(self, is_object: bool):
+        self.is_object = is_object
+        self.key: Optional[str] = None
+        self.expect_key = is_object
+
+class JSONItemStream:
+    """Extrae de forma incremental los elementos de una lista JSON
+
+    Recibe la respuesta por trozos con ``feed()`` y devuelve cada elemento
+    de la lista situada en ``path`` (secuencia de claves desde la raíz; vacía
+    si la raíz es la lista) en cuanto está completo. Solo se conserva en
+    memoria el elemento en curso, así que el consumo no depende del tamaño
+    total de la respuesta. Cada elemento se decodifica con el codec JSON
+    configurado; el resto del documento se recorre sin construir objetos.
+    """
+
+    def __init__(self, path: Sequence[str] = (), codec: Optional[JSONCodec] = None):
+        self.path = list(path)
+        self.codec = codec or get_codec()
+        self.items = 0
+        self.done = False
+        self._buf = bytearray()
+        self._pos = 0
+        self._stack: List[_Frame] = []
+        self._in_target = False
+        self._depth = 0
+        self._item_start = 0
+
+    def _at_path(self) -> bool:
+        stack = self._stack
+        if len(stack) != len(self.path):
+            return False
+        return all(f.is_object and f.key == key for f, key in zip(stack, self.path))
+
+    def _emit(self, end: int, items: List[Any]) -> None:
+        raw = self._buf[self._item_start:end].strip()
+        if raw:
+            items.append(self.codec.loads(raw))
+            self.items += 1
+
+    def feed(self, data: bytes) -> List[Any]:
+        """Añadir un trozo de la respuesta y devolver los elementos completados"""
+        items: List[Any] = []
+        if self.done:
+            return items
+        buf = self._buf
+        buf += data
+        pos = self._pos
+        if not self._in_target:
+            pos = self._scan_outside(buf, pos)
+        if self._in_target:
+            pos = self._scan_target(buf, pos, items)
+
+        # Descartar lo ya procesado conservando el elemento en curso
+        if self.done:
+            buf.clear()
+            pos = 0
+        else:
+            keep_from = self._item_start if self._in_target else pos
+            if keep_from:
+                del buf[:keep_from]
+                pos -= keep_from
+                self._item_start = 0
+        self._pos = pos
+        return items
+
+    def _scan_outside(self, buf: bytearray, pos: int) -> int:
+        """Recorrer el documento siguiendo las claves hasta encontrar la lista buscada"""
+        stack = self._stack
+        for match in _TOKEN.finditer(buf, pos):
+            i, pos = match.span()
+            c = buf[i]
+            if c == _QUOTE:
+                if pos - i == 1:
+                    # Cadena incompleta: se vuelve a analizar con el siguiente trozo
+                    return i
+                if stack and stack[-1].expect_key:
+                    stack[-1].key = self.codec.loads(bytes(buf[i:pos]))
+                    stack[-1].expect_key = False
+            elif c in _OPEN:
+                if c == _OPEN[1] and self._at_path():
+                    self._in_target = True
+                    self._item_start = pos
+                    return pos
+                stack.append(_Frame(c == _OPEN[0]))
+            elif c in _CLOSE:
+                if stack:
+                    stack.pop()
+            elif stack and stack[-1].is_object:
+                stack[-1].expect_key = True
+        return pos
+
+    def _scan_target(self, buf: bytearray, pos: int, items: List[Any]) -> int:
+        """Dentro de la lista buscada solo importa la profundidad para separar elementos"""
+        end = len(buf)
+        depth = self._depth
+        while True:
+            pos = (_NESTED_RUN if depth else _ITEM_RUN).match(buf, pos).end()
+            if pos >= end:
+                break
+            c = buf[pos]
+            if c == _QUOTE:
+                # Cadena incompleta: se vuelve a analizar con el siguiente trozo
+                break
+            pos += 1
+            if c in _OPEN:
+                depth += 1
+            elif c in _CLOSE:
+                if depth == 0:
+                    self._emit(pos - 1, items)
+                    self.done = True
+                    break
+                depth -= 1
+            else:
+                self._emit(pos - 1, items)
+                self._item_start = pos
+        self._depth = depth
+        return pos
+
+    def close(self) -> None:
+        """Comprobar que la respuesta terminó con la lista completa"""
+        if not self.done:
+            where = "/".join(self.path) or "<root>"
+            if self._in_target:
+                raise ValueError(f"Truncated JSON stream inside list at '{where}'")
+            raise ValueError(f"No JSON list found at '{where}'")
+
+class Base64FieldStream:
+    """Decodifica en streaming un campo base64 de un objeto JSON
+
+    Pensado para respuestas como las de ``getBase64FromMediaMessage``, en
+    las que casi todo el tamaño es un único campo base64. ``feed()`` devuelve
+    los bytes ya decodificados del campo a medida que llegan y, cuando el
+    objeto termina, un último elemento con el resto del objeto (el campo
+    vale ``None``). Solo se guarda en memoria el JSON que rodea al campo.
+    """
+
+    def __init__(self, field: str = "base64", codec: Optional[JSONCodec] = None):
+        self.field = field
+        self.codec = codec or get_codec()
+        self.done = False
+        self.decoded_bytes = 0
+        self._pattern = re.compile(rb'"' + re.escape(field.encode("utf-8")) + rb'"\s*:\s*"')
+        # JSON alrededor del campo, con null en lugar del valor
+        self._head = bytearray()
+        self._state = 0  # 0: buscando el campo, 1: dentro del valor, 2: después del valor
+        self._search_from = 0
+        self._pending = b""
+        self._prefix = b""
+        self._started = False
+        self._tail_pos = 0
+        self._depth = 1
+
+    def feed(self, data: bytes) -> List[Any]:
+        """Añadir un trozo de la respuesta y devolver los bytes decodificados (y el objeto al final)"""
+        items: List[Any] = []
+        if self.done:
+            return items
+        if self._state == 0:
+            self._head += data
+            start = self._find_field()
+            if start is None:
+                return items
+            data = bytes(self._head[start:])
+            # Se quita también la comilla de apertura del valor
+            del self._head[start - 1:]
+            self._head += b"null"
+            self._tail_pos = len(self._head)
+            self._state = 1
+        if self._state == 1:
+            end = data.find(b'"')
+            chunk = self._decode(data if end < 0 else data[:end], final=end >= 0)
+            if chunk:
+                items.append(chunk)
+            if end < 0:
+                return items
+            data = data[end + 1:]
+            self._state = 2
+        self._head += data
+        if self._object_closed():
+            self.done = True
+            items.append(self.codec.loads(bytes(self._head)))
+            self._head = bytearray()
+        return items
+
+    def _find_field(self) -> Optional[int]:
+        """Posición del inicio del valor si el campo está en el primer nivel del objeto"""
+        head = self._head
+        match = self._pattern.search(head, self._search_from)
+        while match is not None:
+            depth, inside_string = 0, False
+            for token in _TOKEN.finditer(head):
+                if token.start() >= match.start():
+                    break
+                if token.end() > match.start():
+                    inside_string = True
+                    break
+                c = head[token.start()]
+                if c in _OPEN:
+                    depth += 1
+                elif c in _CLOSE:
+                    depth -= 1
+            if depth == 1 and not inside_string:
+                return match.end()
+            match = self._pattern.search(head, match.end())
+        # La clave puede quedar partida entre dos trozos
+        self._search_from = max(0, len(head) - len(self.field) - 64)
+        return None
+
+    def _decode(self, value: bytes, final: bool) -> bytes:
+        if not self._started:
+            # Algunas versiones devuelven un data URI: el inicio del valor se guarda hasta saber si lo es
+            value = self._prefix + value
+            if not final and len(value) < 256 and (
+                b"data:".startswith(value) or (value.startswith(b"data:") and b"," not in value)
+            ):
+                self._prefix = value
+                return b""
+            self._prefix = b""
+            self._started = True
+            if value.startswith(b"data:") and b"," in value[:256]:
+                value = value[value.index(b",") + 1:]
+        value = self._pending + value
+        if not final and value.endswith(b"\\"):
+            value, self._pending = value[:-1], b"\\"
+        else:
+            self._pending = b""
+        if b"\\" in value:
+            value = value.replace(b"\\/", b"/").replace(b"\\n", b"").replace(b"\\r", b"")
+        usable = len(value) if final else len(value) - len(value) % 4
+        self._pending = value[usable:] + self._pending
+        decoded = binascii.a2b_base64(value[:usable]) if usable else b""
+        self.decoded_bytes += len(decoded)
+        return decoded
+
+    def _object_closed(self) -> bool:
+        """Seguir la profundidad tras el valor hasta cerrar el objeto raíz"""
+        head = self._head
+        for token in _TOKEN.finditer(head, self._tail_pos):
+            if token.end() - token.start() == 1 and head[token.start()] == _QUOTE:
+                # Cadena incompleta: se vuelve a analizar con el siguiente trozo
+                self._tail_pos = token.start()
+                return False
+            c = head[token.start()]
+            if c in _OPEN:
+                self._depth += 1
+            elif c in _CLOSE:
+                self._depth -= 1
+                if self._depth == 0:
+                    return True
+            self._tail_pos = token.end()
+        return False
+
+    def close(self) -> None:
+        """Comprobar que la respuesta terminó con el objeto completo"""
+        if not self.done:
+            if self._state == 0:
+                raise ValueError(f"No '{self.field}' field found in JSON object")
+            raise ValueError(f"Truncated JSON stream in field '{self.field}'")
+
+async def collect_items(items: AsyncIterator[Any], limit: int) -> Dict[str, Any]:
+    """Reunir hasta ``limit`` elementos de un stream e indicar si quedaban más
+
+    Al parar se cierra el stream, lo que corta la descarga de la respuesta.
+    """
+    collected: List[Any] = []
+    truncated = False
+    async with aclosing(items):
+        async for item in items:
+            if len(collected) >= limit:
+                truncated = True
+                break
+            collected.append(item)
+    return {"success": True, "result": collected, "count": len(collected), "truncated": truncated}
@@ -0,0 +1,95 @@
+import os
+import time
+import contextvars
+from contextlib import contextmanager
+from fnmatch import fnmatchcase
+from typing import Iterator, List, Optional, Tuple
+
+# Política de timeouts por prefijo de endpoint (segundos). La primera
+# coincidencia gana, por lo que los patrones más específicos van primero.
+DEFAULT_TIMEOUT_POLICY: List[Tuple[str, float]] = [
+    ("chat/getBase64FromMediaMessage*", 60.0),
+    ("chat/findMessages*", 30.0),
+    ("chat/find*", 20.0),
+    ("group/fetchAllGroups*", 30.0),
+    ("message/send*", 15.0),
+    ("instance/connectionState*", 5.0),
+]
+
+DEFAULT_TIMEOUT = 20.0
+
+# Instante (time.monotonic) en que vence la llamada a herramienta en curso
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("evolution_deadline", default=None)
+
+class DeadlineExceeded(Exception):
+    """La llamada a herramienta agotó su plazo antes de completar la petición"""
+
+class TimeoutPolicy:
+    """Tabla de timeouts por patrón de endpoint"""
+
+    def __init__(self, rules: Optional[List[Tuple[str, float]]] = None, default: float = DEFAULT_TIMEOUT):
+        self.rules = list(rules if rules is not None else DEFAULT_TIMEOUT_POLICY)
+        self.default = default
+
+    @classmethod
+    def from_env(cls) -> "TimeoutPolicy":
+        """Construir la política aplicando EVOLUTION_API_TIMEOUTS sobre la tabla por defecto
+
+        Formato: ``patrón=segundos`` separados por comas, p. ej.
+        ``message/send*=10,chat/find*=25``.
+        """
+        rules = list(DEFAULT_TIMEOUT_POLICY)
+        overrides = os.getenv("EVOLUTION_API_TIMEOUTS", "")
+        for item in filter(None, (part.strip() for part in overrides.split(","))):
+            pattern, _, seconds = item.partition("=")
+            rules = [(p, t) for p, t in rules if p != pattern.strip()]
+            rules.insert(0, (pattern.strip(), float(seconds)))
+        default = float(os.getenv("EVOLUTION_API_DEFAULT_TIMEOUT", str(DEFAULT_TIMEOUT)))
+        return cls(rules, default)
+
+    def timeout_for(self, endpoint: str) -> float:
+        """Obtener el timeout configurado para un endpoint"""
+        path = endpoint.lstrip("/")
+        for pattern, seconds in self.rules:
+            if fnmatchcase(path, pattern):
+                return seconds
+        return self.default
+
+def remaining_time() -> Optional[float]:
+    """Segundos restantes hasta el plazo de la llamada actual (None si no hay plazo)"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[None]:
+    """Fijar un plazo global para el contexto actual
+
+    Un plazo anidado nunca extiende uno exterior más estricto.
+    """
+    if seconds is None:
+        yield
+        return
+    expires_at = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        expires_at = min(expires_at, current)
+    token = _deadline.set(expires_at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def effective_timeout(policy_timeout: float) -> float:
+    """Combinar el timeout del endpoint con el plazo restante de la llamada
+
+    Lanza ``DeadlineExceeded`` si el plazo ya venció, para no iniciar trabajo
+    que no puede completarse a tiempo.
+    """
+    remaining = remaining_time()
+    if remaining is None:
+        return policy_timeout
+    if remaining <= 0:
+        raise DeadlineExceeded("Tool call deadline exceeded before sending request")
+    return min(policy_timeout, remaining)
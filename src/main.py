@@ -16,6 +16,15 @@ from evolution.group.routes import GroupRoutes
 from evolution.proxy.routes import ProxyRoutes
 from evolution.settings.routes import SettingsRoutes
 from evolution.integrations.webhook.routes import WebhookRoutes
+from evolution.diagnostics.routes import DiagnosticsRoutes
+from evolution.search.routes import SearchRoutes
+from evolution.contacts.routes import ContactRoutes
+from evolution.outbox.routes import OutboxRoutes
+from evolution.outbox.worker import get_outbox
+from evolution.outbox.schedule import get_message_schedule
+from evolution.http_client import close_shared_client
+from evolution.media.preprocess import media_preprocessor
+from evolution.middleware import DeadlineMiddleware
 
 def setup_logging() -> None:
     """Configurar logging para la aplicación"""
@@ -49,13 +58,15 @@ def get_server_config() -> Dict[str, Any]:
         'host': host,
         'port': port,
         'environment': os.getenv('ENVIRONMENT', 'development'),
-        'log_level': os.getenv('LOG_LEVEL', 'INFO').lower()
+        'log_level': os.getenv('LOG_LEVEL', 'INFO').lower(),
+        'tool_deadline': float(os.getenv('MCP_TOOL_DEADLINE', '60'))
     }
 
-def create_mcp_server() -> FastMCP:
+def create_mcp_server(tool_deadline: float = 60.0) -> FastMCP:
     """Crear y configurar el servidor MCP"""
     try:
         mcp = FastMCP("evolution-api")
+        mcp.add_middleware(DeadlineMiddleware(tool_deadline))
         return mcp
     except Exception as e:
         logging.getLogger(__name__).critical(f"Failed to create MCP server: {str(e)}")
@@ -73,7 +84,11 @@ def register_routers(mcp: FastMCP) -> None:
         GroupRoutes(),
         ProxyRoutes(),
         SettingsRoutes(),
-        WebhookRoutes()
+        WebhookRoutes(),
+        DiagnosticsRoutes(),
+        SearchRoutes(),
+        ContactRoutes(),
+        OutboxRoutes()
     ]
 
     for router in routers:
@@ -93,7 +108,29 @@ async def run_sse_server(mcp: FastMCP, host: str, port: int) -> None:
     await asyncio.sleep(1)
     logger.info("Server initialization complete, ready to accept connections")
     
-    await mcp.run_async(transport="sse", host=host, port=port)
+    # Retomar los envíos que quedaron en la cola persistente
+    outbox = get_outbox()
+    if outbox is not None:
+        outbox.start()
+        logger.info("Send queue workers started")
+    # Retomar el temporizador de los envíos programados
+    schedule = get_message_schedule()
+    if schedule is not None:
+        schedule.start()
+        logger.info("Message schedule started")
+
+    try:
+        await mcp.run_async(transport="sse", host=host, port=port)
+    finally:
+        if schedule is not None:
+            await schedule.stop()
+        if outbox is not None:
+            await outbox.stop()
+        # Cerrar el pool de conexiones compartido hacia la Evolution API
+        await close_shared_client()
+        logger.info("Shared HTTP client closed")
+        # Parar los procesos de preparación de multimedia, si se llegaron a arrancar
+        media_preprocessor.shutdown(wait=False)
 
 def main() -> None:
     setup_logging()
@@ -109,7 +146,7 @@ def main() -> None:
         logger.info("Credentials loaded successfully")
         logger.info(f"SSE Server configuration: {config}")
         
-        mcp = create_mcp_server()
+        mcp = create_mcp_server(config['tool_deadline'])
         
         logger.info("Registering routers...")
         register_routers(mcp)
@@ -0,0 +1,24 @@
+import pytest
+from src.evolution.base_routes import ClientRegistry, client_registry
+from src.evolution.message.routes import MessageRoutes
+from src.evolution.message.client import MessageClient
+
+@pytest.fixture(autouse=True)
+def api_env(monkeypatch):
+    """Variables de entorno mínimas para construir clientes"""
+    monkeypatch.setenv("EVOLUTION_API_URL", "http://evolution.test")
+    monkeypatch.setenv("EVOLUTION_API_KEY", "test-key")
+    client_registry.clear()
+    yield
+    client_registry.clear()
+
+def test_registry_creates_each_client_once():
+    """El registro construye una sola instancia por clase de cliente"""
+    registry = ClientRegistry()
+    first = registry.get(MessageClient)
+    assert isinstance(first, MessageClient)
+    assert registry.get(MessageClient) is first
+
+def test_routers_share_registry_clients():
+    """Routers distintos del mismo dominio comparten el cliente"""
+    assert MessageRoutes().client is MessageRoutes().client
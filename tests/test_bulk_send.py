@@ -0,0 +1,121 @@
+import json
+import time
+import asyncio
+import httpx
+import pytest
+from src.evolution import http_client
+from src.evolution.message import bulk
+from src.evolution.message import client as message_client
+from src.evolution.message.bulk import BulkSender, enqueue_bulk, parse_recipient, render
+from src.evolution.message.client import MessageClient
+from src.evolution.rate_limit import SendRateLimiter
+from src.evolution.timeouts import deadline
+
+@pytest.fixture(autouse=True)
+def api_env(monkeypatch):
+    """Variables de entorno mínimas para construir clientes"""
+    monkeypatch.setenv("EVOLUTION_API_URL", "http://evolution.test")
+    monkeypatch.setenv("EVOLUTION_API_KEY", "test-key")
+    monkeypatch.setattr(message_client, "send_rate_limiter", SendRateLimiter(rate=0))
+
+class FakeEvolution:
+    """sendText simulado que registra el texto por número y la concurrencia máxima"""
+
+    def __init__(self, monkeypatch, latency=0.01, fail=()):
+        self.latency = latency
+        self.fail = set(fail)
+        self.texts = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        monkeypatch.setattr(http_client, "_shared_client", httpx.AsyncClient(transport=httpx.MockTransport(self.handle)))
+
+    async def handle(self, request):
+        body = json.loads(request.content)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        if body["number"] in self.fail:
+            return httpx.Response(400, json={"message": "not on WhatsApp"})
+        self.texts[body["number"]] = body["text"]
+        return httpx.Response(200, json={"key": {"id": f"ID{body['number']}"}, "message": {"conversation": body["text"]}})
+
+def text_sender(client, template="Hola {nombre}"):
+    async def send(number, variables):
+        return await client.send_text("test", number, render(template, variables))
+    return send
+
+def test_render_keeps_unknown_placeholders():
+    assert render("Hola {nombre}, pedido {pedido}", {"nombre": "Ana"}) == "Hola Ana, pedido {pedido}"
+    assert render("Precio: {precio}€", {"precio": 10}) == "Precio: 10€"
+    assert render(None, {"a": 1}) is None
+
+def test_parse_recipient_forms():
+    assert parse_recipient("5511999999999") == {"number": "5511999999999", "variables": {}}
+    assert parse_recipient({"number": "1", "nombre": "Ana"}) == {"number": "1", "variables": {"nombre": "Ana"}}
+    assert parse_recipient({"number": "1", "variables": {"nombre": "Ana"}})["variables"] == {"nombre": "Ana"}
+    with pytest.raises(ValueError):
+        parse_recipient({"nombre": "Ana"})
+
+async def test_bulk_send_renders_variables_and_summarises(monkeypatch):
+    """Cada destinatario recibe su texto y el resumen trae solo número, estado e ID"""
+    api = FakeEvolution(monkeypatch, fail={"300"})
+    recipients = [{"number": "100", "nombre": "Ana"}, {"number": "200", "variables": {"nombre": "Luis"}}, "300", "100", {}]
+    result = await BulkSender(concurrency=2).run(recipients, text_sender(MessageClient()))
+
+    assert api.texts == {"100": "Hola Ana", "200": "Hola Luis"}
+    assert (result["total"], result["sent"], result["failed"], result["skipped"], result["pending"]) == (5, 2, 1, 2, 0)
+    assert result["results"][0] == {"number": "100", "status": "sent", "id": "ID100"}
+    assert result["results"][2]["status"] == "failed"
+    assert result["results"][3] == {"number": "100", "status": "skipped", "error": "Duplicate recipient"}
+    assert result["pending_recipients"] == []
+
+    failures = await BulkSender(concurrency=2).run(["300", "400"], text_sender(MessageClient()), only_failures=True)
+    assert [r["number"] for r in failures["results"]] == ["300"]
+
+async def test_bulk_send_caps_concurrency(monkeypatch):
+    api = FakeEvolution(monkeypatch)
+    result = await BulkSender(concurrency=3).run([str(n) for n in range(30)], text_sender(MessageClient()))
+    assert result["sent"] == 30
+    assert api.max_in_flight == 3
+
+async def test_bulk_send_waits_for_rate_limit(monkeypatch):
+    """Si el limitador rechaza por espera excesiva, el trabajador espera y reintenta"""
+    FakeEvolution(monkeypatch, latency=0)
+    monkeypatch.setattr(message_client, "send_rate_limiter", SendRateLimiter(rate=50, burst=1, max_wait=0))
+    start = time.monotonic()
+    result = await BulkSender(concurrency=4).run([str(n) for n in range(10)], text_sender(MessageClient()))
+    assert result["sent"] == 10
+    assert time.monotonic() - start >= 9 / 50
+
+async def test_bulk_send_returns_pending_when_deadline_is_short(monkeypatch):
+    """Los destinatarios que no caben en el plazo quedan pendientes, sin marcarse como fallidos"""
+    monkeypatch.setattr(bulk, "DEADLINE_MARGIN", 0.05)
+    FakeEvolution(monkeypatch, latency=0)
+    monkeypatch.setattr(message_client, "send_rate_limiter", SendRateLimiter(rate=20, burst=1))
+    recipients = [{"number": str(n), "nombre": "x"} for n in range(20)]
+    with deadline(0.3):
+        result = await BulkSender(concurrency=2).run(recipients, text_sender(MessageClient()))
+    assert result["failed"] == 0
+    assert 0 < result["sent"] < 20
+    assert result["sent"] + result["pending"] == 20
+    assert result["pending_recipients"] == recipients[result["sent"]:]
+
+async def test_enqueue_bulk_queues_one_send_per_recipient():
+    """En modo cola cada destinatario válido se encola con su texto ya personalizado"""
+    batches = []
+
+    async def enqueue_many(items):
+        batches.append(items)
+        return list(range(10, 10 + len(items)))
+
+    result = await enqueue_bulk(
+        [{"number": "1", "nombre": "Ana"}, "1", "2"],
+        lambda number, variables: {"number": number, "text": render("Hola {nombre}", variables)},
+        enqueue_many
+    )
+    assert batches == [[{"number": "1", "text": "Hola Ana"}, {"number": "2", "text": "Hola {nombre}"}]]
+    assert (result["queued"], result["skipped"]) == (2, 1)
+    assert result["results"][2] == {"number": "2", "status": "queued", "queue_id": 11}
@@ -0,0 +1,77 @@
+import pytest
+from src.evolution import http_client
+from src.evolution.cache import MISSING, ResponseCache
+from src.evolution.settings.client import SettingsClient
+from src.evolution.profile.client import ProfileClient
+
+@pytest.fixture(autouse=True)
+def api_env(monkeypatch):
+    """Variables de entorno mínimas y caché limpia"""
+    monkeypatch.setenv("EVOLUTION_API_URL", "http://evolution.test")
+    monkeypatch.setenv("EVOLUTION_API_KEY", "test-key")
+    monkeypatch.setattr(http_client, "response_cache", ResponseCache())
+
+def test_ttl_rules_by_endpoint(monkeypatch):
+    """Solo se cachean los endpoints configurados"""
+    monkeypatch.setenv("EVOLUTION_API_CACHE_TTLS", "label/findLabels/*=0,chat/findChats/*=5")
+    cache = ResponseCache.from_env()
+    assert cache.ttl_for("/settings/find/sales") == 300
+    assert cache.ttl_for("label/findLabels/sales") is None
+    assert cache.ttl_for("chat/findChats/sales") == 5
+    assert cache.ttl_for("message/sendText/sales") is None
+
+def test_lru_eviction_and_expiry():
+    """Se expulsa la entrada menos usada y las caducadas no se devuelven"""
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", "settings/find/a", 1, ttl=60)
+    cache.set("b", "settings/find/b", 2, ttl=60)
+    assert cache.get("a") == 1
+    cache.set("c", "settings/find/c", 3, ttl=60)
+    assert cache.get("b") is MISSING
+    assert cache.evictions == 1
+
+    cache.set("d", "settings/find/d", 4, ttl=-1)
+    assert cache.get("d") is MISSING
+
+def test_invalidation_discards_in_flight_results():
+    """Una lectura iniciada antes de invalidar no guarda datos obsoletos"""
+    cache = ResponseCache()
+    generation = cache.generation
+    cache.invalidate("settings/find/sales")
+    cache.set("k", "settings/find/sales", "stale", ttl=60, generation=generation)
+    assert cache.get("k") is MISSING
+
+async def test_client_caches_invalidates_and_bypasses(monkeypatch):
+    """find_settings se cachea, set_settings invalida y bypass_cache fuerza la lectura"""
+    calls = []
+
+    async def fake_request_with_retries(self, method, endpoint, url, params, json, idempotent):
+        calls.append(endpoint)
+        return {"call": len(calls)}
+
+    monkeypatch.setattr(SettingsClient, "_request_with_retries", fake_request_with_retries)
+    client = SettingsClient()
+
+    assert await client.find_settings("sales") == {"call": 1}
+    assert await client.find_settings("sales") == {"call": 1}
+    assert await client.find_settings("sales", bypass_cache=True) == {"call": 2}
+
+    await client.set_settings("sales", reject_call=True)
+    assert await client.find_settings("sales") == {"call": 4}
+    assert await client.find_settings("sales") == {"call": 4}
+
+async def test_removing_profile_picture_invalidates_profile(monkeypatch):
+    """remove_profile_picture invalida el perfil cacheado igual que update_profile_picture"""
+    calls = []
+
+    async def fake_request_with_retries(self, method, endpoint, url, params, json, idempotent):
+        calls.append(endpoint)
+        return {"call": len(calls)}
+
+    monkeypatch.setattr(ProfileClient, "_request_with_retries", fake_request_with_retries)
+    client = ProfileClient()
+
+    assert await client.fetch_business_profile("sales", "5511999999999") == {"call": 1}
+    assert await client.fetch_business_profile("sales", "5511999999999") == {"call": 1}
+    await client.remove_profile_picture("sales")
+    assert await client.fetch_business_profile("sales", "5511999999999") == {"call": 3}
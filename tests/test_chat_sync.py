@@ -0,0 +1,116 @@
+import asyncio
+import pytest
+from src.evolution.chat.client import ChatClient
+from src.evolution.search.index import MessageIndex
+from src.evolution.search.sync import ChatSync, last_activity
+
+@pytest.fixture(autouse=True)
+def api_env(monkeypatch):
+    """Variables de entorno mínimas para construir clientes"""
+    monkeypatch.setenv("EVOLUTION_API_URL", "http://evolution.test")
+    monkeypatch.setenv("EVOLUTION_API_KEY", "test-key")
+
+@pytest.fixture
+def index(tmp_path):
+    """Índice en un directorio temporal"""
+    idx = MessageIndex(str(tmp_path / "messages.db"))
+    yield idx
+    idx.close()
+
+CHATS = [f"55119999900{i:02d}@s.whatsapp.net" for i in range(6)]
+
+class FakeEvolution:
+    """Mensajes en memoria servidos como findMessages/findChats (más recientes primero)"""
+
+    def __init__(self, per_chat=25):
+        self.messages = {jid: [] for jid in CHATS}
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fail_on_page = None
+        for jid in CHATS:
+            self.add(jid, per_chat)
+
+    def add(self, jid, count):
+        chat = self.messages[jid]
+        for _ in range(count):
+            n = len(chat)
+            chat.append({
+                "key": {"id": f"{jid[:13]}-{n}", "remoteJid": jid, "fromMe": False},
+                "messageTimestamp": 1_700_000_000 + n * 10,
+                "message": {"conversation": f"mensaje {n}"}
+            })
+
+    def install(self, monkeypatch):
+        fake = self
+
+        async def post(client, endpoint, json, params=None, idempotent=None, bypass_cache=False):
+            if endpoint.startswith("chat/findChats"):
+                return [
+                    {"remoteJid": jid, "lastMessage": chat[-1]} for jid, chat in fake.messages.items()
+                ]
+            fake.requests.append(json)
+            fake.in_flight += 1
+            fake.max_in_flight = max(fake.max_in_flight, fake.in_flight)
+            try:
+                await asyncio.sleep(0.001)
+                if fake.fail_on_page == json["page"]:
+                    raise RuntimeError("upstream down")
+                jid = json["where"]["key"]["remoteJid"]
+                since = json["where"].get("messageTimestamp", {}).get("gte", 0)
+                records = [m for m in reversed(fake.messages[jid]) if m["messageTimestamp"] >= since]
+                size, page = json["offset"], json["page"]
+                pages = -(-len(records) // size)
+                return {"messages": {"total": len(records), "pages": pages, "records": records[(page - 1) * size:page * size]}}
+            finally:
+                fake.in_flight -= 1
+
+        monkeypatch.setattr(ChatClient, "post", post)
+
+def test_last_activity_from_find_chats():
+    """La última actividad se toma del último mensaje o de updatedAt"""
+    assert last_activity({"lastMessage": {"messageTimestamp": "1700000000"}}) == 1_700_000_000
+    assert last_activity({"updatedAt": "2023-11-14T22:13:20.000Z"}) == 1_700_000_000
+    assert last_activity({}) is None
+
+async def test_second_sync_only_fetches_new_messages(index, monkeypatch):
+    """Tras la primera sincronización solo se piden los mensajes nuevos y se saltan los chats sin cambios"""
+    fake = FakeEvolution()
+    fake.install(monkeypatch)
+    sync = ChatSync(index, ChatClient(), concurrency=3, page_size=10)
+
+    first = await sync.sync_instance("ventas")
+    assert first["synced"] == 6 and first["messages_saved"] == 150
+    assert 1 < fake.max_in_flight <= 3
+
+    fake.add(CHATS[0], 3)
+    fake.requests.clear()
+    second = await sync.sync_instance("ventas")
+    assert second["skipped"] == 5 and second["synced"] == 1
+    # Los 3 nuevos más el mensaje de la marca, que se vuelve a pedir
+    assert second["messages_saved"] == 4
+    assert len(fake.requests) == 1
+    assert index.stats("ventas")["instances"]["ventas"]["messages"] == 153
+    state = index.sync_state("ventas", CHATS[0])[CHATS[0]]
+    assert state["high_water"] == 1_700_000_270
+
+async def test_interrupted_sync_resumes_from_checkpoint(index, monkeypatch):
+    """Si una sincronización falla a medias se retoma desde el último lote guardado"""
+    fake = FakeEvolution(per_chat=40)
+    fake.install(monkeypatch)
+    sync = ChatSync(index, ChatClient(), concurrency=1, page_size=10)
+
+    fake.fail_on_page = 3
+    result = await sync.sync_instance("ventas", remote_jids=[CHATS[1]])
+    assert list(result["failed"]) == [CHATS[1]]
+    state = index.sync_state("ventas")[CHATS[1]]
+    assert state["resume_cursor"] and state["high_water"] == 0
+    assert index.stats("ventas")["instances"]["ventas"]["messages"] == 20
+
+    fake.fail_on_page = None
+    fake.requests.clear()
+    result = await sync.sync_instance("ventas", remote_jids=[CHATS[1]])
+    assert result["messages_saved"] == 20
+    assert [request["page"] for request in fake.requests] == [3, 4]
+    state = index.sync_state("ventas")[CHATS[1]]
+    assert state["resume_cursor"] is None and state["high_water"] == 1_700_000_390
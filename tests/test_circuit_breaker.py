@@ -0,0 +1,82 @@
+import httpx
+import pytest
+from src.evolution import http_client
+from src.evolution.http_client import EvolutionAPIClient, EvolutionAPIError
+from src.evolution.retry import RetryBudget
+from src.evolution.circuit_breaker import CircuitBreaker, CircuitBreakerRegistry, instance_from_endpoint
+
+@pytest.fixture(autouse=True)
+def api_env(monkeypatch):
+    """Variables de entorno mínimas, sin reintentos y circuitos nuevos"""
+    monkeypatch.setenv("EVOLUTION_API_URL", "http://evolution.test")
+    monkeypatch.setenv("EVOLUTION_API_KEY", "test-key")
+    monkeypatch.setenv("EVOLUTION_API_MAX_RETRIES", "0")
+    monkeypatch.setattr(http_client, "retry_budget", RetryBudget())
+    monkeypatch.setattr(http_client, "circuit_breakers", CircuitBreakerRegistry(failure_threshold=2, reset_timeout=60))
+
+class StatusClient:
+    """Cliente HTTP falso que responde siempre con el mismo código"""
+    is_closed = False
+
+    def __init__(self, status):
+        self.status = status
+        self.calls = 0
+
+    async def request(self, method, url, **kwargs):
+        self.calls += 1
+        return httpx.Response(self.status, json={}, request=httpx.Request(method, url))
+
+def test_instance_from_endpoint():
+    """El nombre de instancia es el tercer segmento de la ruta"""
+    assert instance_from_endpoint("/message/sendText/sales") == "sales"
+    assert instance_from_endpoint("instance/fetchInstances") is None
+
+def test_breaker_state_transitions(monkeypatch):
+    """closed -> open -> half_open -> closed"""
+    breaker = CircuitBreaker("sales", failure_threshold=2, reset_timeout=10)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+    breaker.opened_at -= 10
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_half_open_failure_reopens():
+    """Un fallo en semiabierto vuelve a abrir el circuito"""
+    breaker = CircuitBreaker("sales", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+async def test_open_breaker_fails_fast(monkeypatch):
+    """Con el circuito abierto no se contacta al upstream"""
+    fake = StatusClient(503)
+    monkeypatch.setattr(http_client, "_shared_client", fake)
+    client = EvolutionAPIClient()
+    for _ in range(2):
+        with pytest.raises(EvolutionAPIError):
+            await client.get("instance/connectionState/sales")
+    with pytest.raises(EvolutionAPIError) as exc:
+        await client.get("instance/connectionState/sales")
+    assert "Circuit breaker open" in exc.value.detail
+    assert fake.calls == 2
+
+    # Otras instancias no se ven afectadas
+    fake.status = 200
+    assert await client.get("instance/connectionState/support") == {}
+
+async def test_client_errors_do_not_open_breaker(monkeypatch):
+    """Los errores 4xx no cuentan como fallos de la instancia"""
+    monkeypatch.setattr(http_client, "_shared_client", StatusClient(404))
+    client = EvolutionAPIClient()
+    for _ in range(3):
+        with pytest.raises(EvolutionAPIError):
+            await client.get("instance/connectionState/sales")
+    assert http_client.circuit_breakers.get("sales").state == CircuitBreaker.CLOSED
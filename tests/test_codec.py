@@ -0,0 +1,36 @@
+import json
+import pytest
+from src.evolution import codec
+from src.evolution.codec import JSONCodec, create_codec, get_codec
+
+SAMPLE = {"number": "5511999999999", "text": "¡Hola! 😀", "options": {"delay": 0, "linkPreview": False}}
+
+@pytest.fixture(autouse=True)
+def reset_codec(monkeypatch):
+    """Codec compartido sin inicializar en cada prueba"""
+    monkeypatch.setattr(codec, "_codec", None)
+
+def test_stdlib_roundtrip_is_compact_utf8():
+    """El codec estándar produce JSON compacto en UTF-8"""
+    data = JSONCodec().dumps(SAMPLE)
+    assert data == json.dumps(SAMPLE, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    assert JSONCodec().loads(data) == SAMPLE
+
+def test_orjson_roundtrip_matches_stdlib():
+    """orjson produce y lee el mismo JSON que la biblioteca estándar"""
+    pytest.importorskip("orjson")
+    fast = create_codec("orjson")
+    assert fast.loads(JSONCodec().dumps(SAMPLE)) == SAMPLE
+    assert json.loads(fast.dumps(SAMPLE)) == SAMPLE
+
+def test_unavailable_codec_falls_back_to_stdlib(monkeypatch):
+    """Un codec desconocido o no instalado cae en la biblioteca estándar"""
+    monkeypatch.setenv("EVOLUTION_API_JSON_CODEC", "ujson")
+    assert get_codec().name == "stdlib"
+
+def test_auto_skips_missing_libraries(monkeypatch):
+    """En modo auto se salta un codec cuya biblioteca no está instalada"""
+    def missing():
+        raise ImportError("not installed")
+    monkeypatch.setattr(codec, "CODECS", {"missing": missing, "stdlib": JSONCodec})
+    assert create_codec("auto").name == "stdlib"
@@ -0,0 +1,54 @@
+import asyncio
+import pytest
+from src.evolution.concurrency import AdaptiveConcurrencyLimiter, LimiterTimeout
+
+async def test_excess_requests_queue_until_release():
+    """Las peticiones que exceden el límite esperan en cola FIFO"""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_wait=1)
+    await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.stats()["queue_depth"] == 1
+
+    limiter.release(0.01)
+    await waiter
+    assert limiter.in_flight == 1
+    assert limiter.stats()["queue_depth"] == 0
+
+async def test_queue_wait_is_bounded():
+    """Superada la espera máxima se rechaza la petición"""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_wait=0.01)
+    await limiter.acquire()
+    with pytest.raises(LimiterTimeout):
+        await limiter.acquire()
+    assert limiter.rejected == 1
+    assert limiter.stats()["queue_depth"] == 0
+    assert limiter.in_flight == 1
+
+def test_limit_grows_additively_with_stable_latency():
+    """Con latencia estable y el límite en uso, el límite crece"""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=10)
+    for _ in range(40):
+        limiter.in_flight = 4
+        limiter.release(0.01)
+    assert limiter.limit > 4
+
+def test_limit_decreases_on_latency_rise_and_errors():
+    """Subidas de latencia o errores reducen el límite multiplicativamente"""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=10, backoff_ratio=0.5)
+    limiter.in_flight = 2
+    limiter.release(0.01)
+    limiter.release(1.0)
+    assert limiter.limit == 5
+
+    limiter._last_decrease = 0
+    limiter.in_flight = 1
+    limiter.release(dropped=True)
+    assert limiter.limit == 2.5
+
+def test_disabled_limiter_never_queues():
+    """Desactivado, el limitador solo cuenta peticiones en curso"""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, enabled=False)
+    asyncio.run(limiter.acquire())
+    asyncio.run(limiter.acquire())
+    assert limiter.in_flight == 2
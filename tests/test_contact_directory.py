@@ -0,0 +1,123 @@
+import asyncio
+import pytest
+from src.evolution.contacts.directory import (
+    ContactDirectory,
+    ContactDirectoryRegistry,
+    ContactEntry,
+    normalize_name
+)
+
+CONTACTS = [
+    {"remoteJid": "5511999990001@s.whatsapp.net", "pushName": "María López"},
+    {"remoteJid": "5511999990002@s.whatsapp.net", "pushName": "Mario Pérez"},
+    {"remoteJid": "5521988887777@s.whatsapp.net", "pushName": "Ana María Souza"},
+    {"remoteJid": "120363000000000001@g.us", "name": "Equipo Ventas"},
+    {"remoteJid": "5511999990003@s.whatsapp.net"},
+    {"id": "sin-jid"}
+]
+
+@pytest.fixture
+async def registries():
+    """Crea registros y cancela al terminar sus recargas en segundo plano"""
+    created = []
+
+    def make(ttl):
+        registry = ContactDirectoryRegistry(ttl=ttl)
+        created.append(registry)
+        return registry
+
+    yield make
+    for registry in created:
+        await registry.close()
+
+def build(records=CONTACTS):
+    entries = [ContactEntry.from_contact(c) for c in records]
+    return ContactDirectory([e for e in entries if e is not None])
+
+class FakeClient:
+    """Cliente que sirve contactos como stream_contacts"""
+
+    def __init__(self, records):
+        self.records = records
+        self.calls = 0
+        self.fail = False
+
+    async def stream_contacts(self, instance_name, where=None, limit=None):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        for record in self.records:
+            yield record
+
+def test_entry_from_contact():
+    """Número solo para JIDs de usuario; registros sin JID se descartan"""
+    person = ContactEntry.from_contact(CONTACTS[0])
+    assert (person.jid, person.number, person.name) == ("5511999990001@s.whatsapp.net", "5511999990001", "María López")
+    assert ContactEntry.from_contact(CONTACTS[3]).number is None
+    assert ContactEntry.from_contact(CONTACTS[5]) is None
+    assert not hasattr(person, "__dict__")
+
+def test_normalize_name():
+    assert normalize_name("MARÍA Ñandú") == "maria nandu"
+
+def test_lookup_by_jid_and_number():
+    """JID exacto, número con formato y número sin código de país"""
+    directory = build()
+    assert len(directory) == 5
+    assert [e.name for e in directory.lookup("120363000000000001@g.us")] == ["Equipo Ventas"]
+    assert directory.lookup("desconocido@s.whatsapp.net") == []
+    assert [e.jid for e in directory.lookup("+55 (11) 99999-0002")] == ["5511999990002@s.whatsapp.net"]
+    assert [e.jid for e in directory.lookup("21 98888-7777")] == ["5521988887777@s.whatsapp.net"]
+    assert directory.lookup("99999-0009") == []
+
+def test_lookup_by_name_prefix():
+    """Prefijo de cualquier palabra, sin tildes ni mayúsculas, y varias palabras"""
+    directory = build()
+    assert {e.name for e in directory.lookup("mari")} == {"María López", "Mario Pérez", "Ana María Souza"}
+    assert {e.name for e in directory.lookup("MARIA")} == {"Ana María Souza", "María López"}
+    assert [e.name for e in directory.lookup("mar lop")] == ["María López"]
+    assert [e.name for e in directory.lookup("ventas")] == ["Equipo Ventas"]
+    assert len(directory.lookup("mari", limit=2)) == 2
+    assert directory.lookup("zz") == []
+    assert directory.lookup("  ") == []
+
+def test_lookup_by_name_with_punctuation():
+    """Las palabras del resto de la búsqueda se comparan igual que las indexadas"""
+    directory = build(CONTACTS + [{"remoteJid": "5511999990009@s.whatsapp.net", "pushName": "Ana-María López"}])
+    for query in ("lopez maria", "maria lopez", "ana-maria", "lop ana mar", "lopez lopez"):
+        assert [e.name for e in directory.lookup(query) if e.name.startswith("Ana-")] == ["Ana-María López"], query
+    assert [e.name for e in directory.lookup("maria lopez")] == ["María López", "Ana-María López"]
+
+async def test_registry_loads_once_and_coalesces(registries):
+    """Consultas simultáneas de una instancia comparten una sola carga"""
+    registry = registries(ttl=60)
+    client = FakeClient(CONTACTS)
+    first, second = await asyncio.gather(registry.get("inst", client), registry.get("inst", client))
+    assert first is second
+    assert client.calls == 1
+    assert await registry.get("inst", client) is first
+    assert client.calls == 1
+    assert registry.stats()["instances"]["inst"]["contacts"] == 5
+
+async def test_registry_refreshes_in_background(registries):
+    """Un directorio caducado se sirve mientras se recarga en segundo plano"""
+    registry = registries(ttl=0)
+    client = FakeClient(CONTACTS)
+    old = await registry.get("inst", client)
+    client.records = CONTACTS + [{"remoteJid": "5511900000000@s.whatsapp.net", "pushName": "Nuevo"}]
+    assert await registry.get("inst", client) is old
+    await asyncio.sleep(0.05)
+    fresh = await registry.get("inst", client)
+    assert fresh is not old
+    assert [e.name for e in fresh.lookup("nuevo")] == ["Nuevo"]
+
+async def test_registry_keeps_directory_when_refresh_fails(registries):
+    registry = registries(ttl=0)
+    client = FakeClient(CONTACTS)
+    old = await registry.get("inst", client)
+    client.fail = True
+    assert await registry.get("inst", client) is old
+    await asyncio.sleep(0.05)
+    assert registry.failed_refreshes == 1
+    assert registry._directories["inst"] is old
@@ -0,0 +1,109 @@
+import asyncio
+import httpx
+import pytest
+from src.evolution import http_client
+from src.evolution.http_client import EvolutionAPIClient, get_shared_client, close_shared_client
+
+@pytest.fixture(autouse=True)
+def api_env(monkeypatch):
+    """Variables de entorno mínimas para construir clientes"""
+    monkeypatch.setenv("EVOLUTION_API_URL", "http://evolution.test")
+    monkeypatch.setenv("EVOLUTION_API_KEY", "test-key")
+
+async def test_shared_client_is_reused():
+    """El cliente HTTP compartido se reutiliza entre llamadas"""
+    first = get_shared_client()
+    assert get_shared_client() is first
+    await close_shared_client()
+    assert first.is_closed
+    second = get_shared_client()
+    assert second is not first
+    await close_shared_client()
+
+async def test_pool_limits_from_env(monkeypatch):
+    """Los límites del pool se leen de variables de entorno"""
+    monkeypatch.setenv("EVOLUTION_API_MAX_CONNECTIONS", "7")
+    monkeypatch.setenv("EVOLUTION_API_KEEPALIVE_EXPIRY", "2.5")
+    limits = http_client.get_pool_limits()
+    assert limits.max_connections == 7
+    assert limits.keepalive_expiry == 2.5
+
+async def test_domain_clients_share_connection_pool(monkeypatch):
+    """Todas las peticiones pasan por el mismo cliente compartido"""
+    seen = []
+
+    class FakeResponse:
+        content = b'{"ok": true}'
+
+        def raise_for_status(self):
+            pass
+
+    class FakeClient:
+        is_closed = False
+
+        async def request(self, **kwargs):
+            seen.append(kwargs["url"])
+            return FakeResponse()
+
+    fake = FakeClient()
+    monkeypatch.setattr(http_client, "_shared_client", fake)
+    await EvolutionAPIClient().get("instance/fetchInstances")
+    await EvolutionAPIClient().get("label/findLabels/test")
+    assert seen == [
+        "http://evolution.test/instance/fetchInstances",
+        "http://evolution.test/label/findLabels/test"
+    ]
+
+async def test_http2_switch(monkeypatch):
+    """EVOLUTION_API_HTTP2 activa HTTP/2 en el cliente compartido"""
+    monkeypatch.setenv("EVOLUTION_API_HTTP2", "true")
+    monkeypatch.setattr(http_client, "_http2_available", lambda: True)
+    captured = {}
+    monkeypatch.setattr(http_client.httpx, "AsyncClient", lambda **kwargs: captured.update(kwargs) or kwargs)
+    monkeypatch.setattr(http_client, "_shared_client", None)
+    get_shared_client()
+    assert captured["http2"] is True
+    monkeypatch.setattr(http_client, "_shared_client", None)
+
+async def test_connection_stats_without_client(monkeypatch):
+    """Sin cliente activo las estadísticas se devuelven a cero"""
+    monkeypatch.setattr(http_client, "_shared_client", None)
+    stats = http_client.get_connection_stats()
+    assert stats["connections"] == 0
+    assert stats["active_streams"] == 0
+
+async def test_connection_stats_with_real_client(monkeypatch):
+    """Con un AsyncClient real se leen las conexiones del pool (detecta cambios internos de httpx)"""
+    async def handle(reader, writer):
+        await reader.readuntil(b"\r\n\r\n")
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: 2\r\n\r\n{}")
+        await writer.drain()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    client = httpx.AsyncClient()
+    monkeypatch.setattr(http_client, "_shared_client", client)
+    try:
+        await client.get(f"http://127.0.0.1:{port}/")
+        stats = http_client.get_connection_stats()
+    finally:
+        await client.aclose()
+        server.close()
+        await server.wait_closed()
+    assert stats["partial"] is False
+    assert (stats["connections"], stats["http1_connections"], stats["idle_connections"]) == (1, 1, 1)
+
+def test_connection_stats_degrade_when_internals_change(monkeypatch):
+    class Connection:
+        def info(self):
+            raise AttributeError("_network_stream")
+
+    class Client:
+        is_closed = False
+        _transport = type("Transport", (), {"_pool": type("Pool", (), {"connections": [Connection()]})()})()
+
+    monkeypatch.setattr(http_client, "_shared_client", Client())
+    stats = http_client.get_connection_stats()
+    assert (stats["connections"], stats["partial"]) == (1, True)
+    monkeypatch.setattr(http_client, "_shared_client", type("Client", (), {"is_closed": False})())
+    assert http_client.get_connection_stats()["partial"] is True
@@ -0,0 +1,139 @@
+import json
+import time
+import asyncio
+import httpx
+import pytest
+from src.evolution import http_client
+from src.evolution import idempotency
+from src.evolution.http_client import EvolutionAPIError
+from src.evolution.idempotency import IdempotencyConflict, IdempotencyOutcomeUnknown, IdempotencyStore, fingerprint
+from src.evolution.message import client as message_client
+from src.evolution.message import routes as message_routes
+from src.evolution.message.routes import MessageRoutes
+from src.evolution.outbox import worker
+from src.evolution.rate_limit import SendRateLimiter
+
+@pytest.fixture(autouse=True)
+def api_env(monkeypatch):
+    """Variables de entorno mínimas para construir clientes"""
+    monkeypatch.setenv("EVOLUTION_API_URL", "http://evolution.test")
+    monkeypatch.setenv("EVOLUTION_API_KEY", "test-key")
+    monkeypatch.delenv("EVOLUTION_SEND_QUEUE_PATH", raising=False)
+    monkeypatch.setattr(message_client, "send_rate_limiter", SendRateLimiter(rate=0))
+    monkeypatch.setattr(worker, "_outbox", None)
+    monkeypatch.setattr(message_routes, "idempotency_store", IdempotencyStore())
+
+class Counter:
+    """Envío simulado que tarda ``delay`` segundos y devuelve un id distinto cada vez"""
+
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return {"key": {"id": f"MSG{self.calls}"}}
+
+async def test_repeated_key_returns_original_result():
+    store = IdempotencyStore()
+    send = Counter()
+    first = await store.run("ventas:pedido-1", fingerprint("send_text", "hola"), send)
+    again = await store.run("ventas:pedido-1", fingerprint("send_text", "hola"), send)
+    assert first == again == {"key": {"id": "MSG1"}}
+    assert send.calls == 1
+    assert (store.stats()["executed"], store.stats()["replayed"]) == (1, 1)
+    with pytest.raises(IdempotencyConflict):
+        await store.run("ventas:pedido-1", fingerprint("send_text", "adiós"), send)
+
+async def test_concurrent_calls_wait_for_the_first():
+    store = IdempotencyStore()
+    send = Counter(delay=0.05)
+    results = await asyncio.gather(*(store.run("k", "same", send) for _ in range(5)))
+    assert send.calls == 1
+    assert all(result is results[0] for result in results)
+    assert store.stats()["joined"] == 4
+
+async def test_cancelled_caller_does_not_abort_the_send():
+    """Un reintento tras un timeout del llamante se une al envío que sigue en curso"""
+    store = IdempotencyStore()
+    send = Counter(delay=0.05)
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(store.run("k", "same", send), 0.01)
+    assert await store.run("k", "same", send) == {"key": {"id": "MSG1"}}
+    assert send.calls == 1
+
+async def test_failures_are_not_remembered(tmp_path):
+    """Solo se vuelve a enviar si la petición no llegó a Evolution"""
+    store = IdempotencyStore()
+    failing = Counter(delay=0.01, error=EvolutionAPIError(503, "connection refused", request_sent=False))
+    results = await asyncio.gather(*(store.run("k", "same", failing) for _ in range(2)), return_exceptions=True)
+    assert [result.detail for result in results] == ["connection refused", "connection refused"]
+    assert failing.calls == 1
+    assert await store.run("k", "same", Counter()) == {"key": {"id": "MSG1"}}
+
+    # Un timeout de respuesta o un 5xx pueden haber entregado el mensaje: la clave lo recuerda
+    path = str(tmp_path / "idempotency.db")
+    for store in (IdempotencyStore(), IdempotencyStore(path=path)):
+        ambiguous = Counter(delay=0.01, error=EvolutionAPIError(504, "read timeout"))
+        results = await asyncio.gather(*(store.run("k", "same", ambiguous) for _ in range(2)), return_exceptions=True)
+        assert all(isinstance(result, IdempotencyOutcomeUnknown) for result in results)
+        assert "read timeout" in str(results[0])
+        retry = Counter()
+        with pytest.raises(IdempotencyOutcomeUnknown):
+            await store.run("k", "same", retry)
+        assert (ambiguous.calls, retry.calls, store.stats()["unknown_outcome"]) == (1, 0, 1)
+    # Otro proceso ve el mismo desenlace desconocido
+    with pytest.raises(IdempotencyOutcomeUnknown):
+        await IdempotencyStore(path=path).run("k", "same", retry)
+    assert retry.calls == 0
+
+async def test_lru_and_ttl_eviction(monkeypatch):
+    store = IdempotencyStore(ttl=60, max_entries=2)
+    send = Counter()
+    for key in ("a", "b", "a", "c"):
+        await store.run(key, "same", send)
+    # "b" era la menos usada: se expulsa y vuelve a enviarse
+    assert send.calls == 3
+    await store.run("b", "same", send)
+    assert send.calls == 4
+    assert store.stats()["evictions"] == 2
+
+    now = time.time()
+    monkeypatch.setattr(idempotency.time, "time", lambda: now + 61)
+    await store.run("c", "same", send)
+    assert send.calls == 5
+
+async def test_sqlite_store_is_shared_between_processes(tmp_path):
+    """Dos almacenes sobre el mismo fichero se comportan como dos procesos"""
+    path = str(tmp_path / "idempotency.db")
+    first, second = IdempotencyStore(path=path), IdempotencyStore(path=path)
+    slow, other = Counter(delay=0.3), Counter()
+    task = asyncio.create_task(first.run("k", "same", slow))
+    await asyncio.sleep(0.1)
+    # El segundo proceso espera al envío en curso del primero en lugar de repetirlo
+    assert await second.run("k", "same", other) == {"key": {"id": "MSG1"}}
+    assert await task == {"key": {"id": "MSG1"}}
+    assert (slow.calls, other.calls) == (1, 0)
+    with pytest.raises(IdempotencyConflict):
+        await IdempotencyStore(path=path).run("k", "different", other)
+
+async def test_send_tools_deduplicate_by_key(monkeypatch):
+    sent = []
+
+    def handler(request):
+        sent.append(json.loads(request.content))
+        return httpx.Response(200, json={"key": {"id": f"MSG{len(sent)}"}})
+
+    monkeypatch.setattr(http_client, "_shared_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    routes = MessageRoutes()
+    first = await routes._send("send_text", "ventas", number="1", text="hola", idempotency_key="pedido-1")
+    again = await routes._send("send_text", "ventas", number="1", text="hola", idempotency_key="pedido-1")
+    # La misma clave en otra instancia es otra llamada
+    other = await routes._send("send_text", "soporte", number="1", text="hola", idempotency_key="pedido-1")
+    assert first == again == {"key": {"id": "MSG1"}}
+    assert other == {"key": {"id": "MSG2"}}
+    assert len(sent) == 2
@@ -0,0 +1,133 @@
+import os
+import json
+import base64
+import asyncio
+import hashlib
+import httpx
+import pytest
+from src.evolution import http_client
+from src.evolution.chat.client import ChatClient
+from src.evolution.media.cache import MediaCache, file_extension
+
+@pytest.fixture(autouse=True)
+def api_env(monkeypatch):
+    """Variables de entorno mínimas para construir clientes"""
+    monkeypatch.setenv("EVOLUTION_API_URL", "http://evolution.test")
+    monkeypatch.setenv("EVOLUTION_API_KEY", "test-key")
+
+@pytest.fixture
+def cache(tmp_path):
+    """Caché en un directorio temporal"""
+    media = MediaCache(str(tmp_path / "media"), max_bytes=10_000)
+    yield media
+    media.close()
+
+def downloader(content, calls, fail=False, metadata=None):
+    """Descarga simulada con la forma de ChatClient.stream_media"""
+    async def download():
+        calls.append(1)
+        for i in range(0, len(content), 1000):
+            await asyncio.sleep(0)
+            yield content[i:i + 1000]
+            if fail:
+                raise RuntimeError("conexión cortada")
+        yield metadata or {"mimetype": "image/jpeg", "fileName": "foto.JPG", "base64": None}
+    return download
+
+async def test_fetch_stores_file_and_hits(cache):
+    """La primera llamada descarga a disco; la segunda se sirve desde la caché"""
+    content = os.urandom(3000)
+    calls = []
+    first = await cache.fetch("inst", "MSG1", downloader(content, calls))
+    assert first["cached"] is False
+    assert first["handle"] == hashlib.sha256(content).hexdigest()
+    assert first["path"].endswith(".jpg")
+    assert "base64" not in first
+    with open(first["path"], "rb") as f:
+        assert f.read() == content
+
+    second = await cache.fetch("inst", "MSG1", downloader(content, calls))
+    assert second["cached"] is True
+    assert second["path"] == first["path"]
+    assert len(calls) == 1
+    assert cache.blob_path(first["handle"]) == first["path"]
+    assert cache.stats()["hit_rate"] == 0.5
+
+async def test_same_content_stored_once(cache):
+    """Dos mensajes con el mismo contenido comparten fichero"""
+    content = os.urandom(2000)
+    a = await cache.fetch("inst", "A", downloader(content, []))
+    b = await cache.fetch("inst", "B", downloader(content, []))
+    assert a["path"] == b["path"]
+    stats = cache.stats()
+    assert (stats["entries"], stats["files"], stats["size_bytes"]) == (2, 1, 2000)
+
+async def test_concurrent_fetches_coalesce(cache):
+    calls = []
+    content = os.urandom(5000)
+    results = await asyncio.gather(*(cache.fetch("inst", "MSG", downloader(content, calls)) for _ in range(5)))
+    assert len(calls) == 1
+    assert {r["handle"] for r in results} == {hashlib.sha256(content).hexdigest()}
+
+async def test_lru_eviction(cache):
+    """Al superar el límite se borran los ficheros usados hace más tiempo"""
+    entries = {}
+    for name in ("A", "B", "C"):
+        entries[name] = await cache.fetch("inst", name, downloader(os.urandom(3000), []))
+    await cache.fetch("inst", "A", downloader(b"", []))  # A pasa a ser el más reciente
+    await cache.fetch("inst", "D", downloader(os.urandom(3000), []))
+    assert not os.path.exists(entries["B"]["path"])
+    assert os.path.exists(entries["A"]["path"])
+    assert cache.lookup("inst", "B") is None
+    stats = cache.stats()
+    assert stats["size_bytes"] <= 10_000
+    assert stats["evictions"] == 1
+
+async def test_failed_download_leaves_nothing(cache):
+    with pytest.raises(RuntimeError):
+        await cache.fetch("inst", "X", downloader(os.urandom(3000), [], fail=True))
+    assert os.listdir(os.path.join(cache.directory, "tmp")) == []
+    assert cache.lookup("inst", "X") is None
+
+async def test_missing_file_is_downloaded_again(cache):
+    calls = []
+    content = os.urandom(1000)
+    entry = await cache.fetch("inst", "M", downloader(content, calls))
+    os.remove(entry["path"])
+    again = await cache.fetch("inst", "M", downloader(content, calls))
+    assert again["cached"] is False
+    assert os.path.exists(again["path"])
+    assert len(calls) == 2
+    assert cache.stats()["size_bytes"] == 1000
+
+def test_file_extension():
+    assert file_extension({"fileName": "informe.PDF"}) == ".pdf"
+    assert file_extension({"fileName": "sin extension", "mimetype": "application/pdf; charset=binary"}) == ".pdf"
+    assert file_extension({}) == ""
+
+async def test_stream_media_from_api(monkeypatch, cache):
+    """stream_media decodifica la respuesta de getBase64FromMediaMessage mientras llega"""
+    content = os.urandom(50_000)
+    body = json.dumps({
+        "mediaType": "videoMessage",
+        "mimetype": "video/mp4",
+        "base64": base64.b64encode(content).decode("ascii")
+    }).encode()
+
+    async def chunks():
+        for i in range(0, len(body), 4096):
+            yield body[i:i + 4096]
+
+    def handler(request):
+        assert request.url.path == "/chat/getBase64FromMediaMessage/inst"
+        assert json.loads(request.content) == {"message": {"key": {"id": "VID"}}, "convertToMp4": True}
+        return httpx.Response(200, content=chunks())
+
+    monkeypatch.setattr(http_client, "_shared_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    client = ChatClient()
+    entry = await cache.fetch("inst", "VID", lambda: client.stream_media("inst", "VID", True), variant="mp4")
+    assert entry["mediaType"] == "videoMessage"
+    assert entry["size"] == len(content)
+    assert entry["path"].endswith(".mp4")
+    with open(entry["path"], "rb") as f:
+        assert f.read() == content
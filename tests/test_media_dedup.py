@@ -0,0 +1,134 @@
+import os
+import json
+import base64
+import asyncio
+import httpx
+import pytest
+from src.evolution import http_client
+from src.evolution.media.dedup import UploadRegistry, base64_digest, file_digest, response_media_url
+from src.evolution.media.upload import FileUpload
+from src.evolution.message import client as message_client
+from src.evolution.message.client import MessageClient
+from src.evolution.rate_limit import SendRateLimiter
+
+CONTENT = b"%PDF-1.4 " + bytes(range(256)) * 400
+ENCODED = base64.b64encode(CONTENT).decode("ascii")
+STORED_URL = "https://s3.example.com/evolution/folleto.pdf"
+
+@pytest.fixture(autouse=True)
+def api_env(monkeypatch):
+    """Variables de entorno mínimas para construir clientes"""
+    monkeypatch.setenv("EVOLUTION_API_URL", "http://evolution.test")
+    monkeypatch.setenv("EVOLUTION_API_KEY", "test-key")
+    monkeypatch.setattr(message_client, "send_rate_limiter", SendRateLimiter(rate=0))
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Registro nuevo para cada prueba"""
+    fresh = UploadRegistry(max_entries=10, ttl=60)
+    monkeypatch.setattr(message_client, "upload_registry", fresh)
+    return fresh
+
+class FakeEvolution:
+    """Evolution API simulada: guarda cada envío y devuelve mediaUrl si hay S3"""
+
+    def __init__(self, monkeypatch, with_s3=True):
+        self.sent = []
+        self.with_s3 = with_s3
+        self.reject_urls = False
+        monkeypatch.setattr(http_client, "_shared_client", httpx.AsyncClient(transport=httpx.MockTransport(self.handle)))
+
+    async def handle(self, request):
+        await request.aread()
+        await asyncio.sleep(0.01)
+        if request.headers["content-type"].startswith("multipart"):
+            self.sent.append(("bytes", len(request.content)))
+        else:
+            body = json.loads(request.content)
+            value = body.get("media") or body.get("audio") or body.get("sticker") or body.get("video")
+            if value.startswith("http"):
+                self.sent.append(("url", value))
+                if self.reject_urls:
+                    return httpx.Response(400, json={"message": "Failed to download media"})
+            else:
+                self.sent.append(("bytes", len(value)))
+        message = {"documentMessage": {}, **({"mediaUrl": STORED_URL} if self.with_s3 else {})}
+        return httpx.Response(200, json={"key": {"id": "SENT"}, "message": message})
+
+def test_digests_match_across_forms(tmp_path):
+    """La huella del base64 (con o sin data URI) coincide con la del fichero"""
+    path = tmp_path / "folleto.pdf"
+    path.write_bytes(CONTENT)
+    assert base64_digest(ENCODED) == file_digest(str(path))
+    assert base64_digest("data:application/pdf;base64," + ENCODED) == file_digest(str(path))
+    assert base64_digest(ENCODED)[1] == len(CONTENT)
+
+def test_response_media_url():
+    assert response_media_url({"message": {"mediaUrl": STORED_URL}}) == STORED_URL
+    assert response_media_url({"mediaUrl": STORED_URL}) == STORED_URL
+    assert response_media_url({"message": {"imageMessage": {"url": "https://mmg.whatsapp.net/x.enc"}}}) is None
+    assert response_media_url(None) is None
+
+async def test_repeat_sends_use_stored_url(monkeypatch, registry, tmp_path):
+    """Tras el primer envío, el mismo contenido se manda por URL, venga en base64 o en fichero"""
+    api = FakeEvolution(monkeypatch)
+    client = MessageClient()
+    await client.send_media("inst", "5511999990001", "document", ENCODED, filename="folleto.pdf")
+    await client.send_media("inst", "5511999990002", "document", ENCODED, filename="folleto.pdf")
+    path = tmp_path / "folleto.pdf"
+    path.write_bytes(CONTENT)
+    await client.send_media_file("inst", "5511999990003", FileUpload(path=str(path)))
+    assert [kind for kind, _ in api.sent] == ["bytes", "url", "url"]
+    stats = registry.stats()
+    assert (stats["hits"], stats["misses"], stats["bytes_saved"]) == (2, 1, 2 * len(CONTENT))
+    assert stats["hit_rate"] == 0.667
+
+async def test_urls_are_not_hashed(monkeypatch, registry):
+    api = FakeEvolution(monkeypatch)
+    await MessageClient().send_media("inst", "55", "image", "https://example.com/a.jpg")
+    assert api.sent == [("url", "https://example.com/a.jpg")]
+    assert registry.stats()["misses"] == 0
+
+async def test_concurrent_sends_upload_once(monkeypatch, registry):
+    """Los envíos simultáneos del mismo contenido esperan a la URL del primero"""
+    api = FakeEvolution(monkeypatch)
+    client = MessageClient()
+    await asyncio.gather(*(client.send_sticker("inst", f"55{i}", ENCODED) for i in range(8)))
+    assert [kind for kind, _ in api.sent].count("bytes") == 1
+    assert registry.stats()["coalesced"] == 7
+
+async def test_without_storage_urls_every_send_uploads(monkeypatch, registry):
+    """Sin S3 no hay URL que reutilizar: se envían los bytes sin esperas entre envíos"""
+    api = FakeEvolution(monkeypatch, with_s3=False)
+    client = MessageClient()
+    await client.send_audio("inst", "551", ENCODED)
+    await asyncio.gather(*(client.send_audio("inst", f"55{i}", ENCODED) for i in range(5)))
+    assert [kind for kind, _ in api.sent] == ["bytes"] * 6
+    assert registry.stats()["coalesced"] == 0
+    assert registry.stats()["uncacheable"] == 1
+
+async def test_stale_url_falls_back_to_bytes(monkeypatch, registry):
+    api = FakeEvolution(monkeypatch)
+    client = MessageClient()
+    await client.send_media("inst", "551", "document", ENCODED)
+    api.reject_urls = True
+    result = await client.send_media("inst", "552", "document", ENCODED)
+    assert result["key"]["id"] == "SENT"
+    assert [kind for kind, _ in api.sent] == ["bytes", "url", "bytes"]
+    assert registry.stats()["stale"] == 1
+
+async def test_registry_is_bounded_and_expires(monkeypatch):
+    registry = UploadRegistry(max_entries=2, ttl=60)
+    for digest in ("a", "b", "c"):
+        assert await registry.claim(digest) == (None, True)
+        registry.finish(digest, {"message": {"mediaUrl": f"https://s3/{digest}"}})
+    assert registry.lookup("a") is None
+    assert registry.lookup("c") == "https://s3/c"
+    registry.ttl = 0
+    registry.finish("d", {"mediaUrl": "https://s3/d"})
+    assert registry.lookup("d") is None
+
+async def test_disabled_registry(monkeypatch):
+    registry = UploadRegistry(enabled=False)
+    assert await registry.digest_base64(ENCODED) is None
+    assert await registry.digest_upload(FileUpload(content=CONTENT)) is None
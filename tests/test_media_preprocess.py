@@ -0,0 +1,132 @@
+import io
+import json
+import base64
+import random
+import httpx
+import pytest
+from src.evolution import http_client
+from src.evolution.media.dedup import UploadRegistry
+from src.evolution.media.preprocess import MediaPolicy, MediaPreprocessor, default_policies, process_media, rename
+from src.evolution.message import client as message_client
+from src.evolution.message.client import MessageClient
+from src.evolution.rate_limit import SendRateLimiter
+
+Image = pytest.importorskip("PIL.Image")
+
+@pytest.fixture(autouse=True)
+def api_env(monkeypatch):
+    """Variables de entorno mínimas para construir clientes"""
+    monkeypatch.setenv("EVOLUTION_API_URL", "http://evolution.test")
+    monkeypatch.setenv("EVOLUTION_API_KEY", "test-key")
+    monkeypatch.setattr(message_client, "send_rate_limiter", SendRateLimiter(rate=0))
+    monkeypatch.setattr(message_client, "upload_registry", UploadRegistry(enabled=False))
+
+@pytest.fixture
+def preprocessor(monkeypatch):
+    """Preparador con un solo proceso, activado para los envíos"""
+    fresh = MediaPreprocessor(workers=1, enabled=True)
+    monkeypatch.setattr(message_client, "media_preprocessor", fresh)
+    yield fresh
+    fresh.shutdown()
+
+def make_image(width, height, mode="RGB", fmt="PNG"):
+    """Imagen con degradados irregulares, parecida a una foto"""
+    rng = random.Random(width * height)
+    seed = Image.frombytes(mode, (24, 16), bytes(rng.randrange(256) for _ in range(24 * 16 * len(mode))))
+    image = seed.resize((width, height), Image.BICUBIC)
+    out = io.BytesIO()
+    image.save(out, fmt)
+    return out.getvalue()
+
+def policy(**overrides):
+    return {**default_policies()["image"].to_dict(), **overrides}
+
+def test_large_image_is_downscaled_to_jpeg():
+    """Una imagen mayor que max_side se reduce manteniendo la proporción"""
+    data = make_image(2000, 1000)
+    result = process_media(("bytes", data), policy(max_side=800), thumbnail=True)
+    assert (result["width"], result["height"]) == (800, 400)
+    assert result["mimetype"] == "image/jpeg"
+    assert len(result["data"]) < len(data)
+    assert (result["original_width"], result["original_height"]) == (2000, 1000)
+    assert max(Image.open(io.BytesIO(result["thumbnail"])).size) == 96
+
+def test_small_image_is_left_alone():
+    """Las imágenes que ya caben y pesan poco se envían tal cual"""
+    data = make_image(300, 200, fmt="JPEG")
+    assert process_media(("bytes", data), policy()) is None
+
+def test_transparency_is_flattened_for_jpeg():
+    """JPEG no admite alfa: la imagen se aplana sobre blanco"""
+    data = make_image(1200, 1200, mode="RGBA")
+    result = process_media(("base64", base64.b64encode(data).decode()), policy(max_side=600))
+    assert Image.open(io.BytesIO(result["data"])).mode == "RGB"
+
+def test_sticker_fills_webp_canvas():
+    """Los stickers se escalan a un lienzo WebP de 512x512 bajo el límite de tamaño"""
+    data = make_image(200, 100, mode="RGBA")
+    result = process_media(("bytes", data), default_policies()["sticker"].to_dict())
+    sticker = Image.open(io.BytesIO(result["data"]))
+    assert sticker.format == "WEBP"
+    assert sticker.size == (512, 512)
+    assert len(result["data"]) <= 100 * 1024
+    # Zona superior transparente: la imagen apaisada queda centrada
+    assert sticker.convert("RGBA").getpixel((256, 10))[3] == 0
+
+def test_rename_changes_extension():
+    assert rename("foto.png", ".jpg") == "foto.jpg"
+    assert rename(None, ".jpg") is None
+
+async def test_prepare_runs_in_process_pool():
+    """prepare ejecuta la política en el pool y lleva la cuenta de bytes ahorrados"""
+    preprocessor = MediaPreprocessor(policies={"image": MediaPolicy(max_side=500)}, workers=1)
+    try:
+        data = make_image(1500, 1500)
+        result = await preprocessor.prepare("image", ("bytes", data))
+        assert (result["width"], result["height"]) == (500, 500)
+        assert await preprocessor.prepare("video", ("bytes", b"\x00")) is None
+        assert await preprocessor.prepare("image", ("bytes", b"not an image")) is None
+        stats = preprocessor.stats()
+        assert stats["processed"] == 1 and stats["failed"] == 1
+        assert stats["bytes_saved"] > 0
+    finally:
+        preprocessor.shutdown()
+
+async def test_send_media_sends_prepared_image(monkeypatch, preprocessor):
+    """Con la preparación activa, sendMedia recibe la imagen reducida en JPEG"""
+    sent = []
+
+    def handler(request):
+        sent.append(json.loads(request.content))
+        return httpx.Response(200, json={"key": {"id": "SENT"}})
+
+    monkeypatch.setattr(http_client, "_shared_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    data = make_image(2400, 1600)
+    client = MessageClient()
+    await client.send_media("test", "5511999999999", "image", base64.b64encode(data).decode(),
+                            filename="foto.png", mimetype="image/png")
+    body = sent[0]
+    assert body["fileName"] == "foto.jpg"
+    assert body["mimetype"] == "image/jpeg"
+    assert Image.open(io.BytesIO(base64.b64decode(body["media"]))).size == (1600, 1067)
+
+async def test_send_media_file_uploads_prepared_image(monkeypatch, tmp_path, preprocessor):
+    """Los ficheros locales se suben ya preparados; documentos y URLs no se tocan"""
+    uploads = []
+
+    async def handler(request):
+        await request.aread()
+        uploads.append((request.headers["content-type"], request.content))
+        return httpx.Response(200, json={"key": {"id": "SENT"}})
+
+    monkeypatch.setattr(http_client, "_shared_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    path = tmp_path / "foto.png"
+    path.write_bytes(make_image(2000, 2000))
+    client = MessageClient()
+    await client.send_media_file("test", "5511999999999", path.read_bytes(), filename="foto.png")
+    assert b'filename="foto.jpg"' in uploads[0][1]
+    assert len(uploads[0][1]) < path.stat().st_size
+
+    await client.send_media("test", "5511999999999", "document", base64.b64encode(b"%PDF").decode())
+    await client.send_media("test", "5511999999999", "image", "https://example.com/a.png")
+    assert preprocessor.stats()["processed"] == 1
@@ -0,0 +1,135 @@
+import os
+import json
+import httpx
+import pytest
+from src.evolution import http_client
+from src.evolution.media.cache import MediaCache
+from src.evolution.media.upload import FileUpload, check_local_path, form_fields, media_source, resolve_upload
+from src.evolution.message.client import MessageClient
+
+@pytest.fixture(autouse=True)
+def api_env(monkeypatch):
+    """Variables de entorno mínimas para construir clientes"""
+    monkeypatch.setenv("EVOLUTION_API_URL", "http://evolution.test")
+    monkeypatch.setenv("EVOLUTION_API_KEY", "test-key")
+    monkeypatch.delenv("EVOLUTION_MEDIA_ROOTS", raising=False)
+
+@pytest.fixture
+def media_dir(tmp_path, monkeypatch):
+    """Directorio permitido con un PDF de prueba"""
+    root = tmp_path / "media"
+    root.mkdir()
+    (root / "folleto.pdf").write_bytes(b"%PDF-1.4 " + os.urandom(200_000))
+    monkeypatch.setenv("EVOLUTION_MEDIA_ROOTS", str(root))
+    return root
+
+def capture(monkeypatch, response=None):
+    """Cliente HTTP simulado que guarda las peticiones recibidas"""
+    requests = []
+
+    def handler(request):
+        request.read()
+        requests.append(request)
+        return httpx.Response(200, json=response or {"key": {"id": "SENT"}})
+
+    monkeypatch.setattr(http_client, "_shared_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return requests
+
+def parse_multipart(request):
+    """Campos y ficheros de una petición multipart"""
+    boundary = request.headers["content-type"].split("boundary=")[1].encode()
+    fields, files = {}, {}
+    for part in request.content.split(b"--" + boundary)[1:-1]:
+        head, _, body = part.strip(b"\r\n").partition(b"\r\n\r\n")
+        disposition = head.decode().split("\r\n")[0]
+        name = disposition.split('name="')[1].split('"')[0]
+        if 'filename="' in disposition:
+            files[name] = (disposition.split('filename="')[1].split('"')[0], body)
+        else:
+            fields[name] = body.decode()
+    return fields, files
+
+def test_file_upload_type_and_form_fields():
+    upload = FileUpload(content=b"x", filename="clip.mp4")
+    assert (upload.mimetype, upload.media_type, upload.size) == ("video/mp4", "video", 1)
+    assert FileUpload(content=b"x", filename="informe.pdf").media_type == "document"
+    with pytest.raises(ValueError):
+        FileUpload()
+    assert form_fields({"number": "55", "delay": 1200, "mentionsEveryOne": False, "mentioned": ["1"], "caption": None}) == {
+        "number": "55", "delay": "1200", "mentionsEveryOne": "false", "mentioned": '["1"]'
+    }
+
+def test_local_paths_limited_to_media_roots(media_dir, tmp_path, monkeypatch):
+    """Solo se aceptan ficheros dentro de EVOLUTION_MEDIA_ROOTS, sin escapar por enlaces"""
+    assert check_local_path(str(media_dir / "folleto.pdf")) == os.path.realpath(media_dir / "folleto.pdf")
+    secret = tmp_path / "secreto.txt"
+    secret.write_text("no")
+    with pytest.raises(ValueError, match="outside"):
+        check_local_path(str(secret))
+    os.symlink(secret, media_dir / "enlace.txt")
+    with pytest.raises(ValueError, match="outside"):
+        check_local_path(str(media_dir / "enlace.txt"))
+    with pytest.raises(ValueError, match="not found"):
+        check_local_path(str(media_dir / "no-existe.pdf"))
+    monkeypatch.delenv("EVOLUTION_MEDIA_ROOTS")
+    with pytest.raises(ValueError, match="disabled"):
+        check_local_path(str(media_dir / "folleto.pdf"))
+
+def test_media_source_requires_one_input(media_dir):
+    assert media_source("https://example.com/a.jpg", None, None) == ("https://example.com/a.jpg", None)
+    value, upload = media_source(None, str(media_dir / "folleto.pdf"), None)
+    assert value is None and upload.filename == "folleto.pdf"
+    with pytest.raises(ValueError, match="exactly one"):
+        media_source("https://example.com/a.jpg", str(media_dir / "folleto.pdf"), None)
+    with pytest.raises(ValueError, match="exactly one"):
+        media_source(None, None, None)
+
+def test_resolve_handle_from_cache(media_dir, tmp_path):
+    """Un fichero registrado en la caché se puede enviar por su handle"""
+    cache = MediaCache(str(tmp_path / "cache"))
+    entry = cache.register_file(str(media_dir / "folleto.pdf"))
+    assert entry["mimetype"] == "application/pdf"
+    upload = resolve_upload(handle=entry["handle"], cache=cache)
+    assert upload.path == entry["path"]
+    assert upload.mimetype == "application/pdf"
+    with pytest.raises(ValueError, match="Unknown"):
+        resolve_upload(handle="0" * 64, cache=cache)
+    cache.close()
+
+async def test_send_media_file_uploads_multipart(media_dir, monkeypatch):
+    """El fichero va como parte binaria del multipart, sin base64 ni JSON"""
+    requests = capture(monkeypatch)
+    path = media_dir / "folleto.pdf"
+    result = await MessageClient().send_media_file(
+        "inst", "5511999990001", resolve_upload(str(path)), caption="Folleto", mentioned=["5511999990002"]
+    )
+    assert result == {"key": {"id": "SENT"}}
+    request = requests[0]
+    assert request.url.path == "/message/sendMedia/inst"
+    assert request.headers["content-type"].startswith("multipart/form-data")
+    assert request.headers["apikey"] == "test-key"
+    fields, files = parse_multipart(request)
+    assert fields == {
+        "number": "5511999990001",
+        "mediatype": "document",
+        "fileName": "folleto.pdf",
+        "mimetype": "application/pdf",
+        "caption": "Folleto",
+        "mentioned": '["5511999990002"]'
+    }
+    assert files["file"] == ("folleto.pdf", path.read_bytes())
+
+async def test_send_file_variants_accept_bytes(monkeypatch):
+    """send_ptv_file, send_audio_file y send_sticker_file suben bytes en memoria como multipart"""
+    requests = capture(monkeypatch)
+    client = MessageClient()
+    await client.send_ptv_file("inst", "55", b"video", delay=500)
+    await client.send_audio_file("inst", "55", b"audio")
+    await client.send_sticker_file("inst", "55", FileUpload(content=b"RIFF", filename="s.webp"))
+    assert [r.url.path for r in requests] == [
+        "/message/sendPtv/inst", "/message/sendWhatsAppAudio/inst", "/message/sendSticker/inst"
+    ]
+    ptv_fields, ptv_files = parse_multipart(requests[0])
+    assert ptv_fields == {"number": "55", "delay": "500"}
+    assert ptv_files["file"] == ("video.mp4", b"video")
+    assert parse_multipart(requests[2])[1]["file"] == ("s.webp", b"RIFF")
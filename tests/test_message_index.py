@@ -0,0 +1,112 @@
+import pytest
+from src.evolution.search import index as index_module
+from src.evolution.search.index import MessageIndex, extract_text, message_rowid
+
+@pytest.fixture(autouse=True)
+def api_env(monkeypatch):
+    """Variables de entorno mínimas para construir clientes"""
+    monkeypatch.setenv("EVOLUTION_API_URL", "http://evolution.test")
+    monkeypatch.setenv("EVOLUTION_API_KEY", "test-key")
+
+@pytest.fixture
+def index(tmp_path):
+    """Índice en un directorio temporal"""
+    idx = MessageIndex(str(tmp_path / "messages.db"))
+    yield idx
+    idx.close()
+
+def record(message_id, remote_jid, text, timestamp, push_name=None, from_me=False, participant=None):
+    key = {"id": message_id, "remoteJid": remote_jid, "fromMe": from_me}
+    if participant:
+        key["participant"] = participant
+    return {
+        "key": key,
+        "pushName": push_name,
+        "messageType": "conversation",
+        "message": {"conversation": text},
+        "messageTimestamp": timestamp
+    }
+
+ANA = "5511999990001@s.whatsapp.net"
+LUIS = "5511999990002@s.whatsapp.net"
+GROUP = "120363000000000001@g.us"
+
+SAMPLE = [
+    record("m1", ANA, "Hola, ¿llegó el pedido?", 1_700_000_000, "Ana Pérez"),
+    record("m2", ANA, "Sí, la factura va mañana", 1_700_000_100, from_me=True),
+    record("m3", LUIS, "Necesito presupuesto del pedido 42", 1_700_086_400, "Luis Gómez"),
+    record("m4", GROUP, "Reunión del pedido a las 10", 1_700_172_800, "Ana Pérez", participant=ANA),
+]
+
+def test_extract_text_from_captions():
+    """Se indexan textos, pies de foto y nombres de archivo"""
+    assert extract_text({"imageMessage": {"caption": "foto del envío"}}) == "foto del envío"
+    assert extract_text({"documentMessage": {"fileName": "factura.pdf", "caption": "adjunto"}}) == "factura.pdf adjunto"
+    assert extract_text(None) == ""
+
+def test_keyword_search_newest_first(index):
+    """Las palabras se buscan sin tildes y los resultados van del más reciente al más antiguo"""
+    assert index.ingest("ventas", SAMPLE) == 4
+    results = index.search("ventas", query="pedido")
+    assert [r["id"] for r in results] == ["m4", "m3", "m1"]
+    assert "[pedido]" in results[0]["text"]
+    assert [r["id"] for r in index.search("ventas", query="manana")] == ["m2"]
+    assert [r["id"] for r in index.search("ventas", query="presu*")] == ["m3"]
+    assert index.search("otra", query="pedido") == []
+
+def test_filters_by_chat_sender_and_dates(index):
+    """Se combinan chat, remitente (número o nombre) y rango de fechas"""
+    index.ingest("ventas", SAMPLE)
+    assert [r["id"] for r in index.search("ventas", remote_jid="5511999990001")] == ["m2", "m1"]
+    assert [r["id"] for r in index.search("ventas", sender="+55 11 99999-0001")] == ["m4", "m1"]
+    assert [r["id"] for r in index.search("ventas", sender="luis")] == ["m3"]
+    assert [r["id"] for r in index.search("ventas", query="pedido", since="2023-11-15T00:00:00", until=1_700_100_000)] == ["m3"]
+
+def test_reingest_updates_edited_text(index):
+    """Volver a sincronizar un mensaje editado actualiza el índice sin duplicarlo"""
+    index.ingest("ventas", SAMPLE)
+    index.ingest("ventas", [record("m1", ANA, "Hola, ¿llegó la devolución?", 1_700_000_000, "Ana Pérez")])
+    assert index.search("ventas", query="devolución")[0]["id"] == "m1"
+    assert [r["id"] for r in index.search("ventas", query="llegó")] == ["m1"]
+    assert index.stats("ventas")["instances"]["ventas"]["messages"] == 4
+
+def test_rowid_collision_is_resolved(index, monkeypatch):
+    """Dos mensajes del mismo segundo con el mismo rowid se guardan ambos"""
+    monkeypatch.setattr(index_module, "message_rowid", lambda timestamp, instance, message_id: timestamp << 20)
+    index.ingest("ventas", [record("a", ANA, "uno", 1_700_000_000), record("b", ANA, "dos", 1_700_000_000)])
+    index.ingest("ventas", [record("b", ANA, "dos editado", 1_700_000_000)])
+    assert index.stats()["instances"]["ventas"]["messages"] == 2
+    assert [r["id"] for r in index.search("ventas", query="editado")] == ["b"]
+    assert message_rowid(1, "ventas", "a") >> 20 == 1
+
+async def test_sync_pages_through_find_messages(index):
+    """sync descarga findMessages por páginas e indexa los registros"""
+    class FakeIterator:
+        pages_fetched = 2
+
+        def __init__(self):
+            self.records = iter(SAMPLE)
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            pass
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            try:
+                return next(self.records)
+            except StopIteration:
+                raise StopAsyncIteration
+
+    class FakeClient:
+        def iter_messages(self, instance_name, where=None, page_size=100):
+            assert where == {"key": {"remoteJid": ANA}}
+            return FakeIterator()
+
+    result = await index.sync(FakeClient(), "ventas", remote_jid="5511999990001", max_messages=3)
+    assert result["ingested"] == 3
+    assert len(index.search("ventas", limit=10)) == 3
@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+from src.evolution.chat.client import ChatClient
+from src.evolution.pagination import PageIterator, decode_cursor
+
+@pytest.fixture(autouse=True)
+def api_env(monkeypatch):
+    """Variables de entorno mínimas para construir clientes"""
+    monkeypatch.setenv("EVOLUTION_API_URL", "http://evolution.test")
+    monkeypatch.setenv("EVOLUTION_API_KEY", "test-key")
+
+def make_source(total_items, page_size, delay=0.0):
+    """Listado paginado falso que registra las páginas pedidas"""
+    requested = []
+
+    async def fetch_page(page):
+        requested.append(page)
+        await asyncio.sleep(delay)
+        start = (page - 1) * page_size
+        items = list(range(start, min(start + page_size, total_items)))
+        return items, -(-total_items // page_size)
+
+    return fetch_page, requested
+
+async def test_iterates_all_pages():
+    """Se recorren todas las páginas y se para en la última"""
+    fetch_page, requested = make_source(25, 10)
+    items = [item async for item in PageIterator(fetch_page, 10, prefetch=2)]
+    assert items == list(range(25))
+    assert requested == [1, 2, 3]
+
+async def test_prefetch_overlaps_consumption():
+    """La página siguiente se pide mientras se consume la actual"""
+    fetch_page, requested = make_source(100, 10, delay=0.01)
+    async with PageIterator(fetch_page, 10, prefetch=2) as pages:
+        assert await pages.__anext__() == 0
+        await asyncio.sleep(0)
+        assert requested == [1, 2, 3]
+
+async def test_early_termination_cancels_prefetch():
+    """Al cerrar antes de tiempo se cancelan las páginas precargadas"""
+    fetch_page, requested = make_source(100, 10)
+
+    async def slow_after_first(page):
+        if page > 1:
+            await asyncio.sleep(10)
+        return await fetch_page(page)
+
+    pages = PageIterator(slow_after_first, 10, prefetch=3)
+    assert await pages.take(5) == [0, 1, 2, 3, 4]
+    tasks = [task for _, task in pages._pending]
+    assert len(tasks) == 3
+    await pages.aclose()
+    assert all(task.cancelled() for task in tasks)
+    assert requested == [1]
+
+async def test_resume_from_cursor():
+    """Un cursor retoma el recorrido en el elemento siguiente"""
+    fetch_page, _ = make_source(35, 10)
+    async with PageIterator(fetch_page, 10, prefetch=1, fingerprint="q") as first:
+        assert await first.take(12) == list(range(12))
+        cursor = first.cursor
+    page, index, page_size = decode_cursor(cursor, "q")
+    async with PageIterator(fetch_page, page_size, start_page=page, start_index=index, fingerprint="q") as rest:
+        assert await rest.take(100) == list(range(12, 35))
+        assert rest.cursor is None
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, "otra")
+
+async def test_chat_client_iter_messages(monkeypatch):
+    """iter_messages pide findMessages por páginas con el filtro indicado"""
+    bodies = []
+
+    async def fake_post(self, endpoint, json, params=None, idempotent=None, bypass_cache=False):
+        bodies.append(json)
+        records = [{"id": f"{json['page']}-{i}"} for i in range(2)]
+        return {"messages": {"total": 4, "pages": 2, "currentPage": json["page"], "records": records}}
+
+    monkeypatch.setattr(ChatClient, "post", fake_post)
+    where = {"key": {"remoteJid": "123@s.whatsapp.net"}}
+    async with ChatClient().iter_messages("test", where=where, page_size=2) as messages:
+        ids = [message["id"] async for message in messages]
+    assert ids == ["1-0", "1-1", "2-0", "2-1"]
+    assert bodies[0] == {"where": where, "page": 1, "offset": 2}
@@ -0,0 +1,71 @@
+import time
+import pytest
+from src.evolution import http_client
+from src.evolution.http_client import EvolutionAPIError
+from src.evolution.message import client as message_client
+from src.evolution.message.client import MessageClient
+from src.evolution.rate_limit import RateLimitExceeded, SendRateLimiter, TokenBucket
+
+@pytest.fixture(autouse=True)
+def api_env(monkeypatch):
+    """Variables de entorno mínimas para construir clientes"""
+    monkeypatch.setenv("EVOLUTION_API_URL", "http://evolution.test")
+    monkeypatch.setenv("EVOLUTION_API_KEY", "test-key")
+
+def test_token_bucket_refills_at_rate():
+    """El bucket se recarga según el ritmo configurado"""
+    bucket = TokenBucket(rate=10, capacity=1)
+    now = time.monotonic()
+    assert bucket.delay(now) == 0
+    bucket.take()
+    assert bucket.delay(now) == pytest.approx(0.1)
+    assert bucket.delay(now + 0.2) == 0
+
+async def test_fail_fast_reports_retry_after():
+    """Sin espera permitida se informa cuándo reintentar sin consumir tokens"""
+    limiter = SendRateLimiter(rate=1, burst=1)
+    await limiter.acquire("sales")
+    with pytest.raises(RateLimitExceeded) as exc:
+        await limiter.acquire("sales", max_wait=0)
+    assert 0 < exc.value.retry_after <= 1
+    assert limiter.rejected == 1
+
+async def test_waits_for_token():
+    """Con espera permitida el envío se demora hasta tener token"""
+    limiter = SendRateLimiter(rate=50, burst=1)
+    await limiter.acquire("sales")
+    start = time.monotonic()
+    await limiter.acquire("sales", max_wait=1)
+    assert time.monotonic() - start >= 0.015
+    assert limiter.waited == 1
+
+async def test_instances_and_recipients_are_independent():
+    """Cada instancia y cada destinatario tienen su propio bucket"""
+    limiter = SendRateLimiter(rate=1, burst=1, recipient_rate=1, recipient_burst=1)
+    await limiter.acquire("sales", "111")
+    await limiter.acquire("support", "111")
+    with pytest.raises(RateLimitExceeded):
+        await limiter.acquire("sales", "222", max_wait=0)
+
+    limiter = SendRateLimiter(rate=0, recipient_rate=1, recipient_burst=1)
+    await limiter.acquire("sales", "111")
+    await limiter.acquire("sales", "222")
+    with pytest.raises(RateLimitExceeded):
+        await limiter.acquire("sales", "111", max_wait=0)
+
+async def test_message_client_paces_sends(monkeypatch):
+    """Los envíos de MessageClient pasan por el limitador; otras rutas no"""
+    limiter = SendRateLimiter(rate=1, burst=1, max_wait=0)
+    monkeypatch.setattr(message_client, "send_rate_limiter", limiter)
+
+    async def fake_request(self, method, endpoint, **kwargs):
+        return {"endpoint": endpoint}
+
+    monkeypatch.setattr(http_client.EvolutionAPIClient, "_make_request", fake_request)
+    client = MessageClient()
+    await client.send_text("sales", "111", "hola")
+    with pytest.raises(EvolutionAPIError) as exc:
+        await client.send_text("sales", "111", "hola")
+    assert exc.value.status_code == 429
+    assert exc.value.retry_after > 0
+    assert await client.post("chat/findChats/sales", json={}) == {"endpoint": "chat/findChats/sales"}
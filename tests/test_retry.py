@@ -0,0 +1,79 @@
+import httpx
+import pytest
+from src.evolution import http_client
+from src.evolution.http_client import EvolutionAPIClient, EvolutionAPIError
+from src.evolution.retry import RetryBudget, RetryPolicy
+from src.evolution.circuit_breaker import CircuitBreakerRegistry
+
+@pytest.fixture(autouse=True)
+def api_env(monkeypatch):
+    """Variables de entorno mínimas y reintentos sin espera"""
+    monkeypatch.setenv("EVOLUTION_API_URL", "http://evolution.test")
+    monkeypatch.setenv("EVOLUTION_API_KEY", "test-key")
+    monkeypatch.setenv("EVOLUTION_API_RETRY_BASE_DELAY", "0")
+    monkeypatch.setattr(http_client, "retry_budget", RetryBudget())
+    monkeypatch.setattr(http_client, "circuit_breakers", CircuitBreakerRegistry())
+
+class ScriptedClient:
+    """Cliente HTTP falso que devuelve una secuencia de respuestas o excepciones"""
+    is_closed = False
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    async def request(self, method, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome, json={"status": outcome}, request=httpx.Request(method, url))
+
+def test_backoff_is_bounded():
+    """El backoff con jitter nunca supera el máximo configurado"""
+    policy = RetryPolicy(base_delay=1, max_delay=2)
+    assert all(0 <= policy.backoff(attempt) <= 2 for attempt in range(10))
+    assert policy.backoff(0, retry_after=1.5) >= 1.5
+
+def test_budget_limits_retries():
+    """El presupuesto rechaza reintentos al agotarse"""
+    budget = RetryBudget(ratio=0.5, min_per_second=0, max_tokens=1)
+    assert budget.try_spend()
+    assert not budget.try_spend()
+    budget.record_request()
+    budget.record_request()
+    assert budget.try_spend()
+
+async def test_idempotent_read_is_retried(monkeypatch):
+    """Una lectura idempotente se reintenta tras un 503"""
+    fake = ScriptedClient(503, 502, 200)
+    monkeypatch.setattr(http_client, "_shared_client", fake)
+    assert await EvolutionAPIClient().get("instance/fetchInstances") == {"status": 200}
+    assert fake.calls == 3
+
+async def test_send_is_not_retried_after_delivery(monkeypatch):
+    """Un envío no se reintenta si la petición pudo llegar al servidor"""
+    fake = ScriptedClient(503, 200)
+    monkeypatch.setattr(http_client, "_shared_client", fake)
+    with pytest.raises(EvolutionAPIError) as exc:
+        await EvolutionAPIClient().post("message/sendText/test", json={})
+    assert exc.value.status_code == 503
+    assert exc.value.retriable
+    assert fake.calls == 1
+
+async def test_send_is_retried_when_never_sent(monkeypatch):
+    """Un envío sí se reintenta si la conexión nunca se estableció"""
+    fake = ScriptedClient(httpx.ConnectError("refused"), 200)
+    monkeypatch.setattr(http_client, "_shared_client", fake)
+    assert await EvolutionAPIClient().post("message/sendText/test", json={}) == {"status": 200}
+    assert fake.calls == 2
+
+async def test_fatal_errors_are_not_retried(monkeypatch):
+    """Los errores definitivos (4xx) se propagan sin reintentar"""
+    fake = ScriptedClient(404)
+    monkeypatch.setattr(http_client, "_shared_client", fake)
+    with pytest.raises(EvolutionAPIError) as exc:
+        await EvolutionAPIClient().get("instance/fetchInstances")
+    assert exc.value.status_code == 404
+    assert not exc.value.retriable
+    assert fake.calls == 1
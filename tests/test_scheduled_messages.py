@@ -0,0 +1,235 @@
+import json
+import time
+import sqlite3
+import asyncio
+import httpx
+import pytest
+from src.evolution import http_client
+from src.evolution.http_client import EvolutionAPIError
+from src.evolution.message import client as message_client
+from src.evolution.message.client import MessageClient
+from src.evolution.outbox import schedule as schedule_module, worker
+from src.evolution.outbox.schedule import MessageSchedule, ScheduleStore, parse_send_at
+from src.evolution.rate_limit import SendRateLimiter
+
+@pytest.fixture(autouse=True)
+def api_env(monkeypatch):
+    """Variables de entorno mínimas para construir clientes"""
+    monkeypatch.setenv("EVOLUTION_API_URL", "http://evolution.test")
+    monkeypatch.setenv("EVOLUTION_API_KEY", "test-key")
+    monkeypatch.delenv("EVOLUTION_SEND_QUEUE_PATH", raising=False)
+    monkeypatch.setattr(message_client, "send_rate_limiter", SendRateLimiter(rate=0))
+    monkeypatch.setattr(worker, "_outbox", None)
+
+@pytest.fixture
+def store(tmp_path):
+    db = ScheduleStore(str(tmp_path / "schedule.db"))
+    yield db
+    db.close()
+
+@pytest.fixture
+def api(monkeypatch):
+    """sendText simulado que anota el texto y el instante de cada envío"""
+    sent = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        sent.append((body["text"], time.time()))
+        return httpx.Response(200, json={"key": {"id": f"ID-{body['text']}"}})
+
+    monkeypatch.setattr(http_client, "_shared_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return sent
+
+async def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+def test_parse_send_at():
+    assert parse_send_at("2030-01-01T00:00:00") == parse_send_at("2030-01-01T00:00:00+00:00") == 1893456000.0
+    assert parse_send_at("2030-01-01T02:00:00+02:00") == 1893456000.0
+    assert abs(parse_send_at(delay_seconds=10) - time.time() - 10) < 1
+    for send_at, delay in (("2020-01-01T00:00:00", None), (None, None), ("2030-01-01T00:00:00", 5), (None, -1)):
+        with pytest.raises(ValueError):
+            parse_send_at(send_at, delay)
+
+def test_store_claims_due_items_and_recovers_after_restart(tmp_path):
+    path = str(tmp_path / "schedule.db")
+    store = ScheduleStore(path)
+    now = time.time()
+    ids = store.add_many([("ventas", "send_text", {"number": str(n), "text": "hola"}, now + offset) for n, offset in enumerate((-2, -1, 60))])
+    assert [item["id"] for item in store.claim_due(now, 10)] == ids[:2]
+    assert store.finish(ids[0], "sent", message_id="MSG")
+    store.close()
+
+    # El envío reclamado y no terminado vuelve a programarse al reabrir
+    reopened = ScheduleStore(path)
+    assert sorted(reopened.recover()) == [(now - 1, ids[1]), (now + 60, ids[2])]
+    assert reopened.get(ids[0])["message_id"] == "MSG"
+    assert reopened.counts()["scheduled"] == 2
+    reopened.close()
+
+def test_cancel_only_touches_scheduled_items(store):
+    now = time.time()
+    ids = store.add_many([("ventas", "send_text", {}, now - 1), ("ventas", "send_text", {}, now + 60), ("soporte", "send_text", {}, now + 60)])
+    store.claim_due(now, 10)
+    assert store.cancel(ids[0]) == 0
+    assert store.cancel(instance_name="ventas") == 1
+    assert [item["id"] for item in store.list("scheduled")] == [ids[2]]
+    with pytest.raises(ValueError):
+        store.cancel()
+    with pytest.raises(ValueError):
+        store.list("unknown")
+
+async def test_sends_fire_in_order_and_on_time(store, api):
+    schedule = MessageSchedule(store, client=MessageClient())
+    now = time.time()
+    try:
+        await schedule.schedule_many([
+            ("ventas", "send_text", {"number": "1", "text": "segundo"}, now + 0.15),
+            ("ventas", "send_text", {"number": "1", "text": "cancelado"}, now + 0.1),
+            ("ventas", "send_text", {"number": "1", "text": "primero"}, now + 0.05)
+        ])
+        await schedule.cancel(2)
+        await wait_for(lambda: len(api) == 2)
+        await asyncio.sleep(0.1)
+    finally:
+        await schedule.stop()
+    assert [text for text, _ in api] == ["primero", "segundo"]
+    assert all(0 <= sent_at - due < 0.1 for (_, sent_at), due in zip(api, (now + 0.05, now + 0.15)))
+    assert store.get(3)["message_id"] == "ID-primero"
+    assert store.get(2)["status"] == "cancelled"
+
+async def test_earlier_item_wakes_the_timer(store, api):
+    """Un envío programado antes que el próximo pendiente no espera a este"""
+    schedule = MessageSchedule(store, client=MessageClient())
+    try:
+        await schedule.schedule("ventas", "send_text", {"number": "1", "text": "tarde"}, time.time() + 30)
+        await asyncio.sleep(0.05)
+        await schedule.schedule("ventas", "send_text", {"number": "1", "text": "pronto"}, time.time() + 0.05)
+        await wait_for(lambda: len(api) == 1, timeout=1)
+    finally:
+        await schedule.stop()
+    assert api[0][0] == "pronto"
+
+async def test_due_items_are_handed_to_the_send_queue(monkeypatch, tmp_path, api):
+    monkeypatch.setenv("EVOLUTION_SEND_QUEUE_PATH", str(tmp_path / "outbox.db"))
+    monkeypatch.setattr(schedule_module, "_schedule", None)
+    schedule = schedule_module.get_message_schedule()
+    outbox = worker.get_outbox()
+    outbox._client = MessageClient()
+    try:
+        result = await schedule.schedule("ventas", "send_text", {"number": "1", "text": "hola"}, time.time())
+        await wait_for(lambda: schedule.store.get(result["schedule_id"])["status"] == "queued")
+        queue_id = schedule.store.get(result["schedule_id"])["queue_id"]
+        await wait_for(lambda: outbox.queue.get(queue_id)["status"] == "sent")
+    finally:
+        await schedule.stop()
+        await outbox.stop()
+        schedule.store.close()
+        outbox.queue.close()
+    assert [text for text, _ in api] == ["hola"]
+
+class FlakyClient:
+    """send_text que falla con los errores indicados antes de enviar"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def send_text(self, instance_name, number, text):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return {"key": {"id": f"ID-{text}"}}
+
+async def test_transient_failures_before_sending_are_retried(store):
+    unreachable = EvolutionAPIError(503, "circuit open", request_sent=False)
+    client = FlakyClient(unreachable, EvolutionAPIError(504, "connect timeout", request_sent=False))
+    schedule = MessageSchedule(store, client=client, retry_delay=0.01)
+    try:
+        first = await schedule.schedule("ventas", "send_text", {"number": "1", "text": "hola"}, time.time())
+        await wait_for(lambda: store.get(first["schedule_id"])["status"] == "sent")
+        # Agotados los intentos el envío queda fallido
+        schedule.max_attempts = 2
+        client.errors = [unreachable] * 3
+        second = await schedule.schedule("ventas", "send_text", {"number": "1", "text": "adiós"}, time.time())
+        await wait_for(lambda: store.get(second["schedule_id"])["status"] == "failed")
+    finally:
+        await schedule.stop()
+    assert store.get(first["schedule_id"])["attempts"] == 3
+    assert store.get(second["schedule_id"])["attempts"] == 2
+    assert (client.calls, schedule.retried, schedule.failed) == (5, 3, 1)
+
+async def test_failures_after_sending_are_not_retried(store):
+    """Un 5xx o un timeout con la petición ya enviada puede haberse entregado: no se repite"""
+    client = FlakyClient(EvolutionAPIError(500, "internal error"))
+    schedule = MessageSchedule(store, client=client, retry_delay=0.01)
+    try:
+        result = await schedule.schedule("ventas", "send_text", {"number": "1", "text": "hola"}, time.time())
+        await wait_for(lambda: store.get(result["schedule_id"])["status"] == "failed")
+        await asyncio.sleep(0.05)
+    finally:
+        await schedule.stop()
+    assert (client.calls, schedule.retried) == (1, 0)
+
+def test_store_without_attempts_column_is_migrated(tmp_path):
+    import sqlite3
+    path = str(tmp_path / "schedule.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(schedule_module.SCHEMA.replace("    attempts INTEGER NOT NULL DEFAULT 0,\n", ""))
+    conn.execute("INSERT INTO scheduled (instance, operation, params, send_at, created_at, updated_at) VALUES ('ventas', 'send_text', '{}', 0, 0, 0)")
+    conn.commit()
+    conn.close()
+    store = ScheduleStore(path)
+    assert [item["attempts"] for item in store.claim_due(time.time(), 10)] == [1]
+    store.close()
+
+class FlakyOutbox:
+    """Cola de envíos cuya base de datos está bloqueada las primeras ``failures`` veces"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.queued = []
+
+    async def enqueue_many(self, items):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        self.queued.extend(items)
+        return list(range(len(self.queued) - len(items) + 1, len(self.queued) + 1))
+
+async def test_failed_handoff_to_the_send_queue_is_retried(monkeypatch, store):
+    outbox = FlakyOutbox(failures=2)
+    monkeypatch.setattr(schedule_module, "get_outbox", lambda: outbox)
+    monkeypatch.setattr(schedule_module, "HANDOFF_RETRY", 0.02)
+    mark_queued, calls = store.mark_queued, []
+
+    def flaky_mark_queued(handoffs):
+        # También falla una vez al marcarlos: ya están en la cola y no deben volver a encolarse
+        calls.append(handoffs)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        mark_queued(handoffs)
+
+    monkeypatch.setattr(store, "mark_queued", flaky_mark_queued)
+    schedule = MessageSchedule(store)
+    try:
+        ids = await schedule.schedule_many([
+            ("ventas", "send_text", {"number": str(n), "text": "hola"}, time.time()) for n in range(3)
+        ])
+        await wait_for(lambda: all(store.get(item_id)["status"] == "queued" for item_id in ids))
+    finally:
+        await schedule.stop()
+    assert [params["number"] for _, _, params in outbox.queued] == ["0", "1", "2"]
+    assert [store.get(item_id)["queue_id"] for item_id in ids] == [1, 2, 3]
+    # Los reclamos que no se pudieron entregar no cuentan como intentos
+    assert [store.get(item_id)["attempts"] for item_id in ids] == [1, 1, 1]
+    assert len(calls) == 2
+
+async def test_unknown_operation_is_rejected(store):
+    schedule = MessageSchedule(store)
+    with pytest.raises(ValueError):
+        await schedule.schedule("ventas", "delete_instance", {}, time.time())
+    assert store.counts()["scheduled"] == 0
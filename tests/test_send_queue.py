@@ -0,0 +1,225 @@
+import json
+import time
+import asyncio
+import httpx
+import pytest
+from src.evolution import http_client
+from src.evolution.message import client as message_client
+from src.evolution.message.client import MessageClient
+from src.evolution.message.routes import MessageRoutes
+from src.evolution.outbox import worker
+from src.evolution.outbox.queue import OutboundQueue
+from src.evolution.outbox.worker import Outbox, dispatch
+from src.evolution.rate_limit import SendRateLimiter
+
+@pytest.fixture(autouse=True)
+def api_env(monkeypatch):
+    """Variables de entorno mínimas para construir clientes"""
+    monkeypatch.setenv("EVOLUTION_API_URL", "http://evolution.test")
+    monkeypatch.setenv("EVOLUTION_API_KEY", "test-key")
+    monkeypatch.setattr(message_client, "send_rate_limiter", SendRateLimiter(rate=0))
+
+@pytest.fixture
+def queue(tmp_path):
+    store = OutboundQueue(str(tmp_path / "outbox.db"))
+    yield store
+    store.close()
+
+class FakeEvolution:
+    """sendText simulado; ``responses`` fija el código devuelto para cada número en cada intento"""
+
+    def __init__(self, monkeypatch, responses=None):
+        self.responses = {number: list(codes) for number, codes in (responses or {}).items()}
+        self.sent = []
+        monkeypatch.setattr(http_client, "_shared_client", httpx.AsyncClient(transport=httpx.MockTransport(self.handle)))
+
+    def handle(self, request):
+        body = json.loads(request.content)
+        codes = self.responses.get(body["number"])
+        status = codes.pop(0) if codes else 200
+        if status != 200:
+            return httpx.Response(status, json={"message": "error"})
+        self.sent.append(body)
+        return httpx.Response(200, json={"key": {"id": f"ID{body['number']}"}})
+
+async def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+def test_claim_hides_items_until_visibility_timeout(queue):
+    """Un envío reclamado no se entrega a otro trabajador hasta que vence su plazo"""
+    first = queue.enqueue("test", "send_text", {"number": "1", "text": "hola"})
+    queue.enqueue("test", "send_text", {"number": "2", "text": "hola"})
+    claimed = queue.claim(1, visibility_timeout=0.05, max_attempts=3)
+    assert [(item["id"], item["attempts"], item["params"]["number"]) for item in claimed] == [(first, 1, "1")]
+    assert [item["params"]["number"] for item in queue.claim(5, 0.05, 3)] == ["2"]
+    assert queue.claim(5, 0.05, 3) == []
+
+    time.sleep(0.06)
+    # El trabajador no confirmó: los dos vuelven a la cola con un intento más
+    assert [item["attempts"] for item in queue.claim(5, 60, 3)] == [2, 2]
+
+def test_expired_lease_is_dead_lettered_after_max_attempts(queue):
+    item_id = queue.enqueue("test", "send_text", {"number": "1"})
+    queue.claim(1, visibility_timeout=0, max_attempts=1)
+    assert queue.claim(1, 0, 1) == []
+    item = queue.get(item_id)
+    assert (item["status"], item["error"]) == ("dead", "Visibility timeout expired")
+
+def test_complete_retry_release_and_dead_letter(queue):
+    ids = queue.enqueue_many([("test", "send_text", {"number": str(n)}) for n in range(4)])
+    queue.claim(4, 60, 5)
+    assert queue.complete(ids[0], "MSG1")
+    assert queue.retry(ids[1], "boom", delay=60)
+    assert queue.release(ids[2], delay=0)
+    assert queue.dead_letter(ids[3], "rejected")
+    assert not queue.complete(ids[3])
+
+    assert queue.get(ids[0])["message_id"] == "MSG1"
+    assert (queue.get(ids[1])["status"], queue.get(ids[1])["error"]) == ("pending", "boom")
+    assert queue.get(ids[2])["attempts"] == 0
+    # Solo el liberado está listo: el reintento espera su turno
+    assert [item["id"] for item in queue.claim(4, 60, 5)] == [ids[2]]
+    depth = queue.depth()
+    assert (depth["sent"], depth["pending"], depth["inflight"], depth["dead"]) == (1, 1, 1, 1)
+    assert depth["instances"]["test"]["dead"] == 1
+
+def test_cancel_and_requeue_dead(queue):
+    ids = queue.enqueue_many([("ventas", "send_text", {"number": str(n)}) for n in range(3)] + [("soporte", "send_text", {})])
+    queue.claim(1, 60, 5)
+    queue.dead_letter(ids[0], "rejected")
+    assert queue.cancel(instance_name="ventas") == 2
+    assert queue.cancel(ids[0]) == 0
+    assert [item["id"] for item in queue.list("cancelled")] == ids[1:3]
+    assert queue.requeue_dead(instance_name="ventas") == 1
+    assert queue.get(ids[0])["attempts"] == 0
+    with pytest.raises(ValueError):
+        queue.cancel()
+
+def test_high_priority_is_claimed_before_bulk_backlog(queue):
+    """Un high encolado tras una campaña masiva sale en el siguiente reclamo"""
+    queue.enqueue_many([("ventas", "send_text", {"number": str(n), "text": "oferta", "priority": "bulk"}) for n in range(2000)])
+    otp = queue.enqueue("ventas", "send_text", {"number": "999", "text": "código 1234", "priority": "high"})
+    claimed = queue.claim(1, 60, 5)
+    assert [(item["id"], item["priority"]) for item in claimed] == [(otp, "high")]
+    assert queue.depth()["pending_by_priority"] == {"bulk": 2000}
+    # El resto de la campaña sigue por orden de llegada
+    assert [item["params"]["number"] for item in queue.claim(3, 60, 5)] == ["0", "1", "2"]
+
+def test_claim_shares_ready_sends_by_weight(queue):
+    """Con normal y bulk pendientes, normal recibe unas cuatro veces más turnos"""
+    queue.enqueue_many([("ventas", "send_text", {"number": str(n), "text": "hola", "priority": "bulk"}) for n in range(20)])
+    queue.enqueue_many([("ventas", "send_text", {"number": str(n), "text": "hola"}) for n in range(20)])
+    priorities = [item["priority"] for _ in range(10) for item in queue.claim(1, 60, 5)]
+    assert priorities.count("normal") == 8
+    assert [item["priority"] for item in queue.claim(10, 60, 5)].count("bulk") == 2
+
+def test_queue_without_priority_column_is_migrated(tmp_path):
+    import sqlite3
+    path = str(tmp_path / "outbox.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE outbox (id INTEGER PRIMARY KEY, instance TEXT NOT NULL, operation TEXT NOT NULL, "
+        "params TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, "
+        "available_at REAL NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL, message_id TEXT, error TEXT)"
+    )
+    conn.execute("INSERT INTO outbox (instance, operation, params, available_at, created_at, updated_at) VALUES ('test', 'send_text', '{}', 0, 0, 0)")
+    conn.commit()
+    conn.close()
+    store = OutboundQueue(path)
+    assert [item["priority"] for item in store.claim(5, 60, 5)] == ["normal"]
+    store.close()
+
+def test_queue_survives_reopen(tmp_path):
+    """Los envíos pendientes siguen ahí tras reiniciar el proceso"""
+    path = str(tmp_path / "outbox.db")
+    store = OutboundQueue(path)
+    item_id = store.enqueue("test", "send_text", {"number": "1", "text": "ñandú"})
+    store.close()
+    reopened = OutboundQueue(path)
+    assert reopened.claim(1, 60, 5)[0]["params"] == {"number": "1", "text": "ñandú"}
+    assert reopened.get(item_id)["status"] == "inflight"
+    reopened.close()
+
+async def test_workers_deliver_retry_and_dead_letter(monkeypatch, queue):
+    """Los transitorios se reintentan, los 4xx van a la cola de muertos y el resto se entrega"""
+    api = FakeEvolution(monkeypatch, responses={"2": [503, 200], "3": [400]})
+    outbox = Outbox(queue, client=MessageClient(), workers=2, retry_delay=0.01, poll_interval=0.05)
+    ids = await outbox.enqueue_many([("test", "send_text", {"number": str(n), "text": "hola"}) for n in range(1, 5)])
+    try:
+        await wait_for(lambda: queue.depth()["pending"] + queue.depth()["inflight"] == 0)
+    finally:
+        await outbox.stop()
+    assert sorted(body["number"] for body in api.sent) == ["1", "2", "4"]
+    assert queue.get(ids[1])["attempts"] == 2
+    assert queue.get(ids[1])["message_id"] == "ID2"
+    dead = queue.get(ids[2])
+    assert (dead["status"], dead["attempts"]) == ("dead", 1)
+    assert (outbox.delivered, outbox.retried, outbox.dead_lettered) == (3, 1, 1)
+
+async def test_rate_limited_sends_do_not_use_attempts(monkeypatch, queue):
+    """Un rechazo del limitador de ritmo devuelve el envío a la cola sin gastar intentos"""
+    api = FakeEvolution(monkeypatch)
+    monkeypatch.setattr(message_client, "send_rate_limiter", SendRateLimiter(rate=20, burst=1, max_wait=0))
+    outbox = Outbox(queue, client=MessageClient(), workers=3, max_attempts=1, poll_interval=0.01)
+    await outbox.enqueue_many([("test", "send_text", {"number": str(n), "text": "hola"}) for n in range(5)])
+    try:
+        await wait_for(lambda: len(api.sent) == 5)
+    finally:
+        await outbox.stop()
+    assert queue.depth()["dead"] == 0
+
+async def test_dispatch_resolves_uploads_at_send_time(monkeypatch, tmp_path):
+    monkeypatch.setenv("EVOLUTION_MEDIA_ROOTS", str(tmp_path))
+    path = tmp_path / "folleto.pdf"
+    path.write_bytes(b"%PDF-1.4")
+    uploads = []
+
+    async def handler(request):
+        await request.aread()
+        uploads.append(request.content)
+        return httpx.Response(200, json={"key": {"id": "SENT"}})
+
+    monkeypatch.setattr(http_client, "_shared_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    params = {"number": "1", "upload": {"path": str(path)}, "caption": "hola"}
+    await dispatch(MessageClient(), "test", "send_media_file", params)
+    assert b"%PDF-1.4" in uploads[0] and b'filename="folleto.pdf"' in uploads[0]
+    with pytest.raises(ValueError):
+        await dispatch(MessageClient(), "test", "delete_instance", {})
+
+async def test_enqueue_rejects_params_the_client_method_does_not_take(queue):
+    """Los parámetros propios de las herramientas se rechazan al encolar, no en la cola de muertos"""
+    outbox = Outbox(queue, client=MessageClient())
+    for operation, params in (
+        ("send_text", {"number": "1", "text": "hola", "idempotency_key": "k"}),
+        ("send_text", {"number": "1"}),
+        ("send_media", {"number": "1", "media_type": "image", "path": "/tmp/a.png"}),
+        ("send_media_file", {"number": "1", "media_type": "image"}),
+        ("send_text", {"number": "1", "text": "hola", "upload": {"path": "/tmp/a.png"}})
+    ):
+        with pytest.raises(ValueError):
+            await outbox.enqueue("test", operation, params)
+    with pytest.raises(ValueError):
+        await outbox.enqueue_many([("test", "send_text", {"number": "1", "text": "ok"}), ("test", "send_text", {"text": "sin número"})])
+    assert queue.depth()["pending"] == 0
+    await outbox.enqueue("test", "send_media_file", {"number": "1", "upload": {"path": "/tmp/a.png"}, "priority": "high"})
+    await outbox.stop()
+    assert queue.depth()["pending"] + queue.depth()["inflight"] + queue.depth()["dead"] == 1
+
+async def test_send_tools_enqueue_in_queued_mode(monkeypatch, tmp_path):
+    """Con EVOLUTION_SEND_QUEUE_MODE los send_* encolan y devuelven el id de la cola"""
+    monkeypatch.setenv("EVOLUTION_SEND_QUEUE_PATH", str(tmp_path / "outbox.db"))
+    monkeypatch.setenv("EVOLUTION_SEND_QUEUE_MODE", "true")
+    monkeypatch.setattr(worker, "_outbox", None)
+    api = FakeEvolution(monkeypatch)
+    outbox = worker.get_outbox()
+    try:
+        result = await MessageRoutes()._send("send_text", "test", number="1", text="hola")
+        assert result == {"queued": True, "queue_id": 1, "status": "pending"}
+        await wait_for(lambda: outbox.queue.get(1)["status"] == "sent")
+        assert api.sent == [{"number": "1", "text": "hola"}]
+    finally:
+        await outbox.stop()
+        outbox.queue.close()
@@ -0,0 +1,121 @@
+import asyncio
+import httpx
+import pytest
+from src.evolution import http_client
+from src.evolution.message import client as message_client
+from src.evolution.message.client import MessageClient
+from src.evolution.outbox.worker import dispatch
+from src.evolution.rate_limit import RateLimitExceeded, SendRateLimiter
+from src.evolution import scheduler
+from src.evolution.scheduler import SendScheduler, current_priority, send_priority
+
+@pytest.fixture(autouse=True)
+def api_env(monkeypatch):
+    """Variables de entorno mínimas para construir clientes"""
+    monkeypatch.setenv("EVOLUTION_API_URL", "http://evolution.test")
+    monkeypatch.setenv("EVOLUTION_API_KEY", "test-key")
+    monkeypatch.setattr(message_client, "send_rate_limiter", SendRateLimiter(rate=0))
+
+async def send_all(sched, limiter, sends, order):
+    """Lanzar los envíos ``(instancia, clase, etiqueta)`` en orden y anotar cuándo obtienen turno"""
+    async def send(instance, priority, label):
+        await sched.acquire(instance, priority, limiter)
+        order.append(label)
+        sched.release()
+
+    tasks = []
+    for instance, priority, label in sends:
+        tasks.append(asyncio.create_task(send(instance, priority, label)))
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+
+async def test_high_priority_overtakes_queued_bulk():
+    """Un envío high llegado tras una tanda bulk sale en cuanto hay token"""
+    sched = SendScheduler()
+    limiter = SendRateLimiter(rate=200, burst=1, max_wait=5)
+    order = []
+    sends = [("ventas", "bulk", f"b{n}") for n in range(10)] + [("ventas", "high", "h")]
+    await send_all(sched, limiter, sends, order)
+    assert order.index("h") <= 2
+    stats = sched.stats()["classes"]
+    assert (stats["bulk"]["sent"], stats["high"]["sent"]) == (10, 1)
+    assert stats["high"]["wait_max_ms"] < stats["bulk"]["wait_max_ms"]
+
+async def test_weights_share_sends_between_classes():
+    """Con las dos clases saturadas, normal recibe unas cuatro veces más turnos que bulk"""
+    sched = SendScheduler()
+    limiter = SendRateLimiter(rate=1000, burst=1, max_wait=5)
+    order = []
+    sends = [("ventas", "bulk", "b")] * 20 + [("ventas", "normal", "n")] * 20
+    await send_all(sched, limiter, sends, order)
+    assert order[:1] == ["b"]
+    assert 3 <= order[1:11].count("n") <= 9
+
+async def test_in_flight_slots_are_shared_between_instances():
+    """Una instancia con muchos envíos en cola no deja sin plazas a las demás"""
+    sched = SendScheduler(max_in_flight=2)
+    limiter = SendRateLimiter(rate=0, max_wait=5)
+    order = []
+
+    async def send(instance, label):
+        await sched.acquire(instance, "normal", limiter)
+        order.append(label)
+        await asyncio.sleep(0.01)
+        sched.release()
+
+    tasks = [asyncio.create_task(send("ventas", "v")) for _ in range(8)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(send("soporte", "s")))
+    await asyncio.gather(*tasks)
+    assert order.index("s") <= 3
+    assert sched.in_flight == 0
+
+async def test_wait_past_max_wait_raises_and_frees_the_turn():
+    sched = SendScheduler()
+    limiter = SendRateLimiter(rate=2, burst=1, max_wait=0.05)
+    await sched.acquire("ventas", "normal", limiter)
+    sched.release()
+    with pytest.raises(RateLimitExceeded) as exc:
+        await sched.acquire("ventas", "normal", limiter)
+    assert exc.value.retry_after > 0
+    assert sched.stats()["classes"]["normal"]["rejected"] == 1
+    assert sched.stats()["waiting_by_instance"] == {}
+    with pytest.raises(ValueError):
+        await sched.acquire("ventas", "urgent", limiter)
+
+def test_weights_from_env(monkeypatch):
+    monkeypatch.setenv("EVOLUTION_SEND_PRIORITY_WEIGHTS", "high=32, bulk=0.5")
+    monkeypatch.setenv("EVOLUTION_SEND_MAX_IN_FLIGHT", "4")
+    sched = SendScheduler.from_env()
+    assert sched.weights == {"high": 32.0, "normal": 4.0, "bulk": 0.5}
+    assert sched.max_in_flight == 4
+
+async def test_queued_sends_keep_their_priority(monkeypatch):
+    """Los envíos de la cola salen con la clase guardada en sus parámetros"""
+    monkeypatch.setattr(scheduler, "send_scheduler", SendScheduler())
+    seen = []
+
+    class Client:
+        async def send_text(self, instance_name, number, text):
+            seen.append(current_priority())
+
+    await dispatch(Client(), "ventas", "send_text", {"number": "1", "text": "hola", "priority": "high"})
+    await dispatch(Client(), "ventas", "send_text", {"number": "1", "text": "hola"})
+    assert seen == ["high", "normal"]
+    with pytest.raises(ValueError):
+        with send_priority("urgent"):
+            pass
+
+async def test_message_client_sends_through_scheduler(monkeypatch):
+    sched = SendScheduler()
+    monkeypatch.setattr(message_client, "send_scheduler", sched)
+    monkeypatch.setattr(
+        http_client,
+        "_shared_client",
+        httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, json={"key": {"id": "A"}})))
+    )
+    with send_priority("high"):
+        await MessageClient().send_text("ventas", "5511999999999", "hola")
+    stats = sched.stats()
+    assert stats["classes"]["high"]["sent"] == 1
+    assert stats["in_flight"] == 0
@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from src.evolution import http_client
+from src.evolution.http_client import EvolutionAPIClient
+from src.evolution.singleflight import SingleFlight, request_key
+
+@pytest.fixture(autouse=True)
+def api_env(monkeypatch):
+    """Variables de entorno mínimas para construir clientes"""
+    monkeypatch.setenv("EVOLUTION_API_URL", "http://evolution.test")
+    monkeypatch.setenv("EVOLUTION_API_KEY", "test-key")
+
+def test_request_key_ignores_param_order():
+    """La clave no depende del orden de los parámetros"""
+    assert request_key("GET", "u", {"a": 1, "b": 2}) == request_key("GET", "u", {"b": 2, "a": 1})
+    assert request_key("GET", "u", {"a": 1}) != request_key("GET", "u", {"a": 2})
+
+async def test_identical_calls_share_one_execution():
+    """Las llamadas simultáneas con la misma clave se ejecutan una vez"""
+    flight = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"state": "open"}
+
+    results = await asyncio.gather(*(flight.do("k", fetch) for _ in range(5)))
+    assert calls == 1
+    assert all(r == {"state": "open"} for r in results)
+    assert flight.stats()["coalesced"] == 4
+    assert flight.stats()["in_flight"] == 0
+
+async def test_errors_are_shared():
+    """La excepción de la llamada compartida llega a todos los llamantes"""
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+async def test_cancelling_one_caller_keeps_shared_call():
+    """Cancelar a un llamante no cancela la llamada del resto"""
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    first = asyncio.create_task(flight.do("k", fetch))
+    second = asyncio.create_task(flight.do("k", fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == "ok"
+
+async def test_client_coalesces_reads_but_not_sends(monkeypatch):
+    """El cliente agrupa lecturas idempotentes pero nunca envíos"""
+    monkeypatch.setattr(http_client, "single_flight", SingleFlight())
+    calls = []
+
+    async def fake_request_with_retries(self, method, endpoint, *args):
+        calls.append(endpoint)
+        await asyncio.sleep(0.01)
+        return {}
+
+    monkeypatch.setattr(EvolutionAPIClient, "_request_with_retries", fake_request_with_retries)
+    client = EvolutionAPIClient()
+    await asyncio.gather(*(client.get("instance/connectionState/sales") for _ in range(3)))
+    await asyncio.gather(*(client.post("message/sendText/sales", json={"text": "hi"}) for _ in range(2)))
+    assert calls.count("instance/connectionState/sales") == 1
+    assert calls.count("message/sendText/sales") == 2
@@ -0,0 +1,129 @@
+import json
+import base64
+import httpx
+import pytest
+from src.evolution import http_client
+from src.evolution.chat.client import ChatClient
+from src.evolution.streaming import Base64FieldStream, JSONItemStream, collect_items
+
+@pytest.fixture(autouse=True)
+def api_env(monkeypatch):
+    """Variables de entorno mínimas para construir clientes"""
+    monkeypatch.setenv("EVOLUTION_API_URL", "http://evolution.test")
+    monkeypatch.setenv("EVOLUTION_API_KEY", "test-key")
+
+def feed_in_chunks(parser, raw, size):
+    items = []
+    for i in range(0, len(raw), size):
+        items += parser.feed(raw[i:i + size])
+    parser.close()
+    return items
+
+@pytest.mark.parametrize("size", [1, 5, 64, 4096])
+def test_items_at_nested_path(size):
+    """Se extraen los elementos de la lista indicada, sin importar cómo se corten los trozos"""
+    records = [{"key": {"id": "a"}, "text": "llave } y corchete ] \"escapado\""}, 2, "x,y", None, [1, [2]]]
+    doc = {"records": ["señuelo"], "messages": {"total": 5, "records": records, "pages": 1}}
+    raw = json.dumps(doc, ensure_ascii=False).encode("utf-8")
+    assert feed_in_chunks(JSONItemStream(("messages", "records")), raw, size) == records
+
+def test_root_list_and_errors():
+    """Una lista en la raíz se lee con la ruta vacía; las respuestas incompletas fallan"""
+    assert feed_in_chunks(JSONItemStream(), b' [ {"id": 1} , {"id": 2} ] ', 3) == [{"id": 1}, {"id": 2}]
+    assert feed_in_chunks(JSONItemStream(), b'[]', 1) == []
+
+    truncated = JSONItemStream()
+    truncated.feed(b'[{"id": 1}, {"id"')
+    with pytest.raises(ValueError, match="Truncated"):
+        truncated.close()
+    missing = JSONItemStream(("messages", "records"))
+    missing.feed(b'{"status": 404}')
+    with pytest.raises(ValueError, match="No JSON list"):
+        missing.close()
+
+def test_buffer_only_holds_current_item():
+    """El buffer no crece con el número de elementos ya leídos"""
+    parser = JSONItemStream()
+    parser.feed(b"[")
+    for _ in range(1000):
+        assert len(parser.feed(b'{"id": "' + b"x" * 100 + b'"},')) == 1
+        assert len(parser._buf) < 200
+
+@pytest.mark.parametrize("size", [1, 3, 7, 4096])
+def test_base64_field_decoded_in_chunks(size):
+    """Los bytes del campo se decodifican por trozos y el resto del objeto llega al final"""
+    raw_media = bytes(range(256)) * 20
+    encoded = base64.b64encode(raw_media).decode("ascii").replace("/", "\\/")
+    doc = (
+        '{"mediaType": "imageMessage", "caption": "dice \\"base64\\": \\"no\\"", '
+        '"size": {"base64": "anidado"}, "base64": "' + encoded + '", "mimetype": "image/jpeg"}'
+    ).encode("utf-8")
+    items = feed_in_chunks(Base64FieldStream(), doc, size)
+    assert b"".join(item for item in items if isinstance(item, bytes)) == raw_media
+    assert items[-1] == {
+        "mediaType": "imageMessage",
+        "caption": 'dice "base64": "no"',
+        "size": {"base64": "anidado"},
+        "base64": None,
+        "mimetype": "image/jpeg"
+    }
+
+def test_base64_field_data_uri_and_errors():
+    parser = Base64FieldStream()
+    items = parser.feed(b'{"base64": "data:image/png;base64,aG9sYQ=="}')
+    assert items == [b"hola", {"base64": None}]
+
+    missing = Base64FieldStream()
+    missing.feed(b'{"error": "Message not found"}')
+    with pytest.raises(ValueError, match="No 'base64' field"):
+        missing.close()
+    truncated = Base64FieldStream()
+    truncated.feed(b'{"base64": "aG9s')
+    with pytest.raises(ValueError, match="Truncated"):
+        truncated.close()
+
+def test_base64_field_data_uri_split_between_chunks():
+    """El prefijo del data URI puede llegar partido en cualquier punto"""
+    doc = b'{"base64": "data:image\\/png;base64,aG9sYSBtdW5kbw=="}'
+    for offset in range(1, len(doc)):
+        parser = Base64FieldStream()
+        items = parser.feed(doc[:offset]) + parser.feed(doc[offset:])
+        assert b"".join(items[:-1]) == b"hola mundo", offset
+        assert items[-1] == {"base64": None}
+    parser = Base64FieldStream()
+    assert feed_in_chunks(parser, doc, 1)[-1] == {"base64": None}
+    assert parser.decoded_bytes == len(b"hola mundo")
+
+async def test_client_stream_stops_early(monkeypatch):
+    """Al alcanzar el límite se deja de leer la respuesta"""
+    sent_chunks = []
+
+    async def body():
+        yield b'{"messages": {"total": 1000, "records": ['
+        for i in range(1000):
+            sent_chunks.append(i)
+            yield (b"," if i else b"") + json.dumps({"id": i}).encode()
+        yield b"]}}"
+
+    def handler(request):
+        assert json.loads(request.content) == {"where": {"key": {"remoteJid": "123@s.whatsapp.net"}}}
+        return httpx.Response(200, content=body())
+
+    monkeypatch.setattr(http_client, "_shared_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    client = ChatClient()
+    result = await collect_items(client.stream_messages("test", remote_jid="123@s.whatsapp.net", limit=4), 3)
+    assert result["result"] == [{"id": 0}, {"id": 1}, {"id": 2}]
+    assert result["truncated"] is True
+    assert len(sent_chunks) < 10
+
+async def test_client_stream_http_error(monkeypatch):
+    """Los errores HTTP se convierten en EvolutionAPIError como en las peticiones normales"""
+    monkeypatch.setattr(
+        http_client,
+        "_shared_client",
+        httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(404, json={"error": "x"})))
+    )
+    with pytest.raises(http_client.EvolutionAPIError) as exc:
+        async for _ in ChatClient().stream_contacts("test"):
+            pass
+    assert exc.value.status_code == 404
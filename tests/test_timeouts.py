@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from src.evolution import http_client
+from src.evolution.http_client import EvolutionAPIClient
+from src.evolution.timeouts import TimeoutPolicy, deadline, remaining_time
+
+@pytest.fixture(autouse=True)
+def api_env(monkeypatch):
+    """Variables de entorno mínimas para construir clientes"""
+    monkeypatch.setenv("EVOLUTION_API_URL", "http://evolution.test")
+    monkeypatch.setenv("EVOLUTION_API_KEY", "test-key")
+
+class SlowClient:
+    """Cliente HTTP falso que tarda ``delay`` segundos en responder"""
+    is_closed = False
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = []
+
+    async def request(self, **kwargs):
+        self.calls.append(kwargs)
+        await asyncio.sleep(self.delay)
+
+def test_policy_matches_endpoint_prefixes():
+    """La política elige el timeout por patrón de endpoint"""
+    policy = TimeoutPolicy()
+    assert policy.timeout_for("/message/sendText/test") == 15.0
+    assert policy.timeout_for("chat/findMessages/test") == 30.0
+    assert policy.timeout_for("chat/findChats/test") == 20.0
+    assert policy.timeout_for("label/findLabels/test") == policy.default
+
+def test_policy_env_overrides(monkeypatch):
+    """EVOLUTION_API_TIMEOUTS sobrescribe reglas existentes"""
+    monkeypatch.setenv("EVOLUTION_API_TIMEOUTS", "message/send*=3, label/*=2")
+    policy = TimeoutPolicy.from_env()
+    assert policy.timeout_for("message/sendMedia/test") == 3.0
+    assert policy.timeout_for("label/findLabels/test") == 2.0
+
+def test_nested_deadline_never_extends():
+    """Un plazo interior no amplía el exterior"""
+    with deadline(1):
+        with deadline(10):
+            assert remaining_time() <= 1
+    assert remaining_time() is None
+
+async def test_request_bounded_by_endpoint_timeout(monkeypatch):
+    """Una petición lenta se cancela al vencer el timeout del endpoint"""
+    monkeypatch.setenv("EVOLUTION_API_TIMEOUTS", "instance/*=0.05")
+    monkeypatch.setattr(http_client, "_shared_client", SlowClient(1))
+    with pytest.raises(HTTPException) as exc:
+        await EvolutionAPIClient().get("instance/fetchInstances")
+    assert exc.value.status_code == 504
+
+async def test_request_bounded_by_tool_deadline(monkeypatch):
+    """El plazo de la herramienta acota el timeout enviado al upstream"""
+    fake = SlowClient(1)
+    monkeypatch.setattr(http_client, "_shared_client", fake)
+    with deadline(0.05):
+        with pytest.raises(HTTPException) as exc:
+            await EvolutionAPIClient().get("instance/fetchInstances")
+    assert exc.value.status_code == 504
+    assert fake.calls[0]["timeout"] <= 0.05
+
+async def test_expired_deadline_skips_upstream(monkeypatch):
+    """Con el plazo vencido no se inicia la petición"""
+    fake = SlowClient(0)
+    monkeypatch.setattr(http_client, "_shared_client", fake)
+    with deadline(-1):
+        with pytest.raises(HTTPException) as exc:
+            await EvolutionAPIClient().get("instance/fetchInstances")
+    assert exc.value.status_code == 504
+    assert fake.calls == []